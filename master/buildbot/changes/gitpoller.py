@@ -17,7 +17,6 @@ from __future__ import annotations
 
 import contextlib
 import os
-import re
 from typing import TYPE_CHECKING
 from typing import ClassVar
 from typing import Sequence
@@ -483,73 +482,73 @@ class GitPoller(base.ReconfigurablePollingChangeSource, StateMixin, GitMixin):
         # but not a critical error. Just use HEAD as the ref to use
         return (['HEAD'], False)
 
-    def _get_commit_comments(self, rev):
-        args = ['--no-walk', r'--format=%s%n%b', rev, '--']
-        d = self._dovccmd('log', args, path=self.workdir)
-        return d
-
-    def _get_commit_timestamp(self, rev):
-        # unix timestamp
-        args = ['--no-walk', r'--format=%ct', rev, '--']
-        d = self._dovccmd('log', args, path=self.workdir)
+    # Metadata of all new commits is extracted with a single 'git log' invocation per batch of
+    # revisions. Fields are separated by NUL characters which can't appear in any of them; '-z'
+    # also NUL-terminates file names and disables their quoting.
+    _COMMITS_INFO_FORMAT = '%x00%H%x00%ct%x00%aN <%aE>%x00%cN <%cE>%x00%s%n%b%x00'
+    COMMITS_INFO_BATCH_SIZE = 500
+
+    def _parse_commits_info(self, git_output):
+        # the output starts with the separator of the first commit
+        fields = git_output.split('\0')[1:]
+        pos = 0
+        while pos < len(fields):
+            if pos + 6 > len(fields):
+                raise OSError(f'could not parse commit info for rev {fields[pos]}')
+            rev, stamp, author, committer, comments = fields[pos : pos + 5]
+            pos += 6
+
+            # file names follow until the separator of the next commit or the end of output
+            files = []
+            while pos < len(fields) and fields[pos]:
+                files.append(fields[pos])
+                pos += 1
+            pos += 1
+            if files and files[0].startswith('\n'):
+                files[0] = files[0][1:]
 
-        @d.addCallback
-        def process(git_output):
             if self.usetimestamps:
                 try:
-                    stamp = int(git_output)
+                    timestamp = int(stamp)
                 except Exception as e:
                     log.msg(
-                        f'gitpoller: caught exception converting output \'{git_output}\' to '
-                        'timestamp'
+                        f'gitpoller: caught exception converting output \'{stamp}\' to timestamp'
                     )
                     raise e
-                return stamp
-            return None
-
-        return d
-
-    def _get_commit_files(self, rev):
-        args = ['--name-only', '--no-walk', r'--format=%n', '-m', '--first-parent', rev, '--']
-        d = self._dovccmd('log', args, path=self.workdir)
-
-        def decode_file(file):
-            # git use octal char sequences in quotes when non ASCII
-            match = re.match('^"(.*)"$', file)
-            if match:
-                file = bytes2unicode(
-                    match.groups()[0], encoding=self.encoding, errors='unicode_escape'
-                )
-            return bytes2unicode(file, encoding=self.encoding)
-
-        @d.addCallback
-        def process(git_output):
-            fileList = [
-                decode_file(file) for file in [s for s in git_output.splitlines() if len(s)]
-            ]
-            return fileList
-
-        return d
-
-    def _get_commit_author(self, rev):
-        args = ['--no-walk', r'--format=%aN <%aE>', rev, '--']
-        d = self._dovccmd('log', args, path=self.workdir)
+            else:
+                timestamp = None
 
-        @d.addCallback
-        def process(git_output):
-            if not git_output:
-                raise OSError('could not get commit author for rev')
-            return git_output
+            if not author:
+                raise OSError(f'could not get commit author for rev {rev}')
+            if not committer:
+                raise OSError(f'could not get commit committer for rev {rev}')
 
-        return d
+            yield rev, (timestamp, author, committer, files, comments.strip())
 
     @defer.inlineCallbacks
-    def _get_commit_committer(self, rev):
-        args = ['--no-walk', r'--format=%cN <%cE>', rev, '--']
-        res = yield self._dovccmd('log', args, path=self.workdir)
-        if not res:
-            raise OSError('could not get commit committer for rev')
-        return res
+    def _get_commits_info(self, revs):
+        """
+        Returns a dictionary mapping each of the given revisions to a
+        (timestamp, author, committer, files, comments) tuple.
+        """
+        args = [
+            '-z',
+            '--no-walk',
+            '--stdin',
+            '--name-only',
+            '-m',
+            '--first-parent',
+            f'--format={self._COMMITS_INFO_FORMAT}',
+            '--',
+        ]
+        git_output = yield self._dovccmd(
+            'log', args, path=self.workdir, initial_stdin='\n'.join(revs) + '\n'
+        )
+        infos = dict(self._parse_commits_info(git_output))
+        for rev in revs:
+            if rev not in infos:
+                raise OSError(f'could not get commit info for rev {rev}')
+        return infos
 
     def _get_commit_parent_hashes(self, rev):
         args = ['--no-walk', r'--format=%P', rev, '--']
@@ -618,55 +617,41 @@ class GitPoller(base.ReconfigurablePollingChangeSource, StateMixin, GitMixin):
             if last_commit is not None:
                 last_commit_id = last_commit['commitid']
 
-        for rev in revList:
-            dl = defer.DeferredList(
-                [
-                    self._get_commit_timestamp(rev),
-                    self._get_commit_author(rev),
-                    self._get_commit_committer(rev),
-                    self._get_commit_files(rev),
-                    self._get_commit_comments(rev),
-                ],
-                consumeErrors=True,
-            )
-
-            results = yield dl
-
-            # check for failures
-            failures = [r[1] for r in results if not r[0]]
-            if failures:
-                for failure in failures:
-                    log.err(failure, f"while processing changes for {rev} {branch}")
-                # just fail on the first error; they're probably all related!
-                failures[0].raiseException()
-
-            timestamp, author, committer, files, comments = [r[1] for r in results]
-
-            yield self.master.data.updates.addChange(
-                author=author,
-                committer=committer,
-                revision=bytes2unicode(rev, encoding=self.encoding),
-                files=files,
-                comments=comments,
-                when_timestamp=timestamp,
-                branch=bytes2unicode(self._removeHeads(branch)),
-                project=self.project,
-                repository=bytes2unicode(self.repourl, encoding=self.encoding),
-                category=self.category,
-                src='git',
-            )
-
-            if self._codebase_id is not None:
-                last_commit_id = yield self.master.data.updates.add_commit(
-                    codebaseid=self._codebase_id,
+        for batch_start in range(0, change_count, self.COMMITS_INFO_BATCH_SIZE):
+            batch = revList[batch_start : batch_start + self.COMMITS_INFO_BATCH_SIZE]
+            try:
+                infos = yield self._get_commits_info(batch)
+            except Exception as e:
+                log.err(e, f"while processing changes for {batch} {branch}")
+                raise
+            for rev in batch:
+                timestamp, author, committer, files, comments = infos[rev]
+
+                yield self.master.data.updates.addChange(
                     author=author,
                     committer=committer,
+                    revision=bytes2unicode(rev, encoding=self.encoding),
+                    files=files,
                     comments=comments,
                     when_timestamp=timestamp,
-                    revision=bytes2unicode(rev, encoding=self.encoding),
-                    parent_commitid=last_commit_id,
+                    branch=bytes2unicode(self._removeHeads(branch)),
+                    project=self.project,
+                    repository=bytes2unicode(self.repourl, encoding=self.encoding),
+                    category=self.category,
+                    src='git',
                 )
 
+                if self._codebase_id is not None:
+                    last_commit_id = yield self.master.data.updates.add_commit(
+                        codebaseid=self._codebase_id,
+                        author=author,
+                        committer=committer,
+                        comments=comments,
+                        when_timestamp=timestamp,
+                        revision=bytes2unicode(rev, encoding=self.encoding),
+                        parent_commitid=last_commit_id,
+                    )
+
         if self._codebase_id is not None and last_commit_id is not None:
             yield self.master.data.updates.update_branch(
                 codebaseid=self._codebase_id,
@@ -53,6 +53,9 @@ from buildbot.warnings import ConfigWarning
 from buildbot.www import auth
 from buildbot.www import avatar
 from buildbot.www.authz import authz
+from buildbot.www.eventhub import DEFAULT_HIGH_WATERMARK
+from buildbot.www.eventhub import DEFAULT_LOW_WATERMARK
+from buildbot.www.eventhub import OVERFLOW_POLICIES
 
 DEFAULT_DB_URL = 'sqlite:///state.sqlite'
 
@@ -148,6 +151,8 @@ class FileLoader(ComparableMixin):
 class DBConfig:
     db_url: str | interfaces.IRenderable = DEFAULT_DB_URL
     engine_kwargs: dict[str, Any] = field(default_factory=lambda: {})
+    # DBAPI driver of the optional asyncio database engine, e.g. 'asyncpg'
+    async_driver: str | None = None
 
     @defer.inlineCallbacks
     def getRenderingFor(self, iprops: IProperties) -> Generator[Any, Any, DBConfig]:
@@ -157,7 +162,7 @@ class DBConfig:
             db_url = self.db_url
         engine_kwargs = yield iprops.render(self.engine_kwargs)
 
-        return DBConfig(db_url, engine_kwargs)
+        return DBConfig(db_url, engine_kwargs, self.async_driver)
 
 
 class MasterConfig(util.ComparableMixin):
@@ -178,6 +183,10 @@ class MasterConfig(util.ComparableMixin):
         self.logEncoding = 'utf-8'
         self.logMaxSize = None
         self.logMaxTailSize = None
+        self.logWriteBufferSize = None
+        self.logWriteBufferTime = 1
+        self.logChunkCacheSize = 16 * 1024 * 1024
+        self.directoryUnpackThreads = 2
         self.properties = properties.Properties()
         self.collapseRequests = None
         self.codebaseGenerator = None
@@ -198,6 +207,7 @@ class MasterConfig(util.ComparableMixin):
         self.mq = {"type": 'simple'}
         self.metrics = None
         self.caches = {"Builds": 15, "Changes": 10}
+        self.cacheMaxBytes = None
         self.schedulers = {}
         self.secretsProviders = []
         self.builders = []
@@ -224,6 +234,7 @@ class MasterConfig(util.ComparableMixin):
         "buildbotURL",
         "buildCacheSize",
         "builders",
+        "cacheMaxBytes",
         "caches",
         "change_source",
         "codebaseGenerator",
@@ -233,11 +244,15 @@ class MasterConfig(util.ComparableMixin):
         "changeHorizon",
         'db',
         "db_url",
+        "directoryUnpackThreads",
         "logCompressionLimit",
         "logCompressionMethod",
         "logEncoding",
         "logMaxSize",
         "logMaxTailSize",
+        "logWriteBufferSize",
+        "logWriteBufferTime",
+        "logChunkCacheSize",
         "manhole",
         "machines",
         "collapseRequests",
@@ -404,8 +419,11 @@ class MasterConfig(util.ComparableMixin):
             'logCompressionMethod',
             _default_log_compression_method(),
         )
-        if self.logCompressionMethod not in ('raw', 'bz2', 'gz', 'lz4', 'zstd', 'br'):
-            error("c['logCompressionMethod'] must be 'raw', 'bz2', 'gz', 'lz4', 'br' or 'zstd'")
+        if self.logCompressionMethod not in ('raw', 'bz2', 'gz', 'lz4', 'zstd', 'zstd-dict', 'br'):
+            error(
+                "c['logCompressionMethod'] must be 'raw', 'bz2', 'gz', 'lz4', 'br', 'zstd' "
+                "or 'zstd-dict'"
+            )
 
         if self.logCompressionMethod == "lz4":
             try:
@@ -417,14 +435,14 @@ class MasterConfig(util.ComparableMixin):
                     "To set c['logCompressionMethod'] to 'lz4' "
                     "you must install the lz4 library ('pip install lz4')"
                 )
-        elif self.logCompressionMethod == "zstd":
+        elif self.logCompressionMethod in ("zstd", "zstd-dict"):
             try:
                 import zstandard  # pylint: disable=import-outside-toplevel
 
                 _ = zstandard
             except ImportError:
                 error(
-                    "To set c['logCompressionMethod'] to 'zstd' "
+                    f"To set c['logCompressionMethod'] to '{self.logCompressionMethod}' "
                     "you must install the zstandard Buildbot extra ('pip install buildbot[zstd]')"
                 )
         elif self.logCompressionMethod == "br":
@@ -441,6 +459,15 @@ class MasterConfig(util.ComparableMixin):
         copy_int_param('logMaxSize')
         copy_int_param('logMaxTailSize')
         copy_param('logEncoding')
+        copy_int_param('logWriteBufferSize')
+        copy_param('logWriteBufferTime', check_type=(int, float), check_type_name='a number')
+        copy_int_param('logChunkCacheSize')
+        if self.logChunkCacheSize is None or self.logChunkCacheSize < 0:
+            error("c['logChunkCacheSize'] must be a positive integer or 0")
+
+        copy_int_param('directoryUnpackThreads')
+        if self.directoryUnpackThreads is None or self.directoryUnpackThreads < 1:
+            error("c['directoryUnpackThreads'] must be at least 1")
 
         properties = config_dict.get('properties', {})
         if not isinstance(properties, dict):
@@ -525,11 +552,15 @@ class MasterConfig(util.ComparableMixin):
         dbconfig = DBConfig()
 
         if 'db' in config_dict:
-            if set(config_dict['db'].keys()) - set(['db_url', 'engine_kwargs']) and throwErrors:
+            if (
+                set(config_dict['db'].keys()) - set(['db_url', 'engine_kwargs', 'async_driver'])
+                and throwErrors
+            ):
                 error("unrecognized keys in c['db']")
             dbconfig = DBConfig(
                 db_url=config_dict['db'].get('db_url', DEFAULT_DB_URL),
                 engine_kwargs=config_dict['db'].get('engine_kwargs', {}),
+                async_driver=config_dict['db'].get('async_driver'),
             )
         elif 'db_url' in config_dict:
             dbconfig = DBConfig(config_dict['db_url'])
@@ -582,6 +613,21 @@ class MasterConfig(util.ComparableMixin):
                 error("c['caches'] must be a dictionary")
             else:
                 for name, value in caches.items():
+                    if isinstance(value, dict):
+                        unknown = set(value) - {'size', 'maxBytes', 'ttl'}
+                        if unknown:
+                            error(f"unknown keys {sorted(unknown)} for cache '{name}'")
+                            return
+                        if 'size' not in value:
+                            error(f"'size' must be given for cache '{name}'")
+                            return
+                        for key in ('maxBytes', 'ttl'):
+                            limit = value.get(key)
+                            if limit is not None and (
+                                not isinstance(limit, (int, float)) or limit <= 0
+                            ):
+                                error(f"'{key}' of cache '{name}' must be a positive number")
+                        value = value['size']
                     if not isinstance(value, int):
                         error(f"value for cache size '{name}' must be an integer")
                         return
@@ -589,6 +635,13 @@ class MasterConfig(util.ComparableMixin):
                         error(f"'{name}' cache size must be at least 1, got '{value}'")
                 self.caches.update(caches)
 
+        if 'cacheMaxBytes' in config_dict:
+            max_bytes = config_dict['cacheMaxBytes']
+            if max_bytes is not None and (not isinstance(max_bytes, int) or max_bytes < 1):
+                error("c['cacheMaxBytes'] must be a positive integer or None")
+            else:
+                self.cacheMaxBytes = max_bytes
+
         if 'buildCacheSize' in config_dict:
             if explicit:
                 msg = "cannot specify c['caches'] and c['buildCacheSize']"
@@ -802,6 +855,9 @@ class MasterConfig(util.ComparableMixin):
             'custom_templates_dir',
             'debug',
             'default_page',
+            'event_queue_high_watermark',
+            'event_queue_low_watermark',
+            'event_queue_overflow',
             'json_cache_seconds',
             'jsonp',
             'logRotateLength',
@@ -844,6 +900,29 @@ class MasterConfig(util.ComparableMixin):
                     'be a datetime.timedelta'
                 )
 
+        high_watermark = www_cfg.get('event_queue_high_watermark', DEFAULT_HIGH_WATERMARK)
+        low_watermark = www_cfg.get('event_queue_low_watermark', DEFAULT_LOW_WATERMARK)
+        for name, value in (
+            ('event_queue_high_watermark', high_watermark),
+            ('event_queue_low_watermark', low_watermark),
+        ):
+            if not isinstance(value, int) or value <= 0:
+                error(f'Invalid www["{name}"] configuration should be a positive integer')
+                break
+        else:
+            if low_watermark > high_watermark:
+                error(
+                    'Invalid www configuration: event_queue_low_watermark should not be greater '
+                    'than event_queue_high_watermark'
+                )
+
+        event_queue_overflow = www_cfg.get('event_queue_overflow')
+        if event_queue_overflow is not None and event_queue_overflow not in OVERFLOW_POLICIES:
+            error(
+                'Invalid www["event_queue_overflow"] configuration should be one of '
+                + ', '.join(repr(p) for p in OVERFLOW_POLICIES)
+            )
+
         self.www.update(www_cfg)
 
     def load_services(self, filename, config_dict):
@@ -119,6 +119,7 @@ class BuildRequestEndpoint(base.Endpoint):
         yield self.master.db.buildrequests.set_build_requests_priority(
             brids=[brid], priority=priority
         )
+        yield self.master.data.rtypes.buildrequest.generateEvent([brid], 'update')
 
     @defer.inlineCallbacks
     def control(self, action, args, kwargs):
@@ -201,6 +202,27 @@ class BuildRequest(base.ResourceType):
 
     entityType = EntityType(name)
 
+    @defer.inlineCallbacks
+    def get_unclaimed_summary(self, builderids: list[int] | None = None):
+        """
+        Get the highest priority and the oldest submission time of the
+        unclaimed build requests of the given builders, or of all builders.
+
+        @returns: dictionary mapping builderids to dictionaries with
+            'highest_priority' and 'oldest_submitted_at' keys, via Deferred.
+            Builders without unclaimed build requests are not included.
+        """
+        summaries = yield self.master.db.buildrequests.get_unclaimed_buildrequests_summary(
+            builderids
+        )
+        return {
+            s.builderid: {
+                'highest_priority': s.highest_priority,
+                'oldest_submitted_at': s.oldest_submitted_at,
+            }
+            for s in summaries
+        }
+
     @defer.inlineCallbacks
     def generateEvent(self, brids, event):
         events = []
@@ -47,6 +47,7 @@ class DataConnector(service.AsyncService):
         'buildbot.data.codebases',
         'buildbot.data.codebase_commits',
         'buildbot.data.codebase_branches',
+        'buildbot.data.dbpool',
         'buildbot.data.workers',
         'buildbot.data.steps',
         'buildbot.data.logs',
@@ -0,0 +1,105 @@
+# This file is part of Buildbot.  Buildbot is free software: you can
+# redistribute it and/or modify it under the terms of the GNU General Public
+# License as published by the Free Software Foundation, version 2.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+# FOR A PARTICULAR PURPOSE.  See the GNU General Public License for more
+# details.
+#
+# You should have received a copy of the GNU General Public License along with
+# this program; if not, write to the Free Software Foundation, Inc., 51
+# Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+#
+# Copyright Buildbot Team Members
+
+from __future__ import annotations
+
+from typing import Any
+
+from twisted.internet import defer
+
+from buildbot.data import base
+from buildbot.data import types
+
+
+def _us(seconds: float) -> int:
+    return round(seconds * 1e6)
+
+
+class DBPoolEndpoint(base.Endpoint):
+    kind = base.EndpointKind.SINGLE
+    pathPatterns = [
+        "/dbpool",
+    ]
+
+    def get(
+        self, resultSpec: base.ResultSpec, kwargs: Any
+    ) -> defer.Deferred[dict[str, Any] | None]:
+        pool = self.master.db.pool
+        if pool is None:
+            return defer.succeed(None)
+        stats = pool.stats
+        return defer.succeed({
+            'size': stats.size,
+            'busy': stats.busy,
+            'queued': stats.queued,
+            'max_busy': stats.max_busy,
+            'max_queued': stats.max_queued,
+            'bucket_bounds_us': [_us(b) for b in stats.BUCKET_BOUNDS],
+        })
+
+
+class DBQueryStatsEndpoint(base.Endpoint):
+    kind = base.EndpointKind.COLLECTION
+    pathPatterns = [
+        "/dbpool/queries",
+    ]
+
+    def get(self, resultSpec: base.ResultSpec, kwargs: Any) -> defer.Deferred[list[dict[str, Any]]]:
+        pool = self.master.db.pool
+        if pool is None:
+            return defer.succeed([])
+        return defer.succeed([
+            {
+                'name': q.name,
+                'count': q.count,
+                'wait_sum_us': _us(q.wait_sum),
+                'wait_buckets': list(q.wait_buckets),
+                'exec_sum_us': _us(q.exec_sum),
+                'exec_buckets': list(q.exec_buckets),
+            }
+            for q in pool.stats.get_queries()
+        ])
+
+
+class DBPool(base.ResourceType):
+    name = "dbpool"
+    plural = "dbpools"
+    endpoints = [DBPoolEndpoint]
+
+    class EntityType(types.Entity):
+        size = types.Integer()
+        busy = types.Integer()
+        queued = types.Integer()
+        max_busy = types.Integer()
+        max_queued = types.Integer()
+        bucket_bounds_us = types.List(of=types.Integer())
+
+    entityType = EntityType(name)
+
+
+class DBQueryStat(base.ResourceType):
+    name = "dbquerystat"
+    plural = "dbquerystats"
+    endpoints = [DBQueryStatsEndpoint]
+
+    class EntityType(types.Entity):
+        name = types.String()
+        count = types.Integer()
+        wait_sum_us = types.Integer()
+        wait_buckets = types.List(of=types.Integer())
+        exec_sum_us = types.Integer()
+        exec_buckets = types.List(of=types.Integer())
+
+    entityType = EntityType(name)
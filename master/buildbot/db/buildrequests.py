@@ -82,6 +82,13 @@ class BuildRequestModel:
         raise KeyError(key)
 
 
+@dataclass
+class UnclaimedBuildRequestsSummaryModel:
+    builderid: int
+    highest_priority: int
+    oldest_submitted_at: datetime.datetime
+
+
 @deprecate.deprecated(versions.Version("buildbot", 4, 1, 0), BuildRequestModel)
 class BrDict(BuildRequestModel):
     pass
@@ -192,6 +199,38 @@ class BuildRequestsConnectorComponent(base.DBConnectorComponent):
         res = yield self.db.pool.do(thd)
         return res
 
+    def get_unclaimed_buildrequests_summary(
+        self, builderids: list[int] | None = None
+    ) -> defer.Deferred[list[UnclaimedBuildRequestsSummaryModel]]:
+        """Get the highest priority and the oldest submission time of the
+        unclaimed build requests of each builder, in a single query"""
+
+        def thd(conn) -> list[UnclaimedBuildRequestsSummaryModel]:
+            reqs_tbl = self.db.model.buildrequests
+            claims_tbl = self.db.model.buildrequest_claims
+            q = (
+                sa.select(
+                    reqs_tbl.c.builderid,
+                    sa.func.max(reqs_tbl.c.priority).label('highest_priority'),
+                    sa.func.min(reqs_tbl.c.submitted_at).label('oldest_submitted_at'),
+                )
+                .select_from(reqs_tbl.outerjoin(claims_tbl, reqs_tbl.c.id == claims_tbl.c.brid))
+                .where((claims_tbl.c.claimed_at == NULL) & (reqs_tbl.c.complete == 0))
+                .group_by(reqs_tbl.c.builderid)
+            )
+            if builderids is not None:
+                q = q.where(reqs_tbl.c.builderid.in_(builderids))
+            return [
+                UnclaimedBuildRequestsSummaryModel(
+                    builderid=row.builderid,
+                    highest_priority=row.highest_priority,
+                    oldest_submitted_at=epoch2datetime(row.oldest_submitted_at),
+                )
+                for row in conn.execute(q).fetchall()
+            ]
+
+        return self.db.pool.do(thd)
+
     @defer.inlineCallbacks
     def claimBuildRequests(self, brids, claimed_at=None):
         if claimed_at is not None:
@@ -309,7 +348,8 @@ class BuildRequestsConnectorComponent(base.DBConnectorComponent):
                 q = reqs_tbl.update()
                 q = q.where(reqs_tbl.c.id.in_(batch))
                 q = q.where(reqs_tbl.c.complete != 1)
-                res = conn.execute(q, priority=priority)
+                q = q.values(priority=priority)
+                res = conn.execute(q)
 
                 # if an incorrect number of rows were updated, then we failed.
                 if res.rowcount != len(batch):
@@ -297,6 +297,26 @@ class BuildsetsConnectorComponent(base.DBConnectorComponent):
 
         return self.db.pool.do(thd)
 
+    def get_buildsets_properties(self, bsids) -> defer.Deferred[dict[int, BsProps]]:
+        def thd(conn) -> dict[int, BsProps]:
+            bsp_tbl = self.db.model.buildset_properties
+            ret: dict[int, BsProps] = {bsid: BsProps() for bsid in bsids}
+            for batch in self.doBatch(bsids):
+                q = sa.select(
+                    bsp_tbl.c.buildsetid,
+                    bsp_tbl.c.property_name,
+                    bsp_tbl.c.property_value,
+                ).where(bsp_tbl.c.buildsetid.in_(batch))
+                for row in conn.execute(q):
+                    try:
+                        properties = json.loads(row.property_value)
+                        ret[row.buildsetid][row.property_name] = tuple(properties)
+                    except ValueError:
+                        pass
+            return ret
+
+        return self.db.pool.do(thd)
+
     def _thd_model_from_row(self, conn, row):
         # get sourcestamps
         tbl = self.db.model.buildset_sourcestamps
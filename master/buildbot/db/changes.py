@@ -311,6 +311,23 @@ class ChangesConnectorComponent(base.DBConnectorComponent):
 
         return self.db.pool.do(thd)
 
+    def get_sourcestampids_with_changes(
+        self, sourcestampids: list[int]
+    ) -> defer.Deferred[set[int]]:
+        def thd(conn) -> set[int]:
+            changes_tbl = self.db.model.changes
+            ret: set[int] = set()
+            for batch in self.doBatch(sourcestampids):
+                q = (
+                    sa.select(changes_tbl.c.sourcestampid)
+                    .where(changes_tbl.c.sourcestampid.in_(batch))
+                    .distinct()
+                )
+                ret.update(row.sourcestampid for row in conn.execute(q))
+            return ret
+
+        return self.db.pool.do(thd)
+
     def getChangeUids(self, changeid: int) -> defer.Deferred[list[int]]:
         assert changeid >= 0
 
@@ -152,3 +152,74 @@ class ZStdCompressor(CompressorInterface):
                 compressor = self._compressor
                 self._compressor = None
                 ZStdCompressor._compressor_pool.release(compressor)
+
+
+class ZStdDictCompressor(CompressorInterface):
+    """
+    zstd compression using a dictionary trained on samples of similar data.
+
+    Small chunks of repetitive data, like the chunks of build logs, compress
+    much better with a dictionary.  The dictionary is not stored in the
+    compressed data: it must be given to every method, as a
+    C{zstandard.ZstdCompressionDict} created by L{load_dictionary}.
+    """
+
+    name = "zstd-dict"
+    available = HAS_ZSTD
+
+    COMPRESS_LEVEL = ZStdCompressor.COMPRESS_LEVEL
+
+    @staticmethod
+    def train_dictionary(samples: list[bytes], dict_size: int) -> bytes | None:
+        """
+        Train a dictionary of at most C{dict_size} bytes.  Returns C{None} if
+        there are not enough samples to train it.
+        """
+        try:
+            return zstandard.train_dictionary(dict_size, samples).as_bytes()
+        except zstandard.ZstdError:
+            return None
+
+    @classmethod
+    def load_dictionary(cls, data: bytes) -> zstandard.ZstdCompressionDict:
+        dictionary = zstandard.ZstdCompressionDict(data)
+        # the dictionary is used by many compressors, prepare it only once
+        dictionary.precompute_compress(level=cls.COMPRESS_LEVEL)
+        return dictionary
+
+    @classmethod
+    def dumps(  # type: ignore[override]
+        cls, data: bytes, dictionary: zstandard.ZstdCompressionDict
+    ) -> bytes:
+        compressor = zstandard.ZstdCompressor(level=cls.COMPRESS_LEVEL, dict_data=dictionary)
+        return compressor.compress(data)
+
+    @classmethod
+    def read(  # type: ignore[override]
+        cls, data: bytes, dictionary: zstandard.ZstdCompressionDict
+    ) -> bytes:
+        # see ZStdCompressor.read about the use of decompressobj
+        decompress_obj = zstandard.ZstdDecompressor(dict_data=dictionary).decompressobj()
+        return decompress_obj.decompress(data) + decompress_obj.flush()
+
+    class CompressObj(CompressObjInterface):
+        def __init__(self, dictionary: zstandard.ZstdCompressionDict) -> None:
+            self._compressor = zstandard.ZstdCompressor(
+                level=ZStdDictCompressor.COMPRESS_LEVEL, dict_data=dictionary
+            )
+            self._compressobj: zstandard.ZstdCompressionObj | None = None
+
+        def compress(self, data: bytes) -> bytes:
+            if self._compressobj is None:
+                self._compressobj = self._compressor.compressobj()
+            return self._compressobj.compress(data)
+
+        def flush(self) -> bytes:
+            assert self._compressobj is not None, (
+                "Programming error: Flush called without previous compress"
+            )
+            try:
+                return self._compressobj.flush(flush_mode=zstandard.COMPRESSOBJ_FLUSH_FINISH)
+            finally:
+                # a compressobj is not re-usable, the compressor is
+                self._compressobj = None
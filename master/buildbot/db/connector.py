@@ -189,9 +189,17 @@ class DBConnector(service.ReconfigurableServiceMixin, service.AsyncMultiService)
         )
         self.upsert = get_upsert_method(self._engine)
         self.has_native_upsert = self.upsert != get_upsert_method(None)
-        self.pool = pool.DBThreadPool(self._engine, reactor=self.master.reactor, verbose=verbose)
+        self.pool = self._create_pool(verbose)
         self.pool.start()
 
+        # report the pool statistics with the other metrics
+        metrics_observer = getattr(self.master, 'metrics', None)
+        if metrics_observer is not None:
+            metrics_observer.registerHandler(
+                pool.DBPoolStats,
+                pool.DBPoolStatsHandler(metrics_observer, self.pool.stats),
+            )
+
         # make sure the db is up to date, unless specifically asked not to
         if check_version:
             if self.configured_db_config.db_url == 'sqlite://':
@@ -205,6 +213,35 @@ class DBConnector(service.ReconfigurableServiceMixin, service.AsyncMultiService)
                     log.msg(l)
                 raise exceptions.DatabaseNotReadyError()
 
+    def _create_pool(self, verbose: bool) -> pool.DBThreadPool:
+        async_driver = self.configured_db_config.async_driver
+        if async_driver:
+            if not pool.is_asyncio_reactor(self.master.reactor):
+                log.msg(
+                    f"The {async_driver!r} database driver requires the asyncio reactor, "
+                    "using a thread pool instead"
+                )
+            else:
+                try:
+                    async_engine = enginestrategy.create_async_engine(
+                        self._engine,
+                        async_driver,
+                        **self.configured_db_config.engine_kwargs,
+                    )
+                except Exception as e:
+                    log.err(
+                        e,
+                        f"while setting up the {async_driver!r} database driver, "
+                        "using a thread pool instead",
+                    )
+                else:
+                    log.msg(f"Using the {async_driver!r} asyncio database driver")
+                    return pool.DBAsyncPool(
+                        self._engine, async_engine, reactor=self.master.reactor, verbose=verbose
+                    )
+
+        return pool.DBThreadPool(self._engine, reactor=self.master.reactor, verbose=verbose)
+
     @async_to_deferred
     async def _shutdown(self) -> None:
         """
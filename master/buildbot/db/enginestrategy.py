@@ -26,6 +26,7 @@ special cases that Buildbot needs.  Those include:
 from __future__ import annotations
 
 import os
+from typing import TYPE_CHECKING
 from typing import Any
 
 import sqlalchemy as sa
@@ -33,6 +34,9 @@ from sqlalchemy.engine import url
 from sqlalchemy.pool import NullPool
 from twisted.python import log
 
+if TYPE_CHECKING:
+    from sqlalchemy.ext.asyncio import AsyncEngine
+
 # from http://www.mail-archive.com/sqlalchemy@googlegroups.com/msg15079.html
 
 
@@ -241,3 +245,35 @@ def create_engine(name_or_url: str, **kwargs: Any) -> sa.Engine:
     engine.optimal_thread_pool_size = max_conns  # type: ignore[attr-defined]
 
     return engine
+
+
+# the engine arguments which also apply to the asyncio engines
+ASYNC_ENGINE_KWARGS = ('pool_size', 'max_overflow', 'pool_recycle', 'pool_timeout')
+
+
+def create_async_engine(engine: sa.Engine, async_driver: str, **kwargs: Any) -> AsyncEngine:
+    """
+    Create an asyncio engine for the database of C{engine}, using the
+    C{async_driver} DBAPI driver, e.g. C{'asyncpg'}, C{'aiomysql'} or
+    C{'aiosqlite'}.  C{kwargs} are the engine arguments of C{engine}; only
+    those listed in C{ASYNC_ENGINE_KWARGS} are used.
+    """
+    from sqlalchemy.ext.asyncio import (  # pylint: disable=import-outside-toplevel
+        create_async_engine as sa_create_async_engine,
+    )
+
+    u = engine.url.set(drivername=f'{engine.dialect.name}+{async_driver}')
+    async_kwargs = {k: v for k, v in kwargs.items() if k in ASYNC_ENGINE_KWARGS}
+    if engine.dialect.name == 'sqlite':
+        if not u.database:
+            raise ValueError("in-memory sqlite databases can't be used with an asyncio driver")
+        async_kwargs = {'poolclass': NullPool}
+    else:
+        # detect the connections lost by the database server, like the
+        # checkout listener of the synchronous mysql engines
+        async_kwargs['pool_pre_ping'] = True
+        if engine.dialect.name == 'mysql':
+            # see special_case_mysql
+            async_kwargs.setdefault('pool_recycle', 3600)
+
+    return sa_create_async_engine(u, **async_kwargs)
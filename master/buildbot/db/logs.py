@@ -18,7 +18,12 @@ from __future__ import annotations
 import dataclasses
 import io
 import os
+import struct
+import sys
 import threading
+from bisect import bisect_right
+from bisect import insort
+from collections import OrderedDict
 from functools import partial
 from typing import TYPE_CHECKING
 
@@ -38,6 +43,7 @@ from buildbot.db.compression import CompressorInterface
 from buildbot.db.compression import GZipCompressor
 from buildbot.db.compression import LZ4Compressor
 from buildbot.db.compression import ZStdCompressor
+from buildbot.db.compression import ZStdDictCompressor
 from buildbot.db.compression.protocol import CompressObjInterface
 from buildbot.util.twisted import async_to_deferred
 from buildbot.warnings import warn_deprecated
@@ -46,12 +52,15 @@ if TYPE_CHECKING:
     from typing import AsyncGenerator
     from typing import Callable
     from typing import Generator
+    from typing import Iterable
     from typing import Literal
     from typing import TypeVar
 
     from sqlalchemy.engine import Connection as SAConnection
+    from twisted.internet.interfaces import IDelayedCall
     from twisted.internet.interfaces import IReactorThreads
     from typing_extensions import ParamSpec
+    from zstandard import ZstdCompressionDict
 
     _T = TypeVar('_T')
     _P = ParamSpec('_P')
@@ -95,6 +104,22 @@ class LogModel:
         raise KeyError(key)
 
 
+@dataclasses.dataclass
+class LogChunksSummaryModel:
+    logid: int
+    num_chunks: int
+    size: int
+    # whether some chunks are not compressed with the requested method
+    other_compression: bool
+
+
+@dataclasses.dataclass
+class LogDictionaryModel:
+    id: int
+    builderid: int | None
+    created_at: int
+
+
 class RawCompressor(CompressorInterface):
     name = "raw"
 
@@ -114,6 +139,165 @@ class RawCompressor(CompressorInterface):
             return b''
 
 
+def _iter_chunk_lines(data: bytes) -> Generator[str, None, None]:
+    # NOTE: we need a streaming decompression interface
+    with io.BytesIO(data) as data_buffer, io.TextIOWrapper(
+        data_buffer,
+        encoding='utf-8',
+    ) as reader:
+        # last line-ending is stripped from chunk on insert
+        # add it back here to simplify handling after
+        data_buffer.seek(0, os.SEEK_END)
+        data_buffer.write(b'\n')
+        data_buffer.seek(0, os.SEEK_SET)
+
+        yield from iter(reader.readline, '')
+
+
+class LogChunkCache:
+    """
+    Least-recently-used cache of the decoded lines of recently appended log
+    chunks, keyed by C{(logid, first_line)} and bounded by the estimated size
+    of the lines, in bytes.
+
+    The cache also records the number of lines of the logs appended to by this
+    master, so that reads past the end of a cached log do not need to query
+    the database.
+    """
+
+    def __init__(self, max_bytes: int = 0):
+        self.max_bytes = max_bytes
+        self.bytes = 0
+        # (logid, first_line) -> (last_line, lines, size)
+        self._chunks: OrderedDict[tuple[int, int], tuple[int, tuple[str, ...], int]] = OrderedDict()
+        # sorted first lines of the cached chunks of each log
+        self._first_lines: dict[int, list[int]] = {}
+        self._num_lines: dict[int, int] = {}
+
+    def set_max_bytes(self, max_bytes: int) -> None:
+        self.max_bytes = max_bytes
+        self._purge()
+
+    def put(
+        self, logid: int, first_line: int, last_line: int, lines: tuple[str, ...], size: int
+    ) -> None:
+        if size <= self.max_bytes:
+            key = (logid, first_line)
+            if key in self._chunks:
+                self._remove(key)
+            self._chunks[key] = (last_line, lines, size)
+            insort(self._first_lines.setdefault(logid, []), first_line)
+            self.bytes += size
+        if logid in self._first_lines:
+            self._num_lines[logid] = max(self._num_lines.get(logid, 0), last_line + 1)
+        self._purge()
+
+    def get_chunks(
+        self, logid: int, first_line: int, last_line: int | None
+    ) -> list[tuple[int, int, tuple[str, ...]]]:
+        """
+        Return the C{(first_line, last_line, lines)} of the contiguous cached chunks
+        holding the lines from C{first_line}, up to C{last_line} or the first
+        line which is not cached.
+        """
+        first_lines = self._first_lines.get(logid)
+        if not first_lines:
+            return []
+        chunks: list[tuple[int, int, tuple[str, ...]]] = []
+        line = first_line
+        idx = max(bisect_right(first_lines, line) - 1, 0)
+        while idx < len(first_lines) and (last_line is None or line <= last_line):
+            key = (logid, first_lines[idx])
+            chunk_last_line, lines, _ = self._chunks[key]
+            if not key[1] <= line <= chunk_last_line:
+                break
+            self._chunks.move_to_end(key)
+            chunks.append((key[1], chunk_last_line, lines))
+            line = chunk_last_line + 1
+            idx += 1
+        return chunks
+
+    def next_first_line(self, logid: int, line: int) -> int | None:
+        """Return the first line of the next cached chunk after C{line}"""
+        first_lines = self._first_lines.get(logid)
+        if first_lines:
+            idx = bisect_right(first_lines, line)
+            if idx < len(first_lines):
+                return first_lines[idx]
+        return None
+
+    def get_num_lines(self, logid: int) -> int | None:
+        """Return the number of lines of the log, if it has cached chunks"""
+        if logid in self._first_lines:
+            return self._num_lines.get(logid)
+        return None
+
+    def invalidate(self, logid: int | None = None) -> None:
+        """Forget the chunks of the given log, or of all logs"""
+        if logid is None:
+            self._chunks.clear()
+            self._first_lines.clear()
+            self._num_lines.clear()
+            self.bytes = 0
+            return
+        for first_line in self._first_lines.get(logid, [])[:]:
+            self._remove((logid, first_line))
+        self._num_lines.pop(logid, None)
+
+    def _remove(self, key: tuple[int, int]) -> None:
+        logid, first_line = key
+        _, _, size = self._chunks.pop(key)
+        self.bytes -= size
+        first_lines = self._first_lines[logid]
+        first_lines.remove(first_line)
+        if not first_lines:
+            del self._first_lines[logid]
+            self._num_lines.pop(logid, None)
+
+    def _purge(self) -> None:
+        while self.bytes > self.max_bytes and self._chunks:
+            self._remove(next(iter(self._chunks)))
+
+
+class _LogWriteBuffer:
+    """
+    Lines appended to a log and not written to the database yet, numbered
+    from C{written_lines}, the number of lines in the database.
+    """
+
+    def __init__(self, written_lines: int):
+        self.written_lines = written_lines
+        self.num_lines = written_lines
+        # the lines being written to the database, in order, then the lines
+        # waiting to be written
+        self.batches: list[list[str]] = []
+        self.lines: list[str] = []
+        self.size = 0
+        self.lock = defer.DeferredLock()
+        self.timer: IDelayedCall | None = None
+
+    def append(self, content: str) -> None:
+        lines = [line + '\n' for line in content[:-1].split('\n')]
+        self.lines.extend(lines)
+        self.num_lines += len(lines)
+        self.size += len(content)
+
+    def take(self) -> list[str]:
+        lines = self.lines
+        if lines:
+            self.batches.append(lines)
+            self.lines = []
+            self.size = 0
+        return lines
+
+    def get_lines(self) -> list[str]:
+        lines = []
+        for batch in self.batches:
+            lines.extend(batch)
+        lines.extend(self.lines)
+        return lines
+
+
 class LogsConnectorComponent(base.DBConnectorComponent):
     # Postgres and MySQL will both allow bigger sizes than this.  The limit
     # for MySQL appears to be max_packet_size (default 1M).
@@ -122,6 +306,7 @@ class LogsConnectorComponent(base.DBConnectorComponent):
     MAX_CHUNK_LINES = 1000  # a chunk may not have more lines than this
 
     NO_COMPRESSION_ID = 0
+    ZSTD_DICT_COMPRESSION_ID = 6
     COMPRESSION_BYID: dict[int, type[CompressorInterface]] = {
         NO_COMPRESSION_ID: RawCompressor,
         1: GZipCompressor,
@@ -129,8 +314,14 @@ class LogsConnectorComponent(base.DBConnectorComponent):
         3: LZ4Compressor,
         4: ZStdCompressor,
         5: BrotliCompressor,
+        ZSTD_DICT_COMPRESSION_ID: ZStdDictCompressor,
     }
 
+    # the chunks compressed with a dictionary start with the dictionary id
+    DICTIONARY_ID_HEADER = struct.Struct('>I')
+    # maximum number of live logs whose dictionary is remembered
+    MAX_LOG_DICTIONARIES = 1000
+
     COMPRESSION_MODE = {
         compressor.name: (compressor_id, compressor)
         for compressor_id, compressor in COMPRESSION_BYID.items()
@@ -150,6 +341,14 @@ class LogsConnectorComponent(base.DBConnectorComponent):
             maxthreads=max_threads,
             name='DBLogCompression',
         )
+        self._chunk_cache = LogChunkCache()
+        # the zstd dictionaries by id, loaded when first needed
+        self._dictionaries: dict[int, ZstdCompressionDict] = {}
+        # the dictionary id (or None) used to compress the chunks of the live logs
+        self._log_dictionary_ids: OrderedDict[int, int | None] = OrderedDict()
+        # the lines of the live logs not written to the database yet, when
+        # c['logWriteBufferSize'] is set
+        self._write_buffers: dict[int, _LogWriteBuffer] = {}
 
     @defer.inlineCallbacks
     def startService(self):
@@ -158,6 +357,11 @@ class LogsConnectorComponent(base.DBConnectorComponent):
 
     @defer.inlineCallbacks
     def stopService(self):
+        for logid in list(self._write_buffers):
+            try:
+                yield self._flush_write_buffer(logid)
+            except Exception as e:
+                log.err(e, f'while writing the buffered lines of log {logid}')
         yield super().stopService()
         self._compression_pool.stop()
 
@@ -184,6 +388,132 @@ class LogsConnectorComponent(base.DBConnectorComponent):
             raise LogCompressionFormatUnavailableError(msg)
         return compressor
 
+    def _read_chunk(self, compressed_id: int, content: bytes) -> bytes:
+        """
+        Uncompress the content of a chunk.  The dictionaries of the chunks
+        compressed with a dictionary must have been loaded with
+        _load_dictionaries beforehand.
+        """
+        compressor = self._get_compressor(compressed_id)
+        if compressor is ZStdDictCompressor:
+            (dictionary_id,) = self.DICTIONARY_ID_HEADER.unpack_from(content)
+            dictionary = self._dictionaries.get(dictionary_id)
+            if dictionary is None:
+                msg = f"Unknown log compression dictionary ID {dictionary_id}"
+                raise LogCompressionFormatUnavailableError(msg)
+            return compressor.read(  # type: ignore[call-arg]
+                content[self.DICTIONARY_ID_HEADER.size :], dictionary
+            )
+        return compressor.read(content)
+
+    async def _load_dictionaries(self, chunks: Iterable[tuple[int, bytes]]) -> None:
+        """
+        Load the dictionaries needed to read the given (compressed, content)
+        chunks.
+        """
+        dictionary_ids = {
+            self.DICTIONARY_ID_HEADER.unpack_from(content)[0]
+            for compressed_id, content in chunks
+            if compressed_id == self.ZSTD_DICT_COMPRESSION_ID
+        }
+        dictionary_ids.difference_update(self._dictionaries)
+        if not dictionary_ids:
+            return
+
+        def thd(conn) -> list[tuple[int, bytes]]:
+            tbl = self.db.model.logchunk_dictionaries
+            q = sa.select(tbl.c.id, tbl.c.content).where(tbl.c.id.in_(dictionary_ids))
+            return [(row.id, row.content) for row in conn.execute(q)]
+
+        rows = await self.db.pool.do(thd)
+        self._get_compressor(self.ZSTD_DICT_COMPRESSION_ID)
+        dictionaries = await self._defer_to_compression_pool(
+            lambda: {
+                dictionary_id: ZStdDictCompressor.load_dictionary(content)
+                for dictionary_id, content in rows
+            }
+        )
+        self._dictionaries.update(dictionaries)
+
+    def _get_log_dictionary_id(self, logid: int) -> defer.Deferred[int | None]:
+        """
+        Find the most recent dictionary trained for the builder of the log,
+        or else the most recent global dictionary.
+        """
+
+        def thd(conn) -> int | None:
+            model = self.db.model
+            tbl = model.logchunk_dictionaries
+            q = (
+                sa.select(tbl.c.id)
+                .select_from(
+                    model.logs.join(model.steps, model.steps.c.id == model.logs.c.stepid).join(
+                        model.builds, model.builds.c.id == model.steps.c.buildid
+                    )
+                )
+                .join(
+                    tbl,
+                    sa.or_(
+                        tbl.c.builderid == model.builds.c.builderid,
+                        tbl.c.builderid.is_(None),
+                    ),
+                )
+                .where(model.logs.c.id == logid)
+                # builder dictionaries first
+                .order_by(sa.case((tbl.c.builderid.is_(None), 1), else_=0), tbl.c.id.desc())
+                .limit(1)
+            )
+            res = conn.execute(q)
+            row = res.fetchone()
+            res.close()
+            return row.id if row is not None else None
+
+        return self.db.pool.do(thd)
+
+    async def _get_log_compression(
+        self,
+        logid: int,
+        compression_method: str | None = None,
+        live: bool = False,
+    ) -> tuple[int, Callable[[], CompressObjInterface], bytes]:
+        """
+        Returns the compression id, a factory of compression objects and the
+        header of the chunks of the log, compressed with compression_method
+        or with the configured logCompressionMethod if it is not given.
+
+        The logs are compressed with the 'zstd-dict' method only once a
+        dictionary has been trained, and with 'zstd' until then.  The
+        dictionary of the live logs is remembered until they are finished.
+        """
+        if compression_method is None:
+            compressed_id, compressor = self._get_configured_compressor()
+        else:
+            compressed_id, compressor = self.COMPRESSION_MODE[compression_method]
+        if compressor is not ZStdDictCompressor:
+            return compressed_id, compressor.CompressObj, b''
+
+        if logid in self._log_dictionary_ids:
+            dictionary_id = self._log_dictionary_ids[logid]
+        else:
+            dictionary_id = await self._get_log_dictionary_id(logid)
+            if live:
+                self._log_dictionary_ids[logid] = dictionary_id
+                while len(self._log_dictionary_ids) > self.MAX_LOG_DICTIONARIES:
+                    self._log_dictionary_ids.popitem(last=False)
+
+        if dictionary_id is None:
+            compressed_id, compressor = self.COMPRESSION_MODE[ZStdCompressor.name]
+            return compressed_id, compressor.CompressObj, b''
+
+        header = self.DICTIONARY_ID_HEADER.pack(dictionary_id)
+        await self._load_dictionaries([(compressed_id, header)])
+        dictionary = self._dictionaries[dictionary_id]
+        return (
+            compressed_id,
+            partial(ZStdDictCompressor.CompressObj, dictionary),  # type: ignore[call-arg]
+            header,
+        )
+
     def _getLog(self, whereclause) -> defer.Deferred[LogModel | None]:
         def thd_getLog(conn) -> LogModel | None:
             q = self.db.model.logs.select()
@@ -198,7 +528,18 @@ class LogsConnectorComponent(base.DBConnectorComponent):
             res.close()
             return rv
 
-        return self.db.pool.do(thd_getLog)
+        d = self.db.pool.do(thd_getLog)
+        d.addCallback(self._add_buffered_lines)
+        return d
+
+    def _add_buffered_lines(self, model: LogModel | None) -> LogModel | None:
+        # the buffered lines are visible to the readers as soon as they are
+        # appended
+        if model is not None:
+            buffer = self._write_buffers.get(model.id)
+            if buffer is not None:
+                model.num_lines = max(model.num_lines, buffer.num_lines)
+        return model
 
     def getLog(self, logid: int) -> defer.Deferred[LogModel | None]:
         return self._getLog(self.db.model.logs.c.id == logid)
@@ -217,13 +558,79 @@ class LogsConnectorComponent(base.DBConnectorComponent):
             res = conn.execute(q).mappings()
             return [self._model_from_row(row) for row in res.fetchall()]
 
-        return self.db.pool.do(thdGetLogs)
+        d = self.db.pool.do(thdGetLogs)
+        d.addCallback(lambda models: [self._add_buffered_lines(m) for m in models])
+        return d
 
     async def iter_log_lines(
         self,
         logid: int,
         first_line: int = 0,
         last_line: int | None = None,
+    ) -> AsyncGenerator[str, None]:
+        buffer = self._write_buffers.get(logid)
+        if buffer is None:
+            async for line in self._iter_stored_log_lines(logid, first_line, last_line):
+                yield line
+            return
+
+        # the lines from buffer.written_lines are not in the database yet
+        written_lines = buffer.written_lines
+        buffered_lines = buffer.get_lines()
+        if first_line < written_lines:
+            stored_last_line = written_lines - 1
+            if last_line is not None:
+                stored_last_line = min(last_line, stored_last_line)
+            async for line in self._iter_stored_log_lines(logid, first_line, stored_last_line):
+                yield line
+        start = max(first_line - written_lines, 0)
+        end = None if last_line is None else max(last_line - written_lines + 1, 0)
+        for line in buffered_lines[start:end]:
+            yield line
+
+    async def _iter_stored_log_lines(
+        self,
+        logid: int,
+        first_line: int,
+        last_line: int | None,
+    ) -> AsyncGenerator[str, None]:
+        # recently appended chunks are read from the chunk cache, and the
+        # lines between them from the database
+        cache = self._chunk_cache
+        line_idx = first_line
+        while last_line is None or line_idx <= last_line:
+            num_lines = cache.get_num_lines(logid)
+            if num_lines is not None and line_idx >= num_lines:
+                return
+
+            if cached_chunks := cache.get_chunks(logid, line_idx, last_line):
+                for chunk_first_line, chunk_last_line, lines in cached_chunks:
+                    start = line_idx - chunk_first_line
+                    end = None if last_line is None else last_line - chunk_first_line + 1
+                    for line in lines[start:end]:
+                        yield line
+                    line_idx = chunk_last_line + 1
+                continue
+
+            db_last_line = last_line
+            next_cached_line = cache.next_first_line(logid, line_idx)
+            if next_cached_line is not None and (
+                last_line is None or next_cached_line <= last_line
+            ):
+                db_last_line = next_cached_line - 1
+
+            async for line in self._iter_db_log_lines(logid, line_idx, db_last_line):
+                yield line
+
+            if db_last_line is None or db_last_line == last_line:
+                return
+            line_idx = db_last_line + 1
+
+    async def _iter_db_log_lines(
+        self,
+        logid: int,
+        first_line: int,
+        last_line: int | None,
     ) -> AsyncGenerator[str, None]:
         def _thd_get_chunks(
             conn: SAConnection,
@@ -256,6 +663,9 @@ class LogsConnectorComponent(base.DBConnectorComponent):
                 last_line,
                 CHUNK_BATCH_SIZE,
             ):
+                await self._load_dictionaries(
+                    (compressed, content) for _, _, compressed, content in chunks
+                )
                 for chunk in chunks:
                     yield chunk
 
@@ -269,27 +679,15 @@ class LogsConnectorComponent(base.DBConnectorComponent):
         ) -> Generator[str, None, None]:
             # Retrieve associated "reader" and extract the data
             # Note that row.content is stored as bytes, and our caller expects unicode
-            data = self._get_compressor(compressed).read(content)
-            # NOTE: we need a streaming decompression interface
-            with io.BytesIO(data) as data_buffer, io.TextIOWrapper(
-                data_buffer,
-                encoding='utf-8',
-            ) as reader:
-                # last line-ending is stripped from chunk on insert
-                # add it back here to simplify handling after
-                data_buffer.seek(0, os.SEEK_END)
-                data_buffer.write(b'\n')
-                data_buffer.seek(0, os.SEEK_SET)
-
-                line_idx = chunk_first_line
-
+            data = self._read_chunk(compressed, content)
+            line_idx = chunk_first_line
+            for line in _iter_chunk_lines(data):
+                if last_line is not None and line_idx > last_line:
+                    break
                 # need to skip some lines
-                while line_idx < first_line and reader.readline():
-                    line_idx += 1
-
-                while (last_line is None or line_idx <= last_line) and (line := reader.readline()):
+                if line_idx >= first_line:
                     yield line
-                    line_idx += 1
+                line_idx += 1
 
         async for chunk_first_line, _, compressed, content in _iter_chunks_batched():
             async for line in _async_iter_on_pool(
@@ -350,48 +748,113 @@ class LogsConnectorComponent(base.DBConnectorComponent):
 
     @async_to_deferred
     async def appendLog(self, logid: int, content: str) -> tuple[int, int] | None:
-        def _thd_get_numlines(conn: SAConnection) -> int | None:
-            q = sa.select(self.db.model.logs.c.num_lines)
-            q = q.where(self.db.model.logs.c.id == logid)
-            res = conn.execute(q)
-            num_lines = res.fetchone()
-            res.close()
-            return num_lines[0] if num_lines else None
+        assert content[-1] == '\n'
 
-        def _thd_insert_chunk(
-            conn: SAConnection,
-            first_line: int,
-            last_line: int,
-            content: bytes,
-            compressed_id: int,
-        ) -> None:
-            res = conn.execute(
-                self.db.model.logchunks.insert(),
-                {
-                    "logid": logid,
-                    "first_line": first_line,
-                    "last_line": last_line,
-                    "content": content,
-                    "compressed": compressed_id,
-                },
+        max_size: int | None = self.master.config.logWriteBufferSize
+        buffer = self._write_buffers.get(logid)
+        if buffer is None:
+            if not max_size:
+                return await self._write_log_lines(logid, content)
+            log_model = await self._getLog(self.db.model.logs.c.id == logid)
+            if log_model is None:
+                # ignore a missing log
+                return None
+            buffer = self._write_buffers.setdefault(logid, _LogWriteBuffer(log_model.num_lines))
+
+        first_line = buffer.num_lines
+        buffer.append(content)
+        last_line = buffer.num_lines - 1
+        if not max_size or buffer.size >= max_size:
+            # the caller waits for the buffer to be written, which throttles
+            # the producer if the database can't keep up
+            await self._flush_write_buffer(logid)
+        elif buffer.timer is None:
+            buffer.timer = self.master.reactor.callLater(
+                self.master.config.logWriteBufferTime, self._flush_write_buffer_later, logid
             )
-            conn.commit()
-            res.close()
+        return first_line, last_line
 
-        def _thd_update_num_lines(conn: SAConnection, num_lines: int) -> None:
-            res = conn.execute(
-                self.db.model.logs.update()
-                .where(self.db.model.logs.c.id == logid)
-                .values(num_lines=num_lines)
-            )
-            conn.commit()
-            res.close()
+    def _flush_write_buffer_later(self, logid: int) -> None:
+        buffer = self._write_buffers.get(logid)
+        if buffer is not None:
+            buffer.timer = None
+        d = self._flush_write_buffer(logid)
+        d.addErrback(log.err, f'while writing the buffered lines of log {logid}')
+
+    @async_to_deferred
+    async def _flush_write_buffer(self, logid: int) -> None:
+        buffer = self._write_buffers.get(logid)
+        if buffer is None:
+            return
+        if buffer.timer is not None:
+            if buffer.timer.active():
+                buffer.timer.cancel()
+            buffer.timer = None
+        buffer.take()
+        if buffer.batches:
+            # also waits for the lines being written by another flush
+            await buffer.lock.run(self._write_buffered_lines, logid, buffer)
+
+    @async_to_deferred
+    async def _write_buffered_lines(self, logid: int, buffer: _LogWriteBuffer) -> None:
+        # the batches are written in order, under the lock of the buffer.  A
+        # batch that failed to be written stays in the buffer, and is written
+        # again by the next flush
+        while buffer.batches:
+            lines = buffer.batches[0]
+            await self._write_log_lines(logid, ''.join(lines))
+            buffer.batches.pop(0)
+            buffer.written_lines += len(lines)
+        if not buffer.lines and self._write_buffers.get(logid) is buffer:
+            del self._write_buffers[logid]
+
+    async def _write_log_lines(self, logid: int, content: str) -> tuple[int, int] | None:
+        def _thd_insert_chunks(
+            conn: SAConnection,
+            chunks: list[tuple[bytes, int, int]],
+        ) -> tuple[int, int] | None:
+            # All chunks, and the update of the line count, are written in a single
+            # transaction so that each call costs a single round-trip to the database.
+            # The log row is locked so that concurrent appends can't allocate the same lines.
+            logs_tbl = self.db.model.logs
+            with conn.begin():
+                q = sa.select(logs_tbl.c.num_lines)
+                q = q.where(logs_tbl.c.id == logid).with_for_update()
+                res = conn.execute(q)
+                row = res.fetchone()
+                res.close()
+                if row is None:
+                    # ignore a missing log
+                    return None
+
+                num_lines: int = row.num_lines
+                chunk_first_line = num_lines
+                rows = []
+                for compressed_chunk, compressed_id, chunk_lines_count in chunks:
+                    chunk_last_line = chunk_first_line + chunk_lines_count - 1
+                    rows.append({
+                        "logid": logid,
+                        "first_line": chunk_first_line,
+                        "last_line": chunk_last_line,
+                        "content": compressed_chunk,
+                        "compressed": compressed_id,
+                    })
+                    chunk_first_line = chunk_last_line + 1
+
+                conn.execute(self.db.model.logchunks.insert(), rows).close()
+                conn.execute(
+                    logs_tbl.update()
+                    .where(logs_tbl.c.id == logid)
+                    .values(num_lines=chunk_first_line)
+                ).close()
+
+            return num_lines, chunk_first_line - 1
 
         def _thd_compress_chunk(
             compress_obj: CompressObjInterface,
             compressor_id: int,
             lines: list[bytes],
-        ) -> tuple[bytes, int, int]:
+        ) -> tuple[bytes, int, int, bytes]:
             # check for trailing newline and strip it for storage
             # chunks omit the trailing newline
             assert lines and lines[-1][-1:] == b'\n'
@@ -403,17 +866,18 @@ class LogsConnectorComponent(base.DBConnectorComponent):
                 uncompressed_size += len(line)
                 compressed_bytes.append(compress_obj.compress(line))
             compressed_bytes.append(compress_obj.flush())
-            compressed_chunk = b''.join(compressed_bytes)
+            compressed_chunk = header + b''.join(compressed_bytes)
+            uncompressed_chunk = b''.join(lines)
 
             # Is it useful to compress the chunk?
             if uncompressed_size <= len(compressed_chunk):
-                return b''.join(lines), self.NO_COMPRESSION_ID, len(lines)
+                return uncompressed_chunk, self.NO_COMPRESSION_ID, len(lines), uncompressed_chunk
 
-            return compressed_chunk, compressor_id, len(lines)
+            return compressed_chunk, compressor_id, len(lines), uncompressed_chunk
 
         def _thd_iter_chunk_compress(
             content: str,
-        ) -> Generator[tuple[bytes, int, int], None]:
+        ) -> Generator[tuple[bytes, int, int, bytes], None]:
             """
             Split content into chunk delimited by line-endings.
             Try our best to keep chunks smaller than MAX_CHUNK_SIZE
@@ -430,8 +894,7 @@ class LogsConnectorComponent(base.DBConnectorComponent):
                         line = line[:-1]
                 return line + b'\n'
 
-            compressor_id, compressor = self._get_configured_compressor()
-            compress_obj = compressor.CompressObj()
+            compress_obj = compress_obj_factory()
 
             with io.StringIO(content) as buffer:
                 lines: list[bytes] = []
@@ -448,7 +911,7 @@ class LogsConnectorComponent(base.DBConnectorComponent):
 
                     if line_size > self.MAX_CHUNK_SIZE:
                         compressed = _thd_compress_chunk(compress_obj, compressor_id, [line_bytes])
-                        compressed_chunk, _, _ = compressed
+                        compressed_chunk, _, _, _ = compressed
                         # check if compressed size is compliant with DB row limit
                         if len(compressed_chunk) > self.MAX_CHUNK_SIZE:
                             compressed = _thd_compress_chunk(
@@ -463,59 +926,157 @@ class LogsConnectorComponent(base.DBConnectorComponent):
 
         assert content[-1] == '\n'
 
-        num_lines = await self.db.pool.do(_thd_get_numlines)
-        if num_lines is None:
-            # ignore a missing log
-            return None
-
-        # Break the content up into chunks
-        chunk_first_line = last_line = num_lines
-        async for (
-            compressed_chunk,
-            compressed_id,
-            chunk_lines_count,
-        ) in _async_iter_on_pool(
-            partial(
-                _thd_iter_chunk_compress,
-                content=content,
-            ),
-            reactor=self.master.reactor,
-            provider_threadpool=self._compression_pool,
-            # In theory, memory usage could grow to:
-            # MAX_CHUNK_SIZE * max_backlog PER thread (capped by _compression_pool.maxthreads)
-            # with:
-            #   - MAX_CHUNK_SIZE = 64KB
-            #   - max_backlog = 100
-            # ~6MB per thread
-            max_backlog=100,
-        ):
-            last_line = chunk_first_line + chunk_lines_count - 1
-
-            await self.db.pool.do(
-                _thd_insert_chunk,
-                first_line=chunk_first_line,
-                last_line=last_line,
-                content=compressed_chunk,
-                compressed_id=compressed_id,
-            )
+        compressor_id, compress_obj_factory, header = await self._get_log_compression(
+            logid, live=True
+        )
 
-            chunk_first_line = last_line + 1
+        cache_size: int = self.master.config.logChunkCacheSize
+        self._chunk_cache.set_max_bytes(cache_size)
+
+        def _thd_prepare_chunks() -> tuple[
+            list[tuple[bytes, int, int]], list[tuple[tuple[str, ...], int]]
+        ]:
+            chunks = []
+            decoded_chunks = []
+            for (
+                compressed_chunk,
+                compressed_id,
+                lines_count,
+                uncompressed_chunk,
+            ) in _thd_iter_chunk_compress(content):
+                chunks.append((compressed_chunk, compressed_id, lines_count))
+                if cache_size:
+                    lines = tuple(_iter_chunk_lines(uncompressed_chunk))
+                    decoded_chunks.append((lines, sum(map(sys.getsizeof, lines))))
+            return chunks, decoded_chunks
+
+        # Break the content up into chunks. This is done before looking up the log so that
+        # the line numbering and the insertion can happen in a single transaction.
+        chunks, decoded_chunks = await self._defer_to_compression_pool(_thd_prepare_chunks)
+        res = await self.db.pool.do(_thd_insert_chunks, chunks)
+
+        # keep the decoded lines for the readers following the log
+        if res is not None and decoded_chunks:
+            chunk_first_line, _ = res
+            for (_, _, lines_count), (lines, size) in zip(chunks, decoded_chunks):
+                chunk_last_line = chunk_first_line + lines_count - 1
+                self._chunk_cache.put(logid, chunk_first_line, chunk_last_line, lines, size)
+                chunk_first_line = chunk_last_line + 1
+        return res
 
-        await self.db.pool.do(_thd_update_num_lines, last_line + 1)
-        return num_lines, last_line
+    @async_to_deferred
+    async def finishLog(self, logid: int) -> None:
+        await self._flush_write_buffer(logid)
+        self._log_dictionary_ids.pop(logid, None)
 
-    def finishLog(self, logid: int) -> defer.Deferred[None]:
         def thdfinishLog(conn) -> None:
             tbl = self.db.model.logs
             q = tbl.update().where(tbl.c.id == logid)
             conn.execute(q.values(complete=1))
 
-        return self.db.pool.do_with_transaction(thdfinishLog)
+        await self.db.pool.do_with_transaction(thdfinishLog)
+
+    def get_logs_to_recompress(
+        self,
+        compression_method: str,
+        after_logid: int = 0,
+        limit: int = 100,
+    ) -> defer.Deferred[list[LogChunksSummaryModel]]:
+        """
+        Find the finished logs, after after_logid, whose chunks could be
+        merged or recompressed with compression_method: logs with more chunks
+        than compressLog leaves once it has grouped them, or with chunks not
+        all compressed with compression_method.
+
+        With the 'zstd-dict' method, the chunks compressed with 'zstd' are
+        only recompressed if a dictionary is available for their builder.
+        """
+        compressed_id, _ = self.COMPRESSION_MODE[compression_method]
+
+        def thd(conn) -> list[LogChunksSummaryModel]:
+            model = self.db.model
+            logs_tbl = model.logs
+            tbl = model.logchunks
+            num_chunks = sa.func.count(tbl.c.first_line)
+            size = sa.func.sum(sa.func.length(tbl.c.content))
+            num_lines = sa.func.sum(tbl.c.last_line - tbl.c.first_line + 1)
+            from_clause = tbl.join(logs_tbl, logs_tbl.c.id == tbl.c.logid)
+            if compressed_id == self.ZSTD_DICT_COMPRESSION_ID:
+                dictionaries = model.logchunk_dictionaries
+                has_dictionary = sa.exists().where(
+                    sa.or_(
+                        dictionaries.c.builderid.is_(None),
+                        dictionaries.c.builderid == model.builds.c.builderid,
+                    )
+                )
+                other_compression = sa.func.sum(
+                    sa.case(
+                        (tbl.c.compressed == compressed_id, 0),
+                        (
+                            sa.and_(
+                                tbl.c.compressed == self.COMPRESSION_MODE[ZStdCompressor.name][0],
+                                ~has_dictionary,
+                            ),
+                            0,
+                        ),
+                        else_=1,
+                    )
+                )
+                from_clause = from_clause.join(
+                    model.steps, model.steps.c.id == logs_tbl.c.stepid
+                ).join(model.builds, model.builds.c.id == model.steps.c.buildid)
+            else:
+                other_compression = sa.func.sum(
+                    sa.case((tbl.c.compressed != compressed_id, 1), else_=0)
+                )
+            q = (
+                sa.select(tbl.c.logid, num_chunks, size, other_compression)
+                .select_from(from_clause)
+                .where(logs_tbl.c.complete == 1)
+                .where(logs_tbl.c.type != 'd')
+                .where(tbl.c.logid > after_logid)
+                .group_by(tbl.c.logid)
+                .having(num_chunks > 1)
+                .having(
+                    sa.or_(
+                        # compressLog groups a chunk with the previous ones unless the group
+                        # would exceed MAX_CHUNK_SIZE or MAX_CHUNK_LINES, so any two consecutive
+                        # chunks of a grouped log exceed one of them, and such a log has fewer
+                        # than 2 * (size / MAX_CHUNK_SIZE + num_lines / MAX_CHUNK_LINES) + 1
+                        # chunks.
+                        num_chunks * self.MAX_CHUNK_SIZE * self.MAX_CHUNK_LINES
+                        >= 2 * (size * self.MAX_CHUNK_LINES + num_lines * self.MAX_CHUNK_SIZE)
+                        + self.MAX_CHUNK_SIZE * self.MAX_CHUNK_LINES,
+                        other_compression > 0,
+                    )
+                )
+                .order_by(tbl.c.logid)
+                .limit(limit)
+            )
+            return [
+                LogChunksSummaryModel(
+                    logid=row[0],
+                    num_chunks=row[1],
+                    size=row[2],
+                    other_compression=bool(row[3]),
+                )
+                for row in conn.execute(q)
+            ]
+
+        return self.db.pool.do(thd)
 
     @async_to_deferred
-    async def compressLog(self, logid: int, force: bool = False) -> int:
+    async def compressLog(
+        self,
+        logid: int,
+        force: bool = False,
+        compression_method: str | None = None,
+    ) -> int:
         """
         returns the size (in bytes) saved.
+
+        The chunks are compressed with compression_method, or with the
+        configured logCompressionMethod if it is not given.
         """
         tbl = self.db.model.logchunks
 
@@ -638,6 +1199,7 @@ class LogsConnectorComponent(base.DBConnectorComponent):
         def _thd_recompress_chunks(
             compressed_chunks: list[tuple[int, bytes]],
             compress_obj: CompressObjInterface,
+            header: bytes,
         ) -> tuple[bytes, int]:
             """This has to run in the compression thread pool"""
             # decompress this group of chunks. Note that the content is binary bytes.
@@ -652,33 +1214,41 @@ class LogsConnectorComponent(base.DBConnectorComponent):
                 if idx != 0:
                     chunks.append(compress_obj.compress(b'\n'))
 
-                uncompressed_content = self._get_compressor(chunk_compress_id).read(chunk_content)
+                uncompressed_content = self._read_chunk(chunk_compress_id, chunk_content)
                 chunks.append(compress_obj.compress(uncompressed_content))
 
             chunks.append(compress_obj.flush())
-            new_content = b''.join(chunks)
+            new_content = header + b''.join(chunks)
             bytes_saved -= len(new_content)
             return new_content, bytes_saved
 
+        # the chunks are regrouped; the log is usually finished and is no
+        # longer followed by readers
+        self._chunk_cache.invalidate(logid)
+
         chunk_groups = await self.db.pool.do(_thd_gather_chunks_to_process)
         if not chunk_groups:
             return 0
 
         total_bytes_saved: int = 0
 
-        compressed_id, compressor = self._get_configured_compressor()
-        compress_obj = compressor.CompressObj()
+        compressed_id, compress_obj_factory, header = await self._get_log_compression(
+            logid, compression_method
+        )
+        compress_obj = compress_obj_factory()
         for group_first_line, group_last_line in chunk_groups:
             compressed_chunks = await self.db.pool.do(
                 _thd_get_chunks_content,
                 first_line=group_first_line,
                 last_line=group_last_line,
             )
+            await self._load_dictionaries(compressed_chunks)
 
             new_content, bytes_saved = await self._defer_to_compression_pool(
                 _thd_recompress_chunks,
                 compressed_chunks=compressed_chunks,
                 compress_obj=compress_obj,
+                header=header,
             )
 
             total_bytes_saved += bytes_saved
@@ -693,6 +1263,90 @@ class LogsConnectorComponent(base.DBConnectorComponent):
 
         return total_bytes_saved
 
+    def get_log_dictionaries(self) -> defer.Deferred[list[LogDictionaryModel]]:
+        """
+        Returns the zstd dictionaries of the log chunks, without their content.
+        """
+
+        def thd(conn) -> list[LogDictionaryModel]:
+            tbl = self.db.model.logchunk_dictionaries
+            q = sa.select(tbl.c.id, tbl.c.builderid, tbl.c.created_at).order_by(tbl.c.id)
+            return [
+                LogDictionaryModel(id=row.id, builderid=row.builderid, created_at=row.created_at)
+                for row in conn.execute(q)
+            ]
+
+        return self.db.pool.do(thd)
+
+    @async_to_deferred
+    async def train_log_dictionary(
+        self,
+        builderid: int | None = None,
+        max_samples: int = 1000,
+        dict_size: int = 112640,
+    ) -> int | None:
+        """
+        Train a zstd dictionary of at most dict_size bytes on the most recent
+        chunks of the finished logs of a builder, or of all builders if
+        builderid is None, and store it.  At most max_samples chunks, and 100
+        times dict_size uncompressed bytes, are sampled.
+
+        Returns the id of the new dictionary, or None if there are not enough
+        chunks to train it.
+        """
+        self._get_compressor(self.ZSTD_DICT_COMPRESSION_ID)
+        max_samples_size = dict_size * 100
+
+        def _thd_get_samples(conn) -> list[tuple[int, bytes]]:
+            model = self.db.model
+            tbl = model.logchunks
+            q = (
+                sa.select(tbl.c.compressed, tbl.c.content)
+                .select_from(tbl.join(model.logs, model.logs.c.id == tbl.c.logid))
+                .where(model.logs.c.complete == 1)
+                .where(model.logs.c.type != 'd')
+            )
+            if builderid is not None:
+                q = (
+                    q.join(model.steps, model.steps.c.id == model.logs.c.stepid)
+                    .join(model.builds, model.builds.c.id == model.steps.c.buildid)
+                    .where(model.builds.c.builderid == builderid)
+                )
+            q = q.order_by(tbl.c.logid.desc(), tbl.c.first_line).limit(max_samples)
+            return [(row.compressed, row.content) for row in conn.execute(q)]
+
+        def _thd_train(compressed_chunks: list[tuple[int, bytes]]) -> bytes | None:
+            samples: list[bytes] = []
+            samples_size = 0
+            for compressed_id, content in compressed_chunks:
+                if samples_size >= max_samples_size:
+                    break
+                sample = self._read_chunk(compressed_id, content)
+                samples.append(sample)
+                samples_size += len(sample)
+            return ZStdDictCompressor.train_dictionary(samples, dict_size)
+
+        def _thd_insert(conn, content: bytes) -> int:
+            tbl = self.db.model.logchunk_dictionaries
+            res = conn.execute(
+                tbl.insert(),
+                {
+                    "builderid": builderid,
+                    "created_at": int(self.master.reactor.seconds()),
+                    "content": content,
+                },
+            )
+            conn.commit()
+            return res.inserted_primary_key[0]
+
+        compressed_chunks = await self.db.pool.do(_thd_get_samples)
+        await self._load_dictionaries(compressed_chunks)
+        content = await self._defer_to_compression_pool(_thd_train, compressed_chunks)
+        if content is None:
+            log.msg(f'not enough log chunks to train a dictionary for builder {builderid}')
+            return None
+        return await self.db.pool.do(_thd_insert, content)
+
     def deleteOldLogChunks(self, older_than_timestamp: int) -> defer.Deferred[int]:
         def thddeleteOldLogs(conn) -> int:
             model = self.db.model
@@ -754,7 +1408,57 @@ class LogsConnectorComponent(base.DBConnectorComponent):
             res.close()
             return count1 - count2
 
-        return self.db.pool.do(thddeleteOldLogs)
+        def _invalidate_chunk_cache(res):
+            # the deleted logs are not known here, forget all cached chunks
+            self._chunk_cache.invalidate()
+            return res
+
+        def _delete_unused_dictionaries(count):
+            d = self._delete_unused_log_dictionaries()
+            d.addCallback(lambda _: count)
+            return d
+
+        d = self.db.pool.do(thddeleteOldLogs)
+        d.addBoth(_invalidate_chunk_cache)
+        d.addCallback(_delete_unused_dictionaries)
+        return d
+
+    @async_to_deferred
+    async def _delete_unused_log_dictionaries(self) -> None:
+        """
+        Delete the dictionaries no log chunk is compressed with anymore,
+        except the most recent dictionary of each builder, and the global one,
+        which new logs are compressed with.
+        """
+        # the dictionaries of the live logs of this master, which may not have
+        # written a chunk yet
+        live_ids = {i for i in self._log_dictionary_ids.values() if i is not None}
+
+        def thd(conn) -> list[int]:
+            model = self.db.model
+            tbl = model.logchunk_dictionaries
+            chunks = model.logchunks
+            used_ids = set(live_ids)
+            q = sa.select(sa.func.max(tbl.c.id)).group_by(tbl.c.builderid)
+            used_ids.update(row[0] for row in conn.execute(q))
+            q = (
+                sa.select(sa.func.substr(chunks.c.content, 1, self.DICTIONARY_ID_HEADER.size))
+                .where(chunks.c.compressed == self.ZSTD_DICT_COMPRESSION_ID)
+                .distinct()
+            )
+            used_ids.update(
+                self.DICTIONARY_ID_HEADER.unpack(bytes(row[0]))[0] for row in conn.execute(q)
+            )
+            unused_ids = [
+                row.id for row in conn.execute(sa.select(tbl.c.id)) if row.id not in used_ids
+            ]
+            if unused_ids:
+                conn.execute(tbl.delete().where(tbl.c.id.in_(unused_ids))).close()
+                conn.commit()
+            return unused_ids
+
+        for dictionary_id in await self.db.pool.do(thd):
+            self._dictionaries.pop(dictionary_id, None)
 
     def _model_from_row(self, row):
         return LogModel(
@@ -0,0 +1,60 @@
+# This file is part of Buildbot.  Buildbot is free software: you can
+# redistribute it and/or modify it under the terms of the GNU General Public
+# License as published by the Free Software Foundation, version 2.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+# FOR A PARTICULAR PURPOSE.  See the GNU General Public License for more
+# details.
+#
+# You should have received a copy of the GNU General Public License along with
+# this program; if not, write to the Free Software Foundation, Inc., 51
+# Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+#
+# Copyright Buildbot Team Members
+"""add logchunk_dictionaries table
+
+Revision ID: 068
+Revises: 067
+
+"""
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "068"
+down_revision = "067"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'logchunk_dictionaries',
+        sa.Column('id', sa.Integer, primary_key=True),
+        sa.Column(
+            'builderid',
+            sa.Integer,
+            sa.ForeignKey('builders.id'),
+            nullable=True,
+        ),
+        sa.Column('created_at', sa.Integer, nullable=False),
+        sa.Column(
+            'content',
+            sa.LargeBinary().with_variant(sa.dialects.mysql.LONGBLOB, "mysql"),
+            nullable=False,
+        ),
+        mysql_DEFAULT_CHARSET='utf8',
+    )
+
+    op.create_index(
+        'logchunk_dictionaries_builderid',
+        'logchunk_dictionaries',
+        ['builderid'],
+    )
+
+
+def downgrade() -> None:
+    op.drop_index('logchunk_dictionaries_builderid')
+    op.drop_table('logchunk_dictionaries')
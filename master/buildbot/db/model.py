@@ -259,10 +259,33 @@ class Model(base.DBConnectorComponent):
         sa.Column('last_line', sa.Integer, nullable=False),
         # log contents, including a terminating newline, encoded in utf-8 or,
         # if 'compressed' is not 0, compressed with gzip, bzip2, lz4, br or zstd
+        # (with or without a dictionary)
         sa.Column('content', sa.LargeBinary(65536)),
         sa.Column('compressed', sa.SmallInteger, nullable=False),
     )
 
+    # zstd dictionaries used to compress the log chunks with the 'zstd-dict'
+    # method; such chunks start with the id of their dictionary
+    logchunk_dictionaries = sautils.Table(
+        'logchunk_dictionaries',
+        metadata,
+        sa.Column('id', sa.Integer, primary_key=True),
+        # the builder whose logs were sampled to train the dictionary, or NULL
+        # for a dictionary trained on the logs of all builders
+        sa.Column(
+            'builderid',
+            sa.Integer,
+            sa.ForeignKey('builders.id'),
+            nullable=True,
+        ),
+        sa.Column('created_at', sa.Integer, nullable=False),
+        sa.Column(
+            'content',
+            sa.LargeBinary().with_variant(sa.dialects.mysql.LONGBLOB, "mysql"),
+            nullable=False,
+        ),
+    )
+
     # Tables related to buildsets
     # ---------------------------
 
@@ -1113,6 +1136,7 @@ class Model(base.DBConnectorComponent):
     sa.Index('logs_slug', logs.c.stepid, logs.c.slug, unique=True)
     sa.Index('logchunks_firstline', logchunks.c.logid, logchunks.c.first_line)
     sa.Index('logchunks_lastline', logchunks.c.logid, logchunks.c.last_line)
+    sa.Index('logchunk_dictionaries_builderid', logchunk_dictionaries.c.builderid)
     sa.Index(
         'test_names_name', test_names.c.builderid, test_names.c.name, mysql_length={'name': 255}
     )
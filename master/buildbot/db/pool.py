@@ -15,13 +15,18 @@
 
 from __future__ import annotations
 
+import asyncio
+import bisect
+import functools
 import inspect
+import threading
 import time
 import traceback
 from typing import TYPE_CHECKING
 
 import sqlalchemy as sa
 from twisted.internet import defer
+from twisted.internet import task
 from twisted.internet import threads
 from twisted.python import log
 
@@ -33,11 +38,13 @@ from buildbot.db.logs import LogSlugExistsError
 from buildbot.db.schedulers import SchedulerAlreadyClaimedError
 from buildbot.process import metrics
 from buildbot.util.sautils import get_sqlite_version
+from buildbot.util.twisted import async_to_deferred
 
 if TYPE_CHECKING:
     from typing import Callable
     from typing import TypeVar
 
+    from sqlalchemy.ext.asyncio import AsyncEngine
     from typing_extensions import Concatenate
     from typing_extensions import ParamSpec
 
@@ -51,6 +58,160 @@ if TYPE_CHECKING:
 debug = False
 _debug_id = 1
 
+# exceptions expected in normal operation, which are not logged
+_EXPECTED_EXCEPTIONS = (
+    AlreadyClaimedError,
+    ChangeSourceAlreadyClaimedError,
+    SchedulerAlreadyClaimedError,
+    AlreadyCompleteError,
+    LogSlugExistsError,
+)
+
+
+def is_asyncio_reactor(reactor) -> bool:
+    try:
+        from twisted.internet.asyncioreactor import (  # pylint: disable=import-outside-toplevel
+            AsyncioSelectorReactor,
+        )
+    except ImportError:
+        return False
+    return isinstance(reactor, AsyncioSelectorReactor)
+
+
+class DBQueryStats:
+    """
+    Histograms of the time a database function waited for a thread and of its
+    execution time.  C{wait_buckets[i]} counts the waits not longer than
+    C{DBPoolStats.BUCKET_BOUNDS[i]}; the last bucket counts the longer ones.
+    """
+
+    def __init__(self, name: str) -> None:
+        self.name = name
+        self.count = 0
+        self.wait_sum = 0.0
+        self.wait_buckets = [0] * (len(DBPoolStats.BUCKET_BOUNDS) + 1)
+        self.exec_sum = 0.0
+        self.exec_buckets = [0] * (len(DBPoolStats.BUCKET_BOUNDS) + 1)
+
+    def add(self, wait: float, elapsed: float) -> None:
+        self.count += 1
+        self.wait_sum += wait
+        self.wait_buckets[bisect.bisect_left(DBPoolStats.BUCKET_BOUNDS, wait)] += 1
+        self.exec_sum += elapsed
+        self.exec_buckets[bisect.bisect_left(DBPoolStats.BUCKET_BOUNDS, elapsed)] += 1
+
+    def asDict(self) -> dict:
+        return {
+            'count': self.count,
+            'wait_sum': self.wait_sum,
+            'wait_buckets': list(self.wait_buckets),
+            'exec_sum': self.exec_sum,
+            'exec_buckets': list(self.exec_buckets),
+        }
+
+
+class DBPoolStats:
+    """
+    Statistics of the functions run by a database pool, by function name
+    (see L{DBQueryStats}), and the number of busy threads and of functions
+    waiting for a thread.  The statistics are accumulated since the pool was
+    created; they are updated from the pool threads.
+    """
+
+    # upper bounds of the histogram buckets, in seconds
+    BUCKET_BOUNDS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+    def __init__(self, size: int) -> None:
+        self.size = size
+        self.busy = 0
+        self.queued = 0
+        self.max_busy = 0
+        self.max_queued = 0
+        self.queries: dict[str, DBQueryStats] = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def get_name(callable) -> str:
+        name = getattr(callable, '__qualname__', None) or repr(callable)
+        return name.replace('.<locals>', '')
+
+    def on_queued(self) -> None:
+        with self._lock:
+            self.queued += 1
+            self.max_queued = max(self.max_queued, self.queued)
+
+    def on_started(self) -> None:
+        with self._lock:
+            self.queued -= 1
+            self.busy += 1
+            self.max_busy = max(self.max_busy, self.busy)
+
+    def on_finished(self, name: str, wait: float, elapsed: float) -> None:
+        with self._lock:
+            self.busy -= 1
+            stats = self.queries.get(name)
+            if stats is None:
+                stats = self.queries[name] = DBQueryStats(name)
+            stats.add(wait, elapsed)
+
+    def get_queries(self) -> list[DBQueryStats]:
+        with self._lock:
+            return sorted(self.queries.values(), key=lambda q: q.name)
+
+    def report(self, max_queries: int = 10) -> str:
+        retval = [
+            f"DBPool: size={self.size} busy={self.busy} queued={self.queued} "
+            f"max_busy={self.max_busy} max_queued={self.max_queued}"
+        ]
+        queries = sorted(self.get_queries(), key=lambda q: q.exec_sum, reverse=True)
+        for q in queries[:max_queries]:
+            retval.append(
+                f"DBQuery {q.name}: count={q.count} "
+                f"wait={q.wait_sum / q.count:.3g} exec={q.exec_sum / q.count:.3g}"
+            )
+        return "\n".join(retval)
+
+    def asDict(self) -> dict:
+        return {
+            'size': self.size,
+            'busy': self.busy,
+            'queued': self.queued,
+            'max_busy': self.max_busy,
+            'max_queued': self.max_queued,
+            'bucket_bounds': list(self.BUCKET_BOUNDS),
+            'queries': {q.name: q.asDict() for q in self.get_queries()},
+        }
+
+
+class DBPoolStatsHandler(metrics.MetricHandler):
+    """
+    Reports the L{DBPoolStats} of the database pool with the other metrics of
+    a L{metrics.MetricLogObserver}.  There are no events to handle, the pool
+    updates its statistics directly.
+    """
+
+    def __init__(self, metrics, stats: DBPoolStats) -> None:
+        self.stats = stats
+        super().__init__(metrics)
+
+    def reset(self):
+        pass
+
+    def handle(self, eventDict, metric):
+        pass
+
+    def keys(self):
+        return [q.name for q in self.stats.get_queries()]
+
+    def get(self, name):
+        return self.stats.queries[name]
+
+    def report(self):
+        return self.stats.report()
+
+    def asDict(self):
+        return {"db_pool": self.stats.asDict()}
+
 
 def timed_do_fn(f):
     """Decorate a do function to log before, after, and elapsed time,
@@ -82,6 +243,7 @@ def timed_do_fn(f):
 
         # wrap the callable to log the begin and end of the actual thread
         # function
+        @functools.wraps(callable)
         def callable_wrap(*args, **kargs):
             log.msg(f"{descr} - thd start")
             try:
@@ -133,6 +295,7 @@ class DBThreadPool:
         self._pool = util.twisted.ThreadPool(
             minthreads=1, maxthreads=pool_size, name='DBThreadPool'
         )
+        self.stats = DBPoolStats(pool_size)
 
         self.engine = engine
         if engine.dialect.name == 'sqlite':
@@ -192,7 +355,38 @@ class DBThreadPool:
     BACKOFF_MULT = 1.05
     MAX_OPERATIONALERROR_TIME = 3600 * 24  # one day
 
+    def _should_retry(self, e: sa.exc.OperationalError, start: float) -> bool:
+        if not self.engine.should_retry(e):
+            log.err(e, 'Got fatal OperationalError on DB')
+            return False
+        elapsed = time.time() - start
+        if elapsed > self.MAX_OPERATIONALERROR_TIME:
+            log.err(
+                e,
+                f'Raising due to {self.MAX_OPERATIONALERROR_TIME} seconds delay on DB query retries',
+            )
+            return False
+
+        metrics.MetricCountEvent.log("DBThreadPool.retry-on-OperationalError")
+        return True
+
     def __thd(
+        self,
+        with_engine: bool,
+        name: str,
+        queued_at: float,
+        callable: Callable[Concatenate[sa.engine.Engine | sa.engine.Connection, _P], _T],
+        args: _P.args,
+        kwargs: _P.kwargs,
+    ) -> _T:
+        started_at = time.monotonic()
+        self.stats.on_started()
+        try:
+            return self.__thd_retry(with_engine, callable, args, kwargs)
+        finally:
+            self.stats.on_finished(name, started_at - queued_at, time.monotonic() - started_at)
+
+    def __thd_retry(
         self,
         with_engine: bool,
         callable: Callable[Concatenate[sa.engine.Engine | sa.engine.Connection, _P], _T],
@@ -216,19 +410,8 @@ class DBThreadPool:
                         "do not return ResultProxy objects!"
                     )
                 except sa.exc.OperationalError as e:
-                    if not self.engine.should_retry(e):
-                        log.err(e, 'Got fatal OperationalError on DB')
-                        raise
-                    elapsed = time.time() - start
-                    if elapsed > self.MAX_OPERATIONALERROR_TIME:
-                        log.err(
-                            e,
-                            f'Raising due to {self.MAX_OPERATIONALERROR_TIME} '
-                            'seconds delay on DB query retries',
-                        )
+                    if not self._should_retry(e, start):
                         raise
-
-                    metrics.MetricCountEvent.log("DBThreadPool.retry-on-OperationalError")
                     # sleep (remember, we're in a thread..)
                     time.sleep(backoff)
                     backoff *= self.BACKOFF_MULT
@@ -238,16 +421,7 @@ class DBThreadPool:
                 except Exception as e:
                     # AlreadyClaimedError are normal especially in a multimaster
                     # configuration
-                    if not isinstance(
-                        e,
-                        (
-                            AlreadyClaimedError,
-                            ChangeSourceAlreadyClaimedError,
-                            SchedulerAlreadyClaimedError,
-                            AlreadyCompleteError,
-                            LogSlugExistsError,
-                        ),
-                    ):
+                    if not isinstance(e, _EXPECTED_EXCEPTIONS):
                         log.err(e, 'Got fatal Exception on DB')
                     raise
             finally:
@@ -264,6 +438,8 @@ class DBThreadPool:
     ) -> defer.Deferred[_T]:
         """Same as `do`, but will wrap callable with `with conn.begin():`"""
 
+        # account the time to the wrapped function in the pool statistics
+        @functools.wraps(callable)
         def _transaction(
             conn: sa.engine.Connection,
             callable: Callable[Concatenate[sa.engine.Connection, _P], _T],
@@ -281,15 +457,16 @@ class DBThreadPool:
         *args: _P.args,
         **kwargs: _P.kwargs,
     ) -> defer.Deferred[_T]:
-        return threads.deferToThreadPool(
-            self.reactor,
-            self._pool,
-            self.__thd,  # type: ignore[arg-type]
-            False,
-            callable,
-            args,
-            kwargs,
-        )
+        return self._do(DBPoolStats.get_name(callable), callable, args, kwargs)
+
+    def _do(
+        self,
+        name: str,
+        callable: Callable[Concatenate[sa.engine.Connection, _P], _T],
+        args: _P.args,
+        kwargs: _P.kwargs,
+    ) -> defer.Deferred[_T]:
+        return self._defer_to_thread(False, name, callable, args, kwargs)
 
     def do_with_engine(
         self,
@@ -297,12 +474,95 @@ class DBThreadPool:
         *args: _P.args,
         **kwargs: _P.kwargs,
     ) -> defer.Deferred[_T]:
+        return self._defer_to_thread(True, DBPoolStats.get_name(callable), callable, args, kwargs)
+
+    def _defer_to_thread(self, with_engine, name, callable, args, kwargs) -> defer.Deferred:
+        self.stats.on_queued()
         return threads.deferToThreadPool(
             self.reactor,
             self._pool,
             self.__thd,  # type: ignore[arg-type]
-            True,
+            with_engine,
+            name,
+            time.monotonic(),
             callable,
             args,
             kwargs,
         )
+
+
+class DBAsyncPool(DBThreadPool):
+    """
+    Runs the database functions on the asyncio event loop, through an
+    SQLAlchemy asyncio engine, instead of running them in a thread pool.
+
+    The functions passed to C{do} are the same as with L{DBThreadPool}: they
+    get a synchronous connection, whose I/O is done by the asyncio driver
+    (see C{AsyncConnection.run_sync}).  They should not do long computations,
+    which would block the reactor.  At most C{pool_size} functions run
+    concurrently.
+
+    The Twisted reactor must be the asyncio reactor.  The functions using the
+    engine (C{do_with_engine}), such as the schema upgrades, still run in the
+    thread pool.
+    """
+
+    def __init__(self, engine, async_engine: AsyncEngine, reactor, verbose=False):
+        super().__init__(engine, reactor, verbose=verbose)
+        self.async_engine = async_engine
+        self.pool_size = getattr(engine, 'optimal_thread_pool_size', 5)
+        self._semaphore = defer.DeferredSemaphore(self.pool_size)
+
+    @defer.inlineCallbacks
+    def stop(self):
+        if self.running:
+            yield defer.Deferred.fromFuture(asyncio.ensure_future(self.async_engine.dispose()))
+        yield super().stop()
+
+    async def _run(
+        self,
+        callable: Callable[Concatenate[sa.engine.Connection, _P], _T],
+        args: _P.args,
+        kwargs: _P.kwargs,
+    ) -> _T:
+        async with self.async_engine.connect() as conn:
+            return await conn.run_sync(callable, *args, **kwargs)
+
+    @async_to_deferred
+    async def _do(
+        self,
+        name: str,
+        callable: Callable[Concatenate[sa.engine.Connection, _P], _T],
+        args: _P.args,
+        kwargs: _P.kwargs,
+    ) -> _T:
+        backoff = self.BACKOFF_START
+        start = time.time()
+        while True:
+            queued_at = time.monotonic()
+            self.stats.on_queued()
+            await self._semaphore.acquire()
+            started_at = time.monotonic()
+            self.stats.on_started()
+            try:
+                rv = await defer.Deferred.fromFuture(
+                    asyncio.ensure_future(self._run(callable, args, kwargs))
+                )
+                assert not isinstance(rv, self.forbidded_callable_return_type), (
+                    "do not return ResultProxy objects!"
+                )
+                return rv
+            except sa.exc.OperationalError as e:
+                if not self._should_retry(e, start):
+                    raise
+                log.err(e, f'retrying {callable} after sql error {e}')
+            except Exception as e:
+                if not isinstance(e, _EXPECTED_EXCEPTIONS):
+                    log.err(e, 'Got fatal Exception on DB')
+                raise
+            finally:
+                self.stats.on_finished(name, started_at - queued_at, time.monotonic() - started_at)
+                self._semaphore.release()
+
+            await task.deferLater(self.reactor, backoff)
+            backoff *= self.BACKOFF_MULT
@@ -224,6 +224,28 @@ class SourceStampsConnectorComponent(base.DBConnectorComponent):
 
         return self.db.pool.do(thd)
 
+    def get_sourcestamps_for_buildsets(
+        self, buildsetids
+    ) -> defer.Deferred[dict[int, list[SourceStampModel]]]:
+        def thd(conn) -> dict[int, list[SourceStampModel]]:
+            bsss_tbl = self.db.model.buildset_sourcestamps
+            sstamps_tbl = self.db.model.sourcestamps
+
+            from_clause = bsss_tbl.join(sstamps_tbl, bsss_tbl.c.sourcestampid == sstamps_tbl.c.id)
+
+            ret: dict[int, list[SourceStampModel]] = {bsid: [] for bsid in buildsetids}
+            for batch in self.doBatch(buildsetids):
+                q = (
+                    sa.select(bsss_tbl.c.buildsetid, sstamps_tbl)
+                    .select_from(from_clause)
+                    .where(bsss_tbl.c.buildsetid.in_(batch))
+                )
+                for row in conn.execute(q).fetchall():
+                    ret[row.buildsetid].append(self._rowToModel_thd(conn, row))
+            return ret
+
+        return self.db.pool.do(thd)
+
     # returns a Deferred that returns a value
     def getSourceStampsForBuild(self, buildid) -> defer.Deferred[list[SourceStampModel]]:
         assert buildid > 0
@@ -112,6 +112,9 @@ class BuildMaster(service.ReconfigurableServiceMixin, service.MasterService):
         # WebStatus to duplicate those values.
         self.log_rotation = LogRotation()
 
+        # thread pool extracting uploaded directories, created on first use
+        self.directory_unpack_pool = None
+
         # local cache for this master's object ID
         self._object_id = None
 
@@ -27,7 +27,7 @@ from buildbot.util import tuplematch
 class SimpleMQ(service.ReconfigurableServiceMixin, base.MQBase):
     def __init__(self):
         super().__init__()
-        self.qrefs = []
+        self.qrefs = tuplematch.TupleMatchIndex()
         self.persistent_qrefs = {}
         self.debug = False
 
@@ -38,9 +38,8 @@ class SimpleMQ(service.ReconfigurableServiceMixin, base.MQBase):
     def produce(self, routingKey, data):
         if self.debug:
             log.msg(f"MSG: {routingKey}\n{pprint.pformat(data)}")
-        for qref in self.qrefs:
-            if tuplematch.matchTuple(routingKey, qref.filter):
-                self.invokeQref(qref, routingKey, data)
+        for qref in self.qrefs.match(routingKey):
+            self.invokeQref(qref, routingKey, data)
 
     def startConsuming(self, callback, filter, persistent_name=None):
         if any(not isinstance(k, str) and k is not None for k in filter):
@@ -51,11 +50,11 @@ class SimpleMQ(service.ReconfigurableServiceMixin, base.MQBase):
                 qref.startConsuming(callback)
             else:
                 qref = PersistentQueueRef(self, callback, filter)
-                self.qrefs.append(qref)
+                self.qrefs.add(filter, qref)
                 self.persistent_qrefs[persistent_name] = qref
         else:
             qref = QueueRef(self, callback, filter)
-            self.qrefs.append(qref)
+            self.qrefs.add(filter, qref)
         return defer.succeed(qref)
 
 
@@ -69,10 +68,7 @@ class QueueRef(base.QueueRef):
 
     def stopConsuming(self):
         self.callback = None
-        try:
-            self.mq.qrefs.remove(self)
-        except ValueError:
-            pass
+        self.mq.qrefs.remove(self)
 
 
 class PersistentQueueRef(QueueRef):
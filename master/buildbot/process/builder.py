@@ -523,6 +523,4 @@ class Builder(util_service.ReconfigurableServiceMixin, service.MultiService):
 
         return collapseRequests_fn
 
-    @staticmethod
-    def _defaultCollapseRequestFn(master, builder, brdict1, brdict2):
-        return buildrequest.BuildRequest.canBeCollapsed(master, brdict1, brdict2)
+    _defaultCollapseRequestFn = staticmethod(buildrequest.default_collapse_requests_fn)
@@ -16,6 +16,7 @@
 from __future__ import annotations
 
 import calendar
+import json
 from typing import TYPE_CHECKING
 
 from twisted.internet import defer
@@ -43,6 +44,10 @@ class BuildRequestCollapser:
     #     (sourcestamps match, except for revision) Then:
     #     2.1. claim it
     #     2.2. complete it with result SKIPPED
+    #
+    # The new buildrequests are grouped by builder, so that the unclaimed
+    # buildrequests of each builder are loaded only once, and all collapsed
+    # buildrequests are claimed and completed together.
 
     def __init__(self, master, brids):
         self.master = master
@@ -59,27 +64,93 @@ class BuildRequestCollapser:
         return unclaim_brs
 
     @defer.inlineCallbacks
-    def collapse(self):
-        brids_to_collapse = set()
+    def _getNewBrsByBuilder(self):
+        # Retrieve all the new buildrequests with a single query, grouped by
+        # builder
+        new_brs = yield self.master.data.get(
+            ('buildrequests',),
+            [resultspec.Filter('buildrequestid', 'eq', sorted(set(self.brids)))],
+        )
+        brs_by_builder = {}
+        for br in sorted(new_brs, key=lambda br: br['buildrequestid']):
+            brs_by_builder.setdefault(br['builderid'], []).append(br)
+        return brs_by_builder
 
-        for brid in self.brids:
-            # Get the BuildRequest object
-            br = yield self.master.data.get(('buildrequests', brid))
-            # Retrieve the buildername
-            builderid = br['builderid']
-            bldrdict = yield self.master.data.get(('builders', builderid))
-            # Get the builder object
-            bldr = self.master.botmaster.builders.get(bldrdict['name'])
-            if not bldr:
+    @defer.inlineCallbacks
+    def _getCollapseKeys(self, bsids):
+        # Compute, for each buildset, a key summarizing everything the default
+        # collapse function compares, so that two buildsets are compatible if
+        # and only if their keys are equal. Buildsets that can never be
+        # collapsed (e.g. with a patch) get a None key.
+        bsids = sorted(bsids)
+        sourcestamps = yield self.master.db.sourcestamps.get_sourcestamps_for_buildsets(bsids)
+        ssids = [ss.ssid for bs_sourcestamps in sourcestamps.values() for ss in bs_sourcestamps]
+        ssids_with_changes = yield self.master.db.changes.get_sourcestampids_with_changes(ssids)
+        bs_props = yield self.master.db.buildsets.get_buildsets_properties(bsids)
+
+        keys = {}
+        for bsid in bsids:
+            sources = {ss.codebase: ss for ss in sourcestamps[bsid]}
+            if any(ss.patch for ss in sources.values()):
+                keys[bsid] = None
                 continue
-            # Get the Collapse BuildRequest function (from the configuration)
-            collapseRequestsFn = bldr.getCollapseRequestsFn()
-            unclaim_brs = yield self._getUnclaimedBrs(builderid)
 
-            # short circuit if there is no merging to do
-            if not collapseRequestsFn or not unclaim_brs:
-                continue
+            ss_keys = []
+            for codebase, ss in sorted(sources.items()):
+                has_changes = ss.ssid in ssids_with_changes
+                # the revision only matters if there are no changes
+                revision = None if has_changes else ss.revision
+                ss_keys.append((
+                    codebase,
+                    ss.repository,
+                    ss.branch,
+                    ss.project,
+                    has_changes,
+                    revision,
+                ))
+
+            props = BuildRequest.filter_buildset_props_for_collapsing(bs_props[bsid])
+            keys[bsid] = (tuple(ss_keys), json.dumps(props, sort_keys=True))
+        return keys
+
+    @defer.inlineCallbacks
+    def _collapseWithKeys(self, new_brs, unclaim_brs):
+        # Vectorized version of the default collapse function: every
+        # buildset is fetched only once, and requests are matched by key
+        # instead of being compared pairwise.
+        bsids = {br['buildsetid'] for br in new_brs} | {br['buildsetid'] for br in unclaim_brs}
+        keys = yield self._getCollapseKeys(bsids)
+
+        brids_by_bsid = {}
+        brids_by_key = {}
+        for unclaim_br in unclaim_brs:
+            brid = unclaim_br['buildrequestid']
+            brids_by_bsid.setdefault(unclaim_br['buildsetid'], []).append(brid)
+            key = keys[unclaim_br['buildsetid']]
+            if key is not None:
+                brids_by_key.setdefault(key, []).append(brid)
+
+        brids_to_collapse = set()
+        for br in new_brs:
+            brid = br['buildrequestid']
+            # requests from the same buildset are always collapsed
+            candidates = set(brids_by_bsid.get(br['buildsetid'], []))
+            key = keys[br['buildsetid']]
+            if key is not None:
+                # the new buildrequest must actually be newer than the old
+                # build request, otherwise two build requests submitted at the
+                # same time may cancel each other.
+                candidates.update(
+                    other_brid for other_brid in brids_by_key.get(key, []) if other_brid < brid
+                )
+            candidates.discard(brid)
+            brids_to_collapse.update(candidates)
+        return brids_to_collapse
 
+    @defer.inlineCallbacks
+    def _collapsePairwise(self, bldr, collapseRequestsFn, new_brs, unclaim_brs):
+        brids_to_collapse = set()
+        for br in new_brs:
             for unclaim_br in unclaim_brs:
                 if unclaim_br['buildrequestid'] == br['buildrequestid']:
                     continue
@@ -87,14 +158,57 @@ class BuildRequestCollapser:
                 canCollapse = yield collapseRequestsFn(self.master, bldr, br, unclaim_br)
                 if canCollapse is True:
                     brids_to_collapse.add(unclaim_br['buildrequestid'])
+        return brids_to_collapse
+
+    @defer.inlineCallbacks
+    def _claimAndComplete(self, brids):
+        if not brids:
+            return []
+        # claim and complete all the requests at once, falling back to one
+        # request at a time if some of them got claimed in the meantime
+        claimed = yield self.master.data.updates.claimBuildRequests(brids)
+        if claimed:
+            yield self.master.data.updates.completeBuildRequests(brids, SKIPPED)
+            return list(brids)
 
         collapsed_brids = []
-        for brid in brids_to_collapse:
+        for brid in brids:
             claimed = yield self.master.data.updates.claimBuildRequests([brid])
             if claimed:
                 yield self.master.data.updates.completeBuildRequests([brid], SKIPPED)
                 collapsed_brids.append(brid)
+        return collapsed_brids
 
+    @defer.inlineCallbacks
+    def collapse(self):
+        brids_to_collapse = set()
+
+        brs_by_builder = yield self._getNewBrsByBuilder()
+        for builderid, new_brs in brs_by_builder.items():
+            # Retrieve the buildername
+            bldrdict = yield self.master.data.get(('builders', builderid))
+            # Get the builder object
+            bldr = self.master.botmaster.builders.get(bldrdict['name'])
+            if not bldr:
+                continue
+            # Get the Collapse BuildRequest function (from the configuration)
+            collapseRequestsFn = bldr.getCollapseRequestsFn()
+            if not collapseRequestsFn:
+                continue
+
+            unclaim_brs = yield self._getUnclaimedBrs(builderid)
+
+            # short circuit if there is no merging to do
+            if not unclaim_brs:
+                continue
+
+            if collapseRequestsFn is default_collapse_requests_fn:
+                brids = yield self._collapseWithKeys(new_brs, unclaim_brs)
+            else:
+                brids = yield self._collapsePairwise(bldr, collapseRequestsFn, new_brs, unclaim_brs)
+            brids_to_collapse.update(brids)
+
+        collapsed_brids = yield self._claimAndComplete(sorted(brids_to_collapse))
         return collapsed_brids
 
 
@@ -381,3 +495,12 @@ class BuildRequest:
 
     def getSubmitTime(self):
         return self.submittedAt
+
+
+def default_collapse_requests_fn(master, builder, brdict1, brdict2):
+    """
+    The default collapseRequests function, used when it is set to C{True}.
+    L{BuildRequestCollapser} recognizes it and compares the requests in bulk
+    instead of calling it for each pair of requests.
+    """
+    return BuildRequest.canBeCollapsed(master, brdict1, brdict2)
@@ -15,13 +15,14 @@
 
 from __future__ import annotations
 
+import bisect
 import copy
 import math
 import random
-from datetime import datetime
 from typing import TYPE_CHECKING
 
 from twisted.internet import defer
+from twisted.internet import task
 from twisted.python import log
 from twisted.python.failure import Failure
 
@@ -39,6 +40,163 @@ if TYPE_CHECKING:
     from buildbot.process.builder import Builder
 
 
+class UnclaimedBuildRequestIndex(service.AsyncService):
+    """
+    In-memory index of the unclaimed build requests of each builder, ordered
+    by decreasing priority and then by age.
+
+    The requests of a builder are loaded from the data API the first time
+    they are needed, and then kept up to date from the C{buildrequests} MQ
+    events.  With several masters, the whole index is periodically dropped so
+    that it is reloaded from the database, in case some events were missed.
+    The L{BuildRequest} objects of the indexed requests are cached as well.
+    """
+
+    name = 'unclaimed_buildrequests'  # type: ignore[assignment]
+
+    # seconds between reconciliations with the database, in multi-master mode
+    RECONCILE_INTERVAL = 60
+
+    def __init__(self):
+        super().__init__()
+        # builderid -> {brid: brdict}
+        self._brdicts: dict[int, dict[int, dict]] = {}
+        # builderid -> sorted list of (-priority, brid)
+        self._queues: dict[int, list[tuple[int, int]]] = {}
+        # builderid -> (Deferred, events received while loading)
+        self._loading: dict[int, tuple[defer.Deferred, list]] = {}
+        # brid -> BuildRequest
+        self.build_requests: dict[int, BuildRequest] = {}
+        self._consumers = []
+        self._reconcile_loop = None
+
+    @defer.inlineCallbacks
+    def startService(self):
+        for event in ('new', 'unclaimed', 'claimed', 'complete', 'update'):
+            consumer = yield self.master.mq.startConsuming(
+                self._on_buildrequest_event, ('buildrequests', None, event)
+            )
+            self._consumers.append(consumer)
+
+        if self.master.config.multiMaster:
+            self._reconcile_loop = task.LoopingCall(self.invalidate)
+            self._reconcile_loop.clock = self.master.reactor
+            self._reconcile_loop.start(self.RECONCILE_INTERVAL, now=False)
+
+        yield super().startService()
+
+    @defer.inlineCallbacks
+    def stopService(self):
+        for consumer in self._consumers:
+            yield consumer.stopConsuming()
+        self._consumers = []
+        if self._reconcile_loop is not None:
+            self._reconcile_loop.stop()
+            self._reconcile_loop = None
+        self.invalidate()
+        yield super().stopService()
+
+    def invalidate(self, builderid=None):
+        """Forget the requests of a builder, or of all builders, so that they
+        are loaded again the next time they are needed."""
+        builderids = list(self._brdicts) if builderid is None else [builderid]
+        for bid in builderids:
+            brdicts = self._brdicts.pop(bid, {})
+            self._queues.pop(bid, None)
+            for brid in brdicts:
+                self.build_requests.pop(brid, None)
+
+    def remove(self, brids):
+        """Remove requests from the index, e.g. after they have been claimed"""
+        for brdicts in self._brdicts.values():
+            for brid in brids:
+                if brid in brdicts:
+                    self._remove(brdicts.pop(brid))
+
+    @defer.inlineCallbacks
+    def get_unclaimed_brdicts(self, builderid):
+        """Get the unclaimed brdicts of the builder, sorted by age"""
+        yield self._ensure_loaded(builderid)
+        return sorted(self._brdicts[builderid].values(), key=lambda brd: brd['buildrequestid'])
+
+    @defer.inlineCallbacks
+    def get_next_brdict(self, builderid, exclude=()):
+        """Get the unclaimed brdict of the builder with the highest priority,
+        skipping the requests whose id is in exclude"""
+        yield self._ensure_loaded(builderid)
+        brdicts = self._brdicts[builderid]
+        for _, brid in self._queues[builderid]:
+            if brid not in exclude:
+                return brdicts[brid]
+        return None
+
+    def add_build_request(self, breq):
+        # only requests that are still indexed are cached, so that the cache
+        # is cleared together with the index
+        if breq.id in self._brdicts.get(breq.builderid, ()):
+            self.build_requests[breq.id] = breq
+
+    @defer.inlineCallbacks
+    def _ensure_loaded(self, builderid):
+        if builderid in self._brdicts:
+            return
+        if builderid in self._loading:
+            yield self._loading[builderid][0]
+            return
+
+        d = defer.Deferred()
+        events = []
+        self._loading[builderid] = (d, events)
+        try:
+            brdicts = yield self.master.data.get(
+                ('builders', builderid, 'buildrequests'),
+                [resultspec.Filter('claimed', 'eq', [False])],
+            )
+        except Exception as e:
+            del self._loading[builderid]
+            d.errback(e)
+            raise
+
+        del self._loading[builderid]
+        self._brdicts[builderid] = {}
+        self._queues[builderid] = []
+        for brdict in brdicts:
+            self._add(brdict)
+        # replay the events received during the load, in order
+        for event, msg in events:
+            self._apply_event(event, msg)
+        d.callback(None)
+
+    def _on_buildrequest_event(self, key, msg):
+        builderid = msg['builderid']
+        if builderid in self._loading:
+            self._loading[builderid][1].append((key[2], msg))
+        elif builderid in self._brdicts:
+            self._apply_event(key[2], msg)
+
+    def _apply_event(self, event, msg):
+        brdicts = self._brdicts.get(msg['builderid'])
+        if brdicts is None:
+            return
+        old = brdicts.pop(msg['buildrequestid'], None)
+        if old is not None:
+            self._remove(old)
+        if not msg['claimed'] and not msg['complete']:
+            self._add(msg)
+
+    def _add(self, brdict):
+        builderid = brdict['builderid']
+        brid = brdict['buildrequestid']
+        self._brdicts[builderid][brid] = brdict
+        bisect.insort(self._queues[builderid], (-brdict['priority'], brid))
+
+    def _remove(self, brdict):
+        queue = self._queues[brdict['builderid']]
+        entry = (-brdict['priority'], brdict['buildrequestid'])
+        del queue[bisect.bisect_left(queue, entry)]
+        self.build_requests.pop(brdict['buildrequestid'], None)
+
+
 class BuildChooserBase:
     #
     # WARNING: This API is experimental and in active development.
@@ -62,6 +220,10 @@ class BuildChooserBase:
         self.master = master
         self.breqCache = {}
         self.unclaimedBrdicts = None
+        # set by the BuildRequestDistributor
+        self.unclaimed_index = None
+        # ids of the requests removed by _removeBuildRequest
+        self.removedBrids = set()
 
     @defer.inlineCallbacks
     def chooseNextBuild(self):
@@ -87,13 +249,18 @@ class BuildChooserBase:
         # exists, this function does nothing. If a refetch is desired, set
         # the self.unclaimedBrdicts to None before calling."""
         if self.unclaimedBrdicts is None:
-            # TODO: use order of the DATA API
-            brdicts = yield self.master.data.get(
-                ('builders', (yield self.bldr.getBuilderId()), 'buildrequests'),
-                [resultspec.Filter('claimed', 'eq', [False])],
-            )
-            # sort by buildrequestid, so the first is the oldest
-            brdicts.sort(key=lambda brd: brd['buildrequestid'])
+            builderid = yield self.bldr.getBuilderId()
+            if self.unclaimed_index is not None:
+                brdicts = yield self.unclaimed_index.get_unclaimed_brdicts(builderid)
+                brdicts = [b for b in brdicts if b['buildrequestid'] not in self.removedBrids]
+            else:
+                # TODO: use order of the DATA API
+                brdicts = yield self.master.data.get(
+                    ('builders', builderid, 'buildrequests'),
+                    [resultspec.Filter('claimed', 'eq', [False])],
+                )
+                # sort by buildrequestid, so the first is the oldest
+                brdicts.sort(key=lambda brd: brd['buildrequestid'])
             self.unclaimedBrdicts = brdicts
         return self.unclaimedBrdicts
 
@@ -103,6 +270,8 @@ class BuildChooserBase:
         # for API like 'nextBuild', which operate on BuildRequest objects.
 
         breq = self.breqCache.get(brdict['buildrequestid'])
+        if not breq and self.unclaimed_index is not None:
+            breq = self.unclaimed_index.build_requests.get(brdict['buildrequestid'])
         if not breq:
             builder = yield self.master.data.get(
                 ('builders', brdict['builderid']), [resultspec.ResultSpec(fields=['name'])]
@@ -135,13 +304,15 @@ class BuildChooserBase:
             breq = yield BuildRequest.fromBrdict(self.master, model)
             if breq:
                 self.breqCache[model.buildrequestid] = breq
+                if self.unclaimed_index is not None:
+                    self.unclaimed_index.add_build_request(breq)
         return breq
 
     def _getBrdictForBuildRequest(self, breq):
         # Turn a BuildRequest back into a brdict. This operates from the
         # cache, which must be set up once via _fetchUnclaimedBrdicts
 
-        if breq is None:
+        if breq is None or self.unclaimedBrdicts is None:
             return None
 
         brid = breq.id
@@ -157,6 +328,7 @@ class BuildChooserBase:
         if breq is None:
             return
 
+        self.removedBrids.add(breq.id)
         brdict = self._getBrdictForBuildRequest(breq)
         if brdict is not None:
             self.unclaimedBrdicts.remove(brdict)
@@ -251,6 +423,16 @@ class BasicBuildChooser(BuildChooserBase):
 
     @defer.inlineCallbacks
     def _getNextUnclaimedBuildRequest(self):
+        if not self.nextBuild and self.unclaimed_index is not None:
+            # the index keeps the requests sorted, no need to get all of them
+            brdict = yield self.unclaimed_index.get_next_brdict(
+                (yield self.bldr.getBuilderId()), self.removedBrids
+            )
+            if brdict is None:
+                return None
+            nextBreq = yield self._getBuildRequestForBrdict(brdict)
+            return nextBreq
+
         # ensure the cache is there
         yield self._fetchUnclaimedBrdicts()
         if not self.unclaimedBrdicts:
@@ -268,9 +450,7 @@ class BasicBuildChooser(BuildChooserBase):
                 nextBreq = None
         else:
             # otherwise just return the build with highest priority
-            brdict = sorted(self.unclaimedBrdicts.data, key=lambda b: b['priority'], reverse=True)[
-                0
-            ]
+            brdict = max(self.unclaimedBrdicts, key=lambda b: b['priority'])
             nextBreq = yield self._getBuildRequestForBrdict(brdict)
 
         return nextBreq
@@ -336,6 +516,9 @@ class BuildRequestDistributor(service.AsyncMultiService):
         self._deferwaiter = deferwaiter.DeferWaiter()
         self._activity_loop_deferred = None
 
+        self.unclaimed_index = UnclaimedBuildRequestIndex()
+        self.unclaimed_index.setServiceParent(self)
+
         # Use in Master clean shutdown
         # this flag will allow the distributor to still
         # start new builds if it has a parent waiting on it
@@ -359,6 +542,10 @@ class BuildRequestDistributor(service.AsyncMultiService):
         # TEST-TODO: this behavior is not asserted in any way.
         yield self._deferwaiter.wait()
 
+        # the child services are not stopped by AsyncService.stopService
+        if self.unclaimed_index.running:
+            yield self.unclaimed_index.stopService()
+
     @async_to_deferred
     async def maybeStartBuildsOn(self, new_builders: list[str]) -> None:
         """
@@ -410,22 +597,22 @@ class BuildRequestDistributor(service.AsyncMultiService):
         timer = metrics.Timer("BuildRequestDistributor._defaultSorter()")
         timer.start()
 
+        # get the pending requests of all builders in a single query
+        summaries = yield master.data.rtypes.buildrequest.get_unclaimed_summary()
+
         @defer.inlineCallbacks
         def key(bldr):
-            # Sort primarily highest priority of build requests
-            priority = yield bldr.get_highest_priority()
-            if priority is None:
-                # for builders that do not have pending buildrequest, we just use large number
-                priority = -math.inf
-            # Break ties using the time of oldest build request
-            time = yield bldr.getOldestRequestTime()
-            if time is None:
-                # for builders that do not have pending buildrequest, we just use large number
-                time = math.inf
-            else:
-                if isinstance(time, datetime):
-                    time = time.timestamp()
-            return (-priority, time, bldr.name)
+            summary = summaries.get((yield bldr.getBuilderId()))
+            if summary is None:
+                # for builders that do not have pending buildrequest, sort them last
+                return (math.inf, math.inf, bldr.name)
+            # Sort primarily highest priority of build requests, then break
+            # ties using the time of oldest build request
+            return (
+                -summary['highest_priority'],
+                summary['oldest_submitted_at'].timestamp(),
+                bldr.name,
+            )
 
         yield async_sort(builders, key)
 
@@ -531,13 +718,17 @@ class BuildRequestDistributor(service.AsyncMultiService):
             if not (
                 await self.master.data.updates.claimBuildRequests(brids, claimed_at=claimed_at)
             ):
-                # some brids were already claimed, so start over
+                # some brids were already claimed, so start over with
+                # up-to-date requests
+                self.unclaimed_index.invalidate(breqs[0].builderid)
                 bc = self.createBuildChooser(bldr, self.master)
                 continue
+            self.unclaimed_index.remove(brids)
 
             buildStarted = await bldr.maybeStartBuild(worker, breqs)
             if not buildStarted:
                 await self.master.data.updates.unclaimBuildRequests(brids)
+                self.unclaimed_index.invalidate(breqs[0].builderid)
                 self._remove_in_progress_brids(brids)
 
                 # try starting builds again.  If we still have a working worker,
@@ -554,7 +745,9 @@ class BuildRequestDistributor(service.AsyncMultiService):
 
     def createBuildChooser(self, bldr, master):
         # just instantiate the build chooser requested
-        return self.BuildChooser(bldr, master)
+        bc = self.BuildChooser(bldr, master)
+        bc.unclaimed_index = self.unclaimed_index
+        return bc
 
     @async_to_deferred
     async def _waitForFinish(self):
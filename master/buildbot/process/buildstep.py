@@ -1047,6 +1047,7 @@ class ShellMixin:
         collectStdout: bool = False,
         collectStderr: bool = False,
         stdioLogName: str = 'stdio',
+        collect_max_memory: int | None = None,
         **overrides: Any,
     ) -> InlineCallbacksType[remotecommand.RemoteShellCommand]:
         kwargs = {arg: getattr(self, arg) for arg, _ in self._shell_mixin_arg_config}
@@ -1101,7 +1102,10 @@ class ShellMixin:
 
         # the rest of the args go to RemoteShellCommand
         cmd = remotecommand.RemoteShellCommand(
-            collectStdout=collectStdout, collectStderr=collectStderr, **kwargs
+            collectStdout=collectStdout,
+            collectStderr=collectStderr,
+            collect_max_memory=collect_max_memory,
+            **kwargs,
         )
 
         # set up logging
@@ -34,8 +34,37 @@ class CacheManager(service.ReconfigurableServiceMixin, service.AsyncService):
     def __init__(self):
         self.setName('caches')
         self.config = {}
+        self.max_bytes = None
         self._caches = {}
 
+    def _get_limits(self, cache_name):
+        # configuration values are either a size or a dictionary with 'size',
+        # and optionally 'maxBytes' and 'ttl' keys
+        value = self.config.get(cache_name, self.DEFAULT_CACHE_SIZE)
+        if isinstance(value, dict):
+            max_size = value['size']
+            max_bytes = value.get('maxBytes')
+            ttl = value.get('ttl')
+        else:
+            max_size, max_bytes, ttl = value, None, None
+        assert max_size >= 1
+
+        # sizes are also needed to enforce the global limit
+        sizeof = lru.estimate_size if max_bytes is not None or self.max_bytes else None
+        return max_size, {'max_bytes': max_bytes, 'ttl': ttl, 'sizeof': sizeof}
+
+    def _enforce_max_bytes(self):
+        # evict from the largest caches until the total is below the limit
+        caches = list(self._caches.values())
+        total = sum(c.bytes for c in caches)
+        while total > self.max_bytes:
+            largest = max(caches, key=lambda c: c.bytes)
+            if not largest.cache:
+                break
+            size = largest.bytes
+            largest.evict_lru('memory')
+            total -= size - largest.bytes
+
     def get_cache(self, cache_name, miss_fn):
         """
         Get an L{AsyncLRUCache} object with the given name.  If such an object
@@ -52,20 +81,38 @@ class CacheManager(service.ReconfigurableServiceMixin, service.AsyncService):
         try:
             return self._caches[cache_name]
         except KeyError:
-            max_size = self.config.get(cache_name, self.DEFAULT_CACHE_SIZE)
-            assert max_size >= 1
-            c = self._caches[cache_name] = lru.AsyncLRUCache(miss_fn, max_size)
+            max_size, limits = self._get_limits(cache_name)
+            clock = self.master.reactor if self.master is not None else None
+            c = self._caches[cache_name] = lru.AsyncLRUCache(
+                miss_fn, max_size, clock=clock, **limits
+            )
+            if self.max_bytes:
+                c.memory_callback = self._enforce_max_bytes
             return c
 
     def reconfigServiceWithBuildbotConfig(self, new_config):
         self.config = new_config.caches
+        self.max_bytes = new_config.cacheMaxBytes
         for name, cache in self._caches.items():
-            cache.set_max_size(new_config.caches.get(name, self.DEFAULT_CACHE_SIZE))
+            max_size, limits = self._get_limits(name)
+            cache.memory_callback = self._enforce_max_bytes if self.max_bytes else None
+            cache.set_max_size(max_size)
+            cache.set_limits(**limits)
 
         return super().reconfigServiceWithBuildbotConfig(new_config)
 
     def get_metrics(self):
         return {
-            n: {'hits': c.hits, 'refhits': c.refhits, 'misses': c.misses, 'max_size': c.max_size}
+            n: {
+                'hits': c.hits,
+                'refhits': c.refhits,
+                'misses': c.misses,
+                'max_size': c.max_size,
+                'size': len(c.cache),
+                'bytes': c.bytes,
+                'max_bytes': c.max_bytes,
+                'ttl': c.ttl,
+                'evictions': dict(c.evictions),
+            }
             for n, c in self._caches.items()
         }
@@ -0,0 +1,223 @@
+# This file is part of Buildbot.  Buildbot is free software: you can
+# redistribute it and/or modify it under the terms of the GNU General Public
+# License as published by the Free Software Foundation, version 2.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+# FOR A PARTICULAR PURPOSE.  See the GNU General Public License for more
+# details.
+#
+# You should have received a copy of the GNU General Public License along with
+# this program; if not, write to the Free Software Foundation, Inc., 51
+# Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+#
+# Copyright Buildbot Team Members
+
+from __future__ import annotations
+
+from twisted.internet import defer
+from twisted.internet import task
+from twisted.python import log
+
+from buildbot import config
+from buildbot.db.logs import LogsConnectorComponent
+from buildbot.process import metrics
+from buildbot.util import service
+from buildbot.util.poll import method as poll_method
+from buildbot.util.state import StateMixin
+from buildbot.util.twisted import async_to_deferred
+
+
+class LogRecompressor(service.BuildbotService, StateMixin):
+    """
+    Merge and recompress the chunks of finished logs in the background.
+
+    Logs written live are usually stored in many small chunks, some of them
+    uncompressed.  Every C{interval} seconds, the service looks for finished
+    logs with small chunks, or with chunks not compressed with
+    C{compression_method}, and compresses them again with C{compression_method}.
+    The default is the configured C{logCompressionMethod}.
+
+    Each run processes at most C{max_bytes_per_run} bytes of chunks.  After each
+    log, the service waits so that it is busy at most C{busy_fraction} of the
+    time.  The id of the last processed log is kept in the database, so that
+    the service resumes where it stopped after a restart.
+
+    With the C{'zstd-dict'} method, the service can also train the zstd
+    dictionaries used to compress the logs, C{'global'}ly or for each
+    C{'builder'}, depending on C{train_dictionaries}.  A dictionary is trained
+    again once it is older than C{dictionary_max_age} seconds.  At most one
+    dictionary is trained in each run.
+    """
+
+    name: str | None = 'LogRecompressor'  # type: ignore[assignment]
+    _rest: defer.Deferred | None = None
+
+    TRAIN_DICTIONARIES = ('global', 'builder')
+
+    def checkConfig(
+        self,
+        compression_method: str | None = None,
+        interval: float = 600,
+        batch_size: int = 100,
+        max_bytes_per_run: int = 64 * 1024 * 1024,
+        busy_fraction: float = 0.25,
+        train_dictionaries: str | None = None,
+        dictionary_max_age: float = 7 * 24 * 3600,
+    ) -> None:
+        super().checkConfig()
+        if compression_method is not None:
+            mode = LogsConnectorComponent.COMPRESSION_MODE.get(compression_method)
+            if mode is None:
+                config.error(f"unknown log compression method: {compression_method!r}")
+            elif not mode[1].available:
+                config.error(
+                    f"log compression method {compression_method!r} is not available. "
+                    "You might be missing a dependency."
+                )
+        if interval <= 0:
+            config.error(f"interval must be > 0: {interval}")
+        if batch_size < 1:
+            config.error(f"batch_size must be >= 1: {batch_size}")
+        if max_bytes_per_run <= 0:
+            config.error(f"max_bytes_per_run must be > 0: {max_bytes_per_run}")
+        if not 0 < busy_fraction <= 1:
+            config.error(f"busy_fraction must be in ]0, 1]: {busy_fraction}")
+        if train_dictionaries is not None and train_dictionaries not in self.TRAIN_DICTIONARIES:
+            config.error(
+                f"train_dictionaries must be None, 'global' or 'builder': {train_dictionaries!r}"
+            )
+        if dictionary_max_age <= 0:
+            config.error(f"dictionary_max_age must be > 0: {dictionary_max_age}")
+
+    @async_to_deferred
+    async def reconfigService(
+        self,
+        compression_method: str | None = None,
+        interval: float = 600,
+        batch_size: int = 100,
+        max_bytes_per_run: int = 64 * 1024 * 1024,
+        busy_fraction: float = 0.25,
+        train_dictionaries: str | None = None,
+        dictionary_max_age: float = 7 * 24 * 3600,
+    ) -> None:
+        prev_interval = getattr(self, 'interval', None)
+        self.compression_method = compression_method
+        self.interval = interval
+        self.batch_size = batch_size
+        self.max_bytes_per_run = max_bytes_per_run
+        self.busy_fraction = busy_fraction
+        self.train_dictionaries = train_dictionaries
+        self.dictionary_max_age = dictionary_max_age
+        # the time of the last training attempt of the dictionary of each builder
+        # (None for the global dictionary), successful or not
+        self._training_attempts: dict[int | None, float] = {}
+        await super().reconfigService()
+
+        if prev_interval != interval and self.recompress.running:
+            await self.recompress.stop()
+            self.recompress.start(interval=self.interval)
+
+    @async_to_deferred
+    async def startService(self) -> None:
+        await super().startService()
+        self.recompress.start(interval=self.interval)
+
+    @async_to_deferred
+    async def stopService(self) -> None:
+        if self._rest is not None:
+            self._rest.cancel()
+        await self.recompress.stop()
+        await super().stopService()
+
+    @poll_method
+    @async_to_deferred
+    async def recompress(self) -> None:
+        logs = self.master.db.logs
+        reactor = self.master.reactor
+        compression_method = self.compression_method or self.master.config.logCompressionMethod
+
+        if self.train_dictionaries and compression_method == 'zstd-dict':
+            await self._train_dictionary()
+
+        last_logid = await self.getState('last_logid', 0)
+        candidates = await logs.get_logs_to_recompress(
+            compression_method, after_logid=last_logid, limit=self.batch_size
+        )
+        if not candidates:
+            # all logs have been processed, start over with the logs
+            # finished in the meantime on the next run
+            if last_logid:
+                await self.setState('last_logid', 0)
+            return
+
+        bytes_read = 0
+        elapsed = 0.0
+        for candidate in candidates:
+            if bytes_read >= self.max_bytes_per_run:
+                break
+
+            if elapsed > 0 and self.busy_fraction < 1:
+                # rest as long as needed to stay under the busy fraction
+                self._rest = task.deferLater(reactor, elapsed * (1 / self.busy_fraction - 1))
+                try:
+                    await self._rest
+                except defer.CancelledError:
+                    return
+                finally:
+                    self._rest = None
+            if not self.running:
+                break
+
+            started_at = reactor.seconds()
+            try:
+                # the chunks compressed with another method are recompressed even if they
+                # can't be grouped
+                saved = await logs.compressLog(
+                    candidate.logid,
+                    force=candidate.other_compression,
+                    compression_method=compression_method,
+                )
+            except Exception as e:
+                log.err(e, f'while recompressing log {candidate.logid}')
+                saved = 0
+            bytes_read += candidate.size
+
+            metrics.MetricCountEvent.log('LogRecompressor.logs', 1)
+            metrics.MetricCountEvent.log('LogRecompressor.bytes_read', candidate.size)
+            metrics.MetricCountEvent.log('LogRecompressor.bytes_saved', saved)
+            await self.setState('last_logid', candidate.logid)
+            elapsed = reactor.seconds() - started_at
+
+    async def _train_dictionary(self) -> None:
+        # training reads many chunks: train at most one dictionary per run
+        logs = self.master.db.logs
+        now = self.master.reactor.seconds()
+
+        builderids: list[int | None]
+        if self.train_dictionaries == 'global':
+            builderids = [None]
+        else:
+            builderids = [b.id for b in await self.master.db.builders.getBuilders()]
+
+        last_trained: dict[int | None, float] = dict(self._training_attempts)
+        for dictionary in await logs.get_log_dictionaries():
+            last_trained[dictionary.builderid] = max(
+                last_trained.get(dictionary.builderid, dictionary.created_at),
+                dictionary.created_at,
+            )
+
+        for builderid in builderids:
+            trained_at = last_trained.get(builderid)
+            if trained_at is not None and now - trained_at < self.dictionary_max_age:
+                continue
+
+            self._training_attempts[builderid] = now
+            try:
+                dictionary_id = await logs.train_log_dictionary(builderid)
+            except Exception as e:
+                log.err(e, f'while training the log dictionary of builder {builderid}')
+                return
+            if dictionary_id is not None:
+                metrics.MetricCountEvent.log('LogRecompressor.dictionaries', 1)
+            return
@@ -31,6 +31,7 @@ from buildbot.process.results import FAILURE
 from buildbot.process.results import SUCCESS
 from buildbot.util.eventual import eventually
 from buildbot.util.lineboundaries import LineBoundaryFinder
+from buildbot.util.output_accumulator import OutputAccumulator
 from buildbot.util.twisted import async_to_deferred
 from buildbot.worker.protocols import base
 
@@ -67,6 +68,7 @@ class RemoteCommand(base.RemoteCommandImpl):
         collectStderr: bool = False,
         decodeRC: dict[int | None, int] | None = None,
         stdioLogName: str = 'stdio',
+        collect_max_memory: int | None = None,
     ) -> None:
         if decodeRC is None:
             decodeRC = {0: SUCCESS}
@@ -81,8 +83,11 @@ class RemoteCommand(base.RemoteCommandImpl):
         self._closeWhenFinished: dict[str, bool] = {}
         self.collectStdout: bool = collectStdout
         self.collectStderr: bool = collectStderr
-        self.stdout = ''
-        self.stderr = ''
+        # the collected output is accumulated in chunks: appending to a string
+        # attribute copies the whole output for each update
+        self.collect_max_memory = collect_max_memory
+        self._stdout = OutputAccumulator(collect_max_memory)
+        self._stderr = OutputAccumulator(collect_max_memory)
         self.updates: defaultdict[str, list[Any]] = defaultdict(list)
         self.stdioLogName: str = stdioLogName
         self._startTime: float | None = None
@@ -108,6 +113,26 @@ class RemoteCommand(base.RemoteCommandImpl):
             str,
             LineBoundaryFinder,
         ] = defaultdict(LineBoundaryFinder)
+        # set if the worker only sends whole lines, which don't need to be split
+        self._whole_line_updates = False
+
+    @property
+    def stdout(self) -> str:
+        return self._stdout.getvalue()
+
+    @stdout.setter
+    def stdout(self, value: str) -> None:
+        self._stdout.close()
+        self._stdout.append(value)
+
+    @property
+    def stderr(self) -> str:
+        return self._stderr.getvalue()
+
+    @stderr.setter
+    def stderr(self, value: str) -> None:
+        self._stderr.close()
+        self._stderr.append(value)
 
     def __repr__(self) -> str:
         return f"<RemoteCommand '{self.remote_command}' at {id(self)}>"
@@ -137,6 +162,9 @@ class RemoteCommand(base.RemoteCommandImpl):
         # This probably could be solved in a cleaner way.
         self._is_conn_test_fake = hasattr(self.conn, 'is_fake_test_connection')
 
+        info = getattr(self.conn, 'info', None) or {}
+        self._whole_line_updates = bool(info.get('whole_line_updates', False))
+
         self.commandID = RemoteCommand.generate_new_command_id()
 
         log.msg(f"{self}: RemoteCommand.run [{self.commandID}]")
@@ -266,6 +294,14 @@ class RemoteCommand(base.RemoteCommandImpl):
             self._finished(Failure())
 
     def split_line(self, stream: str, text: str) -> str | None:
+        # the text of recent workers is already split in lines, with the newlines
+        # normalized; only older workers need the line boundary finder
+        if (
+            self._whole_line_updates
+            and text.endswith('\n')
+            and stream not in self._line_boundary_finders
+        ):
+            return text
         return self._line_boundary_finders[stream].append(text)
 
     def remote_update(self, updates: list[tuple[dict[str | bytes, Any], int]]) -> int:
@@ -331,7 +367,7 @@ class RemoteCommand(base.RemoteCommandImpl):
     @async_to_deferred
     async def addStdout(self, data) -> None:
         if self.collectStdout:
-            self.stdout += data
+            self._stdout.append(data)
         if self.stdioLogName is not None and self.stdioLogName in self.logs:
             await self.logs[self.stdioLogName].addStdout(data)
 
@@ -341,7 +377,7 @@ class RemoteCommand(base.RemoteCommandImpl):
         if self.collectStdout:
             if is_flushed:
                 data = data[:-1]
-            self.stdout += data
+            self._stdout.append(data)
         if self.stdioLogName is not None and self.stdioLogName in self.logs:
             await self.logs[self.stdioLogName].add_stdout_lines(data)
 
@@ -349,7 +385,7 @@ class RemoteCommand(base.RemoteCommandImpl):
     @async_to_deferred
     async def addStderr(self, data) -> None:
         if self.collectStderr:
-            self.stderr += data
+            self._stderr.append(data)
         if self.stdioLogName is not None and self.stdioLogName in self.logs:
             await self.logs[self.stdioLogName].addStderr(data)
 
@@ -359,7 +395,7 @@ class RemoteCommand(base.RemoteCommandImpl):
         if self.collectStderr:
             if is_flushed:
                 data = data[:-1]
-            self.stderr += data
+            self._stderr.append(data)
         if self.stdioLogName is not None and self.stdioLogName in self.logs:
             await self.logs[self.stdioLogName].add_stderr_lines(data)
 
@@ -499,6 +535,7 @@ class RemoteShellCommand(RemoteCommand):
         initialStdin=None,
         decodeRC=None,
         stdioLogName='stdio',
+        collect_max_memory=None,
     ):
         if logfiles is None:
             logfiles = {}
@@ -546,6 +583,7 @@ class RemoteShellCommand(RemoteCommand):
             collectStderr=collectStderr,
             decodeRC=decodeRC,
             stdioLogName=stdioLogName,
+            collect_max_memory=collect_max_memory,
         )
 
     def _start(self):
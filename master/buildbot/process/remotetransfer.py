@@ -18,16 +18,94 @@ module for regrouping all FileWriterImpl and FileReaderImpl away from steps
 """
 
 import os
+import queue
 import shutil
+import sys
 import tarfile
 import tempfile
+import threading
+import time
 from io import BytesIO
 
+from twisted.internet import defer
+from twisted.internet import threads
+from twisted.python import failure
+
 from buildbot.util import bytes2unicode
+from buildbot.util import twisted
 from buildbot.util import unicode2bytes
 from buildbot.worker.protocols import base
 
 
+class DirectoryUnpackPool:
+    """
+    Runs the extraction of uploaded directories, each in its own thread as
+    the archive is received.  At most C{size} extractions process data at the
+    same time; an extraction waiting for more data from its worker does not
+    count, so that slow uploads don't delay the others.
+    """
+
+    def __init__(self, size):
+        self.size = size
+        self.running = 0
+        self._lock = threading.Condition()
+        # one thread per extraction, the limit is enforced by acquire()
+        self._threads = twisted.ThreadPool(
+            minthreads=0, maxthreads=sys.maxsize, name='buildbot-directory-unpack'
+        )
+
+    def resize(self, size):
+        with self._lock:
+            self.size = size
+            self._lock.notify_all()
+
+    def acquire(self):
+        with self._lock:
+            while self.running >= self.size:
+                self._lock.wait()
+            self.running += 1
+
+    def release(self):
+        with self._lock:
+            self.running -= 1
+            self._lock.notify()
+
+    def run(self, reactor, f, *args):
+        """
+        Call C{f(*args)} in a thread, holding a slot of the pool unless it
+        releases it.
+
+        @returns: Deferred firing with the result of C{f}
+        """
+        self._threads.start()
+        return threads.deferToThreadPool(reactor, self._threads, self._run, f, *args)
+
+    def stop(self):
+        self._threads.stop()
+
+    def _run(self, f, *args):
+        self.acquire()
+        try:
+            return f(*args)
+        finally:
+            self.release()
+
+
+def get_directory_unpack_pool(master):
+    """
+    Return the L{DirectoryUnpackPool} extracting uploaded directories,
+    creating it on first use.  Its size is c['directoryUnpackThreads'].
+    """
+    size = master.config.directoryUnpackThreads
+    pool = master.directory_unpack_pool
+    if pool is None:
+        pool = DirectoryUnpackPool(size)
+        master.directory_unpack_pool = pool
+    elif pool.size != size:
+        pool.resize(size)
+    return pool
+
+
 class FileWriter(base.FileWriterImpl):
     """
     Helper class that acts as a file-object with write access
@@ -45,6 +123,7 @@ class FileWriter(base.FileWriterImpl):
         fd, self.tmpname = tempfile.mkstemp(dir=dirname, prefix='buildbot-transfer-')
         self.fp = os.fdopen(fd, 'wb')
         self.remaining = maxsize
+        self.bytes_written = 0
 
     def remote_write(self, data):
         """
@@ -62,6 +141,7 @@ class FileWriter(base.FileWriterImpl):
             self.remaining = self.remaining - len(data)
         else:
             self.fp.write(data)
+        self.bytes_written += len(data)
 
     def remote_utime(self, accessed_modified):
         os.utime(self.destfile, accessed_modified)
@@ -96,45 +176,243 @@ class FileWriter(base.FileWriterImpl):
             os.unlink(self.tmpname)
 
 
+class _BlockStream:
+    """
+    Read-only file object returning, in an extraction thread, the blocks
+    received from the worker in the reactor thread.  consumed_callback(size)
+    is called in the reactor thread each time blocks are read.  The slot of
+    the extraction thread in unpack_pool is released while waiting for
+    blocks.
+    """
+
+    _EOF = object()
+    _ABORTED = object()
+
+    def __init__(self, reactor, unpack_pool, consumed_callback):
+        self.reactor = reactor
+        self.unpack_pool = unpack_pool
+        self.consumed_callback = consumed_callback
+        self._blocks = queue.SimpleQueue()
+        self._buffer = bytearray()
+        self._eof = False
+
+    def put(self, data):
+        self._blocks.put(data)
+
+    def close_input(self):
+        self._blocks.put(self._EOF)
+
+    def abort(self):
+        self._blocks.put(self._ABORTED)
+
+    def read(self, size=-1):
+        while not self._eof and (size < 0 or len(self._buffer) < size):
+            try:
+                block = self._blocks.get_nowait()
+            except queue.Empty:
+                self.unpack_pool.release()
+                try:
+                    block = self._blocks.get()
+                finally:
+                    self.unpack_pool.acquire()
+            if block is self._EOF:
+                self._eof = True
+            elif block is self._ABORTED:
+                # keep failing if the archive is read again
+                self._blocks.put(block)
+                raise OSError("directory upload was cancelled")
+            else:
+                self._buffer += block
+                self.reactor.callFromThread(self.consumed_callback, len(block))
+        if size < 0:
+            size = len(self._buffer)
+        data = bytes(self._buffer[:size])
+        del self._buffer[:size]
+        return data
+
+
 class DirectoryWriter(FileWriter):
     """
     A DirectoryWriter is implemented as a FileWriter, with an added post-processing
     step to unpack the archive, once the transfer has completed.
+
+    If unpack_pool, a L{DirectoryUnpackPool}, is given, the archive is instead
+    extracted by that pool while it is received, without a temporary file, and
+    progress_callback(files, size) is called in the reactor thread every
+    PROGRESS_INTERVAL seconds while extracting.  Extraction starts once
+    STREAM_BUFFER_SIZE bytes are received or the transfer completes, and
+    writes are delayed while that much data is waiting to be extracted.
     """
 
-    def __init__(self, destroot, maxsize, compress, mode):
+    # minimal time between two calls to progress_callback, in seconds
+    PROGRESS_INTERVAL = 1
+
+    # amount of received data waiting for extraction, in bytes
+    STREAM_BUFFER_SIZE = 1024 * 1024
+
+    def __init__(
+        self,
+        destroot,
+        maxsize,
+        compress,
+        mode,
+        unpack_pool=None,
+        reactor=None,
+        progress_callback=None,
+    ):
         self.destroot = destroot
         self.compress = compress
+        self.unpack_pool = unpack_pool
+        self.reactor = reactor
+        self.progress_callback = progress_callback
+
+        if unpack_pool is not None:
+            self.destfile = self.tmpname = None
+            self.fp = None
+            self.remaining = maxsize
+            self.bytes_written = 0
+            self._stream = _BlockStream(reactor, unpack_pool, self._stream_consumed)
+            self._stream_buffered = 0
+            self._stream_write_waiter = None
+            self._unpack_started = False
+            self._unpack_running = False
+            self._unpack_requested = False
+            self._unpack_finished = defer.Deferred()
+            return
 
         self.fd, self.tarname = tempfile.mkstemp(prefix='buildbot-transfer-')
         os.close(self.fd)
 
         super().__init__(self.tarname, maxsize, mode)
 
+    def remote_write(self, data):
+        if self.unpack_pool is None:
+            return super().remote_write(data)
+
+        if self._unpack_finished.called:
+            if isinstance(self._unpack_finished.result, failure.Failure):
+                # no need to send the rest of an archive that can't be extracted
+                return defer.fail(self._unpack_finished.result)
+            # the end of the archive was found, the rest is padding
+            return None
+
+        data = unicode2bytes(data)
+        if self.remaining is not None:
+            data = data[: self.remaining]
+            self.remaining -= len(data)
+        self.bytes_written += len(data)
+        self._stream.put(data)
+        self._stream_buffered += len(data)
+
+        if self._stream_buffered < self.STREAM_BUFFER_SIZE:
+            return None
+        if not self._unpack_started:
+            self._start_unpack()
+        self._stream_write_waiter = defer.Deferred()
+        return self._stream_write_waiter
+
+    def _stream_consumed(self, size):
+        self._stream_buffered -= size
+        if self._stream_buffered < self.STREAM_BUFFER_SIZE:
+            self._release_write_waiter()
+
+    def _release_write_waiter(self):
+        waiter = self._stream_write_waiter
+        self._stream_write_waiter = None
+        if waiter is not None:
+            waiter.callback(None)
+
     def remote_unpack(self):
         """
         Called by remote worker to state that no more data will be transferred
         """
+        if self.unpack_pool is not None:
+            self._unpack_requested = True
+            self._stream.close_input()
+            if not self._unpack_started:
+                self._start_unpack()
+            # the remote call completes once the archive is extracted
+            return self._unpack_finished
+
         # Make sure remote_close is called, otherwise atomic rename won't happen
         self.remote_close()
+        self._unpack(self.tarname)
+        os.remove(self.tarname)
+        return None
+
+    def _start_unpack(self):
+        self._unpack_started = self._unpack_running = True
+        d = self.unpack_pool.run(self.reactor, self._unpack, self._stream)
+
+        @d.addBoth
+        def finished(result):
+            self._unpack_running = False
+            self._release_write_waiter()
+            if isinstance(result, failure.Failure):
+                self._unpack_finished.errback(result)
+            else:
+                self._unpack_finished.callback(None)
 
+    def _unpack(self, source):
         # Map configured compression to a TarFile setting
         if self.compress == 'bz2':
             mode = 'r|bz2'
         elif self.compress == 'gz':
             mode = 'r|gz'
+        elif isinstance(source, _BlockStream):
+            mode = 'r|'
         else:
             mode = 'r'
 
-        # Unpack archive and clean up after self
-        with tarfile.open(name=self.tarname, mode=mode) as archive:
+        if isinstance(source, _BlockStream):
+            archive = tarfile.open(fileobj=source, mode=mode)
+        else:
+            archive = tarfile.open(name=source, mode=mode)
+
+        # Unpack archive
+        with archive:
+            members = self._iter_members(archive)
             if hasattr(tarfile, 'data_filter'):
-                archive.extractall(path=self.destroot, filter='data')
+                archive.extractall(path=self.destroot, members=members, filter='data')
             else:
-                archive.extractall(path=self.destroot)
-        os.remove(self.tarname)
+                archive.extractall(path=self.destroot, members=members)
+
+    def _iter_members(self, archive):
+        # the archive is read sequentially, so each member is yielded after
+        # the previous one has been extracted
+        files = 0
+        size = 0
+        last_report = time.monotonic()
+        for member in archive:
+            yield member
+            files += 1
+            size += member.size
+            if self.progress_callback is not None and self.unpack_pool is not None:
+                now = time.monotonic()
+                if now - last_report >= self.PROGRESS_INTERVAL:
+                    last_report = now
+                    self.reactor.callFromThread(self.progress_callback, files, size)
+
+    def cancel(self):
+        if self.unpack_pool is None:
+            super().cancel()
+            return
+        if not self._unpack_requested:
+            # errors are only reported to the worker by remote_unpack
+            self._unpack_finished.addErrback(lambda _: None)
+        if self._unpack_finished.called:
+            return
+        # stop the extraction thread, and purge once it is done
+        self._stream.abort()
+        if not self._unpack_started:
+            self._start_unpack()
+        self._unpack_finished.addBoth(lambda res: self.purge() or res)
 
     def purge(self):
+        if self.unpack_pool is not None and self._unpack_running:
+            # the extraction thread may still be writing files, this is
+            # called again by cancel() once it is done
+            return
         super().purge()
         if os.path.isdir(self.destroot):
             shutil.rmtree(self.destroot)
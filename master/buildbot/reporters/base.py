@@ -37,6 +37,7 @@ class ReporterBase(service.BuildbotService):
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
         self.generators = None
+        self._generators_by_key = tuplematch.TupleMatchIndex()
         self._event_consumers = {}
         self._pending_got_event_calls = {}
 
@@ -56,9 +57,15 @@ class ReporterBase(service.BuildbotService):
     def reconfigService(self, generators):
         self.generators = generators
 
+        # share the data fetched for an event with the other reporters
+        yield utils.BuildDetailsMemo.getService(self.master)
+
         wanted_event_keys = set()
-        for g in self.generators:
+        self._generators_by_key = tuplematch.TupleMatchIndex()
+        for g_index, g in enumerate(self.generators):
             wanted_event_keys.update(g.wanted_event_keys)
+            for filter in set(g.wanted_event_keys):
+                self._generators_by_key.add(filter, (g_index, filter))
 
         # Remove consumers for keys that are no longer wanted
         for key in list(self._event_consumers.keys()):
@@ -84,11 +91,10 @@ class ReporterBase(service.BuildbotService):
 
         yield super().stopService()
 
-    def _does_generator_want_key(self, generator, key):
-        for filter in generator.wanted_event_keys:
-            if tuplematch.matchTuple(key, filter):
-                return True
-        return False
+    def _get_generators_wanting_key(self, key):
+        # generators are returned in configuration order, once each
+        g_indexes = dict.fromkeys(g_index for g_index, _ in self._generators_by_key.match(key))
+        return [self.generators[g_index] for g_index in g_indexes]
 
     def _get_chain_key_for_event(self, key, msg):
         if key[0] in ["builds", "buildrequests"]:
@@ -109,18 +115,16 @@ class ReporterBase(service.BuildbotService):
 
         try:
             reports = []
-            for g in self.generators:
-                if self._does_generator_want_key(g, key):
-                    try:
-                        report = yield g.generate(self.master, self, key, msg)
-                        if report is not None:
-                            reports.append(report)
-                    except Exception as e:
-                        log.err(
-                            e,
-                            "Got exception when handling reporter events: "
-                            f"key: {key} generator: {g}",
-                        )
+            for g in self._get_generators_wanting_key(key):
+                try:
+                    report = yield g.generate(self.master, self, key, msg)
+                    if report is not None:
+                        reports.append(report)
+                except Exception as e:
+                    log.err(
+                        e,
+                        f"Got exception when handling reporter events: key: {key} generator: {g}",
+                    )
 
             if reports:
                 yield self.sendMessage(reports)
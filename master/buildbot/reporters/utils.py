@@ -15,6 +15,7 @@
 
 from __future__ import annotations
 
+import copy
 import dataclasses
 from collections import UserList
 from typing import TYPE_CHECKING
@@ -26,11 +27,87 @@ from buildbot.data import resultspec
 from buildbot.process.properties import renderer
 from buildbot.process.results import RETRY
 from buildbot.util import flatten
+from buildbot.util import service
 
 if TYPE_CHECKING:
     from buildbot.db.buildrequests import BuildRequestModel
 
 
+class BuildDetailsMemo(service.SharedService):
+    """
+    Memoizes the data fetched by getDetailsForBuild on behalf of the generators of all
+    reporters, so that an event handled by many reporters causes a single fetch of each
+    piece of data.
+
+    The data is scoped to the message of the event (which is the same object for all
+    consumers of an event), and is forgotten SCOPE_TIMEOUT seconds after it was first
+    fetched. Each caller gets its own copy of the data, as reporters modify it.
+    """
+
+    SCOPE_TIMEOUT = 10
+
+    def __init__(self):
+        super().__init__()
+        # id(scope) -> (scope, timer, {path: result})
+        self._scopes = {}
+        # (id(scope), path) -> [Deferred]
+        self._pending = {}
+
+    @classmethod
+    def get_for_master(cls, master):
+        return master.namedServices.get(cls.getName())
+
+    @defer.inlineCallbacks
+    def get(self, scope, path):
+        scope_entry = self._scopes.get(id(scope))
+        if scope_entry is not None and path in scope_entry[2]:
+            return copy.deepcopy(scope_entry[2][path])
+
+        key = (id(scope), path)
+        waiters = self._pending.get(key)
+        if waiters is not None:
+            d = defer.Deferred()
+            waiters.append(d)
+            res = yield d
+            return res
+
+        self._pending[key] = waiters = []
+        try:
+            result = yield self.master.data.get(path)
+        except Exception:
+            del self._pending[key]
+            for d in waiters:
+                d.errback()
+            raise
+        del self._pending[key]
+
+        scope_entry = self._scopes.get(id(scope))
+        if scope_entry is None:
+            timer = self.master.reactor.callLater(self.SCOPE_TIMEOUT, self._expire, id(scope))
+            scope_entry = self._scopes[id(scope)] = (scope, timer, {})
+        scope_entry[2][path] = result
+
+        for d in waiters:
+            d.callback(copy.deepcopy(result))
+        return copy.deepcopy(result)
+
+    def _expire(self, scope_id):
+        del self._scopes[scope_id]
+
+    def stopService(self):
+        for _, timer, _ in self._scopes.values():
+            timer.cancel()
+        self._scopes = {}
+        return super().stopService()
+
+
+def _get_build_details(master, build, path):
+    memo = BuildDetailsMemo.get_for_master(master)
+    if memo is None:
+        return master.data.get(path)
+    return memo.get(build, path)
+
+
 @defer.inlineCallbacks
 def getPreviousBuild(master, build):
     # naive n-1 algorithm. Still need to define what we should skip
@@ -38,7 +115,9 @@ def getPreviousBuild(master, build):
     # don't hesitate to contribute improvements to that algorithm
     n = build['number'] - 1
     while n >= 0:
-        prev = yield master.data.get(("builders", build['builderid'], "builds", n))
+        prev = yield _get_build_details(
+            master, build, ("builders", build['builderid'], "builds", n)
+        )
 
         if prev and prev['results'] != RETRY:
             return prev
@@ -102,16 +181,22 @@ def getDetailsForBuild(
     add_logs=None,
     want_logs_content=False,
 ):
-    buildrequest = yield master.data.get(("buildrequests", build['buildrequestid']))
-    buildset = yield master.data.get(("buildsets", buildrequest['buildsetid']))
+    buildrequest = yield _get_build_details(
+        master, build, ("buildrequests", build['buildrequestid'])
+    )
+    buildset = yield _get_build_details(master, build, ("buildsets", buildrequest['buildsetid']))
     build['buildrequest'] = buildrequest
     build['buildset'] = buildset
 
     parentbuild = None
     parentbuilder = None
     if buildset['parent_buildid']:
-        parentbuild = yield master.data.get(("builds", buildset['parent_buildid']))
-        parentbuilder = yield master.data.get(("builders", parentbuild['builderid']))
+        parentbuild = yield _get_build_details(
+            master, build, ("builds", buildset['parent_buildid'])
+        )
+        parentbuilder = yield _get_build_details(
+            master, build, ("builders", parentbuild['builderid'])
+        )
     build['parentbuild'] = parentbuild
     build['parentbuilder'] = parentbuilder
 
@@ -125,6 +210,7 @@ def getDetailsForBuild(
         want_logs=want_logs,
         add_logs=add_logs,
         want_logs_content=want_logs_content,
+        _memo_scope=build,
     )
     return ret
 
@@ -168,18 +254,24 @@ def getDetailsForBuilds(
     want_logs=False,
     add_logs=None,
     want_logs_content=False,
+    _memo_scope=None,
 ):
+    def get(path):
+        if _memo_scope is None:
+            return master.data.get(path)
+        return _get_build_details(master, _memo_scope, path)
+
     builderids = {build['builderid'] for build in builds}
 
     builders = yield defer.gatherResults(
-        [master.data.get(("builders", _id)) for _id in builderids], consumeErrors=True
+        [get(("builders", _id)) for _id in builderids], consumeErrors=True
     )
 
     buildersbyid = {builder['builderid']: builder for builder in builders}
 
     if want_properties:
         buildproperties = yield defer.gatherResults(
-            [master.data.get(("builds", build['buildid'], 'properties')) for build in builds],
+            [get(("builds", build['buildid'], 'properties')) for build in builds],
             consumeErrors=True,
         )
     else:  # we still need a list for the big zip
@@ -206,13 +298,13 @@ def getDetailsForBuilds(
 
     if want_steps:  # pylint: disable=too-many-nested-blocks
         buildsteps = yield defer.gatherResults(
-            [master.data.get(("builds", build['buildid'], 'steps')) for build in builds],
+            [get(("builds", build['buildid'], 'steps')) for build in builds],
             consumeErrors=True,
         )
         if want_logs:
             for build, build_steps in zip(builds, buildsteps):
                 for s in build_steps:
-                    logs = yield master.data.get(("steps", s['stepid'], 'logs'))
+                    logs = yield get(("steps", s['stepid'], 'logs'))
                     s['logs'] = list(logs)
                     for l in s['logs']:
                         l['stepname'] = s['name']
@@ -222,7 +314,7 @@ def getDetailsForBuilds(
                         l['url_raw'] = get_url_for_log_raw(master, l['logid'], 'raw')
                         l['url_raw_inline'] = get_url_for_log_raw(master, l['logid'], 'raw_inline')
                         if should_attach_log(logs_config, l):
-                            l['content'] = yield master.data.get(("logs", l['logid'], 'contents'))
+                            l['content'] = yield get(("logs", l['logid'], 'contents'))
 
     else:  # we still need a list for the big zip
         buildsteps = list(range(len(builds)))
@@ -328,6 +328,7 @@ def _copy_database_with_db(src_db, dst_db, ignore_fk_error_rows, print_log):
         "steps",
         "logs",
         "logchunks",
+        "logchunk_dictionaries",
         "schedulers",
         "scheduler_masters",
         "scheduler_changes",
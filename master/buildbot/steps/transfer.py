@@ -17,7 +17,9 @@ from __future__ import annotations
 
 import json
 import os
+import shutil
 import stat
+import tempfile
 
 from twisted.internet import defer
 from twisted.python import log
@@ -54,6 +56,30 @@ class _TransferBuildStep(BuildStep):
     def __init__(self, workdir=None, **buildstep_kwargs):
         super().__init__(**buildstep_kwargs)
         self.workdir = workdir
+        self._unpack_progress = None
+
+    def makeDirectoryWriter(self, masterdest, maxsize, compress):
+        # uploaded directories are extracted in a thread pool so that large
+        # archives don't block the master
+        return remotetransfer.DirectoryWriter(
+            masterdest,
+            maxsize,
+            compress,
+            0o600,
+            unpack_pool=remotetransfer.get_directory_unpack_pool(self.master),
+            reactor=self.master.reactor,
+            progress_callback=self._unpackProgress,
+        )
+
+    def _unpackProgress(self, files, size):
+        self._unpack_progress = (files, size)
+        self.updateSummary()
+
+    def getCurrentSummary(self):
+        if self._unpack_progress is not None:
+            files, size = self._unpack_progress
+            return {'step': f'unpacking: {files} files, {size} bytes'}
+        return super().getCurrentSummary()
 
     @defer.inlineCallbacks
     def runTransferCommand(
@@ -241,7 +267,7 @@ class DirectoryUpload(_TransferBuildStep):
             yield self.addURL(urlText, self.url)
 
         # we use maxsize to limit the amount of data on both sides
-        dirWriter = remotetransfer.DirectoryWriter(masterdest, self.maxsize, self.compress, 0o600)
+        dirWriter = self.makeDirectoryWriter(masterdest, self.maxsize, self.compress)
 
         # default arguments
         args = {
@@ -258,7 +284,10 @@ class DirectoryUpload(_TransferBuildStep):
             args['workersrc'] = source
 
         cmd = makeStatusRemoteCommand(self, 'uploadDirectory', args)
-        res = yield self.runTransferCommand(cmd, dirWriter)
+        try:
+            res = yield self.runTransferCommand(cmd, dirWriter)
+        finally:
+            self._unpack_progress = None
         return res
 
 
@@ -281,6 +310,8 @@ class MultipleFileUpload(_TransferBuildStep, CompositeStepMixin):
         keepstamp=False,
         url=None,
         urlText=None,
+        parallelUploads=1,
+        packSmallFiles=None,
         **buildstep_kwargs,
     ):
         # Emulate that first two arguments are positional.
@@ -303,6 +334,40 @@ class MultipleFileUpload(_TransferBuildStep, CompositeStepMixin):
         self.keepstamp = keepstamp
         self.url = url
         self.urlText = urlText
+        if not isinstance(parallelUploads, int) or parallelUploads < 1:
+            config.error('parallelUploads must be a positive integer')
+        self.parallelUploads = parallelUploads
+        if not isinstance(packSmallFiles, (int, type(None))):
+            config.error('packSmallFiles must be an integer or None')
+        self.packSmallFiles = packSmallFiles
+        self.uploadedBytes = 0
+        self._running_cmds = set()
+
+    @defer.inlineCallbacks
+    def runCommand(self, command):
+        # the uploads may run in parallel: keep track of all the running
+        # commands, and not only of the last one, to interrupt them
+        self._running_cmds.add(command)
+        try:
+            res = yield super().runCommand(command)
+        finally:
+            self._running_cmds.discard(command)
+        return res
+
+    @defer.inlineCallbacks
+    def interrupt(self, reason):
+        yield self.addCompleteLog('interrupt', str(reason))
+        for cmd in list(self._running_cmds):
+            yield cmd.interrupt(reason)
+        return None
+
+    def _accountWriter(self, d, writer):
+        @d.addBoth
+        def account(res):
+            self.uploadedBytes += writer.bytes_written
+            return res
+
+        return d
 
     def uploadFile(self, source, masterdest):
         fileWriter = remotetransfer.FileWriter(masterdest, self.maxsize, self.mode)
@@ -321,10 +386,10 @@ class MultipleFileUpload(_TransferBuildStep, CompositeStepMixin):
             args['workersrc'] = source
 
         cmd = makeStatusRemoteCommand(self, 'uploadFile', args)
-        return self.runTransferCommand(cmd, fileWriter)
+        return self._accountWriter(self.runTransferCommand(cmd, fileWriter), fileWriter)
 
     def uploadDirectory(self, source, masterdest):
-        dirWriter = remotetransfer.DirectoryWriter(masterdest, self.maxsize, self.compress, 0o600)
+        dirWriter = self.makeDirectoryWriter(masterdest, self.maxsize, self.compress)
 
         args = {
             'workdir': self.workdir,
@@ -340,11 +405,64 @@ class MultipleFileUpload(_TransferBuildStep, CompositeStepMixin):
             args['workersrc'] = source
 
         cmd = makeStatusRemoteCommand(self, 'uploadDirectory', args)
-        return self.runTransferCommand(cmd, dirWriter)
+        d = self._accountWriter(self.runTransferCommand(cmd, dirWriter), dirWriter)
+
+        @d.addBoth
+        def reset_progress(res):
+            self._unpack_progress = None
+            return res
+
+        return d
 
     @defer.inlineCallbacks
-    def startUpload(self, source, destdir):
-        masterdest = os.path.join(destdir, os.path.basename(source))
+    def uploadPackedFiles(self, sources, destdir, stats):
+        # The files are sent in a single archive, extracted in a temporary
+        # directory so that a failed upload doesn't purge destdir.  The files
+        # are not bigger than maxsize, which applies to each file as for
+        # uploadFile, so the archive itself is not limited.
+        os.makedirs(destdir, exist_ok=True)
+        tmpdir = tempfile.mkdtemp(dir=destdir, prefix='buildbot-transfer-')
+        dirWriter = self.makeDirectoryWriter(tmpdir, None, self.compress)
+
+        args = {
+            'workdir': self.workdir,
+            'workersrc': '.',
+            'writer': dirWriter,
+            'maxsize': None,
+            'blocksize': self.blocksize,
+            'compress': self.compress,
+            'members': [[source, str(i)] for i, source in enumerate(sources)],
+        }
+
+        cmd = makeStatusRemoteCommand(self, 'uploadDirectory', args)
+        try:
+            result = yield self._accountWriter(self.runTransferCommand(cmd, dirWriter), dirWriter)
+        finally:
+            self._unpack_progress = None
+
+        if result >= FAILURE:
+            return result
+
+        for i, source in enumerate(sources):
+            masterdest = os.path.join(destdir, os.path.basename(source))
+            os.replace(os.path.join(tmpdir, str(i)), masterdest)
+            if self.mode is not None:
+                os.chmod(masterdest, self.mode)
+            # the archive keeps the modification time, uploadFile doesn't
+            # unless keepstamp is set
+            if self.keepstamp:
+                s = stats[source]
+                os.utime(masterdest, (s[stat.ST_ATIME], s[stat.ST_MTIME]))
+            else:
+                os.utime(masterdest)
+        shutil.rmtree(tmpdir)
+
+        for source in sources:
+            yield self.uploadDone(result, source, os.path.join(destdir, os.path.basename(source)))
+        return result
+
+    @defer.inlineCallbacks
+    def statSource(self, source):
         args = {'file': source, 'workdir': self.workdir}
 
         cmd = makeStatusRemoteCommand(self, 'stat', args)
@@ -352,8 +470,20 @@ class MultipleFileUpload(_TransferBuildStep, CompositeStepMixin):
         if cmd.rc != 0:
             msg = f'File {self.workdir}/{source} not available at worker'
             yield self.addCompleteLog('stderr', msg)
+            return None
+        return cmd.updates['stat'][-1]
+
+    @defer.inlineCallbacks
+    def startUpload(self, source, destdir):
+        s = yield self.statSource(source)
+        if s is None:
             return FAILURE
-        s = cmd.updates['stat'][-1]
+        result = yield self.uploadStatted(source, destdir, s)
+        return result
+
+    @defer.inlineCallbacks
+    def uploadStatted(self, source, destdir, s):
+        masterdest = os.path.join(destdir, os.path.basename(source))
         if stat.S_ISDIR(s[stat.ST_MODE]):
             result = yield self.uploadDirectory(source, masterdest)
         elif stat.S_ISREG(s[stat.ST_MODE]):
@@ -369,6 +499,76 @@ class MultipleFileUpload(_TransferBuildStep, CompositeStepMixin):
     def uploadDone(self, result, source, masterdest):
         pass
 
+    @defer.inlineCallbacks
+    def runParallel(self, calls):
+        # Runs the (fn, args) calls with at most parallelUploads of them at
+        # once, in order.  No new call is started once one has failed, but
+        # the running ones are waited for before returning or raising the
+        # first error.  Workers running a single command at a time get the
+        # calls one by one.
+        parallel = self.parallelUploads if self.remote.supports_concurrent_commands else 1
+        semaphore = defer.DeferredSemaphore(parallel)
+        results = []
+
+        @defer.inlineCallbacks
+        def run_one(fn, args):
+            yield semaphore.acquire()
+            try:
+                if FAILURE not in results:
+                    res = yield fn(*args)
+                    results.append(res)
+            except Exception:
+                results.append(FAILURE)
+                raise
+            finally:
+                semaphore.release()
+
+        outcomes = yield defer.DeferredList(
+            [run_one(fn, args) for fn, args in calls], consumeErrors=True
+        )
+        for success, outcome in outcomes:
+            if not success:
+                outcome.raiseException()
+
+        return FAILURE if FAILURE in results else SUCCESS
+
+    @defer.inlineCallbacks
+    def uploadSourcesPacked(self, sources, masterdest):
+        stats = {}
+
+        @defer.inlineCallbacks
+        def stat_one(source):
+            stats[source] = yield self.statSource(source)
+            return FAILURE if stats[source] is None else SUCCESS
+
+        result = yield self.runParallel([(stat_one, (source,)) for source in sources])
+        if result == FAILURE:
+            return result
+
+        # the files bigger than maxsize are uploaded on their own, so that
+        # they are truncated like before
+        max_packed_size = self.packSmallFiles
+        if self.maxsize is not None:
+            max_packed_size = min(max_packed_size, self.maxsize)
+        small_files = [
+            source
+            for source in sources
+            if stat.S_ISREG(stats[source][stat.ST_MODE])
+            and stats[source][stat.ST_SIZE] <= max_packed_size
+        ]
+        if len(small_files) < 2:
+            small_files = []
+
+        calls = []
+        if small_files:
+            calls.append((self.uploadPackedFiles, (small_files, masterdest, stats)))
+        for source in sources:
+            if source not in small_files:
+                calls.append((self.uploadStatted, (source, masterdest, stats[source])))
+
+        result = yield self.runParallel(calls)
+        return result
+
     @defer.inlineCallbacks
     def allUploadsDone(self, result, sources, masterdest):
         if self.url is not None:
@@ -417,15 +617,25 @@ class MultipleFileUpload(_TransferBuildStep, CompositeStepMixin):
             'file' if len(sources) == 1 else 'files',
         ]
 
+        start_time = self.master.reactor.seconds()
         if not sources:
             result = SKIPPED
+        elif self.packSmallFiles is not None and not self.workerVersionIsOlderThan(
+            'uploadDirectory', '3.4'
+        ):
+            result = yield self.uploadSourcesPacked(sources, masterdest)
         else:
-            result = SUCCESS
-            for source in sources:
-                result_single = yield self.startUpload(source, masterdest)
-                if result_single == FAILURE:
-                    result = FAILURE
-                    break
+            result = yield self.runParallel([
+                (self.startUpload, (source, masterdest)) for source in sources
+            ])
+
+        if sources:
+            elapsed = self.master.reactor.seconds() - start_time
+            self.setStatistic('uploaded_bytes', self.uploadedBytes)
+            msg = f"uploaded {self.uploadedBytes} bytes in {elapsed:.3f} seconds"
+            if elapsed > 0:
+                msg += f" ({self.uploadedBytes / elapsed:.0f} bytes/s)"
+            yield self.stdio_log.addHeader(msg + "\n")
 
         yield self.allUploadsDone(result, sources, masterdest)
 
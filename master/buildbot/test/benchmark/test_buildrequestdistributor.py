@@ -0,0 +1,92 @@
+# This file is part of Buildbot.  Buildbot is free software: you can
+# redistribute it and/or modify it under the terms of the GNU General Public
+# License as published by the Free Software Foundation, version 2.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+# FOR A PARTICULAR PURPOSE.  See the GNU General Public License for more
+# details.
+#
+# You should have received a copy of the GNU General Public License along with
+# this program; if not, write to the Free Software Foundation, Inc., 51
+# Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+#
+# Copyright Buildbot Team Members
+
+import math
+from unittest import mock
+
+from buildbot.process import builder
+from buildbot.process import buildrequestdistributor
+from buildbot.test import fakedb
+from buildbot.test.fake import fakemaster
+from buildbot.test.reactor import TestReactorMixin
+from buildbot.test.util import benchmark
+from buildbot.util.async_sort import async_sort
+from buildbot.util.twisted import async_to_deferred
+
+
+class SortBuilders(TestReactorMixin, benchmark.BenchmarkTestCase):
+    """
+    Measures the time taken by the default builder prioritization of the
+    BuildRequestDistributor, depending on the number of builders with pending
+    build requests.
+    """
+
+    BUILDER_COUNTS = (10, 100, 500)
+    REQUESTS_PER_BUILDER = 5
+
+    @async_to_deferred
+    async def setUp(self):
+        super().setUp()
+        self.setup_test_reactor()
+        self.master = await fakemaster.make_master(
+            self, wantDb=True, wantData=True, sqlite_memory=False
+        )
+        self.brd = buildrequestdistributor.BuildRequestDistributor(mock.Mock())
+
+        count = max(self.BUILDER_COUNTS)
+        rows = [fakedb.Master(id=fakedb.FakeDBConnector.MASTER_ID), fakedb.Buildset(id=1)]
+        self.builders = []
+        for i in range(count):
+            rows.append(fakedb.Builder(id=i + 1, name=f'builder{i}'))
+            bldr = builder.Builder(f'builder{i}')
+            bldr.master = self.master
+            bldr._builderid = i + 1
+            self.builders.append(bldr)
+            for j in range(self.REQUESTS_PER_BUILDER):
+                rows.append(
+                    fakedb.BuildRequest(
+                        buildsetid=1, builderid=i + 1, priority=j % 3, submitted_at=1000 + i + j
+                    )
+                )
+        await self.master.db.insert_test_data(rows)
+
+    async def sort_per_builder(self, builders):
+        # prioritization as done before the summary of all builders was
+        # fetched with a single query
+        async def key(bldr):
+            priority = await bldr.get_highest_priority()
+            if priority is None:
+                priority = -math.inf
+            time = await bldr.getOldestRequestTime()
+            time = math.inf if time is None else time.timestamp()
+            return (-priority, time, bldr.name)
+
+        await async_sort(builders, key)
+        return builders
+
+    @async_to_deferred
+    async def test_sort_builders(self):
+        for count in self.BUILDER_COUNTS:
+            builders = self.builders[:count]
+            per_builder = await self.measure_async(lambda b=builders: self.sort_per_builder(b))
+            summary = await self.measure_async(
+                lambda b=builders: self.brd._defaultSorter(self.master, b)
+            )
+            self.report(
+                'sort',
+                builders=count,
+                per_builder_ms=per_builder * 1000,
+                summary_ms=summary * 1000,
+            )
@@ -0,0 +1,128 @@
+# This file is part of Buildbot.  Buildbot is free software: you can
+# redistribute it and/or modify it under the terms of the GNU General Public
+# License as published by the Free Software Foundation, version 2.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+# FOR A PARTICULAR PURPOSE.  See the GNU General Public License for more
+# details.
+#
+# You should have received a copy of the GNU General Public License along with
+# this program; if not, write to the Free Software Foundation, Inc., 51
+# Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+#
+# Copyright Buildbot Team Members
+
+import shutil
+import subprocess
+import tempfile
+
+from twisted.internet import defer
+from twisted.trial import unittest
+
+from buildbot.changes import gitpoller
+from buildbot.test.util import benchmark
+from buildbot.test.util import changesource
+from buildbot.test.util.git_repository import TestGitRepository
+from buildbot.util.twisted import async_to_deferred
+
+
+class ProcessChanges(changesource.ChangeSourceMixin, benchmark.BenchmarkTestCase):
+    """
+    Measures how fast GitPoller turns new commits of a local repository into changes.
+    """
+
+    COMMIT_COUNT = 5000
+    # the per-revision baseline spawns 5 processes per commit, so only a sample is used
+    BASELINE_COMMIT_COUNT = 100
+
+    @async_to_deferred
+    async def setUp(self):
+        super().setUp()
+        try:
+            self.repo = TestGitRepository(repository_path=tempfile.mkdtemp(prefix='benchmark_'))
+        except FileNotFoundError as e:
+            raise unittest.SkipTest("Can't find git binary") from e
+        self.addCleanup(shutil.rmtree, self.repo.repository_path, True)
+        self.revs = self.create_commits(self.COMMIT_COUNT)
+
+        await self.setUpChangeSource(want_real_reactor=True)
+        self.poller = await self.attachChangeSource(
+            gitpoller.GitPoller(
+                str(self.repo.repository_path),
+                branches=['main'],
+                workdir=str(self.repo.repository_path / '.git'),
+                gitbin=self.repo.git_bin,
+            )
+        )
+
+    def create_commits(self, count):
+        stream = []
+        for i in range(count):
+            message = f'Commit {i}\n\nChanged file {i % 100}\n'.encode()
+            content = f'content {i}\n'.encode()
+            stream.append(
+                b'commit refs/heads/main\n'
+                + f'committer test user <user@example.com> {1717855200 + i} +0000\n'.encode()
+                + f'data {len(message)}\n'.encode()
+                + message
+                + f'M 644 inline dir {i % 10}/file{i % 100}.txt\n'.encode()
+                + f'data {len(content)}\n'.encode()
+                + content
+            )
+        subprocess.run(
+            [self.repo.git_bin, 'fast-import', '--quiet'],
+            input=b''.join(stream),
+            cwd=self.repo.repository_path,
+            check=True,
+        )
+        revs = subprocess.check_output(
+            [self.repo.git_bin, 'rev-list', '--reverse', 'main'], cwd=self.repo.repository_path
+        )
+        return revs.decode().split()
+
+    @defer.inlineCallbacks
+    def get_commit_info_per_rev(self, rev):
+        # metadata extraction as done before GitPoller used a single 'git log' call
+        workdir = self.poller.workdir
+        res = yield defer.gatherResults([
+            self.poller._dovccmd('log', ['--no-walk', fmt, rev, '--'], path=workdir)
+            for fmt in (
+                '--format=%ct',
+                '--format=%aN <%aE>',
+                '--format=%cN <%cE>',
+                '--format=%s%n%b',
+            )
+        ])
+        files = yield self.poller._dovccmd(
+            'log',
+            ['--name-only', '--no-walk', '--format=%n', '-m', '--first-parent', rev, '--'],
+            path=workdir,
+        )
+        return (*res, files.splitlines())
+
+    @async_to_deferred
+    async def test_get_commits_info(self):
+        async def per_rev():
+            for rev in self.revs[: self.BASELINE_COMMIT_COUNT]:
+                await self.get_commit_info_per_rev(rev)
+
+        elapsed = await self.measure_async(per_rev)
+        self.report('per-revision', commits_per_second=self.BASELINE_COMMIT_COUNT / elapsed)
+
+        for count in (self.BASELINE_COMMIT_COUNT, self.COMMIT_COUNT):
+            elapsed = await self.measure_async(
+                lambda count=count: self.poller._get_commits_info(self.revs[:count])
+            )
+            self.report('bulk', commits=count, commits_per_second=count / elapsed)
+
+    @async_to_deferred
+    async def test_process_changes(self):
+        async def process_changes():
+            self.poller.lastRev = {'main': self.revs[0]}
+            self.master.data.updates.changesAdded = []
+            await self.poller._process_changes(self.revs[-1], 'main')
+
+        elapsed = await self.measure_async(process_changes)
+        self.assertEqual(len(self.master.data.updates.changesAdded), self.COMMIT_COUNT - 1)
+        self.report('_process_changes', changes_per_second=(self.COMMIT_COUNT - 1) / elapsed)
@@ -0,0 +1,71 @@
+# This file is part of Buildbot.  Buildbot is free software: you can
+# redistribute it and/or modify it under the terms of the GNU General Public
+# License as published by the Free Software Foundation, version 2.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+# FOR A PARTICULAR PURPOSE.  See the GNU General Public License for more
+# details.
+#
+# You should have received a copy of the GNU General Public License along with
+# this program; if not, write to the Free Software Foundation, Inc., 51
+# Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+#
+# Copyright Buildbot Team Members
+
+from buildbot.test import fakedb
+from buildbot.test.fake import fakemaster
+from buildbot.test.reactor import TestReactorMixin
+from buildbot.test.util import benchmark
+from buildbot.util.twisted import async_to_deferred
+
+
+class AppendLog(TestReactorMixin, benchmark.BenchmarkTestCase):
+    """
+    Measures log ingestion rate of LogsConnectorComponent.appendLog.
+
+    This uses an on-disk SQLite database by default, so that the cost of committing
+    transactions is accounted for.  Set BUILDBOT_TEST_DB_URL to run against another
+    database, e.g. a local PostgreSQL server.
+    """
+
+    LINE = 'compiling src/module/some_file.c -O2 -Wall -Werror -Iinclude -DNDEBUG\n'
+
+    @async_to_deferred
+    async def setUp(self):
+        super().setUp()
+        self.setup_test_reactor()
+        self.master = await fakemaster.make_master(self, wantDb=True, sqlite_memory=False)
+        await self.master.db.insert_test_data([
+            fakedb.Worker(id=47, name='linux'),
+            fakedb.Buildset(id=20),
+            fakedb.Builder(id=88, name='b1'),
+            fakedb.BuildRequest(id=41, buildsetid=20, builderid=88),
+            fakedb.Master(id=88),
+            fakedb.Build(
+                id=30, buildrequestid=41, number=7, masterid=88, builderid=88, workerid=47
+            ),
+            fakedb.Step(id=101, buildid=30, number=1, name='one'),
+        ])
+
+    @async_to_deferred
+    async def test_append_log(self):
+        db_name = self.master.db.pool.engine.dialect.name
+        for compression in ('raw', 'zstd'):
+            self.master.config.logCompressionMethod = compression
+            for lines_per_call in (1, 100, 1000, 10000):
+                name = f'{compression}-{lines_per_call}'
+                logid = await self.master.db.logs.addLog(stepid=101, name=name, slug=name, type='s')
+                content = self.LINE * lines_per_call
+                elapsed = await self.measure_async(
+                    lambda logid=logid, content=content: self.master.db.logs.appendLog(
+                        logid, content
+                    )
+                )
+                self.report(
+                    'appendLog',
+                    database=db_name,
+                    compression=compression,
+                    lines_per_call=lines_per_call,
+                    lines_per_second=lines_per_call / elapsed,
+                )
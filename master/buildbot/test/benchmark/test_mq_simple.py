@@ -0,0 +1,50 @@
+# This file is part of Buildbot.  Buildbot is free software: you can
+# redistribute it and/or modify it under the terms of the GNU General Public
+# License as published by the Free Software Foundation, version 2.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+# FOR A PARTICULAR PURPOSE.  See the GNU General Public License for more
+# details.
+#
+# You should have received a copy of the GNU General Public License along with
+# this program; if not, write to the Free Software Foundation, Inc., 51
+# Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+#
+# Copyright Buildbot Team Members
+
+from buildbot.mq import simple
+from buildbot.test.util import benchmark
+
+
+class SimpleMQProduce(benchmark.BenchmarkTestCase):
+    # routing keys as produced for log chunks of a build in progress
+    ROUTING_KEY = ('logs', '5', 'append')
+
+    def make_mq(self, consumers):
+        mq = simple.SimpleMQ()
+        for i in range(consumers):
+            # a mix of the subscriptions typically held by web clients
+            if i % 3 == 0:
+                filter = ('builds', str(i), 'steps', None, 'new')
+            elif i % 3 == 1:
+                filter = ('logs', str(i + 1000), None)
+            else:
+                filter = ('builders', str(i), 'builds', None, None)
+            mq.startConsuming(lambda key, data: None, filter)
+        # a single consumer actually interested in the routing key
+        mq.startConsuming(lambda key, data: None, ('logs', None, 'append'))
+        return mq
+
+    def test_produce_scaling(self):
+        timings = {}
+        for consumers in (10, 100, 1000, 10000):
+            mq = self.make_mq(consumers)
+            timings[consumers] = self.measure(
+                lambda mq=mq: mq.produce(self.ROUTING_KEY, {}), number=100
+            )
+            self.report('produce', consumers=consumers, usec_per_produce=timings[consumers] * 1e6)
+
+        # the cost of producing a message must not depend on the number of
+        # consumers that are not interested in it
+        self.assertLess(timings[10000], timings[10] * 5)
@@ -0,0 +1,92 @@
+# This file is part of Buildbot.  Buildbot is free software: you can
+# redistribute it and/or modify it under the terms of the GNU General Public
+# License as published by the Free Software Foundation, version 2.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+# FOR A PARTICULAR PURPOSE.  See the GNU General Public License for more
+# details.
+#
+# You should have received a copy of the GNU General Public License along with
+# this program; if not, write to the Free Software Foundation, Inc., 51
+# Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+#
+# Copyright Buildbot Team Members
+
+import os
+
+from buildbot.config import BuilderConfig
+from buildbot.plugins import schedulers
+from buildbot.process.factory import BuildFactory
+from buildbot.process.results import SUCCESS
+from buildbot.steps.transfer import MultipleFileUpload
+from buildbot.test.util import benchmark
+from buildbot.test.util.integration import RunMasterBase
+from buildbot.util.twisted import async_to_deferred
+
+
+class MultipleFileUploadBenchmark(RunMasterBase, benchmark.BenchmarkTestCase):
+    """
+    Measures the time taken by a MultipleFileUpload step uploading many small files from a local
+    worker, sequentially, in parallel, and packed in a single archive.
+
+    The local worker runs one command at a time, so its parallel variant is sequential; the
+    msgpack variant below measures actual parallel uploads.
+    """
+
+    timeout = benchmark.BenchmarkTestCase.timeout
+
+    FILES = 500
+    FILE_SIZE = 1024
+
+    VARIANTS = {
+        'sequential': {},
+        'parallel': {'parallelUploads': 8},
+        'packed': {'packSmallFiles': 64 * 1024},
+    }
+
+    @async_to_deferred
+    async def setUp(self):
+        super().setUp()
+        srcdir = os.path.abspath(self.mktemp())
+        os.makedirs(srcdir)
+        self.sources = []
+        for i in range(self.FILES):
+            source = os.path.join(srcdir, f'file{i}')
+            with open(source, 'wb') as f:
+                f.write(os.urandom(self.FILE_SIZE))
+            self.sources.append(source)
+        self.destdir = os.path.abspath(self.mktemp())
+
+        c = {'schedulers': [], 'builders': []}
+        for name, kwargs in self.VARIANTS.items():
+            f = BuildFactory()
+            f.addStep(
+                MultipleFileUpload(
+                    workersrcs=self.sources, masterdest=os.path.join(self.destdir, name), **kwargs
+                )
+            )
+            c['builders'].append(BuilderConfig(name=name, workernames=["local1"], factory=f))
+            c['schedulers'].append(schedulers.ForceScheduler(name=name, builderNames=[name]))
+        await self.setup_master(c)
+
+    async def upload(self, name):
+        build = await self.doForceBuild(
+            triggerCallback=lambda: self.master.data.control("force", {}, ("forceschedulers", name))
+        )
+        self.assertEqual(build['results'], SUCCESS)
+
+    @async_to_deferred
+    async def test_upload(self):
+        timings = {}
+        for name in self.VARIANTS:
+            elapsed = await self.measure_async(lambda name=name: self.upload(name))
+            timings[name] = elapsed
+            self.report('upload', variant=name, files=self.FILES, seconds=elapsed)
+            self.assertEqual(len(os.listdir(os.path.join(self.destdir, name))), self.FILES)
+
+        self.assertLess(timings['packed'], timings['sequential'])
+
+
+class MultipleFileUploadBenchmarkMsgPack(MultipleFileUploadBenchmark):
+    proto = "msgpack"
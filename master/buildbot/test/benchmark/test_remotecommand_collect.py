@@ -0,0 +1,79 @@
+# This file is part of Buildbot.  Buildbot is free software: you can
+# redistribute it and/or modify it under the terms of the GNU General Public
+# License as published by the Free Software Foundation, version 2.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+# FOR A PARTICULAR PURPOSE.  See the GNU General Public License for more
+# details.
+#
+# You should have received a copy of the GNU General Public License along with
+# this program; if not, write to the Free Software Foundation, Inc., 51
+# Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+#
+# Copyright Buildbot Team Members
+
+from buildbot.process import remotecommand
+from buildbot.test.util import benchmark
+
+
+class StrConcatRemoteCommand(remotecommand.RemoteCommand):
+    # the previous behavior: the collected output is a string attribute
+    def __init__(self):
+        super().__init__('shell', {}, collectStdout=True)
+        self.concat_stdout = ''
+
+    def add_stdout_lines(self, data, is_flushed):
+        self.concat_stdout += data
+
+
+class CollectStdout(benchmark.BenchmarkTestCase):
+    """
+    Measures the time taken to collect the output of a command, as done for steps reading the
+    output of a command like git log or a dependency listing.
+    """
+
+    UPDATE = 'x' * 99 + '\n'
+    UPDATE_SIZE = 64 * 1024
+    MB = 1024 * 1024
+
+    def collect(self, cmd, size):
+        update = self.UPDATE * (self.UPDATE_SIZE // len(self.UPDATE))
+        for _ in range(size // len(update)):
+            cmd.add_stdout_lines(update, False)
+        return cmd
+
+    def test_collect(self):
+        timings = {}
+        # the string concatenation is quadratic: it is only measured for small outputs
+        for size_mb in (1, 10, 50):
+            elapsed = self.measure(
+                lambda size_mb=size_mb: self.collect(StrConcatRemoteCommand(), size_mb * self.MB)
+            )
+            timings['str_concat', size_mb] = elapsed
+            self.report('collect', method='str_concat', size_mb=size_mb, seconds=elapsed)
+
+        for size_mb in (1, 10, 50, 500):
+            elapsed = self.measure(
+                lambda size_mb=size_mb: self.collect(
+                    remotecommand.RemoteCommand('shell', {}, collectStdout=True),
+                    size_mb * self.MB,
+                ).stdout
+            )
+            timings['accumulator', size_mb] = elapsed
+            self.report('collect', method='accumulator', size_mb=size_mb, seconds=elapsed)
+
+        for size_mb in (50, 500):
+            elapsed = self.measure(
+                lambda size_mb=size_mb: self.collect(
+                    remotecommand.RemoteCommand(
+                        'shell', {}, collectStdout=True, collect_max_memory=self.MB
+                    ),
+                    size_mb * self.MB,
+                ).stdout
+            )
+            self.report('collect', method='accumulator_to_file', size_mb=size_mb, seconds=elapsed)
+
+        # collecting the output must take time linear with its size
+        self.assertLess(timings['accumulator', 500], timings['accumulator', 50] * 20)
+        self.assertLess(timings['accumulator', 50], timings['str_concat', 50])
@@ -0,0 +1,53 @@
+# This file is part of Buildbot.  Buildbot is free software: you can
+# redistribute it and/or modify it under the terms of the GNU General Public
+# License as published by the Free Software Foundation, version 2.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+# FOR A PARTICULAR PURPOSE.  See the GNU General Public License for more
+# details.
+#
+# You should have received a copy of the GNU General Public License along with
+# this program; if not, write to the Free Software Foundation, Inc., 51
+# Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+#
+# Copyright Buildbot Team Members
+
+from twisted.trial import unittest
+
+from buildbot.test.util import benchmark
+
+try:
+    from buildbot_worker.util.lineboundaries import LineBoundaryFinder
+except ImportError:
+    LineBoundaryFinder = None  # type: ignore[assignment,misc]
+
+
+class LineBoundaries(benchmark.BenchmarkTestCase):
+    """
+    Measures the rate of output split in lines by the worker, for chunks of output as read from
+    a verbose test runner.
+    """
+
+    NEWLINE_RE = r'(\r\n|\r(?=.)|\033\[u|\033\[[0-9]+;[0-9]+[Hf]|\033\[2J|\x08+)'
+    CHUNK_SIZE = 64 * 1024
+
+    OUTPUTS = {
+        'short_lines': 'test_module.py::TestClass::test_something PASSED\n',
+        'crlf_lines': 'test_module.py::TestClass::test_something PASSED\r\n',
+        'progress': '[=====>    ] 50%\r',
+        'long_lines': 'x' * 10000 + '\n',
+    }
+
+    def setUp(self):
+        super().setUp()
+        if LineBoundaryFinder is None:
+            raise unittest.SkipTest('buildbot-worker is not installed')
+
+    def test_append(self):
+        for name, output in self.OUTPUTS.items():
+            # chunks do not end on line boundaries, so that partial lines are carried over
+            chunk = (output * (self.CHUNK_SIZE // len(output) + 1))[: self.CHUNK_SIZE]
+            lbf = LineBoundaryFinder(4096, self.NEWLINE_RE)
+            elapsed = self.measure(lambda lbf=lbf, chunk=chunk: lbf.append(chunk, 0.0), number=10)
+            self.report('append', output=name, mb_per_second=len(chunk) / elapsed / 1e6)
@@ -0,0 +1,133 @@
+# This file is part of Buildbot.  Buildbot is free software: you can
+# redistribute it and/or modify it under the terms of the GNU General Public
+# License as published by the Free Software Foundation, version 2.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+# FOR A PARTICULAR PURPOSE.  See the GNU General Public License for more
+# details.
+#
+# You should have received a copy of the GNU General Public License along with
+# this program; if not, write to the Free Software Foundation, Inc., 51
+# Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+#
+# Copyright Buildbot Team Members
+
+from unittest import mock
+
+from twisted.internet import reactor
+from twisted.spread import pb
+from twisted.trial import unittest
+
+from buildbot.process import remotecommand
+from buildbot.test.util import benchmark
+from buildbot.util.twisted import async_to_deferred
+from buildbot.worker.protocols import pb as pb_protocol
+
+try:
+    from buildbot_worker.pb import ProtocolCommandPb
+except ImportError:
+    ProtocolCommandPb = None  # type: ignore[assignment,misc]
+
+
+class CountingRemoteCommand(remotecommand.RemoteCommand):
+    def __init__(self, whole_line_updates):
+        super().__init__('shell', {})
+        self.worker = mock.Mock()
+        self.active = True
+        self._whole_line_updates = whole_line_updates
+        self.lines = 0
+
+    def remoteUpdate(self, key, value, is_flushed):
+        self.lines += value.count('\n')
+        return super().remoteUpdate(key, value, is_flushed)
+
+
+class CommandRoot(pb.Root):
+    def __init__(self, command):
+        self.command = command
+
+    def remote_get_command(self):
+        # the master wraps its RemoteCommand the same way when starting a command
+        return pb_protocol.RemoteCommand(self.command)
+
+
+class PbUpdates(benchmark.BenchmarkTestCase):
+    """
+    Measures the rate of output lines sent by a worker command over a loopback PB
+    connection, up to the master RemoteCommand.
+    """
+
+    LINE = 'test_module.py::TestClass::test_something PASSED\n'
+    LINES_PER_READ = 20
+    LINES = 20000
+
+    @async_to_deferred
+    async def setUp(self):
+        super().setUp()
+        if ProtocolCommandPb is None:
+            raise unittest.SkipTest('buildbot-worker is not installed')
+
+        self.command = CountingRemoteCommand(whole_line_updates=True)
+        port = reactor.listenTCP(
+            0, pb.PBServerFactory(CommandRoot(self.command)), interface='127.0.0.1'
+        )
+        self.addCleanup(port.stopListening)
+
+        factory = pb.PBClientFactory()
+        reactor.connectTCP('127.0.0.1', port.getHost().port, factory)
+        self.addCleanup(factory.disconnect)
+        root = await factory.getRootObject()
+        self.command_ref = await root.callRemote('get_command')
+
+    def make_protocol_command(self, batched):
+        class UnbatchedProtocolCommandPb(ProtocolCommandPb):
+            # the previous behavior: one remote call per buffered message
+            def protocol_send_update_message(self, message):
+                for update in message:
+                    super().protocol_send_update_message([update])
+
+        cls = ProtocolCommandPb if batched else UnbatchedProtocolCommandPb
+        return cls(
+            unicode_encoding='utf-8',
+            worker_basedir=self.mktemp(),
+            basedir='basedir',
+            buffer_size=64 * 1024,
+            buffer_timeout=5,
+            max_line_length=4096,
+            newline_re=r'(\r\n|\r(?=.)|\033\[u|\033\[[0-9]+;[0-9]+[Hf]|\033\[2J|\x08+)',
+            builder_is_running=True,
+            on_command_complete=lambda: None,
+            on_lost_remote_step=lambda _: None,
+            command='shell',
+            command_id='1',
+            args={'workdir': 'wkdir', 'command': ['true']},
+            command_ref=self.command_ref,
+        )
+
+    async def send_output(self, protocol_command):
+        self.command.lines = 0
+        # interleave stdout and stderr, as a test runner would
+        read = self.LINE * self.LINES_PER_READ
+        for i in range(self.LINES // self.LINES_PER_READ):
+            protocol_command.send_update([('stdout' if i % 2 else 'stderr', read)])
+        protocol_command.flush_command_output()
+        # PB calls are processed in order: this returns once all updates are processed
+        await self.command_ref.callRemote('update', [])
+        self.assertEqual(self.command.lines, self.LINES)
+
+    @async_to_deferred
+    async def test_send_output(self):
+        for batched in (False, True):
+            for whole_line_updates in (False, True):
+                self.command._whole_line_updates = whole_line_updates
+                protocol_command = self.make_protocol_command(batched)
+                elapsed = await self.measure_async(
+                    lambda protocol_command=protocol_command: self.send_output(protocol_command)
+                )
+                self.report(
+                    'send_output',
+                    batched=batched,
+                    whole_line_updates=whole_line_updates,
+                    lines_per_second=self.LINES / elapsed,
+                )
@@ -20,6 +20,7 @@ from buildbot.util.twisted import async_to_deferred
 
 class FakeConnection:
     is_fake_test_connection = True
+    supports_concurrent_commands = True
 
     _waiting_for_interrupt = False
 
@@ -118,6 +118,7 @@ class FakeMaster(service.MasterService):
         self.machine_manager = FakeMachineManager()
         self.machine_manager.setServiceParent(self)
         self.log_rotation = FakeLogRotation()
+        self.directory_unpack_pool = None
         self.db = mock.Mock()
         self.next_objectid = 0
         self.config_version = 0
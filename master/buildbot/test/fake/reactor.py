@@ -110,8 +110,9 @@ class NonThreadPool:
 
     calls = 0
 
-    def __init__(self, **kwargs):
-        pass
+    def __init__(self, minthreads=5, maxthreads=20, **kwargs):
+        self.min = minthreads
+        self.max = maxthreads
 
     def callInThreadWithCallback(self, onResult, func, *args, **kw):
         self.calls += 1
@@ -125,6 +126,12 @@ class NonThreadPool:
         else:
             onResult(True, result)
 
+    def adjustPoolsize(self, minthreads=None, maxthreads=None):
+        if minthreads is not None:
+            self.min = minthreads
+        if maxthreads is not None:
+            self.max = maxthreads
+
     def start(self):
         pass
 
@@ -136,6 +136,7 @@ class TestSetupPyEntryPoints(unittest.TestCase):
             'buildbot.util.netstrings.NetstringParser',
             'buildbot.util.netstrings.NullAddress',
             'buildbot.util.netstrings.NullTransport',
+            'buildbot.util.output_accumulator.OutputAccumulator',
             'buildbot.util.pathmatch.Matcher',
             'buildbot.util.poll.Poller',
             'buildbot.util.private_tempdir.PrivateTemporaryDirectory',
@@ -162,6 +163,7 @@ class TestSetupPyEntryPoints(unittest.TestCase):
             'buildbot.util.subscription.Subscription',
             'buildbot.util.subscription.SubscriptionPoint',
             'buildbot.util.test_result_submitter.TestResultSubmitter',
+            'buildbot.util.tuplematch.TupleMatchIndex',
             "buildbot.util.watchdog.Watchdog",
             "buildbot.util.twisted.ThreadPool",
         }
@@ -190,6 +192,7 @@ class TestSetupPyEntryPoints(unittest.TestCase):
             'buildbot.reporters.telegram.TelegramPollingBot',
             'buildbot.reporters.telegram.TelegramStatusBot',
             'buildbot.reporters.telegram.TelegramWebhookBot',
+            'buildbot.reporters.utils.BuildDetailsMemo',
             'buildbot.reporters.words.Channel',
             'buildbot.reporters.words.Contact',
             'buildbot.reporters.words.ForceOptions',
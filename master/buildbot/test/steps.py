@@ -405,6 +405,7 @@ class ExpectUploadDirectory(Expect):
         keepstamp=None,
         slavesrc=None,
         interrupted=False,
+        members=None,
     ):
         args = {
             'compress': compress,
@@ -415,6 +416,8 @@ class ExpectUploadDirectory(Expect):
         }
         if keepstamp is not None:
             args['keepstamp'] = keepstamp
+        if members is not None:
+            args['members'] = members
         if slavesrc is not None:
             args['slavesrc'] = slavesrc
         if workersrc is not None:
@@ -423,19 +426,22 @@ class ExpectUploadDirectory(Expect):
         super().__init__('uploadDirectory', args, interrupted=interrupted)
 
     def upload_tar_file(self, filename, members, error=None, out_writers=None):
+        @defer.inlineCallbacks
         def behavior(command):
             f = BytesIO()
             archive = tarfile.TarFile(fileobj=f, name=filename, mode='w')
             for name, content in members.items():
                 content = unicode2bytes(content)
-                archive.addfile(tarfile.TarInfo(name), BytesIO(content))
+                info = tarfile.TarInfo(name)
+                info.size = len(content)
+                archive.addfile(info, BytesIO(content))
 
             writer = command.args['writer']
             if out_writers is not None:
                 out_writers.append(writer)
 
             writer.remote_write(f.getvalue())
-            writer.remote_unpack()
+            yield writer.remote_unpack()
 
             if error is not None:
                 writer.cancel = mock.Mock(wraps=writer.cancel)
@@ -41,7 +41,6 @@ from buildbot.test.util import logging
 from buildbot.test.util.git_repository import TestGitRepository
 from buildbot.test.util.state import StateTestMixin
 from buildbot.util import bytes2unicode
-from buildbot.util import unicode2bytes
 from buildbot.util.git_credential import GitCredentialOptions
 from buildbot.util.twisted import async_to_deferred
 
@@ -77,31 +76,14 @@ class TestGitPollerBase(
         self.poller = yield self.attachChangeSource(self.createPoller())
 
     def patch_poller_get_commit_info(self, poller, timestamp):
-        # There is a separate test suite for the methods below, no need to complicate each test
-        def get_timestamp(rev):
-            return defer.succeed(timestamp)
+        # There is a separate test suite for the method below, no need to complicate each test
+        def get_commits_info(revs):
+            return defer.succeed({
+                rev: (timestamp, 'by:' + rev[:8], 'by:' + rev[:8], ['/etc/' + rev[:3]], 'hello!')
+                for rev in revs
+            })
 
-        self.patch(self.poller, '_get_commit_timestamp', get_timestamp)
-
-        def author(rev):
-            return defer.succeed('by:' + rev[:8])
-
-        self.patch(self.poller, '_get_commit_author', author)
-
-        def committer(rev):
-            return defer.succeed('by:' + rev[:8])
-
-        self.patch(self.poller, '_get_commit_committer', committer)
-
-        def files(rev):
-            return defer.succeed(['/etc/' + rev[:3]])
-
-        self.patch(self.poller, '_get_commit_files', files)
-
-        def comments(rev):
-            return defer.succeed('hello!')
-
-        self.patch(self.poller, '_get_commit_comments', comments)
+        self.patch(self.poller, '_get_commits_info', get_commits_info)
 
     @async_to_deferred
     async def set_last_rev(self, state: dict[str, str]) -> None:
@@ -118,144 +100,115 @@ class TestGitPollerBase(
 class TestGitPoller(TestGitPollerBase):
     dummyRevStr = '12345abcde'
 
-    @defer.inlineCallbacks
-    def _perform_git_output_test(
-        self, methodToTest, args, desiredGoodOutput, desiredGoodResult, emptyRaisesException=True
-    ):
+    COMMITS_INFO_ARGS = [
+        'git',
+        'log',
+        '-z',
+        '--no-walk',
+        '--stdin',
+        '--name-only',
+        '-m',
+        '--first-parent',
+        '--format=%x00%H%x00%ct%x00%aN <%aE>%x00%cN <%cE>%x00%s%n%b%x00',
+        '--',
+    ]
+
+    def commits_info_output(self, *commits):
+        output = b''
+        for rev, stamp, author, committer, comments, files in commits:
+            output += b'\0'.join([b'', rev, stamp, author, committer, comments, b'', b''])
+            if files:
+                output += b'\n' + b''.join(f + b'\0' for f in files)
+        return output
+
+    def expect_commits_info(self, output):
         self.expect_commands(
-            ExpectMasterShell(['git', *args]).workdir(self.POLLER_WORKDIR),
+            ExpectMasterShell(self.COMMITS_INFO_ARGS).workdir(self.POLLER_WORKDIR).stdout(output)
         )
 
-        # we should get an Exception with empty output from git
-        try:
-            yield methodToTest(self.dummyRevStr)
-            if emptyRaisesException:
-                self.fail("run_process should have failed on empty output")
-        except Exception as error:
-            if not emptyRaisesException:
-                import traceback
+    @defer.inlineCallbacks
+    def test_get_commits_info(self):
+        revs = [b'12345abcde', b'67890fedcb']
+        self.expect_commits_info(
+            self.commits_info_output(
+                (
+                    revs[0],
+                    b'1273258009',
+                    b'Sammy Jankis <email@example.com>',
+                    b'Leonard Shelby <other@example.com>',
+                    b'this is a commit message\n\nthat is multiline\n',
+                    [b'normal_directory/file1', b'directory with space/file2', b'"quoted"'],
+                ),
+                (revs[1], b'1273258010', b'A <a@example.com>', b'C <c@example.com>', b'\n', []),
+            ),
+        )
 
-                traceback.print_exc()
-                self.fail("run_process should NOT have failed on empty output: " + repr(error))
+        res = yield self.poller._get_commits_info([bytes2unicode(rev) for rev in revs])
 
         self.assert_all_commands_ran()
-
-        # and the method shouldn't suppress any exceptions
-        self.expect_commands(
-            ExpectMasterShell(['git', *args]).workdir(self.POLLER_WORKDIR).exit(1),
+        self.assertEqual(
+            res,
+            {
+                '12345abcde': (
+                    1273258009,
+                    'Sammy Jankis <email@example.com>',
+                    'Leonard Shelby <other@example.com>',
+                    ['normal_directory/file1', 'directory with space/file2', '"quoted"'],
+                    'this is a commit message\n\nthat is multiline',
+                ),
+                '67890fedcb': (1273258010, 'A <a@example.com>', 'C <c@example.com>', [], ''),
+            },
         )
 
-        try:
-            yield methodToTest(self.dummyRevStr)
-            self.fail("run_process should have failed on stderr output")
-        except Exception:
-            pass
-
-        self.assert_all_commands_ran()
+    @defer.inlineCallbacks
+    def test_get_commits_info_no_timestamps(self):
+        self.poller.usetimestamps = False
+        self.expect_commits_info(
+            self.commits_info_output((
+                b'12345abcde',
+                b'1273258009',
+                b'A <a@example.com>',
+                b'A <a@example.com>',
+                b'',
+                [],
+            )),
+        )
+
+        res = yield self.poller._get_commits_info(['12345abcde'])
+        self.assertEqual(res['12345abcde'][0], None)
 
-        # finally we should get what's expected from good output
-        self.expect_commands(
-            ExpectMasterShell(['git', *args]).workdir(self.POLLER_WORKDIR).stdout(desiredGoodOutput)
+    @defer.inlineCallbacks
+    def test_get_commits_info_no_author(self):
+        self.expect_commits_info(
+            self.commits_info_output((
+                b'12345abcde',
+                b'1273258009',
+                b'',
+                b'A <a@example.com>',
+                b'',
+                [b'file1'],
+            )),
         )
 
-        r = yield methodToTest(self.dummyRevStr)
-
-        self.assertEqual(r, desiredGoodResult)
-        # check types
-        if isinstance(r, str):
-            self.assertIsInstance(r, str)
-        elif isinstance(r, list):
-            for e in r:
-                self.assertIsInstance(e, str)
+        with self.assertRaises(OSError):
+            yield self.poller._get_commits_info(['12345abcde'])
 
-        self.assert_all_commands_ran()
+    @defer.inlineCallbacks
+    def test_get_commits_info_missing_rev(self):
+        self.expect_commits_info(b'')
 
-    def test_get_commit_author(self):
-        authorStr = 'Sammy Jankis <email@example.com>'
-        authorBytes = unicode2bytes(authorStr)
-        return self._perform_git_output_test(
-            self.poller._get_commit_author,
-            ['log', '--no-walk', '--format=%aN <%aE>', self.dummyRevStr, '--'],
-            authorBytes,
-            authorStr,
-        )
-
-    def test_get_commit_committer(self):
-        committerStr = 'Sammy Jankis <email@example.com>'
-        committerBytes = unicode2bytes(committerStr)
-        return self._perform_git_output_test(
-            self.poller._get_commit_committer,
-            ['log', '--no-walk', '--format=%cN <%cE>', self.dummyRevStr, '--'],
-            committerBytes,
-            committerStr,
-        )
-
-    def _test_get_commit_comments(self, commentStr):
-        commentBytes = unicode2bytes(commentStr)
-        return self._perform_git_output_test(
-            self.poller._get_commit_comments,
-            ['log', '--no-walk', '--format=%s%n%b', self.dummyRevStr, '--'],
-            commentBytes,
-            commentStr,
-            emptyRaisesException=False,
-        )
-
-    def test_get_commit_comments(self):
-        comments = ['this is a commit message\n\nthat is multiline', 'single line message', '']
-        return defer.DeferredList(
-            [self._test_get_commit_comments(commentStr) for commentStr in comments],
-            consumeErrors=True,
-        )
-
-    def test_get_commit_files(self):
-        filesBytes = b'\n\nfile1\nfile2\n"\146ile_octal"\nfile space'
-        filesRes = ['file1', 'file2', 'file_octal', 'file space']
-        return self._perform_git_output_test(
-            self.poller._get_commit_files,
-            [
-                'log',
-                '--name-only',
-                '--no-walk',
-                '--format=%n',
-                '-m',
-                '--first-parent',
-                self.dummyRevStr,
-                '--',
-            ],
-            filesBytes,
-            filesRes,
-            emptyRaisesException=False,
-        )
+        with self.assertRaises(OSError):
+            yield self.poller._get_commits_info(['12345abcde'])
 
-    def test_get_commit_files_with_space_in_changed_files(self):
-        filesBytes = b'normal_directory/file1\ndirectory with space/file2'
-        filesStr = bytes2unicode(filesBytes)
-        return self._perform_git_output_test(
-            self.poller._get_commit_files,
-            [
-                'log',
-                '--name-only',
-                '--no-walk',
-                '--format=%n',
-                '-m',
-                '--first-parent',
-                self.dummyRevStr,
-                '--',
-            ],
-            filesBytes,
-            [l for l in filesStr.splitlines() if l.strip()],
-            emptyRaisesException=False,
+    @defer.inlineCallbacks
+    def test_get_commits_info_git_error(self):
+        self.expect_commands(
+            ExpectMasterShell(self.COMMITS_INFO_ARGS).workdir(self.POLLER_WORKDIR).exit(1)
         )
 
-    def test_get_commit_timestamp(self):
-        stampBytes = b'1273258009'
-        stampStr = bytes2unicode(stampBytes)
-        return self._perform_git_output_test(
-            self.poller._get_commit_timestamp,
-            ['log', '--no-walk', '--format=%ct', self.dummyRevStr, '--'],
-            stampBytes,
-            float(stampStr),
-        )
+        with self.assertRaises(OSError):
+            yield self.poller._get_commits_info(['12345abcde'])
+        self.assert_all_commands_ran()
 
     def test_describe(self):
         self.assertSubstring("GitPoller", self.poller.describe())
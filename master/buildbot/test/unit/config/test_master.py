@@ -59,6 +59,10 @@ global_defaults = {
     "logEncoding": 'utf-8',
     "logMaxTailSize": None,
     "logMaxSize": None,
+    "logWriteBufferSize": None,
+    "logWriteBufferTime": 1,
+    "logChunkCacheSize": 16 * 1024 * 1024,
+    "directoryUnpackThreads": 2,
     "properties": properties.Properties(),
     "collapseRequests": None,
     "prioritizeBuilders": None,
@@ -249,6 +253,7 @@ class MasterConfigTests(ConfigErrorsMixin, dirs.DirsMixin, unittest.TestCase):
             "mq": {"type": 'simple'},
             "metrics": None,
             "caches": {"Changes": 10, "Builds": 15},
+            "cacheMaxBytes": None,
             "schedulers": {},
             "builders": [],
             "workers": [],
@@ -452,7 +457,9 @@ class MasterConfig_loaders(ConfigErrorsMixin, unittest.TestCase):
             self.cfg.load_global(self.filename, {'logCompressionMethod': 'foo'})
 
         self.assertConfigError(
-            errors, "c['logCompressionMethod'] must be 'raw', 'bz2', 'gz', 'lz4', 'br' or 'zstd'"
+            errors,
+            "c['logCompressionMethod'] must be 'raw', 'bz2', 'gz', 'lz4', 'br', 'zstd' "
+            "or 'zstd-dict'",
         )
 
     def test_load_global_codebaseGenerator(self):
@@ -473,6 +480,36 @@ class MasterConfig_loaders(ConfigErrorsMixin, unittest.TestCase):
     def test_load_global_logMaxTailSize(self):
         self.do_test_load_global({"logMaxTailSize": 123}, logMaxTailSize=123)
 
+    def test_load_global_logWriteBufferSize(self):
+        self.do_test_load_global({"logWriteBufferSize": 65536}, logWriteBufferSize=65536)
+
+    def test_load_global_logWriteBufferTime(self):
+        self.do_test_load_global({"logWriteBufferTime": 0.5}, logWriteBufferTime=0.5)
+
+    def test_load_global_logWriteBufferTime_invalid(self):
+        with capture_config_errors() as errors:
+            self.cfg.load_global(self.filename, {'logWriteBufferTime': 'soon'})
+
+        self.assertConfigError(errors, "c['logWriteBufferTime'] must be a number")
+
+    def test_load_global_logChunkCacheSize(self):
+        self.do_test_load_global({"logChunkCacheSize": 0}, logChunkCacheSize=0)
+
+    def test_load_global_logChunkCacheSize_invalid(self):
+        with capture_config_errors() as errors:
+            self.cfg.load_global(self.filename, {'logChunkCacheSize': -1})
+
+        self.assertConfigError(errors, "c['logChunkCacheSize'] must be a positive integer or 0")
+
+    def test_load_global_directoryUnpackThreads(self):
+        self.do_test_load_global({"directoryUnpackThreads": 4}, directoryUnpackThreads=4)
+
+    def test_load_global_directoryUnpackThreads_invalid(self):
+        with capture_config_errors() as errors:
+            self.cfg.load_global(self.filename, {'directoryUnpackThreads': 0})
+
+        self.assertConfigError(errors, "c['directoryUnpackThreads'] must be at least 1")
+
     def test_load_global_logEncoding(self):
         self.do_test_load_global({"logEncoding": 'latin-2'}, logEncoding='latin-2')
 
@@ -587,6 +624,14 @@ class MasterConfig_loaders(ConfigErrorsMixin, unittest.TestCase):
         self.cfg.load_dbconfig(self.filename, {'db': {'db_url': 'abcd'}})
         self.assertResults(db=config.master.DBConfig(db_url='abcd'))
 
+    def test_load_db_async_driver(self):
+        self.cfg.load_dbconfig(
+            self.filename, {'db': {'db_url': 'postgresql://abcd', 'async_driver': 'asyncpg'}}
+        )
+        self.assertResults(
+            db=config.master.DBConfig(db_url='postgresql://abcd', async_driver='asyncpg')
+        )
+
     def test_load_db_unk_keys(self):
         with capture_config_errors() as errors:
             self.cfg.load_dbconfig(self.filename, {'db': {'db_url': 'abcd', 'bar': 'bar'}})
@@ -679,6 +724,35 @@ class MasterConfig_loaders(ConfigErrorsMixin, unittest.TestCase):
 
         self.assertConfigError(errors, "'Changes' cache size must be at least 1, got '-12'")
 
+    def test_load_caches_limits(self):
+        limits = {'size': 100, 'maxBytes': 10000000, 'ttl': 3600}
+        self.cfg.load_caches(self.filename, {"caches": {"Builds": limits}, "cacheMaxBytes": 1000})
+        self.assertResults(caches={"Changes": 10, "Builds": limits}, cacheMaxBytes=1000)
+
+    def test_load_caches_limits_no_size_err(self):
+        with capture_config_errors() as errors:
+            self.cfg.load_caches(self.filename, {'caches': {'Builds': {'ttl': 10}}})
+
+        self.assertConfigError(errors, "'size' must be given for cache 'Builds'")
+
+    def test_load_caches_limits_unknown_key_err(self):
+        with capture_config_errors() as errors:
+            self.cfg.load_caches(self.filename, {'caches': {'Builds': {'size': 1, 'max': 10}}})
+
+        self.assertConfigError(errors, "unknown keys ['max'] for cache 'Builds'")
+
+    def test_load_caches_limits_invalid_ttl_err(self):
+        with capture_config_errors() as errors:
+            self.cfg.load_caches(self.filename, {'caches': {'Builds': {'size': 1, 'ttl': 0}}})
+
+        self.assertConfigError(errors, "'ttl' of cache 'Builds' must be a positive number")
+
+    def test_load_caches_cacheMaxBytes_err(self):
+        with capture_config_errors() as errors:
+            self.cfg.load_caches(self.filename, {'cacheMaxBytes': '1G'})
+
+        self.assertConfigError(errors, "c['cacheMaxBytes'] must be a positive integer or None")
+
     def test_load_schedulers_defaults(self):
         self.cfg.load_schedulers(self.filename, {})
         self.assertResults(schedulers={})
@@ -994,6 +1068,42 @@ class MasterConfig_loaders(ConfigErrorsMixin, unittest.TestCase):
 
         self.assertConfigError(errors, 'Invalid www["cookie_expiration_time"]')
 
+    def test_load_www_event_queue(self):
+        self.cfg.load_www(
+            self.filename,
+            {
+                "www": {
+                    "event_queue_high_watermark": 1000,
+                    "event_queue_low_watermark": 100,
+                    "event_queue_overflow": "disconnect",
+                }
+            },
+        )
+        self.assertEqual(self.cfg.www["event_queue_high_watermark"], 1000)
+        self.assertEqual(self.cfg.www["event_queue_low_watermark"], 100)
+        self.assertEqual(self.cfg.www["event_queue_overflow"], "disconnect")
+
+    def test_load_www_event_queue_watermark_invalid(self):
+        with capture_config_errors() as errors:
+            self.cfg.load_www(self.filename, {'www': {"event_queue_high_watermark": -1}})
+
+        self.assertConfigError(errors, 'Invalid www["event_queue_high_watermark"]')
+
+    def test_load_www_event_queue_watermarks_inverted(self):
+        with capture_config_errors() as errors:
+            self.cfg.load_www(
+                self.filename,
+                {'www': {"event_queue_high_watermark": 100, "event_queue_low_watermark": 1000}},
+            )
+
+        self.assertConfigError(errors, 'event_queue_low_watermark should not be greater')
+
+    def test_load_www_event_queue_overflow_invalid(self):
+        with capture_config_errors() as errors:
+            self.cfg.load_www(self.filename, {'www': {"event_queue_overflow": "drop"}})
+
+        self.assertConfigError(errors, 'Invalid www["event_queue_overflow"]')
+
     def test_load_www_unknown(self):
         with capture_config_errors() as errors:
             self.cfg.load_www(self.filename, {"www": {"foo": "bar"}})
@@ -112,6 +112,16 @@ class TestBuildRequestEndpoint(endpoint.EndpointMixin, unittest.TestCase):
             buildrequest['properties'], {'prop1': ('one', 'fake1'), 'prop2': ('two', 'fake2')}
         )
 
+    @defer.inlineCallbacks
+    def test_control_set_priority(self):
+        yield self.ep.control('set_priority', {'priority': 12}, {'buildrequestid': 44})
+        buildrequest = yield self.callGet(('buildrequests', 44))
+        self.assertEqual(buildrequest['priority'], 12)
+        self.assertIn(
+            (('buildrequests', '44', 'update'), 12),
+            [(key, msg['priority']) for key, msg in self.master.mq.productions],
+        )
+
 
 class TestBuildRequestsEndpoint(endpoint.EndpointMixin, unittest.TestCase):
     endpointClass = buildrequests.BuildRequestsEndpoint
@@ -300,6 +310,20 @@ class TestBuildRequest(interfaces.InterfaceTests, TestReactorMixin, unittest.Tes
         if expectedDbApiCalled:
             dbMockedMethod.assert_called_with(*methodargs, **methodkwargs)
 
+    @defer.inlineCallbacks
+    def test_get_unclaimed_summary(self):
+        yield self.master.db.insert_test_data([
+            fakedb.Builder(id=123),
+            fakedb.Builder(id=124),
+            fakedb.Buildset(id=8822),
+            fakedb.BuildRequest(id=44, builderid=123, buildsetid=8822, priority=3, submitted_at=20),
+            fakedb.BuildRequest(id=55, builderid=123, buildsetid=8822, priority=1, submitted_at=10),
+        ])
+        res = yield self.rtype.get_unclaimed_summary()
+        self.assertEqual(
+            res, {123: {'highest_priority': 3, 'oldest_submitted_at': epoch2datetime(10)}}
+        )
+
     def testSignatureClaimBuildRequests(self):
         @self.assertArgSpecMatches(
             self.master.data.updates.claimBuildRequests,  # fake
@@ -0,0 +1,69 @@
+# This file is part of Buildbot.  Buildbot is free software: you can
+# redistribute it and/or modify it under the terms of the GNU General Public
+# License as published by the Free Software Foundation, version 2.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+# FOR A PARTICULAR PURPOSE.  See the GNU General Public License for more
+# details.
+#
+# You should have received a copy of the GNU General Public License along with
+# this program; if not, write to the Free Software Foundation, Inc., 51
+# Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+#
+# Copyright Buildbot Team Members
+
+from twisted.internet import defer
+from twisted.trial import unittest
+
+from buildbot.data import dbpool
+from buildbot.test.util import endpoint
+
+
+class DBPoolEndpoint(endpoint.EndpointMixin, unittest.TestCase):
+    endpointClass = dbpool.DBPoolEndpoint
+    resourceTypeClass = dbpool.DBPool
+
+    @defer.inlineCallbacks
+    def setUp(self):
+        yield self.setUpEndpoint()
+
+    @defer.inlineCallbacks
+    def test_get(self):
+        stats = self.master.db.pool.stats
+        stats.max_queued = 3
+
+        pool = yield self.callGet(('dbpool',))
+
+        self.validateData(pool)
+        self.assertEqual(pool['size'], stats.size)
+        self.assertEqual(pool['max_queued'], 3)
+        self.assertEqual(pool['bucket_bounds_us'][:3], [1000, 2500, 5000])
+        self.assertEqual(len(pool['bucket_bounds_us']), len(stats.BUCKET_BOUNDS))
+
+
+class DBQueryStatsEndpoint(endpoint.EndpointMixin, unittest.TestCase):
+    endpointClass = dbpool.DBQueryStatsEndpoint
+    resourceTypeClass = dbpool.DBQueryStat
+
+    @defer.inlineCallbacks
+    def setUp(self):
+        yield self.setUpEndpoint()
+
+    @defer.inlineCallbacks
+    def test_get(self):
+        stats = self.master.db.pool.stats
+        stats.on_queued()
+        stats.on_started()
+        stats.on_finished('Component.getThing.thd', 0.002, 0.5)
+
+        queries = yield self.callGet(('dbpool', 'queries'))
+
+        for query in queries:
+            self.validateData(query)
+        query = next(q for q in queries if q['name'] == 'Component.getThing.thd')
+        self.assertEqual(query['count'], 1)
+        self.assertEqual(query['wait_sum_us'], 2000)
+        self.assertEqual(query['exec_sum_us'], 500000)
+        self.assertEqual(query['wait_buckets'][1], 1)
+        self.assertEqual(query['exec_buckets'][8], 1)
@@ -144,6 +144,66 @@ class Tests(TestReactorMixin, unittest.TestCase):
     def test_getBuildRequests_unclaimed(self):
         return self.do_test_getBuildRequests_claim_args(claimed=False, expected=[52])
 
+    @defer.inlineCallbacks
+    def do_test_get_unclaimed_buildrequests_summary(self, builderids, expected):
+        yield self.master.db.insert_test_data([
+            fakedb.BuildRequest(
+                id=50, buildsetid=self.BSID, builderid=self.BLDRID1, priority=2, submitted_at=200
+            ),
+            fakedb.BuildRequest(
+                id=51, buildsetid=self.BSID, builderid=self.BLDRID1, priority=5, submitted_at=300
+            ),
+            # claimed and complete requests are ignored
+            fakedb.BuildRequest(
+                id=52, buildsetid=self.BSID, builderid=self.BLDRID1, priority=9, submitted_at=100
+            ),
+            fakedb.BuildRequestClaim(
+                brid=52, masterid=self.OTHER_MASTER_ID, claimed_at=self.CLAIMED_AT_EPOCH
+            ),
+            fakedb.BuildRequest(
+                id=53,
+                buildsetid=self.BSID,
+                builderid=self.BLDRID2,
+                priority=9,
+                submitted_at=100,
+                complete=1,
+            ),
+            fakedb.BuildRequest(
+                id=54, buildsetid=self.BSID, builderid=self.BLDRID3, priority=0, submitted_at=400
+            ),
+        ])
+        summaries = yield self.db.buildrequests.get_unclaimed_buildrequests_summary(builderids)
+        self.assertEqual(sorted(summaries, key=lambda s: s.builderid), expected)
+
+    def test_get_unclaimed_buildrequests_summary(self):
+        return self.do_test_get_unclaimed_buildrequests_summary(
+            None,
+            [
+                buildrequests.UnclaimedBuildRequestsSummaryModel(
+                    builderid=self.BLDRID1,
+                    highest_priority=5,
+                    oldest_submitted_at=epoch2datetime(200),
+                ),
+                buildrequests.UnclaimedBuildRequestsSummaryModel(
+                    builderid=self.BLDRID3,
+                    highest_priority=0,
+                    oldest_submitted_at=epoch2datetime(400),
+                ),
+            ],
+        )
+
+    def test_get_unclaimed_buildrequests_summary_builderids(self):
+        return self.do_test_get_unclaimed_buildrequests_summary(
+            [self.BLDRID2, self.BLDRID3],
+            [
+                buildrequests.UnclaimedBuildRequestsSummaryModel(
+                    builderid=self.BLDRID3,
+                    highest_priority=0,
+                    oldest_submitted_at=epoch2datetime(400),
+                ),
+            ],
+        )
+
     @defer.inlineCallbacks
     def do_test_getBuildRequests_buildername_arg(self, **kwargs):
         expected = kwargs.pop('expected')
@@ -564,6 +564,20 @@ class Tests(TestReactorMixin, unittest.TestCase):
 
         yield self.db.pool.do(thd_change_users)
 
+    @defer.inlineCallbacks
+    def test_get_sourcestampids_with_changes(self):
+        yield self.db.insert_test_data([
+            fakedb.SourceStamp(id=234, branch="aa"),
+            fakedb.SourceStamp(id=235, branch="bb"),
+            fakedb.SourceStamp(id=236, branch="cc"),
+            fakedb.Change(changeid=12, sourcestampid=234),
+            fakedb.Change(changeid=13, sourcestampid=234),
+            fakedb.Change(changeid=14, sourcestampid=236),
+        ])
+
+        ssids = yield self.db.changes.get_sourcestampids_with_changes([234, 235, 236])
+        self.assertEqual(ssids, {234, 236})
+
     @defer.inlineCallbacks
     def test_pruneChanges(self):
         yield self.db.insert_test_data([
@@ -22,6 +22,8 @@ from twisted.trial import unittest
 from buildbot.config.master import MasterConfig
 from buildbot.db import connector
 from buildbot.db import exceptions
+from buildbot.db import pool
+from buildbot.process import metrics
 from buildbot.test.fake import fakemaster
 from buildbot.test.reactor import TestReactorMixin
 
@@ -85,6 +87,23 @@ class TestDBConnector(TestReactorMixin, unittest.TestCase):
         with self.assertRaises(exceptions.DatabaseNotReadyError):
             yield self.startService(check_version=True)
 
+    @defer.inlineCallbacks
+    def test_setup_async_driver_without_asyncio_reactor(self):
+        self.master.config.db.async_driver = 'aiosqlite'
+        yield self.startService()
+
+        # the test reactor is not the asyncio reactor
+        self.assertIsInstance(self.db.pool, pool.DBThreadPool)
+        self.assertNotIsInstance(self.db.pool, pool.DBAsyncPool)
+
+    @defer.inlineCallbacks
+    def test_setup_registers_pool_stats(self):
+        self.master.metrics = metrics.MetricLogObserver()
+        yield self.startService()
+
+        handler = self.master.metrics.getHandler(pool.DBPoolStats)
+        self.assertIs(handler.stats, self.db.pool.stats)
+
     def test_setup_check_version_good(self):
         self.db.model.is_current = lambda: defer.succeed(True)
         return self.startService(check_version=True)
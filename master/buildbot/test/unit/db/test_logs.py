@@ -313,6 +313,97 @@ class Tests(TestReactorMixin, unittest.TestCase):
             ),
         )
 
+    @async_to_deferred
+    async def test_appendLog_getLogLines_chunk_cache(self):
+        await self.db.insert_test_data(self.backgroundData + self.testLogLines)
+        self.assertEqual((await self.db.logs.appendLog(201, 'abc\ndef\n')), (7, 8))
+        self.assertEqual((await self.db.logs.appendLog(201, 'ghi\r\n')), (9, 9))
+
+        with mock.patch.object(self.db.pool, 'do', wraps=self.db.pool.do) as pool_do:
+            self.assertEqual((await self.db.logs.getLogLines(201, 8, 9)), "def\nghi\n")
+            self.assertEqual((await self.db.logs.getLogLines(201, 7, 7)), "abc\n")
+            # past the end of the log
+            self.assertEqual((await self.db.logs.getLogLines(201, 9, 100)), "ghi\n")
+            self.assertEqual((await self.db.logs.getLogLines(201, 10, 100)), "")
+        self.assertEqual(pool_do.call_count, 0)
+
+        # older lines are read from the database
+        with mock.patch.object(self.db.pool, 'do', wraps=self.db.pool.do) as pool_do:
+            self.assertEqual(
+                (await self.db.logs.getLogLines(201, 5, 8)),
+                "another line\nyet another line\nabc\ndef\n",
+            )
+        self.assertTrue(pool_do.called)
+
+    @async_to_deferred
+    async def test_appendLog_chunk_cache_disabled(self):
+        self.master.config.logChunkCacheSize = 0
+        await self.db.insert_test_data(self.backgroundData + self.testLogLines)
+        self.assertEqual((await self.db.logs.appendLog(201, 'abc\n')), (7, 7))
+
+        with mock.patch.object(self.db.pool, 'do', wraps=self.db.pool.do) as pool_do:
+            self.assertEqual((await self.db.logs.getLogLines(201, 7, 7)), "abc\n")
+        self.assertTrue(pool_do.called)
+
+    @async_to_deferred
+    async def test_compressLog_invalidates_chunk_cache(self):
+        await self.db.insert_test_data(self.backgroundData + self.testLogLines)
+        await self.db.logs.appendLog(201, 'abc\n')
+        await self.db.logs.appendLog(201, 'def\n')
+        await self.db.logs.compressLog(201)
+
+        with mock.patch.object(self.db.pool, 'do', wraps=self.db.pool.do) as pool_do:
+            self.assertEqual((await self.db.logs.getLogLines(201, 7, 8)), "abc\ndef\n")
+        self.assertTrue(pool_do.called)
+
+    @async_to_deferred
+    async def test_deleteOldLogChunks_invalidates_chunk_cache(self):
+        await self.db.insert_test_data(self.backgroundData)
+        logid = await self.db.logs.addLog(stepid=101, name='another', slug='another', type='s')
+        await self.db.logs.appendLog(logid, 'xyz\n')
+        self.assertEqual((await self.db.logs.getLogLines(logid, 0, 0)), "xyz\n")
+
+        await self.db.logs.deleteOldLogChunks(self.TIMESTAMP_STEP102)
+        self.assertEqual((await self.db.logs.getLogLines(logid, 0, 0)), "")
+
+    @async_to_deferred
+    async def test_deleteOldLogChunks_deletes_unused_dictionaries(self):
+        def dict_chunk(logid, dictionary_id):
+            return fakedb.LogChunk(
+                logid=logid, compressed=6, content=dictionary_id.to_bytes(4, 'big') + b'data'
+            )
+
+        await self.db.insert_test_data([
+            *self.backgroundData,
+            fakedb.Log(id=201, stepid=101, name='a', slug='a', complete=1, num_lines=1),
+            fakedb.Log(id=202, stepid=102, name='b', slug='b', complete=1, num_lines=1),
+            dict_chunk(201, 1),
+            dict_chunk(202, 2),
+        ])
+
+        def thd_insert_dictionaries(conn):
+            tbl = self.db.model.logchunk_dictionaries
+            conn.execute(
+                tbl.insert(),
+                [
+                    {'id': id, 'builderid': builderid, 'created_at': 0, 'content': b'dict'}
+                    for id, builderid in [(1, 88), (2, 88), (3, 88), (4, 88), (5, 88), (6, None)]
+                ],
+            )
+            conn.commit()
+
+        await self.db.pool.do(thd_insert_dictionaries)
+        # a live log of this master is compressed with the dictionary 4
+        self.db.logs._log_dictionary_ids[203] = 4
+        self.db.logs._dictionaries[1] = mock.Mock()
+
+        await self.db.logs.deleteOldLogChunks(self.TIMESTAMP_STEP102)
+
+        # the dictionary 1 was only used by the chunks of the old log, and 3 is
+        # not used, nor the most recent dictionary of the builder
+        self.assertEqual([d.id for d in (await self.db.logs.get_log_dictionaries())], [2, 4, 5, 6])
+        self.assertNotIn(1, self.db.logs._dictionaries)
+
     @defer.inlineCallbacks
     def test_compressLog(self):
         yield self.db.insert_test_data(self.backgroundData + self.testLogLines)
@@ -331,6 +422,130 @@ class Tests(TestReactorMixin, unittest.TestCase):
         self.assertEqual(len(lines), 80000)
         self.assertEqual(lines, ('abc\n' * 20000))
 
+    @defer.inlineCallbacks
+    def test_addLogLines_many_chunks_single_db_call(self):
+        yield self.db.insert_test_data(self.backgroundData + self.testLogLines)
+        line = 'x' * 70000 + '\n'
+        with mock.patch.object(self.db.pool, 'do', wraps=self.db.pool.do) as pool_do:
+            self.assertEqual((yield self.db.logs.appendLog(201, line * 3)), (7, 9))
+        self.assertEqual(pool_do.call_count, 1)
+
+        def thd(conn):
+            tbl = self.db.model.logchunks
+            q = sa.select(tbl.c.first_line, tbl.c.last_line)
+            q = q.where(tbl.c.logid == 201).where(tbl.c.first_line > 6)
+            return [tuple(row) for row in conn.execute(q.order_by(tbl.c.first_line))]
+
+        chunks = yield self.db.pool.do(thd)
+        self.assertEqual(chunks, [(7, 7), (8, 8), (9, 9)])
+        log = yield self.db.logs.getLog(201)
+        self.assertEqual(log.num_lines, 10)
+
+    @defer.inlineCallbacks
+    def test_appendLog_missing(self):
+        yield self.db.insert_test_data(self.backgroundData + self.testLogLines)
+        self.assertEqual((yield self.db.logs.appendLog(999, 'abc\n')), None)
+
+    def get_stored_num_lines(self, logid):
+        def thd(conn):
+            tbl = self.db.model.logs
+            return conn.execute(sa.select(tbl.c.num_lines).where(tbl.c.id == logid)).scalar()
+
+        return self.db.pool.do(thd)
+
+    @async_to_deferred
+    async def test_appendLog_write_buffer_time(self):
+        self.master.config.logWriteBufferSize = 1000
+        self.master.config.logWriteBufferTime = 2
+        await self.db.insert_test_data(self.backgroundData + self.testLogLines)
+        self.assertEqual((await self.db.logs.appendLog(201, 'abc\ndef\n')), (7, 8))
+        self.assertEqual((await self.db.logs.appendLog(201, 'ghi\n')), (9, 9))
+
+        # the buffered lines are readable, but not written yet
+        self.assertEqual((await self.get_stored_num_lines(201)), 7)
+        self.assertEqual((await self.db.logs.getLog(201)).num_lines, 10)
+        self.assertEqual([log.num_lines for log in await self.db.logs.getLogs(101)], [10])
+        self.assertEqual(
+            (await self.db.logs.getLogLines(201, 6, 100)), "yet another line\nabc\ndef\nghi\n"
+        )
+        self.assertEqual((await self.db.logs.getLogLines(201, 8, 8)), "def\n")
+
+        self.reactor.advance(2)
+        self.assertEqual((await self.get_stored_num_lines(201)), 10)
+        self.assertEqual(self.db.logs._write_buffers, {})
+        self.assertEqual(
+            (await self.db.logs.getLogLines(201, 6, 9)), "yet another line\nabc\ndef\nghi\n"
+        )
+
+    @async_to_deferred
+    async def test_appendLog_write_buffer_size(self):
+        self.master.config.logWriteBufferSize = 10
+        await self.db.insert_test_data(self.backgroundData + self.testLogLines)
+        with mock.patch.object(
+            self.db.logs, '_write_log_lines', wraps=self.db.logs._write_log_lines
+        ) as write_log_lines:
+            self.assertEqual((await self.db.logs.appendLog(201, 'abc\n')), (7, 7))
+            self.assertEqual((await self.get_stored_num_lines(201)), 7)
+            # the buffer holds 10 characters
+            self.assertEqual((await self.db.logs.appendLog(201, 'defghi\n')), (8, 8))
+            self.assertEqual((await self.get_stored_num_lines(201)), 9)
+        write_log_lines.assert_called_once_with(201, 'abc\ndefghi\n')
+
+        # the timer does nothing once the buffer is written
+        self.reactor.advance(2)
+        self.assertEqual((await self.get_stored_num_lines(201)), 9)
+
+    @async_to_deferred
+    async def test_finishLog_writes_buffer(self):
+        self.master.config.logWriteBufferSize = 1000
+        await self.db.insert_test_data(self.backgroundData + self.testLogLines)
+        await self.db.logs.appendLog(201, 'abc\n')
+        await self.db.logs.finishLog(201)
+
+        self.assertEqual((await self.get_stored_num_lines(201)), 8)
+        self.assertEqual(self.db.logs._write_buffers, {})
+        log = await self.db.logs.getLog(201)
+        self.assertTrue(log.complete)
+        self.assertEqual((await self.db.logs.getLogLines(201, 7, 7)), "abc\n")
+
+    @async_to_deferred
+    async def test_finishLog_write_buffer_failure(self):
+        self.master.config.logWriteBufferSize = 1000
+        await self.db.insert_test_data(self.backgroundData + self.testLogLines)
+        write_log_lines = self.db.logs._write_log_lines
+        calls = []
+
+        async def fail_once(logid, content):
+            calls.append(content)
+            if len(calls) == 1:
+                raise RuntimeError('database is down')
+            return await write_log_lines(logid, content)
+
+        self.patch(self.db.logs, '_write_log_lines', fail_once)
+        self.assertEqual((await self.db.logs.appendLog(201, 'abc\n')), (7, 7))
+        with self.assertRaises(RuntimeError):
+            await self.db.logs.finishLog(201)
+
+        # the lines are kept, and written again by the next flush
+        self.assertEqual((await self.get_stored_num_lines(201)), 7)
+        self.assertEqual((await self.db.logs.getLogLines(201, 7, 7)), "abc\n")
+        self.assertEqual((await self.db.logs.appendLog(201, 'def\n')), (8, 8))
+        await self.db.logs.finishLog(201)
+
+        self.assertEqual(calls, ['abc\n', 'abc\n', 'def\n'])
+        self.assertEqual((await self.get_stored_num_lines(201)), 9)
+        self.assertEqual(self.db.logs._write_buffers, {})
+        self.assertEqual(
+            (await self.db.logs.getLogLines(201, 6, 8)), "yet another line\nabc\ndef\n"
+        )
+
+    @defer.inlineCallbacks
+    def test_appendLog_write_buffer_missing(self):
+        self.master.config.logWriteBufferSize = 1000
+        yield self.db.insert_test_data(self.backgroundData + self.testLogLines)
+        self.assertEqual((yield self.db.logs.appendLog(999, 'abc\n')), None)
+        self.assertEqual(self.db.logs._write_buffers, {})
+
     @defer.inlineCallbacks
     def test_addLogLines_big_chunk_big_lines(self):
         yield self.db.insert_test_data(self.backgroundData + self.testLogLines)
@@ -585,6 +800,99 @@ class Tests(TestReactorMixin, unittest.TestCase):
     def test_addLogLines_huge_log_lots_snowmans(self):
         return self.do_addLogLines_huge_log(NUM_CHUNKS=3000, chunk='\N{SNOWMAN}\n' * 50)
 
+    @async_to_deferred
+    async def test_compressLog_compression_method(self):
+        await self.db.insert_test_data(self.backgroundData + self.testLogLines)
+        self.db.master.config.logCompressionMethod = "raw"
+        await self.db.logs.compressLog(201, force=True, compression_method="gz")
+
+        def thd(conn):
+            tbl = self.db.model.logchunks
+            q = sa.select(tbl.c.first_line, tbl.c.last_line, tbl.c.compressed)
+            q = q.where(tbl.c.logid == 201)
+            return [tuple(row) for row in conn.execute(q)]
+
+        self.assertEqual((await self.db.pool.do(thd)), [(0, 6, 1)])
+        await self.checkTestLogLines()
+
+    @async_to_deferred
+    async def test_get_logs_to_recompress(self):
+        await self.db.insert_test_data([
+            *self.backgroundData,
+            # finished log with small raw chunks
+            fakedb.Log(id=201, stepid=101, name='a', slug='a', complete=1, num_lines=7, type='s'),
+            *self.testLogLines[1:],
+            # running log
+            fakedb.Log(id=202, stepid=101, name='b', slug='b', complete=0, num_lines=2, type='s'),
+            fakedb.LogChunk(logid=202, first_line=0, last_line=0, compressed=0, content='x'),
+            fakedb.LogChunk(logid=202, first_line=1, last_line=1, compressed=0, content='y'),
+            # finished log with a single chunk
+            fakedb.Log(id=203, stepid=101, name='c', slug='c', complete=1, num_lines=1, type='s'),
+            fakedb.LogChunk(logid=203, first_line=0, last_line=0, compressed=0, content='x'),
+            # finished log with big gz chunks
+            fakedb.Log(id=204, stepid=101, name='d', slug='d', complete=1, num_lines=2, type='s'),
+            fakedb.LogChunk(
+                logid=204, first_line=0, last_line=0, compressed=1, content=b'x' * 60000
+            ),
+            fakedb.LogChunk(
+                logid=204, first_line=1, last_line=1, compressed=1, content=b'y' * 60000
+            ),
+            # finished log with small raw chunks of MAX_CHUNK_LINES lines
+            fakedb.Log(
+                id=205, stepid=101, name='e', slug='e', complete=1, num_lines=2000, type='s'
+            ),
+            fakedb.LogChunk(
+                logid=205, first_line=0, last_line=999, compressed=0, content='x\n' * 999 + 'x'
+            ),
+            fakedb.LogChunk(
+                logid=205,
+                first_line=1000,
+                last_line=1999,
+                compressed=0,
+                content='y\n' * 999 + 'y',
+            ),
+        ])
+
+        self.assertEqual(
+            (await self.db.logs.get_logs_to_recompress('gz')),
+            [
+                logs.LogChunksSummaryModel(
+                    logid=201, num_chunks=4, size=263, other_compression=True
+                ),
+                logs.LogChunksSummaryModel(
+                    logid=205, num_chunks=2, size=3998, other_compression=True
+                ),
+            ],
+        )
+        self.assertEqual(
+            [m.logid for m in (await self.db.logs.get_logs_to_recompress('raw'))], [201, 204]
+        )
+        self.assertEqual(
+            [m.logid for m in (await self.db.logs.get_logs_to_recompress('raw', limit=1))], [201]
+        )
+        self.assertEqual(
+            [m.logid for m in (await self.db.logs.get_logs_to_recompress('raw', after_logid=201))],
+            [204],
+        )
+
+    @async_to_deferred
+    async def test_get_logs_to_recompress_grouped(self):
+        await self.db.insert_test_data([
+            *self.backgroundData,
+            fakedb.Log(id=201, stepid=101, name='a', slug='a', complete=0, num_lines=0, type='s'),
+        ])
+        self.db.master.config.logCompressionMethod = "raw"
+        for _ in range(300):
+            await self.db.logs.appendLog(201, 'x\n' * 10)
+        await self.db.logs.finishLog(201)
+        self.assertEqual(
+            [m.logid for m in (await self.db.logs.get_logs_to_recompress('raw'))], [201]
+        )
+
+        await self.db.logs.compressLog(201)
+        # once grouped, the log is not a candidate anymore
+        self.assertEqual((await self.db.logs.get_logs_to_recompress('raw')), [])
+
     @defer.inlineCallbacks
     def test_compressLog_non_existing_log(self):
         yield self.db.logs.compressLog(201)
@@ -741,3 +1049,191 @@ class Tests(TestReactorMixin, unittest.TestCase):
         with self.assertRaises(logs.LogCompressionFormatUnavailableError):
             await self.db.logs.getLogLines(logid=LOG_ID, first_line=1, last_line=1)
         self.flushLoggedErrors(logs.LogCompressionFormatUnavailableError)
+
+
+class TestLogDictionaries(TestReactorMixin, unittest.TestCase):
+    @defer.inlineCallbacks
+    def setUp(self):
+        if not compression.ZStdDictCompressor.available:
+            raise unittest.SkipTest("zstandard not installed, skip the test")
+
+        self.setup_test_reactor()
+        self.master = yield fakemaster.make_master(self, wantDb=True)
+        self.db = self.master.db
+        self.master.config.logCompressionMethod = 'zstd-dict'
+
+        rows = [
+            *Tests.backgroundData,
+            fakedb.Log(id=201, stepid=101, name='a', slug='a', complete=1, num_lines=0, type='s'),
+        ]
+        for idx in range(500):
+            rows.append(
+                fakedb.LogChunk(
+                    logid=201,
+                    first_line=idx,
+                    last_line=idx,
+                    compressed=0,
+                    content=self.make_line(idx),
+                )
+            )
+        yield self.db.insert_test_data(rows)
+
+    def make_line(self, idx):
+        return f'compiling src/module{idx}.c with gcc -O2 -Wall -Werror ' + 'flags ' * (idx % 7)
+
+    def get_chunks(self, logid):
+        def thd(conn):
+            tbl = self.db.model.logchunks
+            q = sa.select(tbl.c.first_line, tbl.c.compressed, tbl.c.content)
+            q = q.where(tbl.c.logid == logid).order_by(tbl.c.first_line)
+            return [tuple(row) for row in conn.execute(q)]
+
+        return self.db.pool.do(thd)
+
+    @async_to_deferred
+    async def append_log(self):
+        logid = await self.db.logs.addLog(stepid=102, name='b', slug='b', type='s')
+        content = ''.join(self.make_line(idx) + '\n' for idx in range(10))
+        await self.db.logs.appendLog(logid, content)
+        return logid, content
+
+    @async_to_deferred
+    async def test_train_log_dictionary(self):
+        dictionary_id = await self.db.logs.train_log_dictionary(builderid=88, dict_size=4096)
+        self.assertEqual(
+            (await self.db.logs.get_log_dictionaries()),
+            [logs.LogDictionaryModel(id=dictionary_id, builderid=88, created_at=0)],
+        )
+
+    @async_to_deferred
+    async def test_train_log_dictionary_not_enough_chunks(self):
+        self.assertIsNone(await self.db.logs.train_log_dictionary(builderid=89))
+        self.assertEqual((await self.db.logs.get_log_dictionaries()), [])
+
+    @async_to_deferred
+    async def test_appendLog_without_dictionary(self):
+        logid, content = await self.append_log()
+
+        self.assertEqual([c[1] for c in (await self.get_chunks(logid))], [4])
+        self.assertEqual((await self.db.logs.getLogLines(logid, 0, 9)), content)
+
+    @async_to_deferred
+    async def test_appendLog_with_dictionary(self):
+        global_id = await self.db.logs.train_log_dictionary(dict_size=4096)
+        builder_id = await self.db.logs.train_log_dictionary(builderid=88, dict_size=4096)
+        self.assertNotEqual(global_id, builder_id)
+
+        logid, content = await self.append_log()
+
+        # the dictionary of the builder is preferred to the global one
+        [(_, compressed, chunk_content)] = await self.get_chunks(logid)
+        self.assertEqual(compressed, 6)
+        self.assertEqual(chunk_content[:4], builder_id.to_bytes(4, 'big'))
+
+        # the dictionaries are loaded from the database to read the chunks
+        self.db.logs._dictionaries.clear()
+        self.assertEqual((await self.db.logs.getLogLines(logid, 0, 9)), content)
+
+    @async_to_deferred
+    async def test_appendLog_global_dictionary(self):
+        global_id = await self.db.logs.train_log_dictionary(dict_size=4096)
+
+        logid, _ = await self.append_log()
+
+        [(_, compressed, chunk_content)] = await self.get_chunks(logid)
+        self.assertEqual(compressed, 6)
+        self.assertEqual(chunk_content[:4], global_id.to_bytes(4, 'big'))
+
+    @async_to_deferred
+    async def test_compressLog_with_dictionary(self):
+        dictionary_id = await self.db.logs.train_log_dictionary(builderid=88, dict_size=4096)
+
+        await self.db.logs.compressLog(201, force=True)
+
+        chunks = await self.get_chunks(201)
+        self.assertEqual({c[1] for c in chunks}, {6})
+        self.assertEqual({c[2][:4] for c in chunks}, {dictionary_id.to_bytes(4, 'big')})
+        self.db.logs._dictionaries.clear()
+        self.assertEqual(
+            (await self.db.logs.getLogLines(201, 0, 499)),
+            ''.join(self.make_line(idx) + '\n' for idx in range(500)),
+        )
+
+    @async_to_deferred
+    async def test_get_logs_to_recompress(self):
+        await self.db.insert_test_data([
+            # finished log with big zstd chunks
+            fakedb.Log(id=202, stepid=101, name='b', slug='b', complete=1, num_lines=2, type='s'),
+            fakedb.LogChunk(
+                logid=202, first_line=0, last_line=0, compressed=4, content=b'x' * 60000
+            ),
+            fakedb.LogChunk(
+                logid=202, first_line=1, last_line=1, compressed=4, content=b'y' * 60000
+            ),
+        ])
+
+        # the zstd chunks are only recompressed once there is a dictionary
+        candidates = await self.db.logs.get_logs_to_recompress('zstd-dict')
+        self.assertEqual([m.logid for m in candidates], [201])
+
+        def thd(conn):
+            tbl = self.db.model.logchunk_dictionaries
+            conn.execute(tbl.insert(), {'builderid': 88, 'created_at': 0, 'content': b'dict'})
+            conn.commit()
+
+        await self.db.pool.do(thd)
+        candidates = await self.db.logs.get_logs_to_recompress('zstd-dict')
+        self.assertEqual(
+            [(m.logid, m.other_compression) for m in candidates], [(201, True), (202, True)]
+        )
+
+
+class TestLogChunkCache(unittest.TestCase):
+    def test_get_chunks(self):
+        cache = logs.LogChunkCache(max_bytes=100)
+        cache.put(1, 0, 1, ('a\n', 'b\n'), 10)
+        cache.put(1, 2, 2, ('c\n',), 10)
+        cache.put(1, 5, 5, ('f\n',), 10)
+
+        self.assertEqual(cache.get_chunks(1, 1, None), [(0, 1, ('a\n', 'b\n')), (2, 2, ('c\n',))])
+        self.assertEqual(cache.get_chunks(1, 0, 1), [(0, 1, ('a\n', 'b\n'))])
+        self.assertEqual(cache.get_chunks(1, 3, None), [])
+        self.assertEqual(cache.get_chunks(2, 0, None), [])
+        self.assertEqual(cache.next_first_line(1, 3), 5)
+        self.assertEqual(cache.next_first_line(1, 5), None)
+        self.assertEqual(cache.get_num_lines(1), 6)
+        self.assertEqual(cache.get_num_lines(2), None)
+
+    def test_evicts_least_recently_used(self):
+        cache = logs.LogChunkCache(max_bytes=25)
+        cache.put(1, 0, 0, ('a\n',), 10)
+        cache.put(2, 0, 0, ('b\n',), 10)
+        cache.get_chunks(1, 0, None)
+        cache.put(3, 0, 0, ('c\n',), 10)
+
+        self.assertEqual(cache.bytes, 20)
+        self.assertEqual(cache.get_chunks(2, 0, None), [])
+        self.assertEqual(cache.get_num_lines(2), None)
+        self.assertEqual(cache.get_chunks(1, 0, None), [(0, 0, ('a\n',))])
+
+    def test_too_big_chunk(self):
+        cache = logs.LogChunkCache(max_bytes=25)
+        cache.put(1, 0, 0, ('a\n',), 10)
+        cache.put(1, 1, 1, ('b\n',), 30)
+
+        self.assertEqual(cache.bytes, 10)
+        self.assertEqual(cache.get_chunks(1, 1, None), [])
+        self.assertEqual(cache.get_num_lines(1), 2)
+
+    def test_invalidate(self):
+        cache = logs.LogChunkCache(max_bytes=100)
+        cache.put(1, 0, 0, ('a\n',), 10)
+        cache.put(2, 0, 0, ('b\n',), 10)
+
+        cache.invalidate(1)
+        self.assertEqual(cache.get_chunks(1, 0, None), [])
+        self.assertEqual(cache.bytes, 10)
+
+        cache.invalidate()
+        self.assertEqual(cache.get_chunks(2, 0, None), [])
+        self.assertEqual(cache.bytes, 0)
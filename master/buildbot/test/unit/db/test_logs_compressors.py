@@ -80,3 +80,47 @@ class TestBrotliCompressor(TestRawCompressor):
 
 class TestZStdCompressor(TestRawCompressor):
     CompressorCls = compression.ZStdCompressor
+
+
+class TestZStdDictCompressor(unittest.TestCase):
+    CompressorCls = compression.ZStdDictCompressor
+
+    def setUp(self) -> None:
+        if not self.CompressorCls.available:
+            raise unittest.SkipTest(f"Compressor '{self.CompressorCls.name}' is unavailable")
+
+        samples = [
+            f'compiling src/module{idx}.c with gcc -O2 -Wall -Werror\n'.encode() * (idx % 5 + 1)
+            for idx in range(1000)
+        ]
+        dictionary = self.CompressorCls.train_dictionary(samples, 4096)
+        assert dictionary is not None
+        self.dictionary = self.CompressorCls.load_dictionary(dictionary)
+
+    def test_dumps_read(self) -> None:
+        data = b'compiling src/module42.c with gcc -O2 -Wall -Werror\n'
+        compressed_data = self.CompressorCls.dumps(data, self.dictionary)
+        self.assertLess(len(compressed_data), len(compression.ZStdCompressor.dumps(data)))
+        self.assertEqual(data, self.CompressorCls.read(compressed_data, self.dictionary))
+
+    def test_compressobj_read(self) -> None:
+        input_buffer = [f'xy{idx}'.encode() * 10000 for idx in range(10)]
+
+        compress_obj = self.CompressorCls.CompressObj(self.dictionary)
+
+        def _test() -> None:
+            result_buffer = [compress_obj.compress(e) for e in input_buffer]
+            result_buffer.append(compress_obj.flush())
+
+            self.assertEqual(
+                b''.join(input_buffer),
+                self.CompressorCls.read(b''.join(result_buffer), self.dictionary),
+            )
+
+        _test()
+
+        # make sure re-using the same compress obj works
+        _test()
+
+    def test_train_not_enough_samples(self) -> None:
+        self.assertIsNone(self.CompressorCls.train_dictionary([b'abc'], 4096))
@@ -24,6 +24,7 @@ from twisted.trial import unittest
 
 from buildbot.db import enginestrategy
 from buildbot.db import pool
+from buildbot.process import metrics
 from buildbot.test.util import db
 from buildbot.test.util.db import thd_clean_database
 from buildbot.util import sautils
@@ -107,6 +108,37 @@ class Basic(unittest.TestCase):
             self.pool.do_with_engine(fail), (sa.exc.ProgrammingError, sa.exc.OperationalError)
         )
 
+    @defer.inlineCallbacks
+    def test_stats(self):
+        def add(conn, addend1, addend2):
+            return conn.execute(sa.text(f"SELECT {addend1} + {addend2}")).scalar()
+
+        def raise_something(conn):
+            raise RuntimeError("oh noes")
+
+        yield self.pool.do(add, 10, 11)
+        yield self.pool.do_with_transaction(add, 1, 2)
+        yield self.expect_failure(
+            self.pool.do(raise_something), (RuntimeError,), expect_logged_error=True
+        )
+
+        stats = self.pool.stats
+        self.assertEqual((stats.size, stats.busy, stats.queued), (1, 0, 0))
+        self.assertEqual(stats.max_busy, 1)
+
+        query = stats.queries['Basic.test_stats.add']
+        self.assertEqual(query.count, 2)
+        self.assertEqual(sum(query.wait_buckets), 2)
+        self.assertEqual(sum(query.exec_buckets), 2)
+        self.assertGreater(query.exec_sum, 0)
+        self.assertEqual(stats.queries['Basic.test_stats.raise_something'].count, 1)
+
+        self.assertEqual(
+            stats.asDict()['queries']['Basic.test_stats.add']['count'],
+            2,
+        )
+        self.assertIn('DBQuery Basic.test_stats.add: count=2', stats.report())
+
     @defer.inlineCallbacks
     def test_persistence_across_invocations(self):
         # NOTE: this assumes that both methods are called with the same
@@ -150,6 +182,45 @@ class Basic(unittest.TestCase):
         yield self.pool.do_with_transaction(access)
 
 
+class PoolStats(unittest.TestCase):
+    def test_buckets(self):
+        stats = pool.DBPoolStats(2)
+        stats.on_queued()
+        stats.on_queued()
+        stats.on_started()
+        self.assertEqual((stats.busy, stats.queued), (1, 1))
+        stats.on_finished('q', 0.0001, 0.003)
+        stats.on_started()
+        stats.on_finished('q', 0.001, 100)
+
+        query = stats.queries['q']
+        self.assertEqual(query.count, 2)
+        self.assertAlmostEqual(query.wait_sum, 0.0011)
+        self.assertEqual(query.wait_buckets[:2], [2, 0])
+        self.assertEqual(query.exec_buckets[2], 1)
+        self.assertEqual(query.exec_buckets[-1], 1)
+        self.assertEqual((stats.busy, stats.queued, stats.max_busy, stats.max_queued), (0, 0, 1, 2))
+
+    def test_get_name(self):
+        def thd(conn):
+            pass
+
+        self.assertEqual(pool.DBPoolStats.get_name(thd), 'PoolStats.test_get_name.thd')
+
+    def test_handler(self):
+        observer = metrics.MetricLogObserver()
+        stats = pool.DBPoolStats(1)
+        stats.on_queued()
+        stats.on_started()
+        stats.on_finished('q', 0.5, 1)
+        observer.registerHandler(pool.DBPoolStats, pool.DBPoolStatsHandler(observer, stats))
+
+        self.assertEqual(observer.asDict()['db_pool']['queries']['q']['count'], 1)
+        self.assertIn(
+            'DBQuery q: count=1 wait=0.5 exec=1', observer.getHandler(pool.DBPoolStats).report()
+        )
+
+
 class Stress(unittest.TestCase):
     def setUp(self):
         setup_engine = sa.create_engine('sqlite:///test.sqlite', future=True)
@@ -200,3 +271,49 @@ class BasicWithDebug(Basic):
     def tearDown(self):
         pool.debug = False
         return super().tearDown()
+
+
+class AsyncBasic(Basic):
+    # same thing, but with the asyncio driver of sqlite
+
+    @defer.inlineCallbacks
+    def setUp(self):
+        if not pool.is_asyncio_reactor(reactor):
+            raise unittest.SkipTest("the asyncio driver requires the asyncio reactor")
+        try:
+            import aiosqlite  # noqa: F401
+        except ImportError as e:
+            raise unittest.SkipTest("aiosqlite not installed, skip the test") from e
+
+        self.engine = enginestrategy.create_engine('sqlite:///test.sqlite', basedir=os.getcwd())
+        self.engine.should_retry = lambda _: False
+        self.addCleanup(os.unlink, 'test.sqlite')
+        async_engine = enginestrategy.create_async_engine(self.engine, 'aiosqlite')
+        self.pool = pool.DBAsyncPool(self.engine, async_engine, reactor=reactor)
+        self.pool.start()
+        self.addCleanup(self.pool.stop)
+        yield self.pool.do(thd_clean_database)
+
+    @defer.inlineCallbacks
+    def test_do_concurrency(self):
+        running = []
+        max_running = []
+
+        def query(conn):
+            running.append(None)
+            max_running.append(len(running))
+            conn.execute(sa.text("SELECT 1"))
+            running.pop()
+
+        yield defer.gatherResults([self.pool.do(query) for _ in range(5)], consumeErrors=True)
+
+        # the sqlite engine uses a single connection at a time
+        self.assertEqual(self.pool.pool_size, 1)
+        self.assertEqual(max(max_running), 1)
+
+
+class CreateAsyncEngine(unittest.TestCase):
+    def test_sqlite_memory(self):
+        engine = enginestrategy.create_engine('sqlite://', basedir=os.getcwd())
+        with self.assertRaises(ValueError):
+            enginestrategy.create_async_engine(engine, 'aiosqlite')
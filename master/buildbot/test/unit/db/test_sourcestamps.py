@@ -396,6 +396,39 @@ class Tests(TestReactorMixin, unittest.TestCase):
             sorted(db_sourcestamps, key=sourceStampKey), sorted(expected, key=sourceStampKey)
         )
 
+    @defer.inlineCallbacks
+    def test_get_sourcestamps_for_buildsets(self):
+        yield self.db.insert_test_data([
+            fakedb.SourceStamp(id=234, codebase="A", created_at=CREATED_AT, revision="aaa"),
+            fakedb.SourceStamp(id=235, codebase="B", created_at=CREATED_AT, revision="bbb"),
+            fakedb.Buildset(id=30, reason="foo", submitted_at=1300305712, results=-1),
+            fakedb.BuildsetSourceStamp(sourcestampid=234, buildsetid=30),
+            fakedb.BuildsetSourceStamp(sourcestampid=235, buildsetid=30),
+            fakedb.Buildset(id=31, reason="foo", submitted_at=1300305712, results=-1),
+            fakedb.BuildsetSourceStamp(sourcestampid=235, buildsetid=31),
+        ])
+
+        db_sourcestamps = yield self.db.sourcestamps.get_sourcestamps_for_buildsets([30, 31, 32])
+
+        self.assertEqual(sorted(db_sourcestamps), [30, 31, 32])
+        self.assertEqual(sorted(ss.ssid for ss in db_sourcestamps[30]), [234, 235])
+        self.assertEqual(
+            db_sourcestamps[31],
+            [
+                sourcestamps.SourceStampModel(
+                    branch="master",
+                    codebase="B",
+                    created_at=epoch2datetime(CREATED_AT),
+                    patch=None,
+                    project="proj",
+                    repository="repo",
+                    revision="bbb",
+                    ssid=235,
+                )
+            ],
+        )
+        self.assertEqual(db_sourcestamps[32], [])
+
     @defer.inlineCallbacks
     def do_test_getSourceStampsForBuild(self, rows, buildid, expected):
         yield self.db.insert_test_data(rows)
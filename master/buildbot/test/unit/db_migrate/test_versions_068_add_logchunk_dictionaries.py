@@ -0,0 +1,78 @@
+# This file is part of Buildbot.  Buildbot is free software: you can
+# redistribute it and/or modify it under the terms of the GNU General Public
+# License as published by the Free Software Foundation, version 2.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+# FOR A PARTICULAR PURPOSE.  See the GNU General Public License for more
+# details.
+#
+# You should have received a copy of the GNU General Public License along with
+# this program; if not, write to the Free Software Foundation, Inc., 51
+# Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+#
+# Copyright Buildbot Team Members
+
+from __future__ import annotations
+
+import sqlalchemy as sa
+from twisted.internet import defer
+from twisted.trial import unittest
+
+from buildbot.test.util import migration
+from buildbot.util import sautils
+
+
+class Migration(migration.MigrateTestMixin, unittest.TestCase):
+    def setUp(self) -> defer.Deferred[None]:  # type: ignore[override]
+        return self.setUpMigrateTest()
+
+    def create_tables_thd(self, conn: sa.future.engine.Connection) -> None:
+        metadata = sa.MetaData()
+        metadata.bind = conn  # type: ignore[attr-defined]
+
+        builders_tbl = sautils.Table(
+            'builders',
+            metadata,
+            sa.Column('id', sa.Integer, primary_key=True),
+            sa.Column('name', sa.Text, nullable=False),
+            sa.Column('name_hash', sa.String(40), nullable=False),
+        )
+        builders_tbl.create(bind=conn)
+
+        conn.execute(builders_tbl.insert().values(id=5, name='b1', name_hash='h'))
+        conn.commit()
+
+    def test_update(self) -> defer.Deferred[None]:
+        def setup_thd(conn: sa.future.engine.Connection) -> None:
+            self.create_tables_thd(conn)
+
+        def verify_thd(conn: sa.future.engine.Connection) -> None:
+            metadata = sa.MetaData()
+            metadata.bind = conn  # type: ignore[attr-defined]
+
+            # verify the table has been created
+            dictionaries = sautils.Table('logchunk_dictionaries', metadata, autoload_with=conn)
+            conn.execute(
+                dictionaries.insert(),
+                [
+                    {'builderid': 5, 'created_at': 100, 'content': b'dict'},
+                    {'builderid': None, 'created_at': 200, 'content': b'global'},
+                ],
+            )
+            q = sa.select(
+                dictionaries.c.builderid,
+                dictionaries.c.created_at,
+                dictionaries.c.content,
+            ).order_by(dictionaries.c.id)
+            self.assertEqual(
+                [tuple(row) for row in conn.execute(q)],
+                [(5, 100, b'dict'), (None, 200, b'global')],
+            )
+
+            # verify the index has been created
+            insp = sa.inspect(conn)
+            index_names = [item['name'] for item in insp.get_indexes('logchunk_dictionaries')]
+            self.assertIn('logchunk_dictionaries_builderid', index_names)
+
+        return self.do_test_migration('067', '068', setup_thd, verify_thd)
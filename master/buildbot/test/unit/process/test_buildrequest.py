@@ -22,6 +22,7 @@ from twisted.trial import unittest
 
 from buildbot.process import buildrequest
 from buildbot.process.builder import Builder
+from buildbot.process.results import SKIPPED
 from buildbot.test import fakedb
 from buildbot.test.fake import fakemaster
 from buildbot.test.reactor import TestReactorMixin
@@ -147,6 +148,7 @@ class TestBuildRequestCollapser(TestReactorMixin, unittest.TestCase):
         ssid,
         patchid=None,
         bs_properties=None,
+        builderid=77,
     ):
         rows = [
             fakedb.Buildset(id=bsid, reason='foo', submitted_at=1300305712, results=-1),
@@ -154,7 +156,7 @@ class TestBuildRequestCollapser(TestReactorMixin, unittest.TestCase):
             fakedb.BuildRequest(
                 id=brid,
                 buildsetid=bsid,
-                builderid=77,
+                builderid=builderid,
                 priority=13,
                 submitted_at=1300305712,
                 results=-1,
@@ -406,6 +408,74 @@ class TestBuildRequestCollapser(TestReactorMixin, unittest.TestCase):
         yield self.do_request_collapse([22], [])
         yield self.do_request_collapse([21], [20])
 
+    @defer.inlineCallbacks
+    def test_collapseRequests_collapse_default_compares_keys(self):
+        rows = [
+            fakedb.Master(id=fakedb.FakeDBConnector.MASTER_ID),
+            fakedb.SourceStamp(id=222, codebase='A'),
+            fakedb.SourceStamp(id=223, codebase='C'),
+            fakedb.Builder(id=77, name='A'),
+        ]
+        rows += self.makeBuildRequestRows(22, 122, None, 222)
+        rows += self.makeBuildRequestRows(21, 121, 123, 223)
+        rows += self.makeBuildRequestRows(19, 119, None, 223)
+        rows += self.makeBuildRequestRows(20, 120, 124, 223)
+        self.bldr.getCollapseRequestsFn = lambda: Builder._defaultCollapseRequestFn
+        yield self.master.db.insert_test_data(rows)
+
+        with mock.patch.object(
+            buildrequest.BuildRequest,
+            'canBeCollapsed',
+            side_effect=AssertionError('requests should not be compared pairwise'),
+        ):
+            yield self.do_request_collapse([21], [19, 20])
+
+    @defer.inlineCallbacks
+    def test_collapseRequests_collapse_default_multiple_builders(self):
+        bldr_b = yield self.createBuilder('B', builderid=78)
+        bldr_b.getCollapseRequestsFn = lambda: Builder._defaultCollapseRequestFn
+        rows = [
+            fakedb.Master(id=fakedb.FakeDBConnector.MASTER_ID),
+            fakedb.SourceStamp(id=222),
+            fakedb.Builder(id=77, name='A'),
+            fakedb.Builder(id=78, name='B'),
+        ]
+        rows += self.makeBuildRequestRows(19, 119, None, 222)
+        rows += self.makeBuildRequestRows(20, 120, None, 222)
+        rows += self.makeBuildRequestRows(29, 129, None, 222, builderid=78)
+        rows += self.makeBuildRequestRows(30, 130, None, 222, builderid=78)
+        rows += [
+            fakedb.Buildset(id=140, reason='foo', submitted_at=1300305712, results=-1),
+            fakedb.BuildsetSourceStamp(sourcestampid=222, buildsetid=140),
+            fakedb.BuildRequest(
+                id=40, buildsetid=140, builderid=77, submitted_at=1300305712, results=-1
+            ),
+            fakedb.BuildRequest(
+                id=41, buildsetid=140, builderid=78, submitted_at=1300305712, results=-1
+            ),
+        ]
+        self.bldr.getCollapseRequestsFn = lambda: Builder._defaultCollapseRequestFn
+        yield self.master.db.insert_test_data(rows)
+
+        yield self.do_request_collapse([40, 41], [19, 20, 29, 30])
+
+    @defer.inlineCallbacks
+    def test_collapseRequests_claims_in_bulk(self):
+        def collapseRequests_fn(master, builder, brdict1, brdict2):
+            return True
+
+        self.bldr.getCollapseRequestsFn = lambda: collapseRequests_fn
+        yield self.master.db.insert_test_data(self.BASE_ROWS)
+
+        claim = mock.Mock(wraps=self.master.data.updates.claimBuildRequests)
+        complete = mock.Mock(wraps=self.master.data.updates.completeBuildRequests)
+        with mock.patch.object(self.master.data.updates, 'claimBuildRequests', claim):
+            with mock.patch.object(self.master.data.updates, 'completeBuildRequests', complete):
+                yield self.do_request_collapse([21], [19, 20])
+
+        claim.assert_called_once_with([19, 20])
+        complete.assert_called_once_with([19, 20], SKIPPED)
+
 
 class TestSourceStamp(unittest.TestCase):
     def test_asdict_minimal(self):
@@ -28,7 +28,6 @@ from buildbot.process import factory
 from buildbot.test import fakedb
 from buildbot.test.fake import fakemaster
 from buildbot.test.reactor import TestReactorMixin
-from buildbot.util import epoch2datetime
 from buildbot.util.eventual import fireEventually
 from buildbot.util.twisted import async_to_deferred
 
@@ -279,24 +278,31 @@ class Test(TestBRDBase):
         oldestRequestTimes,
         highestPriorities,
         expected,
-        returnDeferred=False,
     ):
         self.useMock_maybeStartBuildsOnBuilder()
-        self.addBuilders(list(oldestRequestTimes))
+        yield self.addBuilders(list(oldestRequestTimes))
         self.master.config.prioritizeBuilders = prioritizeBuilders
 
-        def mklambda(t):  # work around variable-binding issues
-            if returnDeferred:
-                return lambda: defer.succeed(t)
-            return lambda: t
-
+        rows = self.base_rows[:]
         for n, t in oldestRequestTimes.items():
             if t is not None:
-                t = epoch2datetime(t)
-            self.builders[n].getOldestRequestTime = mklambda(t)
-
-        for n, t in highestPriorities.items():
-            self.builders[n].get_highest_priority = mklambda(t)
+                builderid = self.builders[n].getBuilderId()
+                rows += [
+                    fakedb.BuildRequest(
+                        buildsetid=11,
+                        builderid=builderid,
+                        submitted_at=t,
+                        priority=highestPriorities[n],
+                    ),
+                    # a newer request with a lower priority
+                    fakedb.BuildRequest(
+                        buildsetid=11,
+                        builderid=builderid,
+                        submitted_at=t + 1,
+                        priority=highestPriorities[n] - 1,
+                    ),
+                ]
+        yield self.master.db.insert_test_data(rows)
 
         result = yield self.brd._sortBuilders(list(oldestRequestTimes))
 
@@ -311,14 +317,17 @@ class Test(TestBRDBase):
             ['bldr2', 'bldr1', 'bldr3'],
         )
 
-    def test_sortBuilders_default_asyn(self):
-        return self.do_test_sortBuilders(
+    @defer.inlineCallbacks
+    def test_sortBuilders_default_single_query(self):
+        get_summary = mock.Mock(wraps=self.master.data.rtypes.buildrequest.get_unclaimed_summary)
+        self.patch(self.master.data.rtypes.buildrequest, 'get_unclaimed_summary', get_summary)
+        yield self.do_test_sortBuilders(
             None,  # use the default sort
             {"bldr1": 777, "bldr2": 999, "bldr3": 888},
             {"bldr1": 10, "bldr2": 15, "bldr3": 5},
             ['bldr2', 'bldr1', 'bldr3'],
-            returnDeferred=True,
         )
+        self.assertEqual(get_summary.call_count, 1)
 
     def test_sortBuilders_default_None(self):
         return self.do_test_sortBuilders(
@@ -348,6 +357,25 @@ class Test(TestBRDBase):
             ['bldr1', 'bldr2', 'bldr3'],
         )
 
+    @defer.inlineCallbacks
+    def test_sortBuilders_custom_summary(self):
+        @defer.inlineCallbacks
+        def prioritizeBuilders(master, builders):
+            summaries = yield master.data.rtypes.buildrequest.get_unclaimed_summary()
+
+            # builders with the most recent requests first
+            def key(b):
+                return -summaries[b.getBuilderId()]['oldest_submitted_at'].timestamp()
+
+            return sorted(builders, key=key)
+
+        yield self.do_test_sortBuilders(
+            prioritizeBuilders,
+            {"bldr1": 777, "bldr2": 999, "bldr3": 888},
+            {"bldr1": 10, "bldr2": 15, "bldr3": 5},
+            ['bldr2', 'bldr3', 'bldr1'],
+        )
+
     def test_sortBuilders_custom_async(self):
         def prioritizeBuilders(master, builders):
             self.assertIdentical(master, self.master)
@@ -924,3 +952,129 @@ class TestMaybeStartBuilds(TestBRDBase):
         result = self.do_test_nextBuild(nextBuild)
         self.assertEqual(1, len(self.flushLoggedErrors(RuntimeError)))
         return result
+
+
+class TestUnclaimedBuildRequestIndex(TestBRDBase):
+    @defer.inlineCallbacks
+    def setUp(self):
+        yield super().setUp()
+        # the messages are data API buildrequests, as produced by the data layer
+        self.master.mq.verifyMessages = False
+        self.index = self.brd.unclaimed_index
+        yield self.master.db.insert_test_data([
+            *self.base_rows,
+            fakedb.BuildRequest(id=10, buildsetid=11, builderid=77, priority=0),
+            fakedb.BuildRequest(id=11, buildsetid=11, builderid=77, priority=5),
+            fakedb.BuildRequest(id=12, buildsetid=11, builderid=77, priority=5),
+        ])
+
+    @defer.inlineCallbacks
+    def send_event(self, brid, event):
+        msg = yield self.master.data.get(('buildrequests', brid))
+        self.master.mq.callConsumer(('buildrequests', str(brid), event), msg)
+
+    @defer.inlineCallbacks
+    def assert_next_brids(self, exp):
+        got = []
+        while True:
+            brdict = yield self.index.get_next_brdict(77, got)
+            if brdict is None:
+                break
+            got.append(brdict['buildrequestid'])
+        self.assertEqual(got, exp)
+
+    @defer.inlineCallbacks
+    def test_order(self):
+        yield self.assert_next_brids([11, 12, 10])
+        brdicts = yield self.index.get_unclaimed_brdicts(77)
+        self.assertEqual([b['buildrequestid'] for b in brdicts], [10, 11, 12])
+
+    @defer.inlineCallbacks
+    def test_loaded_once(self):
+        yield self.assert_next_brids([11, 12, 10])
+
+        # the index is not reloaded from the database, only updated by events
+        yield self.master.db.insert_test_data([
+            fakedb.BuildRequest(id=13, buildsetid=11, builderid=77, priority=7),
+            fakedb.BuildRequest(id=14, buildsetid=11, builderid=77, priority=1),
+        ])
+        yield self.send_event(13, 'new')
+        yield self.assert_next_brids([13, 11, 12, 10])
+
+    @defer.inlineCallbacks
+    def test_claimed_and_unclaimed_events(self):
+        yield self.assert_next_brids([11, 12, 10])
+
+        yield self.master.db.buildrequests.claimBuildRequests([11])
+        yield self.send_event(11, 'claimed')
+        yield self.assert_next_brids([12, 10])
+
+        yield self.master.db.buildrequests.unclaimBuildRequests([11])
+        yield self.send_event(11, 'unclaimed')
+        yield self.assert_next_brids([11, 12, 10])
+
+    @defer.inlineCallbacks
+    def test_priority_update_event(self):
+        yield self.assert_next_brids([11, 12, 10])
+
+        yield self.master.db.buildrequests.set_build_requests_priority([10], 9)
+        yield self.send_event(10, 'update')
+        yield self.assert_next_brids([10, 11, 12])
+
+    @defer.inlineCallbacks
+    def test_events_while_loading(self):
+        old_get = self.master.data.get
+        load_d = defer.Deferred()
+
+        @defer.inlineCallbacks
+        def slow_get(*args, **kwargs):
+            res = yield old_get(*args, **kwargs)
+            yield load_d
+            return res
+
+        self.master.data.get = slow_get
+        next_d = self.index.get_next_brdict(77)
+        self.master.data.get = old_get
+
+        yield self.master.db.insert_test_data([
+            fakedb.BuildRequest(id=13, buildsetid=11, builderid=77, priority=7),
+        ])
+        yield self.master.db.buildrequests.claimBuildRequests([11])
+        yield self.send_event(13, 'new')
+        yield self.send_event(11, 'claimed')
+
+        load_d.callback(None)
+        brdict = yield next_d
+        self.assertEqual(brdict['buildrequestid'], 13)
+        yield self.assert_next_brids([13, 12, 10])
+
+    @defer.inlineCallbacks
+    def test_reconcile_multi_master(self):
+        yield self.index.stopService()
+        self.master.config.multiMaster = True
+        yield self.index.startService()
+
+        yield self.assert_next_brids([11, 12, 10])
+        yield self.master.db.insert_test_data([
+            fakedb.BuildRequest(id=13, buildsetid=11, builderid=77, priority=7),
+        ])
+        yield self.assert_next_brids([11, 12, 10])
+
+        self.reactor.advance(self.index.RECONCILE_INTERVAL)
+        yield self.assert_next_brids([13, 11, 12, 10])
+
+    @defer.inlineCallbacks
+    def test_build_requests_cached_between_passes(self):
+        self.bldr = yield self.createBuilder('A', builderid=77)
+        from_brdict = mock.Mock(wraps=buildrequestdistributor.BuildRequest.fromBrdict)
+        self.patch(buildrequestdistributor.BuildRequest, 'fromBrdict', from_brdict)
+
+        # without workers, the builds are chosen but not started
+        yield self.brd._maybeStartBuildsOnBuilder(self.bldr)
+        yield self.brd._maybeStartBuildsOnBuilder(self.bldr)
+        self.assertEqual(from_brdict.call_count, 1)
+        self.assertEqual(list(self.index.build_requests), [11])
+
+        yield self.master.db.buildrequests.claimBuildRequests([11])
+        yield self.send_event(11, 'claimed')
+        self.assertEqual(self.index.build_requests, {})
@@ -21,15 +21,25 @@ from twisted.trial import unittest
 from buildbot.process import cache
 
 
+class Value:
+    def __init__(self, key, size=1000):
+        self.key = key
+        self.data = 'x' * size
+
+
 class CacheManager(unittest.TestCase):
     def setUp(self):
         self.caches = cache.CacheManager()
 
-    def make_config(self, **kwargs):
+    def make_config(self, cacheMaxBytes=None, **kwargs):
         cfg = mock.Mock()
         cfg.caches = kwargs
+        cfg.cacheMaxBytes = cacheMaxBytes
         return cfg
 
+    def miss_fn(self, key):
+        return defer.succeed(Value(key))
+
     def test_get_cache_idempotency(self):
         foo_cache = self.caches.get_cache("foo", None)
         bar_cache = self.caches.get_cache("bar", None)
@@ -50,5 +60,52 @@ class CacheManager(unittest.TestCase):
         self.caches.get_cache("foo", None)
         self.assertIn('foo', self.caches.get_metrics())
         metric = self.caches.get_metrics()['foo']
-        for k in 'hits', 'refhits', 'misses', 'max_size':
+        for k in 'hits', 'refhits', 'misses', 'max_size', 'size', 'bytes', 'evictions':
             self.assertIn(k, metric)
+
+    @defer.inlineCallbacks
+    def test_cache_limits(self):
+        yield self.caches.reconfigServiceWithBuildbotConfig(
+            self.make_config(foo={'size': 10, 'maxBytes': 5000, 'ttl': 60})
+        )
+        foo_cache = self.caches.get_cache("foo", self.miss_fn)
+        self.assertEqual((foo_cache.max_size, foo_cache.max_bytes, foo_cache.ttl), (10, 5000, 60))
+
+        for i in range(10):
+            yield foo_cache.get(i)
+
+        metric = self.caches.get_metrics()['foo']
+        self.assertLessEqual(metric['bytes'], 5000)
+        self.assertLess(metric['size'], 10)
+        self.assertEqual(metric['evictions']['bytes'], 10 - metric['size'])
+
+    @defer.inlineCallbacks
+    def test_reconfig_limits(self):
+        foo_cache = self.caches.get_cache("foo", self.miss_fn)
+        yield self.caches.reconfigServiceWithBuildbotConfig(
+            self.make_config(foo={'size': 5, 'ttl': 60})
+        )
+        self.assertEqual((foo_cache.max_size, foo_cache.ttl), (5, 60))
+
+        yield self.caches.reconfigServiceWithBuildbotConfig(self.make_config(foo=3))
+        self.assertEqual((foo_cache.max_size, foo_cache.ttl), (3, None))
+
+    @defer.inlineCallbacks
+    def test_global_max_bytes(self):
+        yield self.caches.reconfigServiceWithBuildbotConfig(
+            self.make_config(cacheMaxBytes=8000, foo=10, bar=10)
+        )
+        foo_cache = self.caches.get_cache("foo", self.miss_fn)
+        bar_cache = self.caches.get_cache("bar", self.miss_fn)
+
+        values = []
+        for i in range(4):
+            values.append((yield foo_cache.get(i)))
+        for i in range(4):
+            values.append((yield bar_cache.get(i)))
+
+        metrics = self.caches.get_metrics()
+        self.assertLessEqual(metrics['foo']['bytes'] + metrics['bar']['bytes'], 8000)
+        self.assertGreater(metrics['foo']['evictions']['memory'], 0)
+        # the evicted entries that are still referenced are still available
+        self.assertIs((yield foo_cache.get(0)), values[0])
@@ -238,6 +238,45 @@ class Tests(TestReactorMixin, unittest.TestCase):
         )
         self.assertEqual(log_content['content'], 'oout1\neerr2\noout2 out3\neerr3\n')
 
+    @defer.inlineCallbacks
+    def get_num_lines(self, _log):
+        log_data = yield self.master.data.get(('logs', _log.logid))
+        return log_data['num_lines']
+
+    @defer.inlineCallbacks
+    def test_write_buffer(self):
+        self.master.config.logWriteBufferSize = 1000
+        self.master.config.logWriteBufferTime = 2
+        _log = yield self.makeLog('s')
+
+        with mock.patch.object(
+            self.master.db.logs, '_write_log_lines', wraps=self.master.db.logs._write_log_lines
+        ) as write_log_lines:
+            yield _log.addStdout('out1\n')
+            yield _log.addStderr('err1\n')
+            # the lines are published and readable right away, and written
+            # to the database after the delay
+            self.assertEqual((yield self.get_num_lines(_log)), 2)
+            self.assertEqual(
+                [
+                    msg['num_lines']
+                    for key, msg in self.master.mq.productions
+                    if key == ('logs', str(_log.logid), 'append')
+                ],
+                [1, 2],
+            )
+            write_log_lines.assert_not_called()
+
+            self.reactor.advance(2)
+            write_log_lines.assert_called_once_with(_log.logid, 'oout1\neerr1\n')
+
+            yield _log.addStdout('out2\n')
+            yield _log.finish()
+            self.assertEqual(write_log_lines.call_count, 2)
+
+        log_content = yield self.master.data.get(('logs', _log.logid, 'contents'))
+        self.assertEqual(log_content['content'], 'oout1\neerr1\noout2\n')
+
     @defer.inlineCallbacks
     def test_unyielded_finish(self):
         _log = yield self.makeLog('s')
@@ -0,0 +1,276 @@
+# This file is part of Buildbot.  Buildbot is free software: you can
+# redistribute it and/or modify it under the terms of the GNU General Public
+# License as published by the Free Software Foundation, version 2.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+# FOR A PARTICULAR PURPOSE.  See the GNU General Public License for more
+# details.
+#
+# You should have received a copy of the GNU General Public License along with
+# this program; if not, write to the Free Software Foundation, Inc., 51
+# Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+#
+# Copyright Buildbot Team Members
+
+from unittest import mock
+
+import sqlalchemy as sa
+from twisted.internet import defer
+from twisted.trial import unittest
+
+from buildbot.db import compression
+from buildbot.process import logrecompressor
+from buildbot.process.logrecompressor import LogRecompressor
+from buildbot.test import fakedb
+from buildbot.test.fake import fakemaster
+from buildbot.test.reactor import TestReactorMixin
+from buildbot.test.util.config import ConfigErrorsMixin
+from buildbot.util.twisted import async_to_deferred
+
+
+class TestLogRecompressor(TestReactorMixin, ConfigErrorsMixin, unittest.TestCase):
+    @defer.inlineCallbacks
+    def setUp(self):
+        self.setup_test_reactor()
+        self.master = yield fakemaster.make_master(self, wantDb=True)
+        self.master.config.logCompressionMethod = 'raw'
+
+        rows = [
+            fakedb.Worker(id=47, name='linux'),
+            fakedb.Buildset(id=20),
+            fakedb.Builder(id=88, name='b1'),
+            fakedb.BuildRequest(id=41, buildsetid=20, builderid=88),
+            fakedb.Master(id=88),
+            fakedb.Build(
+                id=30, buildrequestid=41, number=7, masterid=88, builderid=88, workerid=47
+            ),
+            fakedb.Step(id=101, buildid=30, number=1, name='one'),
+        ]
+        for logid in (201, 202, 203):
+            rows.append(
+                fakedb.Log(
+                    id=logid,
+                    stepid=101,
+                    name=str(logid),
+                    slug=str(logid),
+                    complete=1,
+                    num_lines=10,
+                    type='s',
+                )
+            )
+            rows.extend(
+                fakedb.LogChunk(
+                    logid=logid,
+                    first_line=line,
+                    last_line=line,
+                    compressed=0,
+                    content=f'line {line} ' + 'x' * 100,
+                )
+                for line in range(10)
+            )
+        yield self.master.db.insert_test_data(rows)
+
+    @defer.inlineCallbacks
+    def make_service(self, **kwargs):
+        kwargs.setdefault('compression_method', 'gz')
+        svc = LogRecompressor(**kwargs)
+        yield svc.setServiceParent(self.master)
+        yield svc.startService()
+        self.addCleanup(lambda: svc.stopService() if svc.running else None)
+        return svc
+
+    def get_chunks(self, logid):
+        def thd(conn):
+            tbl = self.master.db.model.logchunks
+            q = sa.select(tbl.c.first_line, tbl.c.last_line, tbl.c.compressed)
+            q = q.where(tbl.c.logid == logid).order_by(tbl.c.first_line)
+            return [tuple(row) for row in conn.execute(q)]
+
+        return self.master.db.pool.do(thd)
+
+    @defer.inlineCallbacks
+    def get_last_logid(self, svc):
+        objectid = yield self.master.db.state.getObjectId(svc.name, 'LogRecompressor')
+        return (yield self.master.db.state.getState(objectid, 'last_logid', None))
+
+    @async_to_deferred
+    async def test_recompress(self):
+        svc = await self.make_service(interval=60)
+        self.assertEqual((await self.get_chunks(201)), [(line, line, 0) for line in range(10)])
+
+        with mock.patch('buildbot.process.metrics.MetricCountEvent.log') as metric_log:
+            self.reactor.advance(60)
+            await svc.recompress.stop()
+
+        for logid in (201, 202, 203):
+            self.assertEqual((await self.get_chunks(logid)), [(0, 9, 1)])
+            lines = await self.master.db.logs.getLogLines(logid, 0, 9)
+            self.assertEqual(
+                lines, ''.join(f'line {line} ' + 'x' * 100 + '\n' for line in range(10))
+            )
+        self.assertEqual((await self.get_last_logid(svc)), 203)
+
+        counters = {}
+        for call in metric_log.call_args_list:
+            counters[call.args[0]] = counters.get(call.args[0], 0) + call.args[1]
+        self.assertEqual(counters['LogRecompressor.logs'], 3)
+        self.assertGreater(counters['LogRecompressor.bytes_saved'], 0)
+
+    @async_to_deferred
+    async def test_resume_from_state(self):
+        svc = await self.make_service(interval=60, batch_size=1)
+        objectid = await self.master.db.state.getObjectId(svc.name, 'LogRecompressor')
+        await self.master.db.state.setState(objectid, 'last_logid', 201)
+
+        self.reactor.advance(60)
+        await svc.recompress.stop()
+
+        self.assertEqual(len(await self.get_chunks(201)), 10)
+        self.assertEqual((await self.get_chunks(202)), [(0, 9, 1)])
+        self.assertEqual(len(await self.get_chunks(203)), 10)
+        self.assertEqual((await self.get_last_logid(svc)), 202)
+
+    @async_to_deferred
+    async def test_start_over_when_done(self):
+        svc = await self.make_service(interval=60)
+        objectid = await self.master.db.state.getObjectId(svc.name, 'LogRecompressor')
+        await self.master.db.state.setState(objectid, 'last_logid', 203)
+
+        self.reactor.advance(60)
+        self.assertEqual((await self.get_last_logid(svc)), 0)
+        self.assertEqual(len(await self.get_chunks(201)), 10)
+
+        self.reactor.advance(60)
+        await svc.recompress.stop()
+        self.assertEqual((await self.get_chunks(201)), [(0, 9, 1)])
+
+    @async_to_deferred
+    async def test_max_bytes_per_run(self):
+        svc = await self.make_service(interval=60, max_bytes_per_run=100)
+
+        self.reactor.advance(60)
+        await svc.recompress.stop()
+
+        self.assertEqual((await self.get_chunks(201)), [(0, 9, 1)])
+        self.assertEqual(len(await self.get_chunks(202)), 10)
+        self.assertEqual((await self.get_last_logid(svc)), 201)
+
+    @async_to_deferred
+    async def test_busy_fraction(self):
+        svc = await self.make_service(interval=60, busy_fraction=0.25)
+        compress_log = self.master.db.logs.compressLog
+
+        def slow_compress_log(*args, **kwargs):
+            # simulate a recompression taking 2 seconds
+            self.reactor.advance(2)
+            return compress_log(*args, **kwargs)
+
+        rests = []
+
+        def deferLater(clock, delay):
+            rests.append(delay)
+            return defer.succeed(None)
+
+        self.patch(self.master.db.logs, 'compressLog', slow_compress_log)
+        self.patch(logrecompressor.task, 'deferLater', deferLater)
+
+        self.reactor.advance(60)
+        await svc.recompress.stop()
+
+        # the service rests 3 times as long as it worked between logs
+        self.assertEqual(rests, [6, 6])
+        self.assertEqual((await self.get_chunks(203)), [(0, 9, 1)])
+
+    @async_to_deferred
+    async def test_stop_while_resting(self):
+        svc = await self.make_service(interval=60, busy_fraction=0.5)
+        compress_log = self.master.db.logs.compressLog
+
+        def slow_compress_log(*args, **kwargs):
+            self.reactor.advance(2)
+            return compress_log(*args, **kwargs)
+
+        resting = defer.Deferred()
+
+        def deferLater(clock, delay):
+            resting.callback(None)
+            return defer.Deferred()
+
+        self.patch(self.master.db.logs, 'compressLog', slow_compress_log)
+        self.patch(logrecompressor.task, 'deferLater', deferLater)
+
+        self.reactor.advance(60)
+        await resting
+        await svc.stopService()
+
+        self.assertEqual((await self.get_chunks(201)), [(0, 9, 1)])
+        self.assertEqual(len(await self.get_chunks(202)), 10)
+
+    @async_to_deferred
+    async def test_train_dictionaries(self):
+        if not compression.ZStdDictCompressor.available:
+            raise unittest.SkipTest("zstandard not installed, skip the test")
+
+        svc = await self.make_service(
+            compression_method='zstd-dict',
+            interval=60,
+            train_dictionaries='builder',
+            dictionary_max_age=3600,
+        )
+        train = mock.Mock(return_value=defer.succeed(None))
+        self.patch(self.master.db.logs, 'train_log_dictionary', train)
+
+        self.reactor.advance(60)
+        train.assert_called_once_with(88)
+
+        # not enough data, don't try again before dictionary_max_age
+        train.reset_mock()
+        self.reactor.advance(60)
+        train.assert_not_called()
+
+        self.reactor.advance(3600)
+        await svc.recompress.stop()
+        train.assert_called_once_with(88)
+
+    @async_to_deferred
+    async def test_train_dictionaries_global(self):
+        if not compression.ZStdDictCompressor.available:
+            raise unittest.SkipTest("zstandard not installed, skip the test")
+
+        self.reactor.advance(10000)
+        svc = await self.make_service(
+            compression_method='zstd-dict',
+            interval=60,
+            train_dictionaries='global',
+            dictionary_max_age=3600,
+        )
+        train = mock.Mock(return_value=defer.succeed(None))
+        self.patch(self.master.db.logs, 'train_log_dictionary', train)
+
+        def thd(conn):
+            tbl = self.master.db.model.logchunk_dictionaries
+            conn.execute(tbl.insert(), {'builderid': None, 'created_at': 9000, 'content': b'd'})
+            conn.commit()
+
+        await self.master.db.pool.do(thd)
+
+        # the dictionary is recent enough
+        self.reactor.advance(60)
+        train.assert_not_called()
+
+        self.reactor.advance(3600)
+        await svc.recompress.stop()
+        train.assert_called_once_with(None)
+
+    def test_check_config(self):
+        with self.assertRaisesConfigError("unknown log compression method: 'foo'"):
+            LogRecompressor(compression_method='foo')
+        with self.assertRaisesConfigError("interval must be > 0: 0"):
+            LogRecompressor(interval=0)
+        with self.assertRaisesConfigError("busy_fraction must be in ]0, 1]: 2"):
+            LogRecompressor(busy_fraction=2)
+        with self.assertRaisesConfigError(
+            "train_dictionaries must be None, 'global' or 'builder': 'foo'"
+        ):
+            LogRecompressor(train_dictionaries='foo')
@@ -82,6 +82,7 @@ class Tests(interfaces.InterfaceTests, unittest.TestCase):
             collectStderr=False,
             decodeRC=None,
             stdioLogName='stdio',
+            collect_max_memory=None,
         ):
             pass
 
@@ -107,6 +108,7 @@ class Tests(interfaces.InterfaceTests, unittest.TestCase):
             initialStdin=None,
             decodeRC=None,
             stdioLogName='stdio',
+            collect_max_memory=None,
         ):
             pass
 
@@ -188,6 +190,53 @@ class Tests(interfaces.InterfaceTests, unittest.TestCase):
         self.assertEqual(cmd.args['usePTY'], 'slave-config')
 
 
+class TestSplitLine(unittest.TestCase):
+    def test_split_line(self):
+        cmd = remotecommand.RemoteCommand('shell', {})
+        self.assertIsNone(cmd.split_line('stdout', 'hel'))
+        self.assertEqual(cmd.split_line('stdout', 'lo\r\nwor'), 'hello\n')
+        self.assertEqual(cmd.split_line('stdout', 'ld\n'), 'world\n')
+
+    def test_split_line_whole_line_updates(self):
+        cmd = remotecommand.RemoteCommand('shell', {})
+        conn = mock.Mock()
+        conn.info = {'whole_line_updates': True}
+        cmd.run(mock.Mock(), conn, 'builder')
+
+        self.assertEqual(cmd.split_line('stdout', 'hello\nworld\n'), 'hello\nworld\n')
+        self.assertNotIn('stdout', cmd._line_boundary_finders)
+
+        # fall back to the line boundary finder if a line is not terminated
+        self.assertIsNone(cmd.split_line('stderr', 'hel'))
+        self.assertEqual(cmd.split_line('stderr', 'lo\n'), 'hello\n')
+
+
+class TestCollectOutput(unittest.TestCase):
+    def test_collect(self):
+        cmd = remotecommand.RemoteCommand('shell', {}, collectStdout=True, collectStderr=True)
+        cmd.add_stdout_lines('hello\n', False)
+        cmd.add_stdout_lines('world\n', False)
+        cmd.add_stderr_lines('oops\n', True)
+        self.assertEqual(cmd.stdout, 'hello\nworld\n')
+        self.assertEqual(cmd.stderr, 'oops')
+
+    def test_collect_max_memory(self):
+        cmd = remotecommand.RemoteCommand(
+            'shell', {}, collectStdout=True, collectStderr=True, collect_max_memory=8
+        )
+        cmd.add_stdout_lines('hello\n', False)
+        cmd.add_stdout_lines('world\n', False)
+        self.assertEqual(cmd.stdout, 'hello\nworld\n')
+        self.assertEqual(cmd.stderr, '')
+
+    def test_set_output(self):
+        cmd = remotecommand.RemoteCommand('shell', {}, collectStdout=True)
+        cmd.add_stdout_lines('hello\n', False)
+        cmd.stdout = 'replaced'
+        cmd.add_stdout_lines('\n', False)
+        self.assertEqual(cmd.stdout, 'replaced\n')
+
+
 class TestWorkerTransition(unittest.TestCase):
     def test_RemoteShellCommand_usePTY(self):
         with assertNotProducesWarnings(DeprecatedApiWarning):
@@ -14,11 +14,17 @@
 # Copyright Buildbot Team Members
 
 
+import io
 import os
+import shutil
 import stat
+import tarfile
 import tempfile
+import threading
 from unittest.mock import Mock
 
+from twisted.internet import defer
+from twisted.internet import reactor
 from twisted.trial import unittest
 
 from buildbot.process import remotetransfer
@@ -72,3 +78,162 @@ class TestStringFileWriter(unittest.TestCase):
         sfw.remote_write(b'bytes')
         sfw.remote_write(' or str')
         self.assertEqual(sfw.buffer, 'bytes or str')
+
+
+class TestDirectoryWriter(unittest.TestCase):
+    def setUp(self):
+        self.destroot = os.path.abspath('destroot')
+        if os.path.exists(self.destroot):
+            shutil.rmtree(self.destroot)
+        self.addCleanup(shutil.rmtree, self.destroot, ignore_errors=True)
+
+    def make_archive(self, members):
+        f = io.BytesIO()
+        with tarfile.open(fileobj=f, mode='w') as archive:
+            for name, content in members.items():
+                info = tarfile.TarInfo(name)
+                info.size = len(content)
+                archive.addfile(info, io.BytesIO(content))
+        return f.getvalue()
+
+    def make_pool(self):
+        pool = remotetransfer.DirectoryUnpackPool(1)
+        self.addCleanup(pool.stop)
+        return pool
+
+    def read_dest(self, name):
+        with open(os.path.join(self.destroot, name), 'rb') as f:
+            return f.read()
+
+    def test_unpack_in_reactor_thread(self):
+        writer = remotetransfer.DirectoryWriter(self.destroot, None, None, 0o600)
+        writer.remote_write(self.make_archive({'a': b'abc', 'dir/b': b'def'}))
+
+        self.assertIsNone(writer.remote_unpack())
+        self.assertEqual(self.read_dest('a'), b'abc')
+        self.assertEqual(self.read_dest('dir/b'), b'def')
+        self.assertFalse(os.path.exists(writer.tarname))
+
+    @defer.inlineCallbacks
+    def test_unpack_in_pool_keeps_reactor_responsive(self):
+        reactor_ran = threading.Event()
+
+        class BlockingDirectoryWriter(remotetransfer.DirectoryWriter):
+            def _iter_members(self, archive):
+                # extraction can't make progress unless the reactor is running
+                # while it is in progress
+                reactor_ran.wait(10)
+                yield from super()._iter_members(archive)
+
+        progress = []
+        writer = BlockingDirectoryWriter(
+            self.destroot,
+            None,
+            None,
+            0o600,
+            unpack_pool=self.make_pool(),
+            reactor=reactor,
+            progress_callback=lambda files, size: progress.append((files, size)),
+        )
+        writer.PROGRESS_INTERVAL = 0
+        members = {f'file{i}': b'x' * i for i in range(100)}
+        writer.remote_write(self.make_archive(members))
+
+        d = writer.remote_unpack()
+        self.assertFalse(d.called)
+        reactor.callLater(0, reactor_ran.set)
+        yield d
+
+        self.assertTrue(reactor_ran.is_set())
+        self.assertEqual(self.read_dest('file99'), b'x' * 99)
+        self.assertEqual(progress[-1], (100, sum(range(100))))
+
+    @defer.inlineCallbacks
+    def test_unpack_in_pool_error(self):
+        writer = remotetransfer.DirectoryWriter(
+            self.destroot, None, None, 0o600, unpack_pool=self.make_pool(), reactor=reactor
+        )
+        writer.remote_write(b'not a tar archive' * 100)
+        self.addCleanup(writer.purge)
+
+        with self.assertRaises(tarfile.TarError):
+            yield writer.remote_unpack()
+
+    @defer.inlineCallbacks
+    def test_unpack_while_receiving(self):
+        writer = remotetransfer.DirectoryWriter(
+            self.destroot, None, 'gz', 0o600, unpack_pool=self.make_pool(), reactor=reactor
+        )
+        writer.STREAM_BUFFER_SIZE = 1024
+        self.patch(tempfile, 'mkstemp', Mock(side_effect=AssertionError('temporary file')))
+
+        f = io.BytesIO()
+        with tarfile.open(fileobj=f, mode='w|gz') as archive:
+            for i in range(20):
+                content = os.urandom(1000)
+                info = tarfile.TarInfo(f'file{i}')
+                info.size = len(content)
+                archive.addfile(info, io.BytesIO(content))
+        data = f.getvalue()
+
+        delayed_writes = 0
+        for i in range(0, len(data), 512):
+            d = writer.remote_write(data[i : i + 512])
+            if d is not None:
+                # too much data is waiting for extraction
+                delayed_writes += 1
+                yield d
+        yield writer.remote_unpack()
+
+        self.assertGreater(delayed_writes, 0)
+        self.assertEqual(sorted(os.listdir(self.destroot)), sorted(f'file{i}' for i in range(20)))
+
+    @defer.inlineCallbacks
+    def test_cancel_while_receiving(self):
+        writer = remotetransfer.DirectoryWriter(
+            self.destroot, None, None, 0o600, unpack_pool=self.make_pool(), reactor=reactor
+        )
+        writer.STREAM_BUFFER_SIZE = 1024
+        data = self.make_archive({f'file{i}': b'x' * 1000 for i in range(10)})
+        d = writer.remote_write(data[:5000])
+        self.assertIsInstance(d, defer.Deferred)
+        yield d
+
+        writer.cancel()
+        writer.purge()
+        yield writer._unpack_finished
+
+        self.assertFalse(os.path.exists(self.destroot))
+
+    @defer.inlineCallbacks
+    def test_unpack_waiting_for_data_does_not_hold_pool(self):
+        pool = self.make_pool()
+        writers = []
+        for name in ('slow', 'fast'):
+            writer = remotetransfer.DirectoryWriter(
+                os.path.join(self.destroot, name),
+                None,
+                None,
+                0o600,
+                unpack_pool=pool,
+                reactor=reactor,
+            )
+            writer.STREAM_BUFFER_SIZE = 1024
+            writers.append(writer)
+        slow, fast = writers
+
+        # the extraction of the slow upload starts, and waits for more data
+        slow_data = self.make_archive({f'file{i}': b'x' * 1000 for i in range(10)})
+        yield slow.remote_write(slow_data[:5000])
+
+        # the fast upload is extracted with the single slot of the pool
+        yield fast.remote_write(self.make_archive({'a': b'abc'}))
+        yield fast.remote_unpack()
+        self.assertEqual(self.read_dest('fast/a'), b'abc')
+        self.assertFalse(slow._unpack_finished.called)
+
+        for i in range(5000, len(slow_data), 1024):
+            yield slow.remote_write(slow_data[i : i + 1024])
+        yield slow.remote_unpack()
+        self.assertEqual(self.read_dest('slow/file9'), b'x' * 1000)
+        self.assertEqual(pool.running, 0)
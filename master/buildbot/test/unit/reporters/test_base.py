@@ -174,6 +174,29 @@ class TestReporterBase(
         self.assertEqual(len(self.master.mq.qrefs), 1)
         self.assertEqual(self.master.mq.qrefs[0].filter, ('fake2', None, None))
 
+    @defer.inlineCallbacks
+    def test_generators_called_for_wanted_keys_only(self):
+        gen1 = self.setup_mock_generator([('builds', None, 'new'), ('builds', None, 'finished')])
+        gen2 = self.setup_mock_generator([('fake1', None, None)])
+        gen3 = self.setup_mock_generator([('builds', None, 'finished')])
+        calls = []
+        for name, gen in [('gen1', gen1), ('gen2', gen2), ('gen3', gen3)]:
+            gen.generate = lambda *args, name=name: calls.append(name)
+
+        notifier = yield self.setupNotifier(generators=[gen1, gen2, gen3])
+
+        yield notifier._got_event(('builds', 10, 'finished'), {'buildid': 10, 'buildrequestid': 1})
+        self.assertEqual(calls, ['gen1', 'gen3'])
+
+        calls.clear()
+        yield notifier._got_event(('builds', 10, 'new'), {'buildid': 10, 'buildrequestid': 1})
+        self.assertEqual(calls, ['gen1'])
+
+        calls.clear()
+        yield notifier.reconfigService(generators=[gen3, gen2])
+        yield notifier._got_event(('builds', 11, 'finished'), {'buildid': 11, 'buildrequestid': 2})
+        self.assertEqual(calls, ['gen3'])
+
     @defer.inlineCallbacks
     def test_generator_throw_exception_on_generate(self):
         gen = self.setup_mock_generator([('fake1', None, None)])
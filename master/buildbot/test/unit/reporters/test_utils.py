@@ -15,6 +15,7 @@
 
 import datetime
 import textwrap
+from unittest import mock
 
 from dateutil.tz import tzutc
 from parameterized import parameterized
@@ -621,6 +622,89 @@ class TestDataUtils(TestReactorMixin, unittest.TestCase, logging.LoggingMixin):
         res = yield utils.getPreviousBuild(self.master, build)
         self.assertEqual(res['buildid'], 18)
 
+    @defer.inlineCallbacks
+    def test_build_details_memo_same_event(self):
+        yield self.setupDb()
+        memo = yield utils.BuildDetailsMemo.getService(self.master)
+        build = yield self.master.data.get(("builds", 22))
+        with mock.patch.object(self.master.data, 'get', wraps=self.master.data.get) as data_get:
+            res1 = yield memo.get(build, ("builders", 80))
+            res2 = yield memo.get(build, ("builders", 80))
+            self.assertEqual(data_get.call_count, 1)
+
+            # callers get their own copy of the data
+            self.assertEqual(res1, res2)
+            res1['name'] = 'modified'
+            res3 = yield memo.get(build, ("builders", 80))
+            self.assertEqual(res3['name'], 'Builder1')
+
+            # another event fetches the data again
+            other_build = dict(build)
+            yield memo.get(other_build, ("builders", 80))
+            self.assertEqual(data_get.call_count, 2)
+
+    @defer.inlineCallbacks
+    def test_build_details_memo_expires(self):
+        yield self.setupDb()
+        memo = yield utils.BuildDetailsMemo.getService(self.master)
+        build = yield self.master.data.get(("builds", 22))
+        with mock.patch.object(self.master.data, 'get', wraps=self.master.data.get) as data_get:
+            yield memo.get(build, ("builders", 80))
+            self.reactor.advance(memo.SCOPE_TIMEOUT)
+            yield memo.get(build, ("builders", 80))
+            self.assertEqual(data_get.call_count, 2)
+
+    @defer.inlineCallbacks
+    def test_build_details_memo_stop_service(self):
+        yield self.setupDb()
+        memo = yield utils.BuildDetailsMemo.getService(self.master)
+        yield memo.startService()
+        build = yield self.master.data.get(("builds", 22))
+        yield memo.get(build, ("builders", 80))
+        self.assertEqual(len(self.reactor.getDelayedCalls()), 1)
+
+        yield memo.stopService()
+        self.assertEqual(self.reactor.getDelayedCalls(), [])
+
+    @defer.inlineCallbacks
+    def test_build_details_memo_concurrent(self):
+        yield self.setupDb()
+        memo = yield utils.BuildDetailsMemo.getService(self.master)
+        build = yield self.master.data.get(("builds", 22))
+        d = defer.Deferred()
+        with mock.patch.object(self.master.data, 'get', return_value=d) as data_get:
+            d1 = memo.get(build, ("builders", 80))
+            d2 = memo.get(build, ("builders", 80))
+            d.callback({'name': 'Builder1'})
+            self.assertEqual(data_get.call_count, 1)
+        res = yield defer.gatherResults([d1, d2])
+        self.assertEqual(res, [{'name': 'Builder1'}, {'name': 'Builder1'}])
+
+    @defer.inlineCallbacks
+    def test_getDetailsForBuild_uses_memo(self):
+        yield self.setupDb()
+        yield utils.BuildDetailsMemo.getService(self.master)
+        build = yield self.master.data.get(("builds", 22))
+
+        # as reporters do, the message of the event is shared between the generators
+        with mock.patch.object(self.master.data, 'get', wraps=self.master.data.get) as data_get:
+            for _ in range(2):
+                yield utils.getDetailsForBuild(
+                    self.master, build, want_properties=True, want_steps=True
+                )
+            memoized_call_count = data_get.call_count
+
+        other_build = yield self.master.data.get(("builds", 22))
+        with mock.patch.object(self.master.data, 'get', wraps=self.master.data.get) as data_get:
+            yield utils.getDetailsForBuild(
+                self.master, other_build, want_properties=True, want_steps=True
+            )
+            self.assertEqual(memoized_call_count, data_get.call_count)
+
+        self.assertEqual(build['parentbuild']['buildid'], 21)
+        self.assertEqual(build['builder']['name'], 'Builder2')
+        self.assertEqual(build['properties'], other_build['properties'])
+
 
 class TestURLUtils(TestReactorMixin, unittest.TestCase):
     @defer.inlineCallbacks
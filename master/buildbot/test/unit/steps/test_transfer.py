@@ -16,6 +16,7 @@
 import json
 import os
 import shutil
+import stat
 import tempfile
 from unittest.mock import Mock
 
@@ -24,6 +25,7 @@ from twisted.trial import unittest
 
 from buildbot import config
 from buildbot.process import remotetransfer
+from buildbot.process.buildstep import create_step_from_step_or_factory
 from buildbot.process.properties import Interpolate
 from buildbot.process.results import CANCELLED
 from buildbot.process.results import EXCEPTION
@@ -31,6 +33,7 @@ from buildbot.process.results import FAILURE
 from buildbot.process.results import SKIPPED
 from buildbot.process.results import SUCCESS
 from buildbot.steps import transfer
+from buildbot.test.fake import connection
 from buildbot.test.reactor import TestReactorMixin
 from buildbot.test.steps import ExpectDownloadFile
 from buildbot.test.steps import ExpectGlob
@@ -471,6 +474,35 @@ class TestDirectoryUpload(TestBuildStepMixin, TestReactorMixin, unittest.TestCas
 
         self.assertEqual(len(self.flushLoggedErrors(RuntimeError)), 1)
 
+    @defer.inlineCallbacks
+    def test_unpack_progress(self):
+        self.setup_step(transfer.DirectoryUpload(workersrc="srcdir", masterdest=self.destdir))
+        summaries = []
+
+        def report_progress(command):
+            step = self.get_nth_step(0)
+            command.args['writer'].progress_callback(2, 24)
+            summaries.append(step.getCurrentSummary())
+
+        self.expect_commands(
+            ExpectUploadDirectory(
+                workersrc="srcdir",
+                workdir='wkdir',
+                blocksize=16384,
+                compress=None,
+                maxsize=None,
+                writer=ExpectRemoteRef(remotetransfer.DirectoryWriter),
+            )
+            .upload_tar_file('fake.tar', {"test": "Hello world!"})
+            .behavior(report_progress)
+            .exit(0)
+        )
+
+        self.expect_outcome(result=SUCCESS, state_string="uploading srcdir")
+        yield self.run_step()
+
+        self.assertEqual(summaries, [{'step': 'unpacking: 2 files, 24 bytes'}])
+
     def test_init_workersrc_keyword(self):
         step = transfer.DirectoryUpload(workersrc='srcfile', masterdest='dstfile')
 
@@ -610,6 +642,296 @@ class TestMultipleFileUpload(TestBuildStepMixin, TestReactorMixin, unittest.Test
         d = self.run_step()
         return d
 
+    def expect_upload_file(self, source, content):
+        return (
+            ExpectUploadFile(
+                workersrc=source,
+                workdir='wkdir',
+                blocksize=16384,
+                maxsize=None,
+                keepstamp=False,
+                writer=ExpectRemoteRef(remotetransfer.FileWriter),
+            )
+            .upload_string(content)
+            .exit(0)
+        )
+
+    @defer.inlineCallbacks
+    def test_parallel_uploads(self):
+        self.setup_step(
+            transfer.MultipleFileUpload(
+                workersrcs=["srcfile1", "srcfile2", "srcfile3"],
+                masterdest=self.destdir,
+                parallelUploads=2,
+            )
+        )
+
+        self.expect_commands(
+            ExpectStat(file="srcfile1", workdir='wkdir').stat_file().exit(0),
+            ExpectStat(file="srcfile2", workdir='wkdir').stat_file().exit(0),
+            self.expect_upload_file("srcfile1", "file 1\n"),
+            self.expect_upload_file("srcfile2", "file 2\n"),
+            ExpectStat(file="srcfile3", workdir='wkdir').stat_file().exit(0),
+            self.expect_upload_file("srcfile3", "file 3\n"),
+        )
+
+        self.expect_outcome(result=SUCCESS, state_string="uploading 3 files")
+        yield self.run_step()
+
+        for i in range(1, 4):
+            with open(os.path.join(self.destdir, f'srcfile{i}'), encoding='utf-8') as f:
+                self.assertEqual(f.read(), f"file {i}\n")
+        self.assertEqual(self.get_nth_step(0).getStatistic('uploaded_bytes'), 21)
+
+    @defer.inlineCallbacks
+    def test_parallel_uploads_single_command_worker(self):
+        self.patch(connection.FakeConnection, 'supports_concurrent_commands', False)
+        self.setup_step(
+            transfer.MultipleFileUpload(
+                workersrcs=["srcfile1", "srcfile2"],
+                masterdest=self.destdir,
+                parallelUploads=2,
+            )
+        )
+
+        # the worker runs one command at a time: the uploads are sequential
+        self.expect_commands(
+            ExpectStat(file="srcfile1", workdir='wkdir').stat_file().exit(0),
+            self.expect_upload_file("srcfile1", "file 1\n"),
+            ExpectStat(file="srcfile2", workdir='wkdir').stat_file().exit(0),
+            self.expect_upload_file("srcfile2", "file 2\n"),
+        )
+
+        self.expect_outcome(result=SUCCESS, state_string="uploading 2 files")
+        yield self.run_step()
+
+    @defer.inlineCallbacks
+    def test_parallel_uploads_failure(self):
+        self.setup_step(
+            transfer.MultipleFileUpload(
+                workersrcs=["srcfile1", "srcfile2", "srcfile3"],
+                masterdest=self.destdir,
+                parallelUploads=2,
+            )
+        )
+
+        # no upload is started after the first failure
+        self.expect_commands(
+            ExpectStat(file="srcfile1", workdir='wkdir').exit(1),
+            ExpectStat(file="srcfile2", workdir='wkdir').stat_file().exit(0),
+            self.expect_upload_file("srcfile2", "file 2\n"),
+        )
+
+        self.expect_outcome(result=FAILURE, state_string="uploading 3 files (failure)")
+        self.expect_log_file('stderr', "File wkdir/srcfile1 not available at worker")
+        yield self.run_step()
+
+    @defer.inlineCallbacks
+    def test_pack_small_files(self):
+        self.setup_step(
+            transfer.MultipleFileUpload(
+                workersrcs=["srcfile1", "srcbig", "sub/srcfile2"],
+                masterdest=self.destdir,
+                packSmallFiles=100,
+                mode=0o640,
+            )
+        )
+
+        self.expect_commands(
+            ExpectStat(file="srcfile1", workdir='wkdir').stat_file(size=7).exit(0),
+            ExpectStat(file="srcbig", workdir='wkdir').stat_file(size=1000).exit(0),
+            ExpectStat(file="sub/srcfile2", workdir='wkdir').stat_file(size=7).exit(0),
+            ExpectUploadDirectory(
+                workersrc='.',
+                workdir='wkdir',
+                blocksize=16384,
+                compress=None,
+                maxsize=None,
+                members=[['srcfile1', '0'], ['sub/srcfile2', '1']],
+                writer=ExpectRemoteRef(remotetransfer.DirectoryWriter),
+            )
+            .upload_tar_file('fake.tar', {"0": "file 1\n", "1": "file 2\n"})
+            .exit(0),
+            self.expect_upload_file("srcbig", "big file\n"),
+        )
+
+        self.expect_outcome(result=SUCCESS, state_string="uploading 3 files")
+        yield self.run_step()
+
+        self.assertEqual(sorted(os.listdir(self.destdir)), ['srcbig', 'srcfile1', 'srcfile2'])
+        with open(os.path.join(self.destdir, 'srcfile2'), encoding='utf-8') as f:
+            self.assertEqual(f.read(), "file 2\n")
+        self.assertEqual(
+            stat.S_IMODE(os.stat(os.path.join(self.destdir, 'srcfile1')).st_mode), 0o640
+        )
+        # without keepstamp, the modification time of the archive is not kept
+        self.assertGreater(os.stat(os.path.join(self.destdir, 'srcfile1')).st_mtime, 0)
+
+    @defer.inlineCallbacks
+    def test_pack_small_files_keepstamp(self):
+        self.setup_step(
+            transfer.MultipleFileUpload(
+                workersrcs=["srcfile1", "srcfile2"],
+                masterdest=self.destdir,
+                packSmallFiles=100,
+                keepstamp=True,
+            )
+        )
+
+        self.expect_commands(
+            ExpectStat(file="srcfile1", workdir='wkdir')
+            .stat_file(size=7, atime=100, mtime=200)
+            .exit(0),
+            ExpectStat(file="srcfile2", workdir='wkdir')
+            .stat_file(size=7, atime=300, mtime=400)
+            .exit(0),
+            ExpectUploadDirectory(
+                workersrc='.',
+                workdir='wkdir',
+                blocksize=16384,
+                compress=None,
+                maxsize=None,
+                members=[['srcfile1', '0'], ['srcfile2', '1']],
+                writer=ExpectRemoteRef(remotetransfer.DirectoryWriter),
+            )
+            .upload_tar_file('fake.tar', {"0": "file 1\n", "1": "file 2\n"})
+            .exit(0),
+        )
+
+        self.expect_outcome(result=SUCCESS, state_string="uploading 2 files")
+        yield self.run_step()
+
+        s = os.stat(os.path.join(self.destdir, 'srcfile2'))
+        self.assertEqual((s.st_atime, s.st_mtime), (300, 400))
+
+    @defer.inlineCallbacks
+    def test_pack_small_files_maxsize(self):
+        self.setup_step(
+            transfer.MultipleFileUpload(
+                workersrcs=["srcfile1", "srcfile2", "srcbig"],
+                masterdest=self.destdir,
+                packSmallFiles=100,
+                maxsize=50,
+            )
+        )
+
+        # maxsize applies to each file: the files bigger than maxsize are not packed
+        self.expect_commands(
+            ExpectStat(file="srcfile1", workdir='wkdir').stat_file(size=7).exit(0),
+            ExpectStat(file="srcfile2", workdir='wkdir').stat_file(size=7).exit(0),
+            ExpectStat(file="srcbig", workdir='wkdir').stat_file(size=70).exit(0),
+            ExpectUploadDirectory(
+                workersrc='.',
+                workdir='wkdir',
+                blocksize=16384,
+                compress=None,
+                maxsize=None,
+                members=[['srcfile1', '0'], ['srcfile2', '1']],
+                writer=ExpectRemoteRef(remotetransfer.DirectoryWriter),
+            )
+            .upload_tar_file('fake.tar', {"0": "file 1\n", "1": "file 2\n"})
+            .exit(0),
+            ExpectUploadFile(
+                workersrc="srcbig",
+                workdir='wkdir',
+                blocksize=16384,
+                maxsize=50,
+                keepstamp=False,
+                writer=ExpectRemoteRef(remotetransfer.FileWriter),
+            )
+            .upload_string("big file\n")
+            .exit(0),
+        )
+
+        self.expect_outcome(result=SUCCESS, state_string="uploading 3 files")
+        yield self.run_step()
+
+    @defer.inlineCallbacks
+    def test_pack_small_files_failure(self):
+        os.makedirs(self.destdir)
+        with open(os.path.join(self.destdir, 'existing'), 'w', encoding='utf-8') as f:
+            f.write('existing')
+
+        self.setup_step(
+            transfer.MultipleFileUpload(
+                workersrcs=["srcfile1", "srcfile2"], masterdest=self.destdir, packSmallFiles=100
+            )
+        )
+
+        self.expect_commands(
+            ExpectStat(file="srcfile1", workdir='wkdir').stat_file(size=7).exit(0),
+            ExpectStat(file="srcfile2", workdir='wkdir').stat_file(size=7).exit(0),
+            ExpectUploadDirectory(
+                workersrc='.',
+                workdir='wkdir',
+                blocksize=16384,
+                compress=None,
+                maxsize=None,
+                members=[['srcfile1', '0'], ['srcfile2', '1']],
+                writer=ExpectRemoteRef(remotetransfer.DirectoryWriter),
+            ).exit(1),
+        )
+
+        self.expect_outcome(result=FAILURE, state_string="uploading 2 files (failure)")
+        yield self.run_step()
+
+        # the contents of the destination directory are kept
+        self.assertEqual(os.listdir(self.destdir), ['existing'])
+
+    def test_pack_small_files_old_worker(self):
+        self.setup_build(worker_version={'*': '3.3'})
+        self.setup_step(
+            transfer.MultipleFileUpload(
+                workersrcs=["srcfile1", "srcfile2"], masterdest=self.destdir, packSmallFiles=100
+            )
+        )
+
+        self.expect_commands(
+            ExpectStat(file="srcfile1", workdir='wkdir').stat_file(size=7).exit(0),
+            self.expect_upload_file("srcfile1", "file 1\n"),
+            ExpectStat(file="srcfile2", workdir='wkdir').stat_file(size=7).exit(0),
+            self.expect_upload_file("srcfile2", "file 2\n"),
+        )
+
+        self.expect_outcome(result=SUCCESS, state_string="uploading 2 files")
+        return self.run_step()
+
+    @defer.inlineCallbacks
+    def test_run_parallel_waits_for_running_calls(self):
+        step = create_step_from_step_or_factory(
+            transfer.MultipleFileUpload(workersrcs=["srcfile"], masterdest='dst', parallelUploads=2)
+        )
+        step.remote = Mock(supports_concurrent_commands=True)
+        running = defer.Deferred()
+
+        def fail():
+            raise RuntimeError('upload failed')
+
+        d = step.runParallel([(lambda: running, ()), (fail, ())])
+        # the error is only reported once the running call is finished
+        self.assertNoResult(d)
+        running.callback(SUCCESS)
+        with self.assertRaises(RuntimeError):
+            yield d
+
+    @defer.inlineCallbacks
+    def test_interrupt_running_uploads(self):
+        step = create_step_from_step_or_factory(
+            transfer.MultipleFileUpload(workersrcs=["srcfile"], masterdest='dst', parallelUploads=2)
+        )
+        step.addCompleteLog = Mock(return_value=defer.succeed(None))
+        cmds = [Mock(), Mock()]
+        step._running_cmds.update(cmds)
+
+        yield step.interrupt('stop')
+
+        for cmd in cmds:
+            cmd.interrupt.assert_called_once_with('stop')
+
+    def test_init_parallel_uploads_invalid(self):
+        with self.assertRaises(config.ConfigErrors):
+            transfer.MultipleFileUpload(workersrcs=["srcfile"], masterdest='dst', parallelUploads=0)
+
     def testMultipleString(self):
         self.setup_step(transfer.MultipleFileUpload(workersrcs="srcfile", masterdest=self.destdir))
         self.expect_commands(
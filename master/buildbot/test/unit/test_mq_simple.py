@@ -59,6 +59,40 @@ class SimpleMQ(TestReactorMixin, unittest.TestCase):
         # topic
         callback.assert_called_with(('a', 'b'), 'foo')
 
+    @defer.inlineCallbacks
+    def test_forward_data_order(self):
+        calls = []
+        yield self.mq.startConsuming(lambda k, v: calls.append(1), ('a', None))
+        yield self.mq.startConsuming(lambda k, v: calls.append(2), ('a', 'b'))
+        yield self.mq.startConsuming(lambda k, v: calls.append(3), (None, 'b'))
+        yield self.mq.startConsuming(lambda k, v: calls.append(4), ('a', 'c'))
+        yield self.mq.startConsuming(lambda k, v: calls.append(5), ('a', None))
+        yield self.mq.produce(('a', 'b'), 'foo')
+        self.assertEqual(calls, [1, 2, 3, 5])
+
+    @defer.inlineCallbacks
+    def test_stop_consuming(self):
+        callback = mock.Mock()
+        qref = yield self.mq.startConsuming(callback, ('a', None))
+        yield qref.stopConsuming()
+        # stopping twice is harmless
+        yield qref.stopConsuming()
+        yield self.mq.produce(('a', 'b'), 'foo')
+        callback.assert_not_called()
+        self.assertEqual(len(self.mq.qrefs), 0)
+
+    @defer.inlineCallbacks
+    def test_stop_consuming_persistent(self):
+        callback = mock.Mock()
+        qref = yield self.mq.startConsuming(callback, ('a', None), persistent_name='p')
+        yield qref.stopConsuming()
+        yield self.mq.produce(('a', 'b'), 'foo')
+        callback.assert_not_called()
+
+        yield self.mq.startConsuming(callback, ('a', None), persistent_name='p')
+        callback.assert_called_once_with(('a', 'b'), 'foo')
+        self.assertEqual(len(self.mq.qrefs), 1)
+
     @defer.inlineCallbacks
     def test_waits_for_called_callback(self):
         def callback(_, __):
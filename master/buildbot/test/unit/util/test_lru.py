@@ -21,6 +21,7 @@ import string
 
 from twisted.internet import defer
 from twisted.internet import reactor
+from twisted.internet import task
 from twisted.python import failure
 from twisted.trial import unittest
 
@@ -262,6 +263,104 @@ class LRUCacheTest(unittest.TestCase):
         self.assertEqual(self.lru.get('p'), set(['PPP']))
         self.assertEqual(self.lru.get('q'), set(['new-q']))  # updated
 
+    def test_ttl(self):
+        clock = task.Clock()
+        self.lru = lru.LRUCache(short, 3, ttl=10, clock=clock)
+        a = self.lru.get('a')
+        clock.advance(5)
+        self.assertIs(self.lru.get('a'), a)
+
+        # the age is counted from the insertion, not from the last access
+        clock.advance(6)
+        self.lru.miss_fn = long
+        self.check_result(self.lru.get('a'), long('a'), 1, 2)
+        self.assertEqual(self.lru.evictions['ttl'], 1)
+
+    def test_ttl_weakref(self):
+        clock = task.Clock()
+        self.lru = lru.LRUCache(short, 1, ttl=10, clock=clock)
+        a = self.lru.get('a')
+        self.lru.get('b')
+        clock.advance(11)
+
+        # an expired entry is not returned even if it is still referenced
+        self.lru.miss_fn = long
+        self.check_result(self.lru.get('a'), long('a'), 0, 3, 0)
+        self.assertEqual(a, short('a'))
+
+    def test_ttl_reinserted_key_evicted(self):
+        clock = task.Clock()
+        self.lru = lru.LRUCache(short, 2, ttl=10, clock=clock)
+        self.lru.get('a')
+        clock.advance(11)
+        self.lru.get('a')
+        self.lru.get('b')
+        self.lru.get('c')
+        self.assertEqual(sorted(self.lru.keys()), ['b', 'c'])
+        self.assertEqual(self.lru.evictions, {'size': 1, 'bytes': 0, 'ttl': 1, 'memory': 0})
+
+    def test_max_bytes(self):
+        self.lru = lru.LRUCache(short, 10, max_bytes=100, sizeof=lambda v: 40)
+        for c in 'abcd':
+            self.lru.get(c)
+        self.assertEqual(sorted(self.lru.keys()), ['c', 'd'])
+        self.assertEqual(self.lru.bytes, 80)
+        self.assertEqual(self.lru.evictions['bytes'], 2)
+
+    def test_max_bytes_put_larger_value(self):
+        sizes = {'AAA': 40, 'BBB': 40, 'B2': 90}
+        self.lru = lru.LRUCache(short, 10, max_bytes=100, sizeof=lambda v: sizes[next(iter(v))])
+        self.lru.get('a')
+        self.lru.get('b')
+        self.lru.put('b', set(['B2']))
+        self.assertEqual(self.lru.keys(), ['b'])
+        self.assertEqual(self.lru.bytes, 90)
+
+    def test_max_bytes_estimated(self):
+        self.lru = lru.LRUCache(short, 10, max_bytes=1)
+        self.lru.get('a')
+        self.assertEqual(self.lru.keys(), [])
+        self.assertEqual(self.lru.bytes, 0)
+
+    def test_set_limits(self):
+        for c in 'abc':
+            self.lru.get(c)
+        self.lru.set_limits(max_bytes=100, sizeof=lambda v: 40)
+        self.assertEqual(sorted(self.lru.keys()), ['b', 'c'])
+        self.lru.set_limits()
+        self.assertEqual((self.lru.sizeof, self.lru.bytes), (None, 0))
+
+    def test_memory_callback(self):
+        calls = []
+        self.lru = lru.LRUCache(short, 10, sizeof=lambda v: 40)
+        self.lru.memory_callback = lambda: calls.append(self.lru.bytes)
+        self.lru.get('a')
+        self.lru.get('b')
+        self.lru.evict_lru('memory')
+        self.assertEqual(calls, [40, 80])
+        self.assertEqual(self.lru.keys(), ['b'])
+        self.assertEqual(self.lru.evictions['memory'], 1)
+
+    def test_estimate_size(self):
+        small = lru.estimate_size({'a': 'x'})
+        self.assertGreater(lru.estimate_size({'a': 'x' * 1000}), small + 900)
+        self.assertGreater(lru.estimate_size([short('a')] * 10), lru.estimate_size(short('a')) * 10)
+
+    def test_estimate_size_attributes(self):
+        class Master:
+            def __init__(self):
+                self.data = {str(i): 'x' * 100 for i in range(100)}
+
+        class Entry:
+            def __init__(self, master):
+                self.master = master
+                self.name = 'x' * 1000
+
+        # the attributes of the entry are followed, but not those of the objects it references
+        size = lru.estimate_size(Entry(Master()))
+        self.assertGreater(size, 1000)
+        self.assertLess(size, 2000)
+
 
 class AsyncLRUCacheTest(unittest.TestCase):
     def setUp(self):
@@ -27,3 +27,65 @@ class MatchTuple(tuplematching.TupleMatchingMixin, unittest.TestCase):
         should_match_string = 'should match' if shouldMatch else "shouldn't match"
         msg = f"{routingKey!r} {should_match_string} {filter!r}"
         self.assertEqual(shouldMatch, result, msg)
+
+
+class TupleMatchIndexMatching(tuplematching.TupleMatchingMixin, unittest.TestCase):
+    def do_test_match(self, routingKey, shouldMatch, filter):
+        index = tuplematch.TupleMatchIndex()
+        index.add(filter, 'item')
+        result = index.match(routingKey) == ['item']
+        should_match_string = 'should match' if shouldMatch else "shouldn't match"
+        msg = f"{routingKey!r} {should_match_string} {filter!r}"
+        self.assertEqual(shouldMatch, result, msg)
+
+
+class TupleMatchIndex(unittest.TestCase):
+    def setUp(self):
+        self.index = tuplematch.TupleMatchIndex()
+
+    def test_match_insertion_order(self):
+        self.index.add(('a', None), 1)
+        self.index.add(('a', 'b'), 2)
+        self.index.add((None, 'b'), 3)
+        self.index.add(('a', None), 4)
+        self.index.add((None, None), 5)
+        self.index.add(('a', 'c'), 6)
+        self.index.add(('a', 'b', None), 7)
+        self.assertEqual(self.index.match(('a', 'b')), [1, 2, 3, 4, 5])
+        self.assertEqual(self.index.match(('a', 'c')), [1, 4, 5, 6])
+        self.assertEqual(self.index.match(('x', 'b')), [3, 5])
+        self.assertEqual(self.index.match(('a',)), [])
+
+    def test_remove(self):
+        self.index.add(('a', None), 1)
+        self.index.add(('a', 'b'), 2)
+        self.index.remove(1)
+        self.assertEqual(self.index.match(('a', 'b')), [2])
+        self.index.remove(2)
+        self.assertEqual(self.index.match(('a', 'b')), [])
+        self.assertEqual(self.index._index, {})
+        self.assertEqual(len(self.index), 0)
+
+    def test_remove_unknown(self):
+        self.index.add(('a',), 1)
+        self.index.remove(2)
+        self.assertEqual(list(self.index), [1])
+
+    def test_readd_moves_to_end(self):
+        self.index.add(('a', None), 1)
+        self.index.add((None, 'b'), 2)
+        self.index.remove(1)
+        self.index.add(('a', None), 1)
+        self.assertEqual(self.index.match(('a', 'b')), [2, 1])
+
+    def test_add_twice(self):
+        self.index.add(('a',), 1)
+        with self.assertRaises(KeyError):
+            self.index.add(('b',), 1)
+
+    def test_contains_len(self):
+        self.index.add(('a',), 1)
+        self.index.add(('b',), 2)
+        self.assertIn(1, self.index)
+        self.assertNotIn(3, self.index)
+        self.assertEqual(len(self.index), 2)
@@ -0,0 +1,359 @@
+# This file is part of Buildbot.  Buildbot is free software: you can
+# redistribute it and/or modify it under the terms of the GNU General Public
+# License as published by the Free Software Foundation, version 2.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+# FOR A PARTICULAR PURPOSE.  See the GNU General Public License for more
+# details.
+#
+# You should have received a copy of the GNU General Public License along with
+# this program; if not, write to the Free Software Foundation, Inc., 51
+# Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+#
+# Copyright Buildbot Team Members
+
+from unittest import mock
+
+from twisted.internet import defer
+from twisted.trial import unittest
+
+from buildbot.test.fake import fakemaster
+from buildbot.test.reactor import TestReactorMixin
+from buildbot.www import eventhub
+
+
+def collector(writes):
+    def write(data, key):
+        writes.append(data)
+
+    return write
+
+
+class TestEventHub(TestReactorMixin, unittest.TestCase):
+    @defer.inlineCallbacks
+    def setUp(self):
+        self.setup_test_reactor()
+        self.master = yield fakemaster.make_master(self, wantMq=True)
+        self.master.mq.verifyMessages = False
+        self.hub = eventhub.EventHub(self.master)
+        self.encoder = mock.Mock(side_effect=lambda key, msg: ("/".join(key) + repr(msg)).encode())
+
+    @defer.inlineCallbacks
+    def test_shared_subscription(self):
+        writes1 = []
+        writes2 = []
+        yield self.hub.subscribe(('builds', None, None), self.encoder, collector(writes1))
+        yield self.hub.subscribe(('builds', None, None), self.encoder, collector(writes2))
+
+        self.assertEqual(len(self.master.mq.qrefs), 1)
+
+        self.master.mq.callConsumer(('builds', '1', 'new'), {'buildid': 1})
+        self.assertEqual(writes1, [b"builds/1/new{'buildid': 1}"])
+        self.assertEqual(writes2, [b"builds/1/new{'buildid': 1}"])
+        self.assertEqual(self.encoder.call_count, 1)
+
+    @defer.inlineCallbacks
+    def test_encoded_once_per_encoder(self):
+        other_encoder = mock.Mock(return_value=b'other')
+        writes = []
+        yield self.hub.subscribe(('builds', None, None), self.encoder, collector(writes))
+        yield self.hub.subscribe(('builds', None, None), other_encoder, collector(writes))
+        yield self.hub.subscribe(('builds', None, None), other_encoder, collector(writes))
+
+        self.master.mq.callConsumer(('builds', '1', 'new'), {'buildid': 1})
+        self.assertEqual(writes, [b"builds/1/new{'buildid': 1}", b'other', b'other'])
+        self.assertEqual(self.encoder.call_count, 1)
+        self.assertEqual(other_encoder.call_count, 1)
+
+    @defer.inlineCallbacks
+    def test_distinct_paths(self):
+        writes1 = []
+        writes2 = []
+        yield self.hub.subscribe(('builds', None, None), self.encoder, collector(writes1))
+        yield self.hub.subscribe(('changes', None, None), self.encoder, collector(writes2))
+
+        self.assertEqual(len(self.master.mq.qrefs), 2)
+        self.master.mq.callConsumer(('changes', '2', 'new'), {'changeid': 2})
+        self.assertEqual(writes1, [])
+        self.assertEqual(writes2, [b"changes/2/new{'changeid': 2}"])
+
+    @defer.inlineCallbacks
+    def test_stop_consuming(self):
+        writes1 = []
+        writes2 = []
+        sub1 = yield self.hub.subscribe(('builds', None, None), self.encoder, collector(writes1))
+        sub2 = yield self.hub.subscribe(('builds', None, None), self.encoder, collector(writes2))
+
+        yield sub1.stopConsuming()
+        self.assertEqual(len(self.master.mq.qrefs), 1)
+        self.master.mq.callConsumer(('builds', '1', 'new'), {'buildid': 1})
+        self.assertEqual(writes1, [])
+        self.assertEqual(len(writes2), 1)
+
+        yield sub2.stopConsuming()
+        self.assertEqual(self.master.mq.qrefs, [])
+        self.assertEqual(self.hub.topics, {})
+
+        # a new subscription starts consuming again
+        yield self.hub.subscribe(('builds', None, None), self.encoder, collector(writes1))
+        self.assertEqual(len(self.master.mq.qrefs), 1)
+        self.master.mq.callConsumer(('builds', '1', 'new'), {'buildid': 1})
+        self.assertEqual(len(writes1), 1)
+
+    @defer.inlineCallbacks
+    def test_stop_consuming_twice(self):
+        sub = yield self.hub.subscribe(('builds', None, None), self.encoder, lambda data, key: None)
+        yield sub.stopConsuming()
+        yield sub.stopConsuming()
+        self.assertEqual(self.master.mq.qrefs, [])
+
+    @defer.inlineCallbacks
+    def test_write_failure_does_not_affect_others(self):
+        def failing_write(data, key):
+            raise RuntimeError('connection gone')
+
+        writes = []
+        yield self.hub.subscribe(('builds', None, None), self.encoder, failing_write)
+        yield self.hub.subscribe(('builds', None, None), self.encoder, collector(writes))
+
+        self.master.mq.callConsumer(('builds', '1', 'new'), {'buildid': 1})
+        self.assertEqual(len(writes), 1)
+        self.assertEqual(len(self.flushLoggedErrors(RuntimeError)), 1)
+
+    @defer.inlineCallbacks
+    def test_subscribe_while_starting(self):
+        d_start = defer.Deferred()
+        qref = mock.Mock()
+        self.master.mq.startConsuming = mock.Mock(return_value=d_start)
+
+        d1 = self.hub.subscribe(('builds', None, None), self.encoder, lambda data, key: None)
+        d2 = self.hub.subscribe(('builds', None, None), self.encoder, lambda data, key: None)
+        self.assertFalse(d1.called)
+        self.assertFalse(d2.called)
+
+        d_start.callback(qref)
+        sub1 = yield d1
+        sub2 = yield d2
+        self.assertEqual(self.master.mq.startConsuming.call_count, 1)
+
+        yield sub1.stopConsuming()
+        yield sub2.stopConsuming()
+        qref.stopConsuming.assert_called_once_with()
+
+    @defer.inlineCallbacks
+    def test_stop_consuming_while_starting(self):
+        d_start = defer.Deferred()
+        qref = mock.Mock()
+        self.master.mq.startConsuming = mock.Mock(return_value=d_start)
+
+        d = self.hub.subscribe(('builds', None, None), self.encoder, lambda data, key: None)
+        sub = self.hub.topics[('builds', None, None)].subscriptions[0]
+        sub.stopConsuming()
+        qref.stopConsuming.assert_not_called()
+
+        d_start.callback(qref)
+        yield d
+        qref.stopConsuming.assert_called_once_with()
+        self.assertEqual(self.hub.topics, {})
+
+    def test_start_consuming_raises(self):
+        self.master.mq.startConsuming = mock.Mock(side_effect=NotImplementedError)
+        with self.assertRaises(NotImplementedError):
+            self.hub.subscribe(('builds', None, None), self.encoder, lambda data, key: None)
+        self.assertEqual(self.hub.topics, {})
+
+    @defer.inlineCallbacks
+    def test_start_consuming_fails(self):
+        self.master.mq.startConsuming = mock.Mock(return_value=defer.fail(RuntimeError('oops')))
+        with self.assertRaises(RuntimeError):
+            yield self.hub.subscribe(('builds', None, None), self.encoder, lambda data, key: None)
+        self.assertEqual(self.hub.topics, {})
+
+    def test_create_queue(self):
+        self.master.config.www['event_queue_high_watermark'] = 1000
+        self.master.config.www['event_queue_low_watermark'] = 100
+        self.master.config.www['event_queue_overflow'] = 'coalesce'
+        queue = self.hub.create_queue(self.encoder, lambda data: None, lambda: None)
+        self.assertEqual(queue.high_watermark, 1000)
+        self.assertEqual(queue.low_watermark, 100)
+        self.assertEqual(queue.overflow, 'coalesce')
+
+    def test_create_queue_defaults(self):
+        queue = self.hub.create_queue(self.encoder, lambda data: None, lambda: None)
+        self.assertEqual(queue.high_watermark, eventhub.DEFAULT_HIGH_WATERMARK)
+        self.assertEqual(queue.low_watermark, eventhub.DEFAULT_LOW_WATERMARK)
+        self.assertEqual(queue.overflow, 'disconnect')
+
+
+class TestEventQueue(unittest.TestCase):
+    def setUp(self):
+        self.written = []
+        self.disconnect = mock.Mock()
+
+    def encoder(self, key, message):
+        return ("/".join(key) + ':' + repr(message)).encode()
+
+    def make_queue(self, **kwargs):
+        kwargs.setdefault('high_watermark', 100)
+        kwargs.setdefault('low_watermark', 20)
+        return eventhub.EventQueue(self.encoder, self.written.append, self.disconnect, **kwargs)
+
+    def event(self, queue, n, size=10):
+        key = ('builds', str(n), 'update')
+        queue.write(b'x' * (size - 1) + str(n).encode(), key)
+
+    def test_write_directly(self):
+        queue = self.make_queue()
+        self.event(queue, 1)
+        self.assertEqual(self.written, [b'xxxxxxxxx1'])
+        self.assertEqual(queue.queued_bytes, 0)
+
+    def test_paused(self):
+        queue = self.make_queue()
+        queue.pauseProducing()
+        self.event(queue, 1)
+        self.event(queue, 2)
+        self.assertEqual(self.written, [])
+        self.assertEqual(queue.queued_bytes, 20)
+
+        queue.resumeProducing()
+        self.assertEqual(self.written, [b'xxxxxxxxx1', b'xxxxxxxxx2'])
+        self.assertEqual(queue.queued_bytes, 0)
+
+        # once drained, events are written directly again
+        self.event(queue, 3)
+        self.assertEqual(self.written[-1], b'xxxxxxxxx3')
+
+    def test_paused_while_flushing(self):
+        def write(data):
+            self.written.append(data)
+            queue.pauseProducing()
+
+        queue = eventhub.EventQueue(self.encoder, write, self.disconnect)
+        queue.pauseProducing()
+        self.event(queue, 1)
+        self.event(queue, 2)
+
+        queue.resumeProducing()
+        self.assertEqual(self.written, [b'xxxxxxxxx1'])
+        # new events stay behind the queued ones
+        self.event(queue, 3)
+        queue.resumeProducing()
+        queue.resumeProducing()
+        self.assertEqual(self.written, [b'xxxxxxxxx1', b'xxxxxxxxx2', b'xxxxxxxxx3'])
+
+    def test_overflow_coalesce(self):
+        queue = self.make_queue(overflow='coalesce')
+        queue.pauseProducing()
+        for n in range(10):
+            self.event(queue, n % 3)
+        self.assertEqual(queue.coalesced, None)
+
+        # goes over the high watermark
+        self.event(queue, 3)
+        self.assertEqual(
+            list(queue.coalesced), [('builds', str(n), 'update') for n in (0, 1, 2, 3)]
+        )
+        self.assertEqual(len(queue.queue), 0)
+        self.event(queue, 1)
+        self.event(queue, 4)
+        self.assertEqual(len(queue.coalesced), 5)
+
+        queue.resumeProducing()
+        self.assertEqual(self.written, [f'builds/{n}/update:None'.encode() for n in range(5)])
+        self.assertEqual(queue.coalesced, None)
+        self.assertEqual(queue.queued_bytes, 0)
+        self.disconnect.assert_not_called()
+
+        # back to full events
+        self.event(queue, 5)
+        self.assertEqual(self.written[-1], b'xxxxxxxxx5')
+
+    def test_coalesce_until_low_watermark(self):
+        def write(data):
+            self.written.append(data)
+            queue.pauseProducing()
+
+        queue = eventhub.EventQueue(
+            self.encoder,
+            write,
+            self.disconnect,
+            high_watermark=300,
+            low_watermark=30,
+            overflow='coalesce',
+        )
+        queue.pauseProducing()
+        for n in range(11):
+            self.event(queue, n, size=30)
+        self.assertEqual(len(queue.coalesced), 11)
+
+        # the notifications are 21 or 22 bytes each: the queue is above the
+        # low watermark until a single notification remains
+        for _ in range(9):
+            queue.resumeProducing()
+            self.assertIsNotNone(queue.coalesced)
+        queue.resumeProducing()
+        self.assertIsNone(queue.coalesced)
+
+        # subsequent events are queued in full, after the remaining notification
+        self.event(queue, 11, size=30)
+        queue.resumeProducing()
+        queue.resumeProducing()
+        self.assertEqual(self.written[-2], b'builds/10/update:None')
+        self.assertEqual(self.written[-1], b'x' * 29 + b'11')
+
+    def test_coalesced_overflow_disconnects(self):
+        queue = self.make_queue(high_watermark=50, low_watermark=10, overflow='coalesce')
+        queue.pauseProducing()
+        for n in range(6):
+            self.event(queue, n)
+        self.disconnect.assert_called_once_with()
+        self.assertTrue(queue.disconnected)
+        self.assertEqual(queue.queued_bytes, 0)
+
+    def test_overflow_disconnect(self):
+        queue = self.make_queue()
+        queue.pauseProducing()
+        for n in range(20):
+            self.event(queue, n)
+        self.disconnect.assert_called_once_with()
+        self.assertEqual(queue.queued_bytes, 0)
+
+        queue.resumeProducing()
+        self.assertEqual(self.written, [])
+
+    def test_stop_producing(self):
+        queue = self.make_queue()
+        queue.pauseProducing()
+        self.event(queue, 1)
+        queue.stopProducing()
+        self.assertEqual(queue.queued_bytes, 0)
+
+        self.event(queue, 2)
+        queue.resumeProducing()
+        self.assertEqual(self.written, [])
+        self.disconnect.assert_not_called()
+
+    def test_metrics(self):
+        queue = self.make_queue(overflow='disconnect')
+        with mock.patch('buildbot.process.metrics.MetricCountEvent.log') as log:
+            queue.pauseProducing()
+            self.event(queue, 1)
+            queue.resumeProducing()
+            queue.pauseProducing()
+            for n in range(11):
+                self.event(queue, n)
+
+        counts = {}
+        for call in log.call_args_list:
+            counter, count = call.args
+            counts[counter] = counts.get(counter, 0) + count
+        self.assertEqual(
+            counts,
+            {
+                'www.event_queue.bytes': 0,
+                'www.event_queue.overflows': 1,
+                'www.event_queue.disconnects': 1,
+            },
+        )
@@ -361,6 +361,19 @@ class V2RootResource_REST(TestReactorMixin, www.WwwTestMixin, unittest.TestCase)
         self.assertEqual(head, b'')
         self.assertEqual(int(self.request.headers[b'content-length'][0]), len(get))
 
+    @defer.inlineCallbacks
+    def test_api_content_length(self):
+        with mock.patch.object(
+            json.encoder.JSONEncoder,
+            'iterencode',
+            wraps=json.encoder.JSONEncoder.iterencode,
+            autospec=True,
+        ) as iterencode:
+            get = yield self.render_resource(self.rsrc, b'/test', method=b'GET')
+        # the data is only encoded once
+        self.assertEqual(iterencode.call_count, 1)
+        self.assertEqual(int(self.request.headers[b'content-length'][0]), len(get))
+
     @defer.inlineCallbacks
     def test_api_collection(self):
         yield self.render_resource(self.rsrc, b'/test')
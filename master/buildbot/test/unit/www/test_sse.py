@@ -48,6 +48,40 @@ class EventResource(TestReactorMixin, www.WwwTestMixin, unittest.TestCase):
         self.assertReceivesChangeNewMessage(self.request)
         self.assertEqual(self.request.finished, False)
 
+    def test_listen_shared_subscription(self):
+        self.render_resource(self.sse, b'/listen/changes/*/*')
+        request1 = self.request
+        self.readUUID(request1)
+        self.render_resource(self.sse, b'/listen/changes/*/*')
+        request2 = self.request
+        self.readUUID(request2)
+        self.assertEqual(len(self.master.mq.qrefs), 1)
+
+        self.master.mq.callConsumer(("changes", "500", "new"), test_changes.Change.changeEvent)
+        self.assertEqual(request1.written, request2.written)
+        self.assertEqual(self.readEvent(request1)[b"event"], b"event")
+
+    def test_listen_slow_client(self):
+        self.master.config.www['event_queue_high_watermark'] = 1000
+        self.master.config.www['event_queue_low_watermark'] = 100
+        self.master.config.www['event_queue_overflow'] = 'coalesce'
+        self.render_resource(self.sse, b'/listen/changes/*/*')
+        request = self.request
+        self.readUUID(request)
+
+        # the transport buffer is full
+        request.producer.pauseProducing()
+        for _ in range(10):
+            self.master.mq.callConsumer(("changes", "500", "new"), test_changes.Change.changeEvent)
+        self.assertEqual(request.written, b"")
+
+        # the events are replaced by a notification once the queue is full
+        request.producer.resumeProducing()
+        kw = self.readEvent(request)
+        self.assertEqual(
+            json.loads(kw[b"data"]), {"key": ['changes', '500', 'new'], "message": None}
+        )
+
     def test_listen_add_then_close(self):
         self.render_resource(self.sse, b'/listen')
         request = self.request
@@ -15,10 +15,15 @@
 
 import json
 import re
+from io import BytesIO
 from unittest.mock import Mock
 
 from twisted.internet import defer
+from twisted.internet.testing import StringTransport
+from twisted.python.failure import Failure
 from twisted.trial import unittest
+from twisted.web import http
+from twisted.web.http_headers import Headers
 
 from buildbot.test.reactor import TestReactorMixin
 from buildbot.test.util import www
@@ -138,3 +143,85 @@ class WsResource(TestReactorMixin, www.WwwTestMixin, unittest.TestCase):
             json.dumps({"cmd": 'stopConsuming', "path": 'builds/*/*', "_id": 2}), False
         )
         self.assert_called_with_json(self.proto.sendMessage, {"msg": "OK", "code": 200, "_id": 2})
+
+    def test_startConsuming_shared_between_connections(self):
+        proto2 = self.ws._factory.buildProtocol("me")
+        proto2.sendMessage = Mock(spec=proto2.sendMessage)
+        for proto in (self.proto, proto2):
+            proto.onMessage(
+                json.dumps({"cmd": 'startConsuming', "path": 'builds/*/*', "_id": 1}), False
+            )
+        self.assertEqual(len(self.master.mq.qrefs), 1)
+
+        self.master.mq.verifyMessages = False
+        self.master.mq.callConsumer(("builds", "1", "new"), {"buildid": 1})
+        for proto in (self.proto, proto2):
+            self.assert_called_with_json(
+                proto.sendMessage, {"k": "builds/1/new", "m": {"buildid": 1}}
+            )
+        # the message is encoded once, and the same bytes are sent to both connections
+        self.assertIs(self.proto.sendMessage.call_args[0][0], proto2.sendMessage.call_args[0][0])
+
+        proto2.connectionLost(None)
+        self.assertEqual(len(self.master.mq.qrefs), 1)
+        self.proto.connectionLost(None)
+        self.assertEqual(self.master.mq.qrefs, [])
+
+    def test_slow_client_disconnected(self):
+        self.master.config.www['event_queue_high_watermark'] = 100
+        self.master.config.www['event_queue_overflow'] = 'disconnect'
+        proto = self.ws._factory.buildProtocol("me")
+        proto.sendMessage = Mock(spec=proto.sendMessage)
+        proto.dropConnection = Mock(spec=proto.dropConnection)
+        proto.onMessage(
+            json.dumps({"cmd": 'startConsuming', "path": 'builds/*/*', "_id": 1}), False
+        )
+        proto.sendMessage.reset_mock()
+
+        # the transport buffer is full
+        proto.event_queue.pauseProducing()
+        self.master.mq.verifyMessages = False
+        for i in range(10):
+            self.master.mq.callConsumer(("builds", str(i), "update"), {"buildid": i})
+        proto.sendMessage.assert_not_called()
+        proto.dropConnection.assert_called_once_with(abort=True)
+
+    def test_event_queue_registered_as_transport_producer(self):
+        # an HTTP connection, upgraded to a websocket by the resource
+        transport = StringTransport()
+        channel = http.HTTPChannel()
+        transport.protocol = channel
+        channel.makeConnection(transport)
+        self.assertIs(transport.producer, channel)
+
+        class FakeRequest:
+            method = b'GET'
+            uri = b'/ws'
+            content = BytesIO()
+            requestHeaders = Headers({
+                b'Host': [b'localhost'],
+                b'Upgrade': [b'websocket'],
+                b'Connection': [b'Upgrade'],
+                b'Sec-WebSocket-Key': [b'dGhlIHNhbXBsZSBub25jZQ=='],
+                b'Sec-WebSocket-Version': [b'13'],
+            })
+
+        request = FakeRequest()
+        request.channel = channel
+        request.transport = transport
+        self.ws.render(request)
+        self.assertIn(b'101 Switching Protocols', transport.value())
+
+        proto = transport.protocol
+        self.assertIs(transport.producer, proto.event_queue)
+        self.assertTrue(transport.streaming)
+
+        # the transport buffer is full, and the events are queued
+        transport.producer.pauseProducing()
+        transport.clear()
+        proto.event_queue.write(b'event', ('builds', '1', 'new'))
+        self.assertEqual(transport.value(), b'')
+        transport.producer.resumeProducing()
+        self.assertNotEqual(transport.value(), b'')
+
+        proto.connectionLost(Failure(Exception('closed')))
@@ -0,0 +1,73 @@
+# This file is part of Buildbot.  Buildbot is free software: you can
+# redistribute it and/or modify it under the terms of the GNU General Public
+# License as published by the Free Software Foundation, version 2.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+# FOR A PARTICULAR PURPOSE.  See the GNU General Public License for more
+# details.
+#
+# You should have received a copy of the GNU General Public License along with
+# this program; if not, write to the Free Software Foundation, Inc., 51
+# Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+#
+# Copyright Buildbot Team Members
+
+import os
+import time
+
+from twisted.python import log
+from twisted.trial import unittest
+
+
+class BenchmarkTestCase(unittest.TestCase):
+    """
+    Base class for micro-benchmarks.  Benchmarks are slow and their results are
+    only meaningful on a quiet machine, so they are skipped unless the
+    BUILDBOT_BENCHMARK environment variable is set.  Results are written to the
+    trial log.
+    """
+
+    # minimal wall-clock time spent measuring each case
+    BENCHMARK_TIME = 0.5
+
+    # benchmarks run many iterations on real resources, don't use the default test timeout
+    timeout = 600
+
+    def setUp(self):
+        if 'BUILDBOT_BENCHMARK' not in os.environ:
+            raise unittest.SkipTest("set BUILDBOT_BENCHMARK to run benchmarks")
+        super().setUp()
+
+    def measure(self, fn, number=1):
+        """Return the best observed time per call of fn(), in seconds.  fn is
+        called number times per sample, for at least BENCHMARK_TIME seconds."""
+        best = None
+        end_time = time.perf_counter() + self.BENCHMARK_TIME
+        while best is None or time.perf_counter() < end_time:
+            start = time.perf_counter()
+            for _ in range(number):
+                fn()
+            elapsed = (time.perf_counter() - start) / number
+            if best is None or elapsed < best:
+                best = elapsed
+        return best
+
+    async def measure_async(self, fn, number=1):
+        """Same as measure(), for a function returning an awaitable"""
+        best = None
+        end_time = time.perf_counter() + self.BENCHMARK_TIME
+        while best is None or time.perf_counter() < end_time:
+            start = time.perf_counter()
+            for _ in range(number):
+                await fn()
+            elapsed = (time.perf_counter() - start) / number
+            if best is None or elapsed < best:
+                best = elapsed
+        return best
+
+    def report(self, name, **values):
+        formatted = ', '.join(
+            f'{k}={v:.6g}' if isinstance(v, float) else f'{k}={v}' for k, v in values.items()
+        )
+        log.msg(f"benchmark {self.id()} {name}: {formatted}")
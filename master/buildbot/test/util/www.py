@@ -48,6 +48,7 @@ class FakeRequest:
     redirected_to = None
     rendered_resource = None
     failure = None
+    producer = None
     method = b'GET'
     path = b'/req.path'
     responseCode = 200
@@ -78,6 +79,12 @@ class FakeRequest:
     def write(self, data):
         self.written = self.written + data
 
+    def registerProducer(self, producer, streaming):
+        self.producer = producer
+
+    def unregisterProducer(self):
+        self.producer = None
+
     def redirect(self, url):
         self.redirected_to = url
 
@@ -13,6 +13,8 @@
 #
 # Copyright Buildbot Team Members
 
+import sys
+import time
 from collections import defaultdict
 from collections import deque
 from itertools import filterfalse
@@ -21,21 +23,58 @@ from weakref import WeakValueDictionary
 from twisted.internet import defer
 from twisted.python import log
 
+_CONTAINER_TYPES = (dict, list, tuple, set, frozenset, deque)
+
+
+def estimate_size(obj, max_depth=4):
+    """
+    Estimate the memory used by obj, in bytes, by following the contents of
+    containers up to max_depth levels.  The attributes of obj itself are
+    followed, but other objects are not: they are usually shared with the rest
+    of the master (e.g., the master itself), so only their own size is counted.
+    Objects referenced several times are counted each time.
+    """
+    size = sys.getsizeof(obj)
+    if max_depth > 0 and not isinstance(obj, _CONTAINER_TYPES) and hasattr(obj, '__dict__'):
+        obj = vars(obj)
+        max_depth -= 1
+        size += sys.getsizeof(obj)
+    return size + _estimate_contents_size(obj, max_depth)
+
+
+def _estimate_contents_size(obj, max_depth):
+    if max_depth <= 0 or not isinstance(obj, _CONTAINER_TYPES):
+        return 0
+    max_depth -= 1
+    size = 0
+    if isinstance(obj, dict):
+        for k, v in obj.items():
+            size += sys.getsizeof(k) + _estimate_contents_size(k, max_depth)
+            size += sys.getsizeof(v) + _estimate_contents_size(v, max_depth)
+    else:
+        for v in obj:
+            size += sys.getsizeof(v) + _estimate_contents_size(v, max_depth)
+    return size
+
 
 class LRUCache:
     """
-    A least-recently-used cache, with a fixed maximum size.
+    A least-recently-used cache, with a fixed maximum size.  The cache can
+    additionally be bounded by the estimated memory size of its entries
+    (max_bytes) and by the age of its entries (ttl, in seconds).
 
     See buildbot manual for more information.
     """
 
     __slots__ = (
-        'max_size max_queue miss_fn queue cache weakrefs refcount hits refhits misses'.split()
-    )
+        'max_size max_queue miss_fn queue cache weakrefs refcount hits refhits misses '
+        'max_bytes ttl sizeof sizes bytes timestamps evictions memory_callback _now'
+    ).split()
     sentinel = object()
     QUEUE_SIZE_FACTOR = 10
+    EVICTION_REASONS = ('size', 'bytes', 'ttl', 'memory')
 
-    def __init__(self, miss_fn, max_size=50):
+    def __init__(self, miss_fn, max_size=50, max_bytes=None, ttl=None, sizeof=None, clock=None):
         self.max_size = max_size
         self.max_queue = max_size * self.QUEUE_SIZE_FACTOR
         self.queue = deque()
@@ -44,13 +83,24 @@ class LRUCache:
         self.hits = self.misses = self.refhits = 0
         self.refcount = defaultdict(lambda: 0)
         self.miss_fn = miss_fn
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.sizeof = sizeof if sizeof is not None or max_bytes is None else estimate_size
+        self.sizes = {}
+        self.bytes = 0
+        self.timestamps = {}
+        self.evictions = dict.fromkeys(self.EVICTION_REASONS, 0)
+        # called after an entry has been added, when sizes are tracked
+        self.memory_callback = None
+        self._now = clock.seconds if clock is not None else time.monotonic
 
     def put(self, key, value):
         cached = key in self.cache or key in self.weakrefs
         self.cache[key] = value
         self.weakrefs[key] = value
+        self._track(key, value)
         self._ref_key(key)
-        if not cached:
+        if not cached or self.sizeof is not None:
             self._purge()
 
     def get(self, key, **miss_fn_kwargs):
@@ -63,10 +113,7 @@ class LRUCache:
 
         result = self.miss_fn(key, **miss_fn_kwargs)
         if result is not None:
-            self.cache[key] = result
-            self.weakrefs[key] = result
-            self._ref_key(key)
-            self._purge()
+            self._insert(key, result)
 
         return result
 
@@ -81,6 +128,46 @@ class LRUCache:
         self.max_queue = max_size * self.QUEUE_SIZE_FACTOR
         self._purge()
 
+    def set_limits(self, max_bytes=None, ttl=None, sizeof=None):
+        """
+        Change the memory and age limits of the cache.  If sizeof is not given
+        and max_bytes is set, entry sizes are estimated with estimate_size.
+        """
+        if sizeof is None and max_bytes is not None:
+            sizeof = estimate_size
+        self.max_bytes = max_bytes
+        if sizeof is not self.sizeof:
+            self.sizeof = sizeof
+            self.sizes = {}
+            self.bytes = 0
+            if sizeof is not None:
+                for key, value in self.cache.items():
+                    self._track(key, value, fresh=False)
+        if ttl is not None and self.ttl is None:
+            # entries present before are considered as fresh
+            now = self._now()
+            self.timestamps = dict.fromkeys(self.cache, now)
+        elif ttl is None:
+            self.timestamps = {}
+        self.ttl = ttl
+        self._purge()
+
+    def evict_lru(self, reason):
+        """Evict the least recently used entry; the cache must not be empty"""
+        queue = self.queue
+        refcount = self.refcount
+        while True:
+            k = queue.popleft()
+            refc = refcount[k] = refcount[k] - 1
+            if refc:
+                continue
+            del refcount[k]
+            # keys removed because of the ttl are left in the queue
+            if k in self.cache:
+                self._remove(k)
+                self.evictions[reason] += 1
+                return
+
     def inv(self):
         global inv_failed
 
@@ -105,6 +192,40 @@ class LRUCache:
             log.msg("      got:", sorted(self.refcount.items()))
             inv_failed = True
 
+    def _insert(self, key, value):
+        self.cache[key] = value
+        self.weakrefs[key] = value
+        self._track(key, value)
+        self._ref_key(key)
+        self._purge()
+
+    def _track(self, key, value, fresh=True):
+        """Record the size and, if fresh, the insertion time of an entry."""
+        if self.sizeof is not None:
+            size = self.sizeof(value)
+            self.bytes += size - self.sizes.get(key, 0)
+            self.sizes[key] = size
+        if fresh and self.ttl is not None:
+            self.timestamps[key] = self._now()
+
+    def _remove(self, key):
+        del self.cache[key]
+        if self.sizeof is not None:
+            self.bytes -= self.sizes.pop(key)
+        if self.ttl is not None and key not in self.weakrefs:
+            self.timestamps.pop(key, None)
+
+    def _expire(self, key):
+        """Forget the key if it is older than the ttl."""
+        timestamp = self.timestamps.get(key)
+        if timestamp is None or self._now() - timestamp <= self.ttl:
+            return
+        del self.timestamps[key]
+        self.weakrefs.pop(key, None)
+        if key in self.cache:
+            self._remove(key)
+        self.evictions['ttl'] += 1
+
     def _ref_key(self, key):
         """Record a reference to the argument key."""
         queue = self.queue
@@ -118,15 +239,26 @@ class LRUCache:
         # is only required when the cache does not exceed its maximum
         # size
         if len(queue) > self.max_queue:
+            cache = self.cache
             refcount.clear()
             queue_appendleft = queue.appendleft
             queue_appendleft(self.sentinel)
             for k in filterfalse(refcount.__contains__, iter(queue.pop, self.sentinel)):
-                queue_appendleft(k)
-                refcount[k] = 1
+                if k in cache:
+                    queue_appendleft(k)
+                    refcount[k] = 1
+
+            if self.ttl is not None:
+                # forget the timestamps of the entries that are gone
+                weakrefs = self.weakrefs
+                for k in [k for k in self.timestamps if k not in cache and k not in weakrefs]:
+                    del self.timestamps[k]
 
     def _get_hit(self, key):
         """Try to do a value lookup from the existing cache entries."""
+        if self.ttl is not None:
+            self._expire(key)
+
         try:
             result = self.cache[key]
             self.hits += 1
@@ -138,31 +270,33 @@ class LRUCache:
         result = self.weakrefs[key]
         self.refhits += 1
         self.cache[key] = result
+        self._track(key, result, fresh=False)
         self._ref_key(key)
+        if self.sizeof is not None:
+            self._purge()
         return result
 
     def _purge(self):
         """
-        Trim the cache down to max_size by evicting the
+        Trim the cache down to max_size entries and max_bytes by evicting the
         least-recently-used entries.
         """
-        if len(self.cache) <= self.max_size:
+        cache = self.cache
+        if len(cache) > self.max_size:
+            max_size = self.max_size
+            while len(cache) > max_size:
+                self.evict_lru('size')
+
+        if self.sizeof is None:
             return
 
-        cache = self.cache
-        refcount = self.refcount
-        queue = self.queue
-        max_size = self.max_size
-
-        # purge least recently used entries, using refcount to count entries
-        # that appear multiple times in the queue
-        while len(cache) > max_size:
-            refc = 1
-            while refc:
-                k = queue.popleft()
-                refc = refcount[k] = refcount[k] - 1
-            del cache[k]
-            del refcount[k]
+        max_bytes = self.max_bytes
+        if max_bytes is not None:
+            while self.bytes > max_bytes and cache:
+                self.evict_lru('bytes')
+
+        if self.memory_callback is not None:
+            self.memory_callback()
 
 
 class AsyncLRUCache(LRUCache):
@@ -173,8 +307,10 @@ class AsyncLRUCache(LRUCache):
 
     __slots__ = ['concurrent']
 
-    def __init__(self, miss_fn, max_size=50):
-        super().__init__(miss_fn, max_size=max_size)
+    def __init__(self, miss_fn, max_size=50, max_bytes=None, ttl=None, sizeof=None, clock=None):
+        super().__init__(
+            miss_fn, max_size=max_size, max_bytes=max_bytes, ttl=ttl, sizeof=sizeof, clock=clock
+        )
         self.concurrent = {}
 
     def get(self, key, **miss_fn_kwargs):
@@ -204,14 +340,9 @@ class AsyncLRUCache(LRUCache):
 
         def handle_result(result):
             if result is not None:
-                self.cache[key] = result
-                self.weakrefs[key] = result
-
                 # reference the key once, possibly standing in for multiple
                 # concurrent accesses
-                self._ref_key(key)
-
-                self._purge()
+                self._insert(key, result)
 
             # and fire all of the waiting Deferreds
             dlist = concurrent.pop(key)
@@ -0,0 +1,80 @@
+# This file is part of Buildbot.  Buildbot is free software: you can
+# redistribute it and/or modify it under the terms of the GNU General Public
+# License as published by the Free Software Foundation, version 2.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+# FOR A PARTICULAR PURPOSE.  See the GNU General Public License for more
+# details.
+#
+# You should have received a copy of the GNU General Public License along with
+# this program; if not, write to the Free Software Foundation, Inc., 51
+# Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+#
+# Copyright Buildbot Team Members
+
+from __future__ import annotations
+
+import tempfile
+import weakref
+from typing import IO
+
+
+class OutputAccumulator:
+    """
+    Keeps a copy of the output of a command, in time linear with the size of
+    the output.  If max_memory is not None, the output is written to a
+    temporary file once it exceeds max_memory characters.
+    """
+
+    def __init__(self, max_memory: int | None = None) -> None:
+        self._max_memory = max_memory
+        self._chunks: list[str] = []
+        self._memory_size = 0
+        self._size = 0
+        self._file: IO[str] | None = None
+
+    def __len__(self) -> int:
+        return self._size
+
+    def append(self, data: str) -> None:
+        if not data:
+            return
+        self._size += len(data)
+        if self._file is not None:
+            self._file.write(data)
+            return
+        self._chunks.append(data)
+        self._memory_size += len(data)
+        if self._max_memory is not None and self._memory_size > self._max_memory:
+            self._spill()
+
+    def _spill(self) -> None:
+        self._file = tempfile.TemporaryFile(
+            mode='w+', encoding='utf-8', errors='surrogatepass', newline=''
+        )
+        # the file is closed when the accumulator is garbage collected, as the value can be read
+        # at any time after the command finished
+        weakref.finalize(self, self._file.close)
+        self._file.writelines(self._chunks)
+        self._chunks = []
+        self._memory_size = 0
+
+    def getvalue(self) -> str:
+        if self._file is not None:
+            self._file.seek(0)
+            value = self._file.read()
+            self._file.seek(0, 2)
+            return value
+        if len(self._chunks) > 1:
+            # join once, so that reading the value again is cheap
+            self._chunks = [''.join(self._chunks)]
+        return self._chunks[0] if self._chunks else ''
+
+    def close(self) -> None:
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+        self._chunks = []
+        self._memory_size = 0
+        self._size = 0
@@ -21,3 +21,82 @@ def matchTuple(routingKey, filter):
         if f is not None and f != k:
             return False
     return True
+
+
+class TupleMatchIndex:
+    """
+    An index of filters (as accepted by `matchTuple`) which finds the items
+    whose filter matches a given routing key without testing every filter.
+
+    Filters are grouped by length and by the positions of their non-wildcard
+    elements.  Within each group, items are looked up by the values at those
+    positions, so the cost of `match` depends on the number of distinct filter
+    shapes and the number of matching items rather than the number of items.
+    """
+
+    def __init__(self):
+        # length -> {non-wildcard positions -> {values at positions -> {item: seq}}}
+        self._index = {}
+        self._items = {}
+        self._seq = 0
+
+    def __len__(self):
+        return len(self._items)
+
+    def __iter__(self):
+        # iterate in insertion order
+        return iter(self._items)
+
+    def __contains__(self, item):
+        return item in self._items
+
+    def add(self, filter, item):
+        if item in self._items:
+            raise KeyError(f"{item!r} is already in the index")
+        filter = tuple(filter)
+        positions = tuple(i for i, f in enumerate(filter) if f is not None)
+        values = tuple(filter[i] for i in positions)
+
+        self._seq += 1
+        shapes = self._index.setdefault(len(filter), {})
+        bucket = shapes.setdefault(positions, {}).setdefault(values, {})
+        bucket[item] = self._seq
+        self._items[item] = (filter, positions, values)
+
+    def remove(self, item):
+        """Remove item from the index.  Removing an unknown item is a no-op."""
+        entry = self._items.pop(item, None)
+        if entry is None:
+            return
+        filter, positions, values = entry
+
+        shapes = self._index[len(filter)]
+        buckets = shapes[positions]
+        bucket = buckets[values]
+        del bucket[item]
+        if not bucket:
+            del buckets[values]
+            if not buckets:
+                del shapes[positions]
+                if not shapes:
+                    del self._index[len(filter)]
+
+    def match(self, routingKey):
+        """Return the items whose filter matches routingKey, in insertion order"""
+        shapes = self._index.get(len(routingKey))
+        if not shapes:
+            return []
+
+        found = []
+        for positions, buckets in shapes.items():
+            bucket = buckets.get(tuple(routingKey[i] for i in positions))
+            if bucket:
+                found.append(bucket)
+
+        if not found:
+            return []
+        if len(found) == 1:
+            return list(found[0])
+        matches = [(seq, item) for bucket in found for item, seq in bucket.items()]
+        matches.sort(key=lambda m: m[0])
+        return [item for _, item in matches]
@@ -76,6 +76,9 @@ class UpdateRegistrationListener(Listener):
 
 class Connection:
     proxies: dict[type, type] = {}
+    # whether the worker runs several commands of a build at the same time;
+    # otherwise starting a command interrupts the running one
+    supports_concurrent_commands = False
 
     def __init__(self, name):
         self._disconnectSubs = subscription.SubscriptionPoint(f"disconnections from {name}")
@@ -141,6 +144,9 @@ class RemoteCommandImpl:
     def remote_update(self, updates):
         raise NotImplementedError
 
+    def remote_update_msgpack(self, updates):
+        raise NotImplementedError
+
     def remote_complete(self, failure=None):
         raise NotImplementedError
 
@@ -102,6 +102,7 @@ class Connection(base.Connection):
     keepalive_timer: None = None
     keepalive_interval = 3600
     info: Any = None
+    supports_concurrent_commands = True
 
     def __init__(self, master, worker, protocol):
         super().__init__(worker.workername)
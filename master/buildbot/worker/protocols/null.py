@@ -41,6 +41,9 @@ class ProxyMixin:
         except TypeError:
             log.msg(f"{method} didn't accept {args} and {kw}")
             raise
+        if isinstance(state, defer.Deferred):
+            # some methods complete asynchronously, like DirectoryWriter.remote_unpack
+            return state.addCallback(fireEventually)
         # break callback recursion for large transfers by using fireEventually
         return fireEventually(state)
 
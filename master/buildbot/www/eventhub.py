@@ -0,0 +1,336 @@
+# This file is part of Buildbot.  Buildbot is free software: you can
+# redistribute it and/or modify it under the terms of the GNU General Public
+# License as published by the Free Software Foundation, version 2.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+# FOR A PARTICULAR PURPOSE.  See the GNU General Public License for more
+# details.
+#
+# You should have received a copy of the GNU General Public License along with
+# this program; if not, write to the Free Software Foundation, Inc., 51
+# Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+#
+# Copyright Buildbot Team Members
+
+from __future__ import annotations
+
+from collections import deque
+from typing import TYPE_CHECKING
+from typing import Any
+from typing import Callable
+from typing import Iterable
+
+from twisted.internet import defer
+from twisted.internet.interfaces import IPushProducer
+from twisted.python import log
+from zope.interface import implementer
+
+from buildbot.process import metrics
+
+if TYPE_CHECKING:
+    from typing import Tuple
+
+    from twisted.python.failure import Failure
+
+    from buildbot.master import BuildMaster
+    from buildbot.mq.base import QueueRef
+
+    Encoder = Callable[[Tuple[str, ...], Any], bytes]
+    Writer = Callable[[bytes, Tuple[str, ...]], Any]
+
+DEFAULT_HIGH_WATERMARK = 4 * 1024 * 1024
+DEFAULT_LOW_WATERMARK = 1024 * 1024
+OVERFLOW_POLICIES = ('coalesce', 'disconnect')
+
+
+class EventSubscription:
+    """
+    A subscription of a single client to a path of the event hub.  It can be
+    used in place of the L{QueueRef} returned by C{mq.startConsuming}.
+    """
+
+    def __init__(self, topic: _Topic, encoder: Encoder, write: Writer):
+        self.topic = topic
+        self.encoder = encoder
+        self.write = write
+
+    def stopConsuming(self) -> defer.Deferred | None:
+        return self.topic.remove_subscription(self)
+
+
+class _Topic:
+    # all the subscriptions to a single path, sharing one mq consumer
+
+    def __init__(self, hub: EventHub, path: tuple[str | None, ...]):
+        self.hub = hub
+        self.path = path
+        self.subscriptions: list[EventSubscription] = []
+        self.qref: QueueRef | None = None
+        self.started = False
+        self.stopped = False
+        self._start_failure: Failure | None = None
+        self._waiters: list[defer.Deferred] = []
+
+    def wait_started(self) -> defer.Deferred[None]:
+        if self.started:
+            return defer.succeed(None)
+        if self._start_failure is not None:
+            return defer.fail(self._start_failure)
+        d: defer.Deferred[None] = defer.Deferred()
+        self._waiters.append(d)
+        return d
+
+    def on_started(self, qref: QueueRef) -> None:
+        self.qref = qref
+        self.started = True
+        if not self.subscriptions:
+            self.stop()
+        waiters, self._waiters = self._waiters, []
+        for d in waiters:
+            d.callback(None)
+
+    def on_start_failed(self, failure: Failure) -> None:
+        self._start_failure = failure
+        self.stopped = True
+        self.hub._remove_topic(self)
+        waiters, self._waiters = self._waiters, []
+        for d in waiters:
+            d.errback(failure)
+
+    def dispatch(self, key: tuple[str, ...], message: Any) -> None:
+        # encode the message once per encoder, whatever the number of
+        # subscriptions
+        encoded: dict[Encoder, bytes] = {}
+        for subscription in list(self.subscriptions):
+            try:
+                data = encoded.get(subscription.encoder)
+                if data is None:
+                    data = encoded[subscription.encoder] = subscription.encoder(key, message)
+                subscription.write(data, key)
+            except Exception as e:
+                log.err(e, f"while dispatching event {key!r}")
+
+    def remove_subscription(self, subscription: EventSubscription) -> defer.Deferred | None:
+        if subscription in self.subscriptions:
+            self.subscriptions.remove(subscription)
+        if not self.subscriptions and self.started:
+            return self.stop()
+        return None
+
+    def stop(self) -> defer.Deferred | None:
+        if self.stopped:
+            return None
+        self.stopped = True
+        self.hub._remove_topic(self)
+        if self.qref is not None:
+            return self.qref.stopConsuming()
+        return None
+
+
+@implementer(IPushProducer)
+class EventQueue:
+    """
+    Bounded outbound queue of the events sent to a single client.
+
+    The queue is registered as a streaming producer of the client transport.
+    Events are written directly while the transport accepts them, and queued
+    while it is paused because the client does not read fast enough.
+
+    When the queued events exceed C{high_watermark} bytes, the C{overflow}
+    policy applies:
+
+     - C{'disconnect'}: the client is disconnected.
+     - C{'coalesce'}: the queued payloads are dropped and replaced by one
+       notification per distinct event key, encoded with a C{None} message, so
+       that the client knows which resources changed and can fetch them again.
+       Further events are coalesced the same way until the queue drains below
+       C{low_watermark} bytes.  If even the notifications exceed
+       C{high_watermark}, the client is disconnected.  Only clients that
+       handle C{None} messages can use this policy; the web UI does not.
+    """
+
+    def __init__(
+        self,
+        encoder: Encoder,
+        write: Callable[[bytes], Any],
+        disconnect: Callable[[], Any],
+        high_watermark: int = DEFAULT_HIGH_WATERMARK,
+        low_watermark: int = DEFAULT_LOW_WATERMARK,
+        overflow: str = 'disconnect',
+    ):
+        assert overflow in OVERFLOW_POLICIES
+        self.encoder = encoder
+        self._write = write
+        self._disconnect = disconnect
+        self.high_watermark = high_watermark
+        self.low_watermark = low_watermark
+        self.overflow = overflow
+
+        self.paused = False
+        self.disconnected = False
+        self.queue: deque[tuple[tuple[str, ...], bytes]] = deque()
+        # notifications of the coalesced events by key, or None when not
+        # coalescing
+        self.coalesced: dict[tuple[str, ...], bytes] | None = None
+        self.queued_bytes = 0
+
+    def _update_queued_bytes(self, delta: int) -> None:
+        if delta:
+            self.queued_bytes += delta
+            metrics.MetricCountEvent.log('www.event_queue.bytes', delta)
+
+    def write(self, data: bytes, key: tuple[str, ...]) -> None:
+        if self.disconnected:
+            return
+        if self.coalesced is not None:
+            self._coalesce(key)
+        elif not self.paused and not self.queue:
+            self._write(data)
+        else:
+            self.queue.append((key, data))
+            self._update_queued_bytes(len(data))
+            if self.queued_bytes > self.high_watermark:
+                self._on_overflow()
+
+    def _coalesce(self, key: tuple[str, ...]) -> None:
+        assert self.coalesced is not None
+        if key in self.coalesced:
+            return
+        notification = self.coalesced[key] = self.encoder(key, None)
+        self._update_queued_bytes(len(notification))
+        if self.queued_bytes > self.high_watermark:
+            self.close(reason='too many coalesced events')
+
+    def _on_overflow(self) -> None:
+        metrics.MetricCountEvent.log('www.event_queue.overflows', 1)
+        if self.overflow == 'disconnect':
+            self.close(reason='event queue overflow')
+            return
+
+        coalesced = dict.fromkeys(key for key, _ in self.queue)
+        self._clear()
+        self.coalesced = {}
+        for key in coalesced:
+            self._coalesce(key)
+            if self.disconnected:
+                break
+
+    def _clear(self) -> None:
+        self.queue.clear()
+        if self.coalesced is not None:
+            self.coalesced = None
+        self._update_queued_bytes(-self.queued_bytes)
+
+    def close(self, reason: str) -> None:
+        if self.disconnected:
+            return
+        log.msg(f"disconnecting slow event client: {reason}")
+        metrics.MetricCountEvent.log('www.event_queue.disconnects', 1)
+        self.disconnected = True
+        self._clear()
+        self._disconnect()
+
+    def _flush(self) -> None:
+        while not self.paused and not self.disconnected:
+            if self.coalesced:
+                key = next(iter(self.coalesced))
+                notification = self.coalesced.pop(key)
+                self._update_queued_bytes(-len(notification))
+                self._write(notification)
+            elif self.queue:
+                key, data = self.queue.popleft()
+                self._update_queued_bytes(-len(data))
+                self._write(data)
+            else:
+                break
+            if self.coalesced is not None and self.queued_bytes <= self.low_watermark:
+                # back to sending full events; the remaining coalesced keys
+                # are still sent before them
+                self.queue.extendleft(reversed(list(self.coalesced.items())))
+                self.coalesced = None
+
+    # IPushProducer
+
+    def pauseProducing(self) -> None:
+        self.paused = True
+
+    def resumeProducing(self) -> None:
+        self.paused = False
+        self._flush()
+
+    def stopProducing(self) -> None:
+        self.disconnected = True
+        self._clear()
+
+
+class EventHub:
+    """
+    Shares mq subscriptions between the websocket and server-sent events
+    clients.
+
+    There is a single mq consumer for each distinct path, whatever the number
+    of clients listening to it. Each message is encoded once for each wire
+    format, and the resulting bytes are written to all the matching clients.
+    """
+
+    def __init__(self, master: BuildMaster):
+        self.master = master
+        self.topics: dict[tuple[str | None, ...], _Topic] = {}
+
+    def subscribe(
+        self, path: Iterable[str | None], encoder: Encoder, write: Writer
+    ) -> defer.Deferred[EventSubscription]:
+        """
+        Subscribe a client to the messages matching C{path}.
+
+        @param path: mq filter tuple, with C{None} as wildcard
+        @param encoder: callable encoding a C{(key, message)} pair to bytes;
+            subscriptions sharing the same encoder share the encoded bytes
+        @param write: callable writing the encoded bytes to the client
+        @returns: L{EventSubscription}, via Deferred
+
+        Exceptions raised by C{mq.startConsuming} for a new path are raised
+        synchronously.
+        """
+        topic_path = tuple(path)
+        topic = self.topics.get(topic_path)
+        start_consuming = topic is None
+        if topic is None:
+            topic = _Topic(self, topic_path)
+
+        subscription = EventSubscription(topic, encoder, write)
+        topic.subscriptions.append(subscription)
+
+        if start_consuming:
+            # the subscription must be registered before starting, as the mq
+            # may answer synchronously
+            started_d = self.master.mq.startConsuming(topic.dispatch, topic_path)
+            self.topics[topic_path] = topic
+            started_d.addCallbacks(topic.on_started, topic.on_start_failed)
+
+        return topic.wait_started().addCallback(lambda _: subscription)
+
+    def create_queue(
+        self,
+        encoder: Encoder,
+        write: Callable[[bytes], Any],
+        disconnect: Callable[[], Any],
+    ) -> EventQueue:
+        """
+        Create the outbound queue of a client connection, configured from the
+        C{event_queue_*} keys of the www configuration.
+        """
+        www = self.master.config.www
+        return EventQueue(
+            encoder,
+            write,
+            disconnect,
+            high_watermark=www.get('event_queue_high_watermark', DEFAULT_HIGH_WATERMARK),
+            low_watermark=www.get('event_queue_low_watermark', DEFAULT_LOW_WATERMARK),
+            overflow=www.get('event_queue_overflow', 'disconnect'),
+        )
+
+    def _remove_topic(self, topic: _Topic) -> None:
+        if self.topics.get(topic.path) is topic:
+            del self.topics[topic.path]
@@ -413,7 +413,15 @@ class V2RootResource(resource.Resource):
             else:
                 encoder.indent = 2
 
-            yield threads.deferToThread(V2RootResource._write_json_data, request, encoder, data)
+            # encode off the reactor thread, but write from the reactor thread as
+            # twisted.web requests are not thread-safe
+            body = yield threads.deferToThread(V2RootResource._encode_json_data, encoder, data)
+            if _is_request_finished(request):
+                return
+
+            request.setHeader(b"content-length", unicode2bytes(str(len(body))))
+            if request.method != b"HEAD":
+                request.write(body)
 
     def reconfigResource(self, new_config):
         # buildbotURL may contain reverse proxy path, Origin header is just
@@ -493,23 +501,11 @@ class V2RootResource(resource.Resource):
         return res
 
     @staticmethod
-    def _write_json_data(
-        request: server.Request,
-        encoder: json.encoder.JSONEncoder,
-        data: Any,
-    ) -> None:
-        content_length = 0
-        for chunk in encoder.iterencode(data):
-            if _is_request_finished(request):
-                return
-            content_length += len(unicode2bytes(chunk))
-        request.setHeader(b"content-length", unicode2bytes(str(content_length)))
-
-        if request.method != b"HEAD":
-            for chunk in encoder.iterencode(data):
-                if _is_request_finished(request):
-                    return
-                request.write(unicode2bytes(chunk))
+    def _encode_json_data(encoder: json.encoder.JSONEncoder, data: Any) -> bytes:
+        # the body is encoded in a single pass, which is required anyway to know
+        # the Content-Length. Note that `encode` uses the C accelerated encoder
+        # when the output is compact, unlike `iterencode`
+        return encoder.encode(data).encode('utf-8')
 
 
 RestRootResource.addApiVersion(2, V2RootResource)
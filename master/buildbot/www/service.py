@@ -44,6 +44,7 @@ from buildbot.www import auth
 from buildbot.www import avatar
 from buildbot.www import change_hook
 from buildbot.www import config as wwwconfig
+from buildbot.www import eventhub
 from buildbot.www import rest
 from buildbot.www import sse
 from buildbot.www import ws
@@ -335,11 +336,14 @@ class WWWService(service.ReconfigurableServiceMixin, service.AsyncMultiService):
         # /config
         root.putChild(b'config', wwwconfig.ConfigResource(self.master))
 
+        # /ws and /sse share the mq subscriptions
+        event_hub = eventhub.EventHub(self.master)
+
         # /ws
-        root.putChild(b'ws', ws.WsResource(self.master))
+        root.putChild(b'ws', ws.WsResource(self.master, event_hub))
 
         # /sse
-        root.putChild(b'sse', sse.EventResource(self.master))
+        root.putChild(b'sse', sse.EventResource(self.master, event_hub))
 
         # /change_hook
         resource_obj = change_hook.ChangeHookResource(master=self.master)
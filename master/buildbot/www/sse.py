@@ -24,12 +24,24 @@ from buildbot.data.exceptions import InvalidPathError
 from buildbot.util import bytes2unicode
 from buildbot.util import toJson
 from buildbot.util import unicode2bytes
+from buildbot.www.eventhub import EventHub
+
+
+def encode_event(event, data):
+    key = [bytes2unicode(e) for e in event]
+    msg = {"key": key, "message": data}
+    return b"event: event\ndata: " + unicode2bytes(json.dumps(msg, default=toJson)) + b"\n\n"
 
 
 class Consumer:
-    def __init__(self, request):
+    def __init__(self, request, hub=None):
         self.request = request
         self.qrefs = {}
+        self.event_queue = None
+        if hub is not None:
+            self.event_queue = hub.create_queue(encode_event, request.write, self.disconnect)
+            # the transport pauses the events while the client does not read them
+            request.registerProducer(self.event_queue, True)
 
     def stopConsuming(self, key=None):
         if key is not None:
@@ -40,12 +52,18 @@ class Consumer:
             self.qrefs = {}
 
     def onMessage(self, event, data):
-        request = self.request
-        key = [bytes2unicode(e) for e in event]
-        msg = {"key": key, "message": data}
-        request.write(b"event: " + b"event" + b"\n")
-        request.write(b"data: " + unicode2bytes(json.dumps(msg, default=toJson)) + b"\n")
-        request.write(b"\n")
+        self.write_event(encode_event(event, data), tuple(event))
+
+    def write_event(self, data, key=None):
+        if self.event_queue is not None:
+            self.event_queue.write(data, key)
+        else:
+            self.request.write(data)
+
+    def disconnect(self):
+        # there is no point in flushing the data already written, as the
+        # client does not read it
+        self.request.transport.abortConnection()
 
     def registerQref(self, path, qref):
         self.qrefs[path] = qref
@@ -54,10 +72,11 @@ class Consumer:
 class EventResource(resource.Resource):
     isLeaf = True
 
-    def __init__(self, master):
+    def __init__(self, master, hub=None):
         super().__init__()
 
         self.master = master
+        self.hub = hub if hub is not None else EventHub(master)
         self.consumers = {}
 
     def decodePath(self, path):
@@ -85,7 +104,7 @@ class EventResource(resource.Resource):
 
         if command == b"listen":
             cid = unicode2bytes(str(uuid.uuid4()))
-            consumer = Consumer(request)
+            consumer = Consumer(request, self.hub)
 
         elif command in (b"add", b"remove"):
             if path:
@@ -107,8 +126,8 @@ class EventResource(resource.Resource):
                     options[k] = options[k][1]
 
             try:
-                d = self.master.mq.startConsuming(
-                    consumer.onMessage, tuple(bytes2unicode(p) for p in path)
+                d = self.hub.subscribe(
+                    tuple(bytes2unicode(p) for p in path), encode_event, consumer.write_event
                 )
 
                 @d.addCallback
@@ -138,6 +157,8 @@ class EventResource(resource.Resource):
             @d.addBoth
             def onEndRequest(_):
                 consumer.stopConsuming()
+                if consumer.event_queue is not None:
+                    consumer.event_queue.stopProducing()
                 del self.consumers[cid]
 
             return server.NOT_DONE_YET
@@ -23,6 +23,14 @@ from twisted.python import log
 
 from buildbot.util import bytes2unicode
 from buildbot.util import toJson
+from buildbot.www.eventhub import EventHub
+
+
+def encode_event(key, message):
+    # protocol is deliberately concise in size
+    return json.dumps(
+        {"k": "/".join(key), "m": message}, default=toJson, separators=(",", ":")
+    ).encode()
 
 
 class Subscription:
@@ -33,9 +41,13 @@ class Subscription:
 
 
 class WsProtocol(WebSocketServerProtocol):
-    def __init__(self, master):
+    def __init__(self, master, hub=None):
         super().__init__()
         self.master = master
+        self.hub = hub if hub is not None else EventHub(master)
+        self.event_queue = self.hub.create_queue(
+            encode_event, self.send_event, self.drop_slow_connection
+        )
         self.qrefs = {}
         self.debug = self.master.config.www.get("debug", False)
 
@@ -45,6 +57,12 @@ class WsProtocol(WebSocketServerProtocol):
     def send_json_message(self, **msg):
         return self.sendMessage(self.to_json(msg))
 
+    def send_event(self, data):
+        return self.sendMessage(data)
+
+    def drop_slow_connection(self):
+        self.dropConnection(abort=True)
+
     def send_error(self, error, code, _id):
         return self.send_json_message(error=error, code=code, _id=_id)
 
@@ -104,11 +122,7 @@ class WsProtocol(WebSocketServerProtocol):
             yield self.ack(_id=_id)
             return
 
-        def callback(key, message):
-            # protocol is deliberately concise in size
-            return self.send_json_message(k="/".join(key), m=message)
-
-        qref = yield self.master.mq.startConsuming(callback, self.parsePath(path))
+        qref = yield self.hub.subscribe(self.parsePath(path), encode_event, self.event_queue.write)
 
         # race conditions handling
         if self.qrefs is None or path in self.qrefs:
@@ -141,26 +155,35 @@ class WsProtocol(WebSocketServerProtocol):
             log.msg("connection lost", system=self)
         for qref in self.qrefs.values():
             qref.stopConsuming()
+        self.event_queue.stopProducing()
 
         self.qrefs = None  # to be sure we don't add any more
 
     def onConnect(self, request):
         return None
 
+    def onOpen(self):
+        # the transport was taken over from the HTTP channel of the upgrade
+        # request, which is still registered as its producer
+        self.transport.unregisterProducer()
+        # the transport pauses the events while the client does not read them
+        self.registerProducer(self.event_queue, True)
+
 
 class WsProtocolFactory(WebSocketServerFactory):
-    def __init__(self, master):
+    def __init__(self, master, hub=None):
         super().__init__()
         self.master = master
+        self.hub = hub if hub is not None else EventHub(master)
         pingInterval = self.master.config.www.get("ws_ping_interval", 0)
         self.setProtocolOptions(webStatus=False, autoPingInterval=pingInterval)
 
     def buildProtocol(self, addr):
-        p = WsProtocol(self.master)
+        p = WsProtocol(self.master, self.hub)
         p.factory = self
         return p
 
 
 class WsResource(WebSocketResource):
-    def __init__(self, master):
-        super().__init__(WsProtocolFactory(master))
+    def __init__(self, master, hub=None):
+        super().__init__(WsProtocolFactory(master, hub))
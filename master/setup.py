@@ -190,6 +190,7 @@ setup_args = {
         []
         if BUILDING_WHEEL
         else [  # skip tests for wheels (save 50% of the archive)
+            "buildbot.test.benchmark",
             "buildbot.test.fuzz",
             "buildbot.test.integration",
             "buildbot.test.integration.interop",
@@ -516,6 +517,7 @@ setup_args = {
                         ],
                     ),
                     ('buildbot.process.logobserver', ['LogLineObserver']),
+                    ('buildbot.process.logrecompressor', ['LogRecompressor']),
                     ('buildbot.process.project', ['Project']),
                     (
                         'buildbot.process.properties',
@@ -0,0 +1 @@
+The default prioritizeBuilders implementation now fetches the highest priority and oldest submission time of the pending build requests of all builders with a single database query, instead of two queries per builder.
@@ -0,0 +1 @@
+The build request distributor now keeps the unclaimed build requests of each builder in memory, updated from the buildrequests messages, instead of loading them from the database for each distribution pass.
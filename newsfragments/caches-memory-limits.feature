@@ -0,0 +1 @@
+Caches configured in :bb:cfg:`caches` can now be bounded by an estimated memory size and by the age of their entries, and :bb:cfg:`cacheMaxBytes` sets a limit to the memory size of all caches.
@@ -0,0 +1 @@
+The build request collapser now groups new build requests by builder, loads the unclaimed requests, sourcestamps and buildset properties it needs once, compares requests with precomputed keys when using the default collapse function, and claims and completes the collapsed requests in a single database call.
@@ -0,0 +1 @@
+Added the ``async_driver`` key of :bb:cfg:`db`, which runs the database queries with an asyncio driver such as ``asyncpg`` or ``aiosqlite`` instead of a thread pool, when the master runs with the asyncio reactor.
@@ -0,0 +1 @@
+``LogsConnectorComponent.appendLog`` now writes all chunks of a log update and the new line count in a single database transaction.
@@ -0,0 +1 @@
+The database pool now records the time each database function waits for a connection and runs, which are reported with the other :bb:cfg:`metrics` and by the new ``/dbpool`` and ``/dbpool/queries`` endpoints of the REST API.
@@ -0,0 +1 @@
+Directory uploads are now streamed: the worker produces the archive while sending it and the master extracts it while receiving it, without temporary archive files.
@@ -0,0 +1 @@
+Uploaded directories are now extracted in a thread pool instead of blocking the master, see :bb:cfg:`directoryUnpackThreads`.
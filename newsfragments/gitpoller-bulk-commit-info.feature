@@ -0,0 +1 @@
+``GitPoller`` now extracts the metadata of new commits with a single ``git log`` invocation per batch of 500 commits, instead of spawning five ``git`` processes per commit.
@@ -0,0 +1 @@
+The commands of a ``LocalWorker`` hand their buffered output over to the master directly, in the same format as the updates of the msgpack protocol.
@@ -0,0 +1 @@
+The master now keeps the decoded lines of recently appended log chunks in a cache bounded by ``c['logChunkCacheSize']`` (16 MiB by default), so that the web UI following running logs no longer reads and decompresses the same chunks from the database on every request.
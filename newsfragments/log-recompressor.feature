@@ -0,0 +1 @@
+Added the :py:class:`~buildbot.plugins.util.LogRecompressor` service, which merges and recompresses the small chunks of finished logs in the background, within a limit on the data read and on the time spent, and reports the space saved as metrics.
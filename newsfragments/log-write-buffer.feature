@@ -0,0 +1 @@
+Added :bb:cfg:`logWriteBufferSize` and :bb:cfg:`logWriteBufferTime` to coalesce log writes to the database.
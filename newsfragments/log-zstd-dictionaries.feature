@@ -0,0 +1 @@
+Added the ``zstd-dict`` value of :bb:cfg:`logCompressionMethod`, which compresses log chunks with zstd dictionaries trained on the existing logs of each builder, or of all builders. Dictionaries are trained by the :ref:`LogRecompressor` service with its new ``train_dictionaries`` parameter.
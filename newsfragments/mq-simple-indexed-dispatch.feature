@@ -0,0 +1 @@
+Improved performance of the ``simple`` message queue when there are many consumers: messages are now dispatched through an index of routing key filters instead of checking every consumer.
@@ -0,0 +1 @@
+:bb:step:`MultipleFileUpload` can now run several uploads at the same time with the ``parallelUploads`` argument, and send small files in a single archive with the ``packSmallFiles`` argument.
@@ -0,0 +1 @@
+Reporters now share the build details fetched for an event, so a finished build causes a single fetch of its buildrequest, buildset, builder, properties, steps and logs regardless of how many reporters and generators are configured. Generators are also looked up through an index of their wanted event keys instead of checking each of them on every event.
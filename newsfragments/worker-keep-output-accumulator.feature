@@ -0,0 +1 @@
+Collecting the stdout or stderr of a command with ``collectStdout`` or ``collectStderr`` now takes time linear with the size of the output, and the new ``collect_max_memory`` argument of ``RemoteCommand``, ``RemoteShellCommand`` and ``makeRemoteShellCommand`` writes the collected output to a temporary file once it exceeds the given number of characters.
@@ -0,0 +1 @@
+The worker splits command output in lines several times faster, by only running the newline regex over output which contains characters starting a newline sequence.
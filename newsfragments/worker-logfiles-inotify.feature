@@ -0,0 +1 @@
+On Linux, the worker now reads the ``logfiles`` of a command as soon as inotify reports a change instead of polling them every 2 seconds, and reads them in larger chunks.
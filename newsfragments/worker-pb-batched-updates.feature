@@ -0,0 +1 @@
+Workers connected with the PB protocol now send all their buffered command output in a single ``update`` call instead of one call per output chunk, and the master no longer splits again the lines sent by such workers.
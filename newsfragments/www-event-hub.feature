@@ -0,0 +1 @@
+WebSocket and server-sent events clients now share message queue subscriptions: each distinct path is consumed once, and each event is JSON-encoded once per protocol instead of once per connection.
@@ -0,0 +1 @@
+WebSocket and server-sent events clients that do not read their events fast enough no longer make the master buffer unbounded data: events are queued up to ``c['www']['event_queue_high_watermark']`` bytes, after which the client is disconnected or, with ``c['www']['event_queue_overflow']`` set to ``'coalesce'``, the events are coalesced into change notifications.
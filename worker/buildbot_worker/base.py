@@ -185,7 +185,7 @@ class BotBase(service.MultiService):
         self.buffer_size = 64 * 1024
         self.buffer_timeout = 5
         self.max_line_length = 4096
-        self.newline_re = r'(\r\n|\r(?=.)|\033\[u|\033\[[0-9]+;[0-9]+[Hf]|\033\[2J|\x08+)'
+        self.newline_re = lineboundaries.DEFAULT_NEWLINE_RE
 
     # for testing purposes
     def setOsReleaseFile(self, os_release_file):
@@ -257,6 +257,9 @@ class BotBase(service.MultiService):
         files['version'] = self.remote_getVersion()
         files['worker_commands'] = self.remote_getCommands()
         files['delete_leftover_dirs'] = self.delete_leftover_dirs
+        # the output updates only contain whole lines, the master does not
+        # need to split them again
+        files['whole_line_updates'] = True
         return files
 
     def remote_getVersion(self):
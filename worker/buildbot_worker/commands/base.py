@@ -25,7 +25,7 @@ from buildbot_worker.exceptions import AbandonChain
 from buildbot_worker.interfaces import IWorkerCommand
 
 # The following identifier should be updated each time this file is changed
-command_version = "3.3"
+command_version = "3.4"
 
 # version history:
 #  >=1.17: commands are interruptable
@@ -71,6 +71,7 @@ command_version = "3.3"
 #  >= 3.1: rmfile command added to remove a file
 #  >= 3.2: shell command now reports failure reason in case the command timed out.
 #  >= 3.3: shell command now supports max_lines parameter.
+#  >= 3.4: uploadDirectory command supports the members parameter.
 
 
 @implementer(IWorkerCommand)
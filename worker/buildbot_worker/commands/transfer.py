@@ -15,7 +15,7 @@
 
 import os
 import tarfile
-import tempfile
+import threading
 
 from twisted.internet import defer
 from twisted.python import log
@@ -185,7 +185,142 @@ class WorkerFileUploadCommand(TransferCommand):
         return self.protocol_command.protocol_update_upload_file_write(self.writer, data)
 
 
+class _TarStream:
+    """
+    Read-only file object producing a tar archive of a directory while it is
+    read, so that no temporary archive is needed.  The archive is written by a
+    thread, which waits while two blocks of blocksize bytes are ready to be
+    read.
+
+    If members is given, the archive contains only these (name, arcname)
+    pairs instead, with names relative to path.
+    """
+
+    def __init__(self, path, compress, blocksize, members=None):
+        if compress == 'bz2':
+            mode = 'w|bz2'
+        elif compress == 'gz':
+            mode = 'w|gz'
+        else:
+            mode = 'w|'
+
+        self.blocksize = blocksize
+        self._output = bytearray()
+        self._output_limit = 2 * blocksize
+        self._lock = threading.Condition()
+        self._thread = None
+        self._finished = False
+        self._closed = False
+        self._error = None
+        self._archive = tarfile.open(mode=mode, fileobj=self)
+        if members is None:
+            self._members = self._add(path, '')
+        else:
+            self._members = self._add_members(path, members)
+        # add the top-level entry now, so that a missing directory is
+        # reported before the upload starts
+        next(self._members, None)
+
+    def write(self, data):
+        # called by the archive in the archiving thread, with the (compressed)
+        # archive data
+        with self._lock:
+            if self._finished:
+                # the archive is flushed when garbage collected after a failure
+                return
+            while (
+                self._thread is not None
+                and len(self._output) >= self._output_limit
+                and not self._closed
+            ):
+                self._lock.wait()
+            if self._closed:
+                raise _TarStreamClosed()
+            self._output += data
+            self._lock.notify_all()
+
+    def read(self, size):
+        if self._thread is None:
+            self._thread = threading.Thread(
+                target=self._archive_members, name='buildbot-worker-tar', daemon=True
+            )
+            self._thread.start()
+
+        with self._lock:
+            while len(self._output) < size and not self._finished:
+                self._lock.wait()
+            if self._error is not None and not self._output:
+                raise self._error
+            data = bytes(self._output[:size])
+            del self._output[:size]
+            self._lock.notify_all()
+        return data
+
+    def close(self):
+        with self._lock:
+            self._closed = True
+            self._lock.notify_all()
+        if self._thread is None:
+            self._members.close()
+            self._finished = True
+
+    def _archive_members(self):
+        error = None
+        try:
+            for _ in self._members:
+                pass
+            self._archive.close()
+        except _TarStreamClosed:
+            pass
+        except Exception as e:
+            error = e
+        with self._lock:
+            self._finished = True
+            self._error = error
+            self._lock.notify_all()
+
+    def _add_members(self, path, members):
+        for name, arcname in members:
+            yield from self._add(os.path.join(path, os.path.expanduser(name)), arcname)
+
+    def _add(self, name, arcname):
+        # equivalent of TarFile.add(), yielding after each member
+        tarinfo = self._archive.gettarinfo(name, arcname)
+        if tarinfo is None:
+            # unsupported file type, skipped like TarFile.add() does
+            return
+        if tarinfo.isreg():
+            self._add_file_data(name, tarinfo)
+        else:
+            self._archive.addfile(tarinfo)
+        yield
+        if tarinfo.isdir():
+            for f in sorted(os.listdir(name)):
+                yield from self._add(os.path.join(name, f), os.path.join(arcname, f))
+
+    def _add_file_data(self, name, tarinfo):
+        with open(name, 'rb') as f:
+            self._archive.addfile(tarinfo, f)
+
+
+class _TarStreamClosed(Exception):
+    pass
+
+
 class WorkerDirectoryUploadCommand(WorkerFileUploadCommand):
+    """
+    Upload a directory from worker to build master, as a tar archive
+    Arguments:
+
+        - ['path']:      path of the directory to read from
+        - ['writer']:    RemoteReference to a buildbot_worker.protocols.base.FileWriterProxy object
+        - ['maxsize']:   max size (in bytes) of the archive to write
+        - ['blocksize']: max size for each data block
+        - ['compress']:  None, 'gz' or 'bz2'
+        - ['members']:   optional list of [name, arcname] pairs to archive instead of the
+                         whole directory, with names relative to path
+    """
+
     debug = False
     requiredArgs = ['path', 'writer', 'blocksize']
 
@@ -195,8 +330,10 @@ class WorkerDirectoryUploadCommand(WorkerFileUploadCommand):
         self.remaining = args['maxsize']
         self.blocksize = args['blocksize']
         self.compress = args['compress']
+        self.members = args.get('members')
         self.stderr = None
         self.rc = 0
+        self.fp = None
 
     def start(self):
         if self.debug:
@@ -205,30 +342,16 @@ class WorkerDirectoryUploadCommand(WorkerFileUploadCommand):
         if self.debug:
             self.log_msg(f"path: {self.path!r}")
 
-        # Create temporary archive
-        fd, self.tarname = tempfile.mkstemp(prefix='buildbot-transfer-')
-        self.fp = os.fdopen(fd, "rb+")
-        if self.compress == 'bz2':
-            mode = 'w|bz2'
-        elif self.compress == 'gz':
-            mode = 'w|gz'
-        else:
-            mode = 'w'
-
-        with tarfile.open(mode=mode, fileobj=self.fp) as archive:
-            try:
-                archive.add(self.path, '')
-            except OSError as e:
-                # if directory does not exist, bail out with an error
-                self.stderr = f"Cannot read directory '{self.path}' for upload: {e}"
-                self.rc = 1
-                archive.close()  # need to close it before self.finished() runs below
-                d = defer.succeed(False)
-                d.addCallback(self.finished)
-                return d
-
-        # Transfer it
-        self.fp.seek(0)
+        # The archive is produced while it is sent
+        try:
+            self.fp = _TarStream(self.path, self.compress, self.blocksize, self.members)
+        except OSError as e:
+            # if directory does not exist, bail out with an error
+            self.stderr = f"Cannot read directory '{self.path}' for upload: {e}"
+            self.rc = 1
+            d = defer.succeed(False)
+            d.addCallback(self.finished)
+            return d
 
         self.sendStatus([('header', f"sending {self.path}\n")])
 
@@ -246,14 +369,22 @@ class WorkerDirectoryUploadCommand(WorkerFileUploadCommand):
             d1.addCallback(lambda ignored: res)
             return d1
 
-        d.addCallback(unpack)
+        def write_err(f):
+            self.rc = 1
+            if f.check(OSError):
+                # a file changed or disappeared while being archived
+                self.stderr = f"Cannot read directory '{self.path}' for upload: {f.value}"
+                return None
+            return f
+
+        d.addCallbacks(unpack, write_err)
         d.addBoth(self.finished)
         return d
 
     def finished(self, res):
-        self.fp.close()
-        self.fp = None
-        os.remove(self.tarname)
+        if self.fp is not None:
+            self.fp.close()
+            self.fp = None
         return TransferCommand.finished(self, res)
 
     def do_protocol_write(self, data):
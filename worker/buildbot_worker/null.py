@@ -17,11 +17,20 @@ from twisted.internet import defer
 
 from buildbot_worker.base import WorkerBase
 from buildbot_worker.pb import BotPbLike
+from buildbot_worker.pb import ProtocolCommandPb
 from buildbot_worker.pb import WorkerForBuilderPbLike
 
 
+class ProtocolCommandNull(ProtocolCommandPb):
+    def protocol_send_update_message(self, message):
+        # the master runs in the same process: the buffered updates are handed over as they are,
+        # in the same format as the updates of the msgpack protocol
+        d = self.command_ref.callRemote("update_msgpack", message)
+        d.addErrback(self._ack_failed, "ProtocolCommandNull.send_update")
+
+
 class WorkerForBuilderNull(WorkerForBuilderPbLike):
-    pass
+    ProtocolCommand = ProtocolCommandNull
 
 
 class BotNull(BotPbLike):
@@ -151,6 +151,8 @@ class ProtocolCommandPb(ProtocolCommandBase):
         # (key, (text, newline_indexes, line_times))
         # only key and text is sent to master in PB protocol
         # if message is not log, simply sends the value (e.g.[("rc", 0)])
+        # the whole buffered message is sent in a single remote call
+        updates = []
         for key, value in message:
             if key in ['stdout', 'stderr', 'header']:
                 # the update[1]=0 comes from the leftover 'updateNum', which the
@@ -162,9 +164,9 @@ class ProtocolCommandPb(ProtocolCommandBase):
                 update = [{key: (logname, data[0])}, 0]
             else:
                 update = [{key: value}, 0]
-            updates = [update]
-            d = self.command_ref.callRemote("update", updates)
-            d.addErrback(self._ack_failed, "ProtocolCommandBase.send_update")
+            updates.append(update)
+        d = self.command_ref.callRemote("update", updates)
+        d.addErrback(self._ack_failed, "ProtocolCommandBase.send_update")
 
     def protocol_notify_on_disconnect(self):
         self.command_ref.notifyOnDisconnect(self.on_lost_remote_step)
@@ -20,6 +20,7 @@ Support for running 'shell commands'
 from __future__ import annotations
 
 import datetime
+import functools
 import os
 import pprint
 import re
@@ -39,6 +40,8 @@ from twisted.internet import reactor
 from twisted.internet import task
 from twisted.python import log
 from twisted.python import runtime
+from twisted.python.failure import Failure
+from twisted.python.filepath import FilePath
 from twisted.python.win32 import quoteArguments
 
 from buildbot_worker import util
@@ -46,6 +49,7 @@ from buildbot_worker.compat import bytes2NativeString
 from buildbot_worker.compat import bytes2unicode
 from buildbot_worker.compat import unicode2bytes
 from buildbot_worker.exceptions import AbandonChain
+from buildbot_worker.util.output_accumulator import OutputAccumulator
 
 if runtime.platformType == 'posix':
     from twisted.internet.process import Process
@@ -93,13 +97,140 @@ def shell_quote(cmd_list, unicode_encoding='utf-8'):
     return " ".join(quote(e) for e in cmd_list)
 
 
+class _LogFileNotifier:
+    """
+    Dispatches the inotify events of the directories containing watched log
+    files to their LogFileWatcher instances, sharing a single inotify file
+    descriptor between all the watchers of the worker.
+
+    The inotify file descriptor is closed when the last watcher is removed.
+    """
+
+    def __init__(self):
+        from twisted.internet import inotify
+
+        self.inotify = inotify
+        self.mask = (
+            inotify.IN_MODIFY
+            | inotify.IN_CLOSE_WRITE
+            | inotify.IN_CREATE
+            | inotify.IN_DELETE
+            | inotify.IN_MOVED_FROM
+            | inotify.IN_MOVED_TO
+            | inotify.IN_DELETE_SELF
+            | inotify.IN_MOVE_SELF
+        )
+        self.notifier = inotify.INotify()
+        self.notifier.startReading()
+        self.closed = False
+        # directory -> list of LogFileWatcher
+        self.watchers = {}
+
+    def add(self, watcher):
+        dirname = os.path.dirname(os.path.abspath(watcher.logfile))
+        if dirname not in self.watchers:
+            try:
+                # raises INotifyError if the directory does not exist yet
+                self.notifier.watch(
+                    FilePath(dirname),
+                    mask=self.mask,
+                    callbacks=[functools.partial(self._notified, dirname)],
+                )
+            except Exception:
+                if not self.watchers:
+                    self._close()
+                raise
+            self.watchers[dirname] = []
+        self.watchers[dirname].append(watcher)
+
+    def remove(self, watcher):
+        dirname = os.path.dirname(os.path.abspath(watcher.logfile))
+        watchers = self.watchers.get(dirname, [])
+        if watcher in watchers:
+            watchers.remove(watcher)
+        if not watchers and dirname in self.watchers:
+            del self.watchers[dirname]
+            self._ignore(dirname)
+        if not self.watchers:
+            self._close()
+
+    def _ignore(self, dirname):
+        try:
+            self.notifier.ignore(FilePath(dirname))
+        except KeyError:
+            # inotify already dropped the watch of a deleted directory
+            pass
+
+    def _close(self):
+        global _log_file_notifier
+        if _log_file_notifier is self:
+            _log_file_notifier = None
+        if not self.closed:
+            self.closed = True
+            # closes the file descriptor and removes it from the reactor right away
+            self.notifier.connectionLost(Failure(error.ConnectionDone()))
+
+    def _lost(self, watchers):
+        for w in watchers:
+            # the watcher may have been stopped in the meantime
+            if w.notifier is self:
+                w.notifyLost()
+
+    def _notified(self, dirname, ignored, filepath, mask):
+        if dirname not in self.watchers:
+            # pending event of a directory that is not watched anymore
+            return
+        watchers = self.watchers[dirname]
+        if mask & self.inotify.IN_DELETE_SELF:
+            # twisted closes the inotify file descriptor when any watched
+            # directory is deleted, so every watcher has to be moved to a new
+            # notifier
+            lost = [w for ws in self.watchers.values() for w in ws]
+            self.watchers = {}
+            self._close()
+            # twisted still removes the watch from the closed file descriptor
+            # after this callback, so the new notifier must not reuse it before
+            reactor.callLater(0, self._lost, lost)
+            return
+
+        if mask & (self.inotify.IN_IGNORED | self.inotify.IN_MOVE_SELF):
+            # the kernel dropped the watch, or the directory was moved away;
+            # the watchers start over on whatever directory has the path now
+            del self.watchers[dirname]
+            self._ignore(dirname)
+            if not self.watchers:
+                self._close()
+            self._lost(watchers)
+            return
+
+        name = filepath.asBytesMode().basename()
+        for w in list(watchers):
+            if w.basename == name:
+                try:
+                    w.poll()
+                except Exception:
+                    log.err(None, f"while reading {w.logfile}")
+
+
+_log_file_notifier = None
+
+
+def _get_log_file_notifier():
+    global _log_file_notifier
+    if _log_file_notifier is None:
+        _log_file_notifier = _LogFileNotifier()
+    return _log_file_notifier
+
+
 class LogFileWatcher:
     POLL_INTERVAL = 2
+    READ_SIZE = 256 * 1024
 
-    def __init__(self, command, name, logfile, follow=False, poll=True):
+    def __init__(self, command, name, logfile, follow=False, poll=True, notify=True):
         self.command = command
         self.name = name
         self.logfile = logfile
+        self.basename = os.fsencode(os.path.basename(logfile))
         decoderFactory = getincrementaldecoder(self.command.unicode_encoding)
         self.logDecode = decoderFactory(errors='replace')
 
@@ -114,19 +245,47 @@ class LogFileWatcher:
         # added since we started watching
         self.follow = follow
 
-        # every 2 seconds we check on the file again
+        # on Linux we read the file as soon as inotify reports a change,
+        # elsewhere every 2 seconds we check on the file again
+        self.notify = notify and runtime.platform.supportsINotify()
+        self.notifier = None
         self.poller = task.LoopingCall(self.poll) if poll else None
 
     def start(self):
-        self.poller.start(self.POLL_INTERVAL).addErrback(self._cleanupPoll)
+        if self.notify and self._startNotify():
+            return
+        self._startPoll()
+
+    def _startNotify(self):
+        try:
+            notifier = _get_log_file_notifier()
+            notifier.add(self)
+        except Exception as e:
+            self.command.log_msg(f"cannot watch {self.logfile} with inotify, polling instead: {e}")
+            return False
+        self.notifier = notifier
+        return True
+
+    def _startPoll(self):
+        if self.poller is not None and not self.poller.running:
+            self.poller.start(self.POLL_INTERVAL).addErrback(self._cleanupPoll)
+
+    def notifyLost(self):
+        self.notifier = None
+        # the file may have changed before the watch was lost
+        self.poll()
+        self.start()
 
     def _cleanupPoll(self, err):
         log.err(err, msg="Polling error")
         self.poller = None
 
     def stop(self):
+        if self.notifier is not None:
+            self.notifier.remove(self)
+            self.notifier = None
         self.poll()
-        if self.poller is not None:
+        if self.poller is not None and self.poller.running:
             self.poller.stop()
         if self.started:
             self.f.close()
@@ -164,7 +323,7 @@ class LogFileWatcher:
         self.f.seek(self.f.tell(), 0)
 
         while True:
-            data = self.f.read(10000)
+            data = self.f.read(self.READ_SIZE)
             if not data:
                 return
             decodedData = self.logDecode.decode(data)
@@ -407,6 +566,8 @@ class RunProcess:
         self.killTimer = None
         self.keepStdout = keepStdout
         self.keepStderr = keepStderr
+        self._stdout = None
+        self._stderr = None
         self.job_object = None
 
         assert usePTY in (
@@ -449,6 +610,18 @@ class RunProcess:
     def log_msg(self, msg):
         log.msg(f"(command {self.command_id}): {msg}")
 
+    @property
+    def stdout(self):
+        if self._stdout is None:
+            return None
+        return self._stdout.getvalue()
+
+    @property
+    def stderr(self):
+        if self._stderr is None:
+            return None
+        return self._stderr.getvalue()
+
     def __repr__(self):
         return f"<{self.__class__.__name__} '{self.fake_command}'>"
 
@@ -456,9 +629,9 @@ class RunProcess:
         # return a Deferred which fires (with the exit code) when the command
         # completes
         if self.keepStdout:
-            self.stdout = ""
+            self._stdout = OutputAccumulator()
         if self.keepStderr:
-            self.stderr = ""
+            self._stderr = OutputAccumulator()
         self.deferred = defer.Deferred()
         try:
             self._startCommand()
@@ -689,7 +862,7 @@ class RunProcess:
             self.send_update([('stdout', data)])
 
         if self.keepStdout:
-            self.stdout += data
+            self._stdout.append(data)
         if self.ioTimeoutTimer:
             self.ioTimeoutTimer.reset(self.timeout)
 
@@ -699,7 +872,7 @@ class RunProcess:
             self.send_update([('stderr', data)])
 
         if self.keepStderr:
-            self.stderr += data
+            self._stderr.append(data)
         if self.ioTimeoutTimer:
             self.ioTimeoutTimer.reset(self.timeout)
 
@@ -760,7 +933,8 @@ class RunProcess:
 
     def _check_max_lines(self, data):
         if self.max_lines is not None:
-            self.line_count += len(re.findall(r"\r\n|\r|\n", data))
+            # count the line endings like the r"\r\n|\r|\n" regex, without building a list
+            self.line_count += data.count('\n') + data.count('\r') - data.count('\r\n')
             if self.line_count > self.max_lines and not self.max_line_kill:
                 self.pp.transport.closeStdout()
                 self.max_line_kill = True
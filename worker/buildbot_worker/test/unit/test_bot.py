@@ -108,6 +108,7 @@ VERSION_ID="1"
                 "version": self.real_bot.remote_getVersion(),
                 "numcpus": multiprocessing.cpu_count(),
                 "delete_leftover_dirs": False,
+                "whole_line_updates": True,
             },
         )
 
@@ -127,6 +128,7 @@ VERSION_ID="1"
                 'worker_commands',
                 'version',
                 'delete_leftover_dirs',
+                'whole_line_updates',
             ]),
         )
 
@@ -165,6 +167,7 @@ VERSION_ID="1"
                 "version": self.real_bot.remote_getVersion(),
                 "numcpus": multiprocessing.cpu_count(),
                 "delete_leftover_dirs": False,
+                "whole_line_updates": True,
             },
         )
 
@@ -266,10 +269,15 @@ class TestWorkerForBuilder(command.CommandTestMixin, unittest.TestCase):
         self.assertEqual(
             st.actions,
             [
-                ['update', [[{'stdout': 'hello\n'}, 0]]],
-                ['update', [[{'rc': 0}, 0]]],
-                ['update', [[{'elapsed': 1}, 0]]],
-                ['update', [[{'header': 'headers\n'}, 0]]],
+                [
+                    'update',
+                    [
+                        [{'stdout': 'hello\n'}, 0],
+                        [{'rc': 0}, 0],
+                        [{'elapsed': 1}, 0],
+                        [{'header': 'headers\n'}, 0],
+                    ],
+                ],
                 ['complete', None],
             ],
         )
@@ -308,8 +316,7 @@ class TestWorkerForBuilder(command.CommandTestMixin, unittest.TestCase):
         self.assertEqual(
             st.actions,
             [
-                ['update', [[{'rc': -1}, 0]]],
-                ['update', [[{'header': 'headerskilling\n'}, 0]]],
+                ['update', [[{'rc': -1}, 0], [{'header': 'headerskilling\n'}, 0]]],
                 ['complete', None],
             ],
         )
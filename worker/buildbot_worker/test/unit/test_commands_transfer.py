@@ -18,6 +18,7 @@ import os
 import re
 import shutil
 import tarfile
+import tempfile
 
 from twisted.internet import defer
 from twisted.internet import reactor
@@ -360,6 +361,113 @@ class TestWorkerDirectoryUpload(CommandTestMixin, unittest.TestCase):
     def test_simple_gz(self):
         return self.test_simple('gz')
 
+    @defer.inlineCallbacks
+    def test_streamed(self):
+        # the archive is produced while it is sent, without a temporary file
+        self.patch(tempfile, 'mkstemp', lambda *args, **kwargs: self.fail('temporary file'))
+        os.makedirs(os.path.join(self.datadir, 'sub', 'empty'))
+        big = os.urandom(5000)
+        with open(os.path.join(self.datadir, 'sub', 'big'), mode="wb") as f:
+            f.write(big)
+
+        self.fakemaster.keep_data = True
+        self.fakemaster.count_writes = True
+        self.make_command(
+            transfer.WorkerDirectoryUploadCommand,
+            {
+                'workdir': 'workdir',
+                'path': self.datadir,
+                'writer': FakeRemote(self.fakemaster),
+                'maxsize': None,
+                'blocksize': 512,
+                'compress': None,
+            },
+        )
+
+        yield self.run_command()
+
+        updates = self.get_updates()
+        writes = [u for u in updates if isinstance(u, str) and u.startswith('write')]
+        self.assertTrue(all(w == 'write 512' for w in writes[:-1]))
+        self.assertIn('unpack', updates)
+        self.assertIn(('rc', 0), updates)
+
+        with tarfile.open(fileobj=io.BytesIO(self.fakemaster.data), mode="r") as a:
+            got_names = sorted(n.rstrip('/') or '.' for n in a.getnames())
+            self.assertEqual(got_names, ['.', 'aa', 'bb', 'sub', 'sub/big', 'sub/empty'])
+            self.assertEqual(a.extractfile('sub/big').read(), big)
+            self.assertEqual(a.extractfile('bb').read(), b"and a little b" * 17)
+
+    @defer.inlineCallbacks
+    def test_members(self):
+        self.fakemaster.keep_data = True
+        self.make_command(
+            transfer.WorkerDirectoryUploadCommand,
+            {
+                'workdir': 'workdir',
+                'path': self.datadir,
+                'writer': FakeRemote(self.fakemaster),
+                'maxsize': None,
+                'blocksize': 512,
+                'compress': None,
+                'members': [['bb', '0'], ['aa', '1']],
+            },
+        )
+
+        yield self.run_command()
+
+        self.assertIn(('rc', 0), self.get_updates())
+
+        with tarfile.open(fileobj=io.BytesIO(self.fakemaster.data), mode="r") as a:
+            self.assertEqual(a.getnames(), ['0', '1'])
+            self.assertEqual(a.extractfile('0').read(), b"and a little b" * 17)
+
+    @defer.inlineCallbacks
+    def test_file_truncated_while_sent(self):
+        self.fakemaster.keep_data = True
+        self.make_command(
+            transfer.WorkerDirectoryUploadCommand,
+            {
+                'workdir': 'workdir',
+                'path': self.datadir,
+                'writer': FakeRemote(self.fakemaster),
+                'maxsize': None,
+                'blocksize': 512,
+                'compress': None,
+            },
+        )
+
+        # the file shrinks between its header and its data being archived
+        orig_add_file_data = transfer._TarStream._add_file_data
+
+        def add_file_data(stream, name, tarinfo):
+            if name.endswith('aa'):
+                with open(name, 'r+b') as f:
+                    f.truncate(10)
+            return orig_add_file_data(stream, name, tarinfo)
+
+        self.patch(transfer._TarStream, '_add_file_data', add_file_data)
+
+        yield self.run_command()
+
+        updates = dict(u for u in self.get_updates() if isinstance(u, tuple))
+        self.assertEqual(updates['rc'], 1)
+        self.assertIn("unexpected end of data", updates['stderr'])
+        self.assertNotIn('unpack', self.get_updates())
+
+    def test_stream_closed_while_archiving(self):
+        with open(os.path.join(self.datadir, 'big'), mode="wb") as f:
+            f.write(b'x' * 100000)
+
+        stream = transfer._TarStream(self.datadir, None, 512)
+        self.assertEqual(len(stream.read(512)), 512)
+        # the archiving thread waits for the archive data to be read
+        self.assertLessEqual(len(stream._output), 2 * 512 + 10240)
+
+        stream.close()
+        stream._thread.join(10)
+        self.assertFalse(stream._thread.is_alive())
+
     # except bz2 can't operate in stream mode on py24
 
     @defer.inlineCallbacks
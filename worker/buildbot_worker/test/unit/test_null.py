@@ -0,0 +1,112 @@
+# This file is part of Buildbot.  Buildbot is free software: you can
+# redistribute it and/or modify it under the terms of the GNU General Public
+# License as published by the Free Software Foundation, version 2.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+# FOR A PARTICULAR PURPOSE.  See the GNU General Public License for more
+# details.
+#
+# You should have received a copy of the GNU General Public License along with
+# this program; if not, write to the Free Software Foundation, Inc., 51
+# Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+#
+# Copyright Buildbot Team Members
+
+import os
+import shutil
+
+from twisted.internet import defer
+from twisted.trial import unittest
+
+from buildbot_worker import null
+from buildbot_worker.test.fake.remote import FakeRemote
+from buildbot_worker.test.fake.runprocess import Expect
+from buildbot_worker.test.util import command
+
+
+class FakeStep:
+    "A fake master-side RemoteCommand that records the updates of a local worker."
+
+    def __init__(self):
+        self.finished_d = defer.Deferred()
+        self.actions = []
+
+    def wait_for_finish(self):
+        return self.finished_d
+
+    def remote_update_msgpack(self, updates):
+        self.actions.append(["update_msgpack", updates])
+
+    def remote_complete(self, f):
+        self.actions.append(["complete", f])
+        self.finished_d.callback(None)
+
+
+class TestWorkerForBuilderNull(command.CommandTestMixin, unittest.TestCase):
+    @defer.inlineCallbacks
+    def setUp(self):
+        self.basedir = os.path.abspath("basedir")
+        if os.path.exists(self.basedir):
+            shutil.rmtree(self.basedir)
+        os.makedirs(self.basedir)
+
+        self.bot = null.BotNull(self.basedir, False)
+        self.bot.startService()
+        self.addCleanup(self.bot.stopService)
+
+        builders = yield self.bot.remote_setBuilderList([('wfb', 'wfb')])
+        self.wfb = FakeRemote(builders['wfb'])
+
+        self.setUpCommand()
+
+    def tearDown(self):
+        if os.path.exists(self.basedir):
+            shutil.rmtree(self.basedir)
+
+    @defer.inlineCallbacks
+    def test_startCommand(self):
+        st = FakeStep()
+
+        self.patch_runprocess(
+            Expect(['echo', 'hello'], os.path.join(self.basedir, 'wfb', 'workdir'))
+            .update('header', 'headers')
+            .update('stdout', 'hello\nwor')
+            .update('stdout', 'ld\n')
+            .update('rc', 0)
+            .exit(0)
+        )
+
+        yield self.wfb.callRemote(
+            "startCommand",
+            FakeRemote(st),
+            "13",
+            "shell",
+            {"command": ['echo', 'hello'], "workdir": 'workdir'},
+        )
+        yield st.wait_for_finish()
+
+        # the output is buffered like for other workers, and the buffered updates are handed
+        # over with their newline indexes
+        self.assertEqual(len(st.actions), 2)
+        action, args = st.actions[0]
+        self.assertEqual(action, 'update_msgpack')
+        updates = []
+        for key, value in args:
+            if key in ('stdout', 'header'):
+                # drop the line times
+                value = value[:2]
+            elif key == 'elapsed':
+                value = None
+            updates.append((key, value))
+
+        self.assertEqual(
+            updates,
+            [
+                ('stdout', ('hello\nworld\n', [5, 11])),
+                ('rc', 0),
+                ('elapsed', None),
+                ('header', ('headers\n', [7])),
+            ],
+        )
+        self.assertEqual(st.actions[-1], ['complete', None])
@@ -27,6 +27,7 @@ from twisted.internet import task
 from twisted.python import log
 from twisted.python import runtime
 from twisted.python import util
+from twisted.python.filepath import FilePath
 from twisted.trial import unittest
 
 from buildbot_worker import runprocess
@@ -1141,3 +1142,121 @@ class TestLogFileWatcher(BasedirMixin, unittest.TestCase):
         finally:
             lf.stop()
             os.remove(f.name)
+
+    @defer.inlineCallbacks
+    def wait_for(self, condition):
+        for _ in range(100):
+            if condition():
+                return
+            yield task.deferLater(reactor, 0.01, lambda: None)
+
+    def skip_without_inotify(self):
+        if not runtime.platform.supportsINotify():
+            raise unittest.SkipTest("inotify is not supported on this platform")
+
+    @defer.inlineCallbacks
+    def test_notify(self):
+        self.skip_without_inotify()
+        os.makedirs(self.basedir)
+        rp = self.makeRP()
+        test_filename = os.path.join(self.basedir, 'test_runprocess_test_notify.log')
+        lf = runprocess.LogFileWatcher(rp, 'test', test_filename, poll=False)
+        lf.start()
+        try:
+            self.assertIsNotNone(lf.notifier)
+            with open(test_filename, 'wb') as f:
+                f.write(b'hello\n')
+
+            # the change is picked up without waiting for a poll interval
+            yield self.wait_for(lambda: self.updates)
+            self.assertEqual(self.updates, [('log', ('test', 'hello\n'))])
+        finally:
+            lf.stop()
+        self.assertIsNone(lf.notifier)
+        # the inotify file descriptor is closed with the last watcher
+        self.assertIsNone(runprocess._log_file_notifier)
+
+    def test_notify_missing_directory(self):
+        rp = self.makeRP()
+        test_filename = os.path.join(self.basedir, 'missing', 'test.log')
+        lf = runprocess.LogFileWatcher(rp, 'test', test_filename)
+        lf.start()
+        try:
+            # the directory cannot be watched, so the watcher polls instead
+            self.assertIsNone(lf.notifier)
+            self.assertTrue(lf.poller.running)
+        finally:
+            lf.stop()
+        self.assertFalse(lf.poller.running)
+        self.assertIsNone(runprocess._log_file_notifier)
+
+    @defer.inlineCallbacks
+    def test_notify_directory_deleted(self):
+        self.skip_without_inotify()
+        self.patch(runprocess.LogFileWatcher, 'POLL_INTERVAL', 0.01)
+        deleted_dir = os.path.join(self.basedir, 'deleted')
+        kept_dir = os.path.join(self.basedir, 'kept')
+        os.makedirs(deleted_dir)
+        os.makedirs(kept_dir)
+        rp = self.makeRP()
+        deleted_filename = os.path.join(deleted_dir, 'test.log')
+        kept_filename = os.path.join(kept_dir, 'test.log')
+        deleted_lf = runprocess.LogFileWatcher(rp, 'deleted', deleted_filename)
+        kept_lf = runprocess.LogFileWatcher(rp, 'kept', kept_filename, poll=False)
+        deleted_lf.start()
+        kept_lf.start()
+        try:
+            notifier = kept_lf.notifier
+            self.assertIs(deleted_lf.notifier, notifier)
+
+            os.rmdir(deleted_dir)
+            yield self.wait_for(lambda: kept_lf.notifier is not notifier)
+
+            # the watcher of the deleted directory polls for it to come back
+            self.assertIsNone(deleted_lf.notifier)
+            self.assertTrue(deleted_lf.poller.running)
+            # the other watchers moved to a new inotify file descriptor
+            self.assertIsNotNone(kept_lf.notifier)
+
+            with open(kept_filename, 'wb') as f:
+                f.write(b'kept\n')
+            os.makedirs(deleted_dir)
+            with open(deleted_filename, 'wb') as f:
+                f.write(b'deleted\n')
+
+            yield self.wait_for(lambda: len(self.updates) == 2)
+            self.assertEqual(
+                sorted(self.updates),
+                [('log', ('deleted', 'deleted\n')), ('log', ('kept', 'kept\n'))],
+            )
+        finally:
+            deleted_lf.stop()
+            kept_lf.stop()
+        self.assertIsNone(runprocess._log_file_notifier)
+
+    @defer.inlineCallbacks
+    def test_notify_watch_ignored(self):
+        self.skip_without_inotify()
+        from twisted.internet import inotify
+
+        os.makedirs(self.basedir)
+        rp = self.makeRP()
+        test_filename = os.path.join(self.basedir, 'test.log')
+        lf = runprocess.LogFileWatcher(rp, 'test', test_filename, poll=False)
+        lf.start()
+        try:
+            notifier = lf.notifier
+            # the kernel drops the watch e.g. when the filesystem is unmounted
+            dirname = os.path.abspath(self.basedir)
+            notifier._notified(dirname, None, FilePath(dirname), inotify.IN_IGNORED)
+
+            # the watcher watches the directory again instead of going deaf
+            self.assertIsNotNone(lf.notifier)
+            self.assertIsNot(lf.notifier, notifier)
+            with open(test_filename, 'wb') as f:
+                f.write(b'hello\n')
+            yield self.wait_for(lambda: self.updates)
+            self.assertEqual(self.updates, [('log', ('test', 'hello\n'))])
+        finally:
+            lf.stop()
+        self.assertIsNone(runprocess._log_file_notifier)
@@ -128,5 +128,25 @@ class LBF(unittest.TestCase):
         self.assertEqual(self.lbf.append('123456789012', 4.0), None)
         self.assertEqual(self.lbf.flush(), ('5123456789012\n', [13], [3.0]))
 
+    def test_long_lines_after_newline(self):
+        """long lines following a complete line are split without losing symbols"""
+        self.assertEqual(
+            self.lbf.append('abc\n1234567890123456789012345\nxyz', 1.0),
+            ('abc\n1234567890123456789\n012345\n', [3, 23, 30], [1.0, 1.0, 1.0]),
+        )
+        self.assertEqual(self.lbf.flush(), ('xyz\n', [3], [1.0]))
+
     def test_empty_flush(self):
         self.assertEqual(self.lbf.flush(), None)
+
+
+class NewlineStartChars(unittest.TestCase):
+    def test_default_newline_re(self):
+        lbf = lineboundaries.LineBoundaryFinder(20, lineboundaries.DEFAULT_NEWLINE_RE)
+        self.assertEqual(lbf.newline_start_chars, ('\x08', '\r', '\x1b'))
+        self.assertEqual(lbf.append('a\r\nb\x1b[2Jc\n', 1.0), ('a\nb\nc\n', [1, 3, 5], [1.0] * 3))
+
+    def test_custom_newline_re(self):
+        lbf = lineboundaries.LineBoundaryFinder(20, r'(; )')
+        self.assertIsNone(lbf.newline_start_chars)
+        self.assertEqual(lbf.append('a; b\n', 1.0), ('a\nb\n', [1, 3], [1.0, 1.0]))
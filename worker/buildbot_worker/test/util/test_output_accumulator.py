@@ -0,0 +1,34 @@
+# This file is part of Buildbot.  Buildbot is free software: you can
+# redistribute it and/or modify it under the terms of the GNU General Public
+# License as published by the Free Software Foundation, version 2.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+# FOR A PARTICULAR PURPOSE.  See the GNU General Public License for more
+# details.
+#
+# You should have received a copy of the GNU General Public License along with
+# this program; if not, write to the Free Software Foundation, Inc., 51
+# Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+#
+# Copyright Buildbot Team Members
+
+
+from twisted.trial import unittest
+
+from buildbot_worker.util.output_accumulator import OutputAccumulator
+
+
+class TestOutputAccumulator(unittest.TestCase):
+    def test_empty(self):
+        acc = OutputAccumulator()
+        self.assertEqual(acc.getvalue(), '')
+
+    def test_append(self):
+        acc = OutputAccumulator()
+        acc.append('line 1\n')
+        acc.append('')
+        acc.append('line 2\r\n')
+        self.assertEqual(acc.getvalue(), 'line 1\nline 2\r\n')
+        acc.append('line 3')
+        self.assertEqual(acc.getvalue(), 'line 1\nline 2\r\nline 3')
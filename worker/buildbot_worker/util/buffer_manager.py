@@ -30,12 +30,10 @@ class BufferManager:
         new_line_text = previous_line_text + new_line_info[0]
 
         new_line_indexes = previous_line_info[1]
-        for index in new_line_info[1]:
-            new_line_indexes.append(len_previous_line_text + index)
+        new_line_indexes.extend(map(len_previous_line_text.__add__, new_line_info[1]))
 
         new_time_indexes = previous_line_info[2]
-        for time in new_line_info[2]:
-            new_time_indexes.append(time)
+        new_time_indexes.extend(new_line_info[2])
 
         return (new_line_text, new_line_indexes, new_time_indexes)
 
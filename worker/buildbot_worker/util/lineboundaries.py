@@ -15,20 +15,39 @@
 
 
 import re
+from itertools import accumulate
+from itertools import chain
 
 from twisted.logger import Logger
 
 log = Logger()
 
+# the newline regex used by the worker, and the characters all its matches start with
+DEFAULT_NEWLINE_RE = r'(\r\n|\r(?=.)|\033\[u|\033\[[0-9]+;[0-9]+[Hf]|\033\[2J|\x08+)'
+_DEFAULT_NEWLINE_START_CHARS = ('\x08', '\r', '\x1b')
+
 
 class LineBoundaryFinder:
-    __slots__ = ['max_line_length', 'newline_re', 'partial_line', 'warned', 'time']
+    __slots__ = [
+        'max_line_length',
+        'newline_re',
+        'newline_start_chars',
+        'partial_line',
+        'warned',
+        'time',
+    ]
 
     def __init__(self, max_line_length, newline_re):
         # split at reasonable line length.
         # too big lines will fill master's memory, and slow down the UI too much.
         self.max_line_length = max_line_length
         self.newline_re = re.compile(newline_re)
+        # most output contains none of the symbols starting a newline sequence, and checking
+        # for them is much cheaper than running the regex
+        if self.newline_re.pattern == DEFAULT_NEWLINE_RE:
+            self.newline_start_chars = _DEFAULT_NEWLINE_START_CHARS
+        else:
+            self.newline_start_chars = None
         self.partial_line = ""
         self.warned = False
         self.time = None
@@ -45,42 +64,26 @@ class LineBoundaryFinder:
             text = self.partial_line + text
             time_partial_line = self.time
 
-        text = self.newline_re.sub('\n', text)
+        if self.newline_start_chars is None or any(c in text for c in self.newline_start_chars):
+            text = self.newline_re.sub('\n', text)
 
-        lf_positions = self.get_lf_positions(text)
+        # str.split and the length computations below run in C, and in the common case the
+        # returned text is a single slice of the input instead of a join of every line
+        lines = text.split('\n')
+        partial_line = lines.pop()
 
-        ret_lines = []  # lines with appropriate number of symbols and their separators \n
-        ret_indexes = []  # ret_indexes is a list of '\n' symbols
-        ret_text_length = -1
-        ret_line_count = 0
-
-        first_position = 0
-        for position in lf_positions:
-            # finds too long lines and splits them, each element in ret_lines will be a line of
-            # appropriate length
-            while position - first_position >= self.max_line_length:
-                line = text[first_position : self.max_line_length - 1] + '\n'
-                ret_lines.append(line)
-                ret_line_count += 1
-                ret_text_length = ret_text_length + len(line)
-                ret_indexes.append(ret_text_length)
-                first_position = first_position + self.max_line_length
+        longest = max(len(partial_line), max(map(len, lines), default=0))
+        if longest >= self.max_line_length:
+            lines, partial_line = self.split_long_lines(lines, partial_line)
+            ret_text = '\n'.join(lines) + '\n' if lines else ''
+        else:
+            ret_text = text[: len(text) - len(partial_line)]
 
-            line = text[first_position : (position + 1)]
-            ret_lines.append(line)
-            ret_line_count += 1
-            ret_text_length = ret_text_length + len(line)
-            ret_indexes.append(ret_text_length)
-            first_position = position + 1
-
-        position = len(text)
-        while position - first_position >= self.max_line_length:
-            line = text[first_position : self.max_line_length - 1] + '\n'
-            ret_lines.append(line)
-            ret_text_length = ret_text_length + len(line)
-            ret_indexes.append(ret_text_length)
-            first_position = first_position + self.max_line_length - 1
+        # position of each '\n' is the cumulated length of the lines, plus their separators
+        ret_indexes = list(accumulate(chain([-1], map((1).__add__, map(len, lines)))))
+        del ret_indexes[0]
 
+        ret_line_count = len(lines)
         if had_partial_line:
             times = []
             if ret_line_count > 1:
@@ -89,28 +92,31 @@ class LineBoundaryFinder:
         else:
             line_times = ret_line_count * [time]
 
-        ret_text = "".join(ret_lines)
-
         if ret_text != '' or not had_partial_line:
             self.time = time
 
-        self.partial_line = text[first_position:position]
+        self.partial_line = partial_line
 
         if ret_text == '':
             return None
 
         return (ret_text, ret_indexes, line_times)
 
-    def get_lf_positions(self, text):
-        lf_position = 0
-        lf_positions = []
-        while lf_position != -1:
-            lf_position = text.find('\n', lf_position)
-            if lf_position < 0:
-                break
-            lf_positions.append(lf_position)
-            lf_position = lf_position + 1
-        return lf_positions
+    def split_long_lines(self, lines, partial_line):
+        # splits lines that are too long in lines of max_line_length - 1 symbols, without
+        # their separator.  Too long partial lines are split the same way, only their remainder
+        # stays partial
+        split_length = self.max_line_length - 1
+        ret_lines = []
+        for line in lines:
+            while len(line) >= self.max_line_length:
+                ret_lines.append(line[:split_length])
+                line = line[split_length:]
+            ret_lines.append(line)
+        while len(partial_line) >= self.max_line_length:
+            ret_lines.append(partial_line[:split_length])
+            partial_line = partial_line[split_length:]
+        return ret_lines, partial_line
 
     def flush(self):
         if self.partial_line != "":
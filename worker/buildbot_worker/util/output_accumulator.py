@@ -0,0 +1,36 @@
+# This file is part of Buildbot.  Buildbot is free software: you can
+# redistribute it and/or modify it under the terms of the GNU General Public
+# License as published by the Free Software Foundation, version 2.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+# FOR A PARTICULAR PURPOSE.  See the GNU General Public License for more
+# details.
+#
+# You should have received a copy of the GNU General Public License along with
+# this program; if not, write to the Free Software Foundation, Inc., 51
+# Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+#
+# Copyright Buildbot Team Members
+
+from __future__ import annotations
+
+
+class OutputAccumulator:
+    """
+    Keeps a copy of the output of a command, in time linear with the size of
+    the output.
+    """
+
+    def __init__(self) -> None:
+        self._chunks: list[str] = []
+
+    def append(self, data: str) -> None:
+        if data:
+            self._chunks.append(data)
+
+    def getvalue(self) -> str:
+        if len(self._chunks) > 1:
+            # join once, so that reading the value again is cheap
+            self._chunks = [''.join(self._chunks)]
+        return self._chunks[0] if self._chunks else ''